@@ -4,11 +4,14 @@ Provides REST API endpoints for mobile app integration
 """
 
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import random
 import string
+import time
 import os
 import requests
 import json
@@ -17,16 +20,90 @@ import base64
 # Import services
 try:
     from backend.services.astrologer_service import astrologer_manager
-    from backend.database.manager import DatabaseManager
+    from backend.database.manager import DatabaseManager, db
+    from backend.database.async_manager import async_db
+    from backend.database.cursors import InvalidCursorError
+    from backend.database.replicas import set_session_key
+    from backend.database.instrumentation import request_scope, registry as query_stats
+    from backend.database.idempotency import (
+        IdempotencyStore, IdempotencyConflictError, IdempotencyInProgressError
+    )
+    from backend.database.memory import MemoryIdempotencyStore
+    from backend.database.cache import caches as db_caches
 except ImportError:
     from astrologer_manager import astrologer_manager
-    from database.manager import DatabaseManager
+    from database.manager import DatabaseManager, db
+    from database.async_manager import async_db
+    from database.cursors import InvalidCursorError
+    from database.replicas import set_session_key
+    from database.instrumentation import request_scope, registry as query_stats
+    from database.idempotency import (
+        IdempotencyStore, IdempotencyConflictError, IdempotencyInProgressError
+    )
+    from database.memory import MemoryIdempotencyStore
+    from database.cache import caches as db_caches
+
+try:
+    from backend.config.settings import get_idempotency_config
+except ImportError:
+    def get_idempotency_config():
+        return {}
+
+# Retried wallet/purchase requests replay the first response (see idempotency.py)
+_idempotency_store = MemoryIdempotencyStore if db.backend == 'memory' else IdempotencyStore
+idempotency = _idempotency_store(db, run=async_db.run, **get_idempotency_config())
+
+
+async def bind_db_session(request: Request):
+    """
+    Tie database reads/writes in this request to the user, so a user's reads
+    stay on the primary for a moment after their own writes (see replicas.py)
+    """
+    user_id = request.path_params.get('user_id') or request.query_params.get('user_id')
+    if not user_id and request.method in ('POST', 'PUT') and \
+            request.headers.get('content-type', '').startswith('application/json'):
+        try:
+            body = await request.json()
+            if isinstance(body, dict):
+                user_id = body.get('user_id')
+        except ValueError:
+            pass
+    set_session_key(user_id if isinstance(user_id, str) else None)
+
+
+async def track_db_queries(request: Request):
+    """Count the queries each request issues (N+1 detection, /api/admin/db-stats)"""
+    route = request.scope.get('route')
+    name = f"{request.method} {getattr(route, 'path', request.url.path)}"
+    with request_scope(name):
+        yield
+
+
+async def run_idempotent(scope: str, key: Optional[str], body: BaseModel, handler, should_store=None):
+    """Run `handler` at most once per idempotency key, replaying its stored response"""
+    try:
+        return await idempotency.execute(scope, key, jsonable_encoder(body), handler, should_store)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-# Initialize database manager
-db = DatabaseManager()
 
 # Create router
-router = APIRouter(prefix="/api", tags=["mobile"])
+router = APIRouter(
+    prefix="/api",
+    tags=["mobile"],
+    dependencies=[Depends(bind_db_session), Depends(track_db_queries)]
+)
+
+
+@router.on_event("shutdown")
+async def close_database_pool():
+    """Flush queued messages, stop the database executor and cache listeners, release pooled connections"""
+    db.stop_write_behind()
+    db_caches.stop()
+    async_db.shutdown()
+    db.close_pool()
 
 
 # ============================================================================
@@ -121,7 +198,7 @@ async def get_astrologers(
         print("🔮 Fetching astrologers for mobile app...")
         
         # Get astrologers from database instead of JSON file
-        astrologers = db.get_all_astrologers(active_only=active_only)
+        astrologers = await async_db.get_all_astrologers(active_only=active_only)
         
         # Apply filters
         if language:
@@ -235,17 +312,6 @@ async def register_user(user: UserRegistration):
     Saves user data to database and creates wallet with welcome bonus.
     """
     try:
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            # Fallback to root database_manager
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         # CRITICAL: Use provided user_id from OTP verification to prevent duplicate users
         # If user_id is not provided, it means mobile app didn't send it (regression risk)
         if not user.user_id:
@@ -307,7 +373,7 @@ async def register_user(user: UserRegistration):
         }
         
         # Save user to database
-        saved_user_id = db.create_user(user_data)
+        saved_user_id = await async_db.create_user(user_data)
         
         if not saved_user_id:
             raise Exception("Failed to save user to database")
@@ -315,7 +381,7 @@ async def register_user(user: UserRegistration):
         # Create wallet for user with welcome bonus
         welcome_bonus = 500.0  # ₹500 welcome bonus
         
-        wallet_id = db.create_wallet(saved_user_id, initial_balance=welcome_bonus)
+        wallet_id = await async_db.create_wallet(saved_user_id, initial_balance=welcome_bonus)
         
         if wallet_id:
             print(f"💰 Wallet created with ₹{welcome_bonus} welcome bonus")
@@ -370,7 +436,7 @@ async def register_user(user: UserRegistration):
 async def get_user(user_id: str):
     """Get user details with profile completion status"""
     try:
-        with db.get_connection() as conn:
+        def fetch_user(conn):
             with conn.cursor() as cursor:
                 cursor.execute("""
                     SELECT user_id, email, phone_number, full_name, display_name,
@@ -382,47 +448,49 @@ async def get_user(user_id: str):
                     FROM users
                     WHERE user_id = %s
                 """, (user_id,))
-                
-                result = cursor.fetchone()
-                if not result:
-                    raise HTTPException(status_code=404, detail="User not found")
-                
-                # Unpack all fields
-                (user_id_db, email, phone_number, full_name, display_name,
-                 gender, profile_picture_url, language_preference,
-                 birth_date, birth_time, birth_location, birth_timezone,
-                 subscription_type, account_status,
-                 email_verified, phone_verified, created_at, updated_at, last_login_at,
-                 metadata) = result
-                
-                # Check profile completion
-                profile_complete, missing_fields = await check_profile_completion(user_id)
-                
-                return {
-                    "user_id": user_id_db,
-                    "email": email,
-                    "phone_number": phone_number,
-                    "full_name": full_name,
-                    "display_name": display_name,
-                    "date_of_birth": birth_date.strftime("%d/%m/%Y") if birth_date else None,
-                    "gender": gender,
-                    "profile_picture_url": profile_picture_url,
-                    "language_preference": language_preference,
-                    "birth_date": birth_date,
-                    "birth_time": birth_time,
-                    "birth_location": birth_location,
-                    "birth_timezone": birth_timezone,
-                    "subscription_type": subscription_type,
-                    "account_status": account_status,
-                    "email_verified": email_verified,
-                    "phone_verified": phone_verified,
-                    "created_at": created_at.isoformat() if created_at else None,
-                    "updated_at": updated_at.isoformat() if updated_at else None,
-                    "last_login_at": last_login_at.isoformat() if last_login_at else None,
-                    "metadata": metadata,
-                    "profile_complete": profile_complete,
-                    "missing_fields": missing_fields
-                }
+                return cursor.fetchone()
+        
+        result = await async_db.run_with_connection(fetch_user, user_id=user_id)
+        if not result:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        # Unpack all fields
+        (user_id_db, email, phone_number, full_name, display_name,
+         gender, profile_picture_url, language_preference,
+         birth_date, birth_time, birth_location, birth_timezone,
+         subscription_type, account_status,
+         email_verified, phone_verified, created_at, updated_at, last_login_at,
+         metadata) = result
+        
+        # Check profile completion (fields already loaded - no second query)
+        missing_fields = get_missing_profile_fields(full_name, birth_date, birth_time, birth_location, gender)
+        profile_complete = len(missing_fields) == 0
+        
+        return {
+            "user_id": user_id_db,
+            "email": email,
+            "phone_number": phone_number,
+            "full_name": full_name,
+            "display_name": display_name,
+            "date_of_birth": birth_date.strftime("%d/%m/%Y") if birth_date else None,
+            "gender": gender,
+            "profile_picture_url": profile_picture_url,
+            "language_preference": language_preference,
+            "birth_date": birth_date,
+            "birth_time": birth_time,
+            "birth_location": birth_location,
+            "birth_timezone": birth_timezone,
+            "subscription_type": subscription_type,
+            "account_status": account_status,
+            "email_verified": email_verified,
+            "phone_verified": phone_verified,
+            "created_at": created_at.isoformat() if created_at else None,
+            "updated_at": updated_at.isoformat() if updated_at else None,
+            "last_login_at": last_login_at.isoformat() if last_login_at else None,
+            "metadata": metadata,
+            "profile_complete": profile_complete,
+            "missing_fields": missing_fields
+        }
                 
     except HTTPException:
         raise
@@ -446,7 +514,7 @@ class UserUpdateRequest(BaseModel):
 async def update_user_profile(user_id: str, update_data: UserUpdateRequest):
     """Update user profile"""
     try:
-        with db.get_connection() as conn:
+        def apply_update(conn):
             with conn.cursor() as cursor:
                 # Check if user exists
                 cursor.execute("SELECT user_id FROM users WHERE user_id = %s", (user_id,))
@@ -497,10 +565,11 @@ async def update_user_profile(user_id: str, update_data: UserUpdateRequest):
                 
                 cursor.execute(update_query, update_values)
                 
-                print(f"✅ Updated user profile for {user_id}")
-                
-                # Return updated user data
-                return await get_user(user_id)
+        await async_db.run_with_connection(apply_update, user_id=user_id)
+        print(f"✅ Updated user profile for {user_id}")
+        
+        # Return updated user data (read after the update has committed)
+        return await get_user(user_id)
                 
     except HTTPException:
         raise
@@ -743,16 +812,6 @@ async def send_otp(otp_request: OTPRequest):
             print(f"🧪 TEST MODE: Detected test phone number {phone_number}")
             return await handle_test_otp_request(phone_number)
         
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         # Check rate limiting (max 3 OTPs per phone per hour)
         try:
             with db.get_connection() as conn:
@@ -855,16 +914,6 @@ async def verify_otp(otp_verification: OTPVerification):
             print(f"🧪 TEST MODE: Verifying test OTP for {phone_number}")
             return await handle_test_otp_verification(phone_number, otp_code)
         
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         # Verify OTP
         try:
             with db.get_connection() as conn:
@@ -969,47 +1018,53 @@ async def verify_otp(otp_verification: OTPVerification):
         raise HTTPException(status_code=500, detail="OTP verification failed")
 
 
+def get_missing_profile_fields(full_name, birth_date, birth_time, birth_location, gender) -> List[str]:
+    """Return the list of required profile fields that are still empty"""
+    missing_fields = []
+    
+    if not full_name or full_name.strip() == '':
+        missing_fields.append('full_name')
+    
+    if not birth_date:
+        missing_fields.append('birth_date')
+    
+    if not birth_time:
+        missing_fields.append('birth_time')
+    
+    if not birth_location or birth_location.strip() == '':
+        missing_fields.append('birth_location')
+    
+    if not gender:
+        missing_fields.append('gender')
+    
+    return missing_fields
+
+
 async def check_profile_completion(user_id: str) -> tuple[bool, List[str]]:
     """
     Check if user profile is complete and return missing fields.
     Returns (is_complete, missing_fields_list)
     """
     try:
-        with db.get_connection() as conn:
+        def fetch_profile(conn):
             with conn.cursor() as cursor:
                 cursor.execute("""
                     SELECT full_name, birth_date, birth_time, birth_location, gender
                     FROM users 
                     WHERE user_id = %s
                 """, (user_id,))
-                
-                result = cursor.fetchone()
-                if not result:
-                    return False, ['user_not_found']
-                
-                full_name, birth_date, birth_time, birth_location, gender = result
-                
-                missing_fields = []
-                
-                if not full_name or full_name.strip() == '':
-                    missing_fields.append('full_name')
-                
-                if not birth_date:
-                    missing_fields.append('birth_date')
-                
-                if not birth_time:
-                    missing_fields.append('birth_time')
-                
-                if not birth_location or birth_location.strip() == '':
-                    missing_fields.append('birth_location')
-                
-                if not gender:
-                    missing_fields.append('gender')
-                
-                is_complete = len(missing_fields) == 0
-                print(f"📋 Profile completion check for {user_id}: complete={is_complete}, missing={missing_fields}")
-                
-                return is_complete, missing_fields
+                return cursor.fetchone()
+        
+        result = await async_db.run_with_connection(fetch_profile, user_id=user_id)
+        if not result:
+            return False, ['user_not_found']
+        
+        missing_fields = get_missing_profile_fields(*result)
+        
+        is_complete = len(missing_fields) == 0
+        print(f"📋 Profile completion check for {user_id}: complete={is_complete}, missing={missing_fields}")
+        
+        return is_complete, missing_fields
                 
     except Exception as e:
         print(f"❌ Error checking profile completion: {e}")
@@ -1220,7 +1275,7 @@ async def get_wallet(user_id: str):
         print(f"💰 Fetching wallet for user: {user_id}")
         
         # Get wallet from database
-        wallet = db.get_wallet(user_id)
+        wallet = await async_db.get_wallet(user_id)
         
         if wallet:
             wallet_data = {
@@ -1235,9 +1290,9 @@ async def get_wallet(user_id: str):
             return wallet_data
         else:
             # Create wallet if it doesn't exist
-            wallet_id = db.create_wallet(user_id, initial_balance=50.00)
+            wallet_id = await async_db.create_wallet(user_id, initial_balance=50.00)
             if wallet_id:
-                wallet = db.get_wallet(user_id)
+                wallet = await async_db.get_wallet(user_id)
                 wallet_data = {
                     "success": True,
                     "wallet_id": wallet['wallet_id'],
@@ -1318,17 +1373,6 @@ async def start_chat(session_data: dict):
     Fetches user data from database and creates conversation.
     """
     try:
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            # Fallback to root database_manager
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         user_id = session_data.get('user_id')
         astrologer_id = session_data.get('astrologer_id')
         topic = session_data.get('topic', 'general')
@@ -1337,7 +1381,7 @@ async def start_chat(session_data: dict):
             raise HTTPException(status_code=400, detail="user_id and astrologer_id are required")
         
         # Fetch user data from database
-        user_data = db.get_user(user_id)
+        user_data = await async_db.get_user(user_id)
         
         if not user_data:
             print(f"⚠️ User not found in database: {user_id}")
@@ -1345,7 +1389,7 @@ async def start_chat(session_data: dict):
             user_data = {'user_id': user_id}
         
         # Create conversation using database manager
-        conversation_id = db.create_conversation(user_id, astrologer_id, topic)
+        conversation_id = await async_db.create_conversation(user_id, astrologer_id, topic)
         
         if not conversation_id:
             raise HTTPException(status_code=500, detail="Failed to create conversation")
@@ -1394,40 +1438,37 @@ class ChatRequest(BaseModel):
     message: str
     
 
-@router.post("/chat/send")
-async def send_ai_chat_message(chat_request: ChatRequest):
+def _chat_handlers():
+    """The process-wide chat handler registry (500 if the chat stack is unavailable)"""
+    try:
+        from backend.handlers.chat_registry import chat_handlers
+    except ImportError:
+        print("❌ OpenAIChatHandler not available")
+        raise HTTPException(status_code=500, detail="Chat service not available")
+    return chat_handlers
+
+
+async def _prepare_chat_turn(chat_request: ChatRequest):
     """
-    Send message to AI astrologer with user context.
-    Fetches user birth details and includes them in the AI prompt.
+    Get the user's handler and the prompt for this turn.
+    Returns (chat_handler, message_with_context).
     """
-    try:
-        # Import required modules
-        try:
-            from backend.database.manager import db
-            from backend.handlers.openai_chat import OpenAIChatHandler
-        except ImportError as import_err:
-            print(f"⚠️ Import error: {import_err}")
-            # Fallback - try to create handler without db if needed
-            try:
-                from backend.handlers.openai_chat import OpenAIChatHandler
-            except ImportError:
-                print("❌ OpenAIChatHandler not available")
-                raise HTTPException(status_code=500, detail="Chat service not available")
-        
-        print(f"💬 AI Chat request from user {chat_request.user_id}")
-        print(f"   Conversation: {chat_request.conversation_id}")
-        print(f"   Astrologer: {chat_request.astrologer_id}")
-        print(f"   Message: {chat_request.message[:50]}...")
-        
-        # Fetch user data from database
-        user_data = db.get_user(chat_request.user_id)
-        
-        if not user_data:
-            print(f"⚠️ User not found in database: {chat_request.user_id}")
-            user_data = {'user_id': chat_request.user_id}
-        
-        # Build user context for AI
-        user_context_text = f"""
+    chat_handlers = _chat_handlers()
+    
+    print(f"💬 AI Chat request from user {chat_request.user_id}")
+    print(f"   Conversation: {chat_request.conversation_id}")
+    print(f"   Astrologer: {chat_request.astrologer_id}")
+    print(f"   Message: {chat_request.message[:50]}...")
+    
+    # Fetch user data from database
+    user_data = await async_db.get_user(chat_request.user_id)
+    
+    if not user_data:
+        print(f"⚠️ User not found in database: {chat_request.user_id}")
+        user_data = {'user_id': chat_request.user_id}
+    
+    # Build user context for AI
+    user_context_text = f"""
 User Information:
 - Name: {user_data.get('full_name', 'Not provided')}
 - Gender: {user_data.get('gender', 'Not provided')}
@@ -1436,67 +1477,81 @@ User Information:
 - Place of Birth: {user_data.get('birth_location', 'Not provided')}
 - Preferred Language: {user_data.get('language_preference', 'Hindi')}
 """
+    
+    # Get (or create) this user's handler for the astrologer - shares the
+    # process's OpenAI client and persona, keeps recent turns in memory
+    chat_handler = chat_handlers.get(chat_request.user_id, chat_request.astrologer_id)
+    
+    # CRITICAL: Set conversation_id in handler's user_states before sending message
+    chat_handler.set_conversation_id(chat_request.user_id, chat_request.conversation_id)
+    print(f"💾 Set conversation_id in handler: {chat_request.conversation_id}")
+    
+    # For first message, inject user context
+    message_with_context = chat_request.message
+    
+    # Check if this is the first user message in conversation
+    try:
+        conversation = await async_db.get_conversation(chat_request.conversation_id)
+        if conversation and conversation.get('total_messages', 0) == 0:
+            # First message - add context
+            message_with_context = f"{user_context_text}\n\nUser's Question: {chat_request.message}"
+            print(f"📋 First message - including user context")
+    except:
+        pass
+    
+    return chat_handler, message_with_context
+
+
+async def _record_chat_turn(chat_request: ChatRequest, response: Dict[str, Any]) -> Dict[str, Any]:
+    """Persist a completed turn (raw user message, not the context-augmented prompt) and build the API response"""
+    # Queue both messages; counters and preview are committed with the next batch
+    turn = await async_db.queue_turn(
+        chat_request.conversation_id,
+        chat_request.message,
+        response['message'],
+        tokens=response.get('tokens_used'),
+        model=response.get('model'),
+        user_id=chat_request.user_id
+    )
+    if not turn:
+        print(f"⚠️ Failed to save chat turn to database")
+        # Continue anyway
+    
+    print(f"✅ AI response generated ({response.get('tokens_used', 0)} tokens)")
+    
+    return {
+        "success": True,
+        "conversation_id": chat_request.conversation_id,
+        "user_message": chat_request.message,
+        "ai_response": response['message'],
+        "astrologer_name": response.get('astrologer_name', 'Astrologer'),
+        "tokens_used": response.get('tokens_used', 0),
+        "thinking_phase": response.get('thinking_phase', 1),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.post("/chat/send")
+async def send_ai_chat_message(chat_request: ChatRequest):
+    """
+    Send message to AI astrologer with user context.
+    Fetches user birth details and includes them in the AI prompt.
+    """
+    try:
+        started = time.perf_counter()
+        chat_handler, message_with_context = await _prepare_chat_turn(chat_request)
         
-        # Create or get chat handler for this astrologer
-        chat_handler = OpenAIChatHandler(astrologer_id=chat_request.astrologer_id)
-        
-        # CRITICAL: Set conversation_id in handler's user_states before sending message
-        if chat_request.user_id not in chat_handler.user_states:
-            chat_handler.user_states[chat_request.user_id] = {}
-        chat_handler.user_states[chat_request.user_id]['conversation_id'] = chat_request.conversation_id
-        print(f"💾 Set conversation_id in handler: {chat_request.conversation_id}")
-        
-        # For first message, inject user context
-        message_with_context = chat_request.message
-        
-        # Check if this is the first user message in conversation
-        try:
-            conversation = db.get_conversation(chat_request.conversation_id)
-            if conversation and conversation.get('total_messages', 0) == 0:
-                # First message - add context
-                message_with_context = f"{user_context_text}\n\nUser's Question: {chat_request.message}"
-                print(f"📋 First message - including user context")
-        except:
-            pass
-        
-        # Get AI response
+        # Get AI response (the turn is persisted by _record_chat_turn)
         response = await chat_handler.send_message(
             user_id=chat_request.user_id,
-            message=message_with_context
+            message=message_with_context,
+            persist=False
         )
         
         if response.get('success'):
-            # Save messages to database
-            try:
-                # Save user message
-                user_msg_id = f"msg_{chat_request.conversation_id}_user_{int(datetime.now().timestamp())}"
-                db.add_message(chat_request.conversation_id, 'user', chat_request.message, 'text')
-                
-                # Update conversation last message info
-                db.update_conversation_last_message(chat_request.conversation_id, chat_request.message)
-                
-                # Save AI response
-                ai_msg_id = f"msg_{chat_request.conversation_id}_ai_{int(datetime.now().timestamp())}"
-                db.add_message(chat_request.conversation_id, 'astrologer', response['message'], 'text')
-                
-                # Update conversation
-                db.update_conversation_activity(chat_request.conversation_id)
-            except Exception as db_error:
-                print(f"⚠️ Failed to save to database: {db_error}")
-                # Continue anyway
-            
-            print(f"✅ AI response generated ({response.get('tokens_used', 0)} tokens)")
-            
-            return {
-                "success": True,
-                "conversation_id": chat_request.conversation_id,
-                "user_message": chat_request.message,
-                "ai_response": response['message'],
-                "astrologer_name": response.get('astrologer_name', 'Astrologer'),
-                "tokens_used": response.get('tokens_used', 0),
-                "thinking_phase": response.get('thinking_phase', 1),
-                "timestamp": datetime.now().isoformat()
-            }
+            result = await _record_chat_turn(chat_request, response)
+            _chat_handlers().record_latency('blocking', (time.perf_counter() - started) * 1000)
+            return result
         else:
             raise Exception("Failed to get AI response")
             
@@ -1509,6 +1564,73 @@ User Information:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def stream_chat_turn(chat_request: ChatRequest, prepared=None, started: Optional[float] = None):
+    """
+    Streaming counterpart of /chat/send, shared by the SSE endpoint and the
+    text-chat WebSocket.
+    
+    Yields {"type": "delta", "text"} events as tokens arrive, then one
+    {"type": "done", ...} event with the /chat/send response fields plus
+    ttft_ms and total_ms. The turn is saved only once the stream completes.
+    
+    Latency is measured like /chat/send: from `started` (taken by the caller
+    before _prepare_chat_turn, or now) until the turn is recorded.
+    """
+    if started is None:
+        started = time.perf_counter()
+    chat_handler, message_with_context = prepared or await _prepare_chat_turn(chat_request)
+    
+    ttft_ms = None
+    async for event in chat_handler.stream_message(
+        user_id=chat_request.user_id,
+        message=message_with_context,
+        persist=False
+    ):
+        if event['type'] != 'done':
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - started) * 1000
+            yield event
+            continue
+        if not event.get('success'):
+            raise Exception("Failed to get AI response")
+        result = await _record_chat_turn(chat_request, event)
+        total_ms = (time.perf_counter() - started) * 1000
+        if ttft_ms is None:
+            ttft_ms = total_ms
+        _chat_handlers().record_latency('streaming', total_ms, ttft_ms=ttft_ms)
+        yield {"type": "done", **result, "ttft_ms": round(ttft_ms, 1), "total_ms": round(total_ms, 1)}
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/chat/send/stream")
+async def stream_ai_chat_message(chat_request: ChatRequest):
+    """
+    Send message to AI astrologer and stream the reply as Server-Sent Events.
+    Emits `delta` events with token text, then a `done` event carrying the
+    same fields as /chat/send plus ttft_ms/total_ms, or an `error` event.
+    """
+    # Resolve the handler before streaming starts so setup failures are plain HTTP errors
+    started = time.perf_counter()
+    prepared = await _prepare_chat_turn(chat_request)
+    
+    async def events():
+        try:
+            async for event in stream_chat_turn(chat_request, prepared, started):
+                yield _sse(event)
+        except Exception as e:
+            print(f"❌ Error in AI chat stream: {e}")
+            yield _sse({"type": "error", "detail": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/chat/message")
 async def send_chat_message(message_data: dict):
     """Send a message in chat session (legacy endpoint)"""
@@ -1526,15 +1648,7 @@ async def send_chat_message(message_data: dict):
         print(f"   Content: {content[:50]}...")
         
         # Save to database
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
-        message_id = f"msg_{conversation_id}_{int(datetime.now().timestamp())}"
-        
-        db.add_message(conversation_id, sender_type, content, message_type)
+        message_id = await async_db.add_message(conversation_id, sender_type, content, message_type)
         
         return {
             "success": True,
@@ -1575,16 +1689,9 @@ async def pause_chat_session(session_data: dict):
             except ValueError:
                 paused_at = None
         
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         print(f"⏸️ Pausing chat session: {conversation_id}")
         
-        success = db.pause_conversation_session(conversation_id, paused_at)
+        success = await async_db.pause_conversation_session(conversation_id, paused_at)
         
         if success:
             return {
@@ -1621,16 +1728,9 @@ async def resume_chat_session(session_data: dict):
             except ValueError:
                 resumed_at = None
         
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         print(f"▶️ Resuming chat session: {conversation_id}")
         
-        success = db.resume_conversation_session(conversation_id, resumed_at)
+        success = await async_db.resume_conversation_session(conversation_id, resumed_at)
         
         if success:
             return {
@@ -1668,16 +1768,9 @@ async def end_chat_session(session_data: dict):
             except ValueError:
                 ended_at = None
         
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         print(f"🛑 Ending chat session: {conversation_id}")
         
-        success = db.end_conversation_session(conversation_id, ended_at, total_duration)
+        success = await async_db.end_conversation_session(conversation_id, ended_at, total_duration)
         
         if success:
             return {
@@ -1702,16 +1795,9 @@ async def end_chat_session(session_data: dict):
 async def get_session_status(conversation_id: str):
     """Get current session status and details"""
     try:
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         print(f"📊 Getting session status: {conversation_id}")
         
-        session_data = db.get_conversation_session_status(conversation_id)
+        session_data = await async_db.get_conversation_session_status(conversation_id)
         
         if session_data:
             # Calculate current session duration
@@ -1754,32 +1840,44 @@ async def get_session_status(conversation_id: str):
 
 
 @router.get("/chat/history/{conversation_id}")
-async def get_chat_history(conversation_id: str, limit: int = 50, offset: int = 0):
-    """Get chat message history for a conversation with pagination"""
+async def get_chat_history(
+    conversation_id: str,
+    limit: int = 50,
+    offset: int = 0,
+    before_cursor: Optional[str] = None
+):
+    """
+    Get chat message history for a conversation with pagination.
+    
+    Pass the previous response's next_cursor as before_cursor to load older
+    messages. offset is kept for older app versions that don't send a cursor.
+    """
     try:
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
-        print(f"📜 Getting chat history: {conversation_id} (limit: {limit}, offset: {offset})")
-        
-        # Get messages with offset and limit (for older messages)
-        messages = db.get_conversation_history(conversation_id, limit, offset)
-        
-        if messages is not None:
-            return {
-                "success": True,
-                "conversation_id": conversation_id,
-                "messages": messages,
-                "total_count": len(messages),
-                "has_more": len(messages) == limit  # Indicate if more messages might exist
+        print(f"📜 Getting chat history: {conversation_id} (limit: {limit}, cursor: {before_cursor}, offset: {offset})")
+        
+        if offset and not before_cursor:
+            # Legacy offset paging
+            messages = await async_db.get_conversation_history(conversation_id, limit + 1, offset)
+            has_more = len(messages) > limit
+            page = {
+                "messages": messages[-limit:] if has_more else messages,
+                "has_more": has_more,
+                "next_cursor": None
             }
         else:
-            raise HTTPException(status_code=404, detail="Conversation not found")
+            page = await async_db.get_conversation_history_page(conversation_id, limit, before_cursor)
+        
+        return {
+            "success": True,
+            "conversation_id": conversation_id,
+            "messages": page['messages'],
+            "total_count": len(page['messages']),
+            "has_more": page['has_more'],
+            "next_cursor": page['next_cursor']
+        }
             
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -1832,16 +1930,10 @@ async def get_user_conversations(
     Returns the most recent conversation for each astrologer.
     """
     try:
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            from database.manager import db
-        
         print(f"📜 Getting conversations for user: {user_id}")
         
         # Get conversations grouped by astrologer
-        conversations = db.get_user_conversations(user_id, limit)
+        conversations = await async_db.get_user_conversations(user_id, limit)
         
         print(f"✅ Found {len(conversations)} conversations")
         
@@ -1857,30 +1949,44 @@ async def get_user_conversations(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/chat/conversations/{user_id}/{astrologer_id}/read")
+async def mark_conversation_read(user_id: str, astrologer_id: str):
+    """
+    Mark a user's chat with an astrologer as read (clears the chat list badge).
+    """
+    try:
+        updated = await async_db.mark_thread_read(user_id, astrologer_id)
+        return {
+            "success": True,
+            "updated": updated
+        }
+        
+    except Exception as e:
+        print(f"❌ Error marking conversation read: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/chat/unified-history/{user_id}/{astrologer_id}")
 async def get_unified_chat_history(
     user_id: str, 
     astrologer_id: str, 
     limit: int = 50, 
-    offset: int = 0
+    offset: int = 0,
+    before_cursor: Optional[str] = None
 ):
     """
     Get unified chat history for a user-astrologer pair.
     Returns all messages from all conversations with date separators.
-    Supports pagination for loading older messages.
+    Supports cursor pagination for loading older messages: pass the previous
+    response's next_cursor as before_cursor.
     """
     try:
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         print(f"📜 Getting unified chat history: {user_id} + {astrologer_id}")
-        print(f"   Limit: {limit}, Offset: {offset}")
+        print(f"   Limit: {limit}, Cursor: {before_cursor}, Offset: {offset}")
         
-        result = db.get_unified_chat_history(user_id, astrologer_id, limit, offset)
+        result = await async_db.get_unified_chat_history(
+            user_id, astrologer_id, limit, offset, before_cursor=before_cursor
+        )
         
         if result.get('success'):
             print(f"✅ Unified history loaded: {len(result['messages'])} messages")
@@ -1890,6 +1996,8 @@ async def get_unified_chat_history(
         else:
             raise HTTPException(status_code=404, detail=result.get('error', 'History not found'))
             
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -1899,6 +2007,48 @@ async def get_unified_chat_history(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/chat/search/{user_id}")
+async def search_chat_history(
+    user_id: str,
+    q: str,
+    astrologer_id: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+):
+    """
+    Search a user's chat history, best matches first.
+    Supports quoted phrases and -excluded words; matches English word forms
+    as well as Hinglish and Devanagari text.
+    """
+    try:
+        q = q.strip()
+        if not q:
+            raise HTTPException(status_code=400, detail="Search query is required")
+        limit = max(1, min(limit, 50))
+        offset = max(0, offset)
+
+        print(f"🔍 Searching chat history: {user_id} q={q!r}")
+        result = await async_db.search_messages(user_id, q, astrologer_id, limit, offset)
+
+        if not result.get('success'):
+            raise HTTPException(status_code=500, detail=result.get('error', 'Search failed'))
+
+        return {
+            "success": True,
+            "query": q,
+            "results": result['results'],
+            "has_more": result['has_more'],
+            "offset": offset,
+            "limit": limit
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error searching chat history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/chat/start-unified")
 async def start_unified_chat_session(session_data: dict):
     """
@@ -1906,13 +2056,6 @@ async def start_unified_chat_session(session_data: dict):
     Creates conversation linked to existing ones if available.
     """
     try:
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         user_id = session_data.get('user_id')
         astrologer_id = session_data.get('astrologer_id')
         topic = session_data.get('topic', 'general')
@@ -1921,14 +2064,14 @@ async def start_unified_chat_session(session_data: dict):
             raise HTTPException(status_code=400, detail="user_id and astrologer_id are required")
         
         # Fetch user data from database
-        user_data = db.get_user(user_id)
+        user_data = await async_db.get_user(user_id)
         
         if not user_data:
             print(f"⚠️ User not found in database: {user_id}")
             user_data = {'user_id': user_id}
         
         # Create unified conversation
-        conversation_id = db.create_unified_conversation(user_id, astrologer_id, topic)
+        conversation_id = await async_db.create_unified_conversation(user_id, astrologer_id, topic)
         
         if not conversation_id:
             raise HTTPException(status_code=500, detail="Failed to create unified conversation")
@@ -2009,48 +2152,18 @@ async def end_chat(end_data: ConversationEndData):
 @router.post("/admin/init-database")
 async def init_database():
     """
-    Initialize database schema (admin endpoint).
-    WARNING: Only use for first-time setup!
+    Initialize or upgrade the database schema (admin endpoint).
+    Applies the baseline schema and any pending migrations; safe to re-run.
     """
     try:
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            # Fallback to root database_manager
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
-        print(f"🔧 Attempting to initialize database schema...")
+        print(f"🔧 Applying database migrations...")
         
-        # Execute schema file
-        schema_file = 'database_schema.sql'
+        result = await async_db.migrate(wait=False)
         
-        # Try different paths
-        import os
-        possible_paths = [
-            schema_file,
-            f'/var/task/{schema_file}',  # Lambda deployment path
-            os.path.join(os.path.dirname(__file__), '..', '..', schema_file),
-        ]
+        if result['locked']:
+            raise HTTPException(status_code=409, detail="Another instance is running migrations")
         
-        schema_path = None
-        for path in possible_paths:
-            if os.path.exists(path):
-                schema_path = path
-                break
-        
-        if not schema_path:
-            raise Exception(f"Schema file not found. Tried: {possible_paths}")
-        
-        print(f"📄 Using schema file: {schema_path}")
-        
-        success = db.execute_schema(schema_path)
-        
-        if success:
+        if result['success']:
             # Check what was created
             try:
                 with db.get_connection() as conn:
@@ -2068,12 +2181,13 @@ async def init_database():
                         astrologer_count = cursor.fetchone()[0]
                 
                 print(f"✅ Database initialized successfully!")
-                print(f"   Tables created: {len(tables)}")
+                print(f"   Tables: {len(tables)}")
                 print(f"   Sample astrologers: {astrologer_count}")
                 
                 return {
                     "success": True,
                     "message": "Database schema initialized successfully",
+                    "migrations_applied": result['applied'],
                     "tables_created": tables,
                     "table_count": len(tables),
                     "sample_astrologers": astrologer_count,
@@ -2084,12 +2198,15 @@ async def init_database():
                 return {
                     "success": True,
                     "message": "Database schema initialized (verification partial)",
+                    "migrations_applied": result['applied'],
                     "note": str(check_error),
                     "timestamp": datetime.now().isoformat()
                 }
         else:
-            raise Exception("Schema execution returned False")
+            raise Exception(f"Migration failed: {result['error']}")
             
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error initializing database: {e}")
         import traceback
@@ -2097,21 +2214,28 @@ async def init_database():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/admin/migrations")
+async def get_migrations():
+    """List schema migrations and whether each has been applied"""
+    try:
+        migrations = await async_db.get_migration_status()
+        pending = [m['version'] for m in migrations if not m['applied']]
+        return {
+            "success": True,
+            "migrations": migrations,
+            "pending": pending,
+            "up_to_date": not pending,
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        print(f"❌ Error reading migration status: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/admin/check-database")
 async def check_database():
     """Check database status and existing tables"""
     try:
-        # Import database manager
-        try:
-            from backend.database.manager import db
-        except ImportError:
-            # Fallback to root database_manager
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            from database_manager import DatabaseManager
-            db = DatabaseManager()
-        
         with db.get_connection() as conn:
             with conn.cursor() as cursor:
                 # Check tables
@@ -2140,6 +2264,8 @@ async def check_database():
                     "table_count": len(tables),
                     "row_counts": counts,
                     "initialized": len(tables) > 0,
+                    "connection_pool": db.get_pool_stats() if hasattr(db, 'get_pool_stats') else None,
+                    "write_behind": db.get_write_behind_stats(),
                     "timestamp": datetime.now().isoformat()
                 }
     except Exception as e:
@@ -2149,6 +2275,27 @@ async def check_database():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/admin/db-stats")
+async def get_db_stats(top: int = 50, reset: bool = False):
+    """
+    In-process query instrumentation: latency histograms per DatabaseManager
+    method and statement, per-route query counts, flagged N+1 requests and
+    EXPLAIN samples of slow queries. Pass reset=true to start a fresh window.
+    """
+    stats = query_stats.snapshot(top=top)
+    stats["connection_pool"] = db.get_pool_stats()
+    stats["caches"] = db_caches.stats()
+    if reset:
+        query_stats.reset()
+    return stats
+
+
+@router.get("/admin/chat-stats")
+async def get_chat_stats():
+    """Chat handler registry: hits, evictions, estimated resident size and reply latency"""
+    return _chat_handlers().stats()
+
+
 # ============================================================================
 # Google Play Purchase Verification
 # ============================================================================
@@ -2163,11 +2310,27 @@ class GooglePlayPurchase(BaseModel):
 
 
 @router.post("/wallet/verify-purchase")
-async def verify_google_play_purchase(purchase: GooglePlayPurchase):
+async def verify_google_play_purchase(
+    purchase: GooglePlayPurchase,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Verify Google Play purchase and credit wallet.
     Handles product bonus + first-time ₹50 bonus.
+    
+    Idempotent per Idempotency-Key header (defaults to the purchase token):
+    a retry gets the original response without re-verifying or re-crediting.
     """
+    return await run_idempotent(
+        'verify_purchase',
+        idempotency_key or purchase.purchase_token,
+        purchase,
+        lambda: _process_google_play_purchase(purchase)
+    )
+
+
+async def _process_google_play_purchase(purchase: GooglePlayPurchase):
+    """Verify a purchase with Google Play and credit the wallet"""
     try:
         from backend.services.google_play_billing import get_billing_service
         
@@ -2177,7 +2340,7 @@ async def verify_google_play_purchase(purchase: GooglePlayPurchase):
         print(f"   Token: {purchase.purchase_token[:20]}...")
         
         # 1. Check if purchase token already processed (prevent duplicate)
-        if db.check_purchase_token_exists(purchase.purchase_token):
+        if await async_db.check_purchase_token_exists(purchase.purchase_token):
             raise HTTPException(
                 status_code=400,
                 detail="Purchase already processed. Each purchase can only be used once."
@@ -2201,7 +2364,7 @@ async def verify_google_play_purchase(purchase: GooglePlayPurchase):
             print(f"⚠️ Google Play verification not available, proceeding without verification (development mode)")
         
         # 3. Get product details from database
-        product = db.get_product_by_id(purchase.product_id)
+        product = await async_db.get_product_by_id(purchase.product_id)
         if not product:
             raise HTTPException(status_code=404, detail=f"Product not found: {purchase.product_id}")
         
@@ -2211,7 +2374,7 @@ async def verify_google_play_purchase(purchase: GooglePlayPurchase):
         
         # Check for first-time recharge bonus
         first_time_bonus = 0.00
-        if not db.has_first_recharge_bonus(purchase.user_id):
+        if not await async_db.has_first_recharge_bonus(purchase.user_id):
             first_time_bonus = 50.00  # Flat ₹50 bonus
             print(f"🎉 First-time recharge detected! Adding ₹{first_time_bonus} bonus")
         
@@ -2226,16 +2389,16 @@ async def verify_google_play_purchase(purchase: GooglePlayPurchase):
         print(f"   Total credited: ₹{total_credited}")
         
         # 5. Get user's wallet
-        wallet = db.get_wallet(purchase.user_id)
+        wallet = await async_db.get_wallet(purchase.user_id)
         if not wallet:
             # Create wallet if it doesn't exist
-            wallet_id = db.create_wallet(purchase.user_id, initial_balance=0)
-            wallet = db.get_wallet(purchase.user_id)
+            wallet_id = await async_db.create_wallet(purchase.user_id, initial_balance=0)
+            wallet = await async_db.get_wallet(purchase.user_id)
             if not wallet:
                 raise HTTPException(status_code=500, detail="Failed to create or retrieve wallet")
         
         # 6. Create transaction and update wallet
-        transaction_id = db.create_google_play_transaction(
+        transaction_id = await async_db.create_google_play_transaction(
             user_id=purchase.user_id,
             wallet_id=wallet['wallet_id'],
             product_id=purchase.product_id,
@@ -2259,7 +2422,7 @@ async def verify_google_play_purchase(purchase: GooglePlayPurchase):
                 print(f"✅ Purchase acknowledged with Google Play")
         
         # 8. Get updated wallet balance
-        updated_wallet = db.get_wallet(purchase.user_id)
+        updated_wallet = await async_db.get_wallet(purchase.user_id)
         
         return {
             'success': True,
@@ -2343,11 +2506,30 @@ class SessionDeduction(BaseModel):
 
 
 @router.post("/wallet/deduct-session")
-async def deduct_session_balance(deduction: SessionDeduction):
+async def deduct_session_balance(
+    deduction: SessionDeduction,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Deduct wallet balance for chat session usage.
     This is called during active sessions (per minute) or at session end.
+    
+    Idempotent per Idempotency-Key header. Requests without one are always
+    charged: the request body alone cannot tell a retry from a second real
+    charge with the same conversation, minute and type. Only successful
+    deductions are replayed, so a retry after a recharge can still go through.
     """
+    return await run_idempotent(
+        'deduct_session',
+        idempotency_key,
+        deduction,
+        lambda: _process_session_deduction(deduction),
+        should_store=lambda response: response.get('success') is True
+    )
+
+
+async def _process_session_deduction(deduction: SessionDeduction):
+    """Debit the wallet for a session deduction"""
     try:
         print(f"💰 Processing session deduction:")
         print(f"   User: {deduction.user_id}")
@@ -2356,15 +2538,31 @@ async def deduct_session_balance(deduction: SessionDeduction):
         print(f"   Amount: ₹{deduction.amount}")
         print(f"   Duration: {deduction.session_duration_minutes} minutes")
         
-        # 1. Get user's wallet
-        wallet = db.get_wallet(deduction.user_id)
-        if not wallet:
-            raise HTTPException(status_code=404, detail="Wallet not found")
-        
-        current_balance = float(wallet['balance'])
+        # Conditional debit + ledger row in one statement (safe against
+        # concurrent per-minute deductions from several devices)
+        result = await async_db.debit_wallet(
+            deduction.user_id,
+            deduction.amount,
+            description=f"Chat session with {deduction.astrologer_name}",
+            reference_type='conversation',
+            reference_id=deduction.conversation_id,
+            metadata={
+                'conversation_id': deduction.conversation_id,
+                'astrologer_id': deduction.astrologer_id,
+                'astrologer_name': deduction.astrologer_name,
+                'session_duration_minutes': deduction.session_duration_minutes,
+                'deduction_type': deduction.deduction_type,
+                'deduction_timestamp': datetime.now().isoformat()
+            }
+        )
         
-        # 2. Check if user has sufficient balance
-        if current_balance < deduction.amount:
+        if not result['success']:
+            if result['error'] == 'wallet_not_found':
+                raise HTTPException(status_code=404, detail="Wallet not found")
+            if result['error'] != 'insufficient_balance':
+                raise HTTPException(status_code=500, detail="Failed to create deduction transaction")
+            
+            current_balance = result['current_balance']
             print(f"⚠️ Insufficient balance: {current_balance} < {deduction.amount}")
             return {
                 "success": False,
@@ -2375,33 +2573,9 @@ async def deduct_session_balance(deduction: SessionDeduction):
                 "message": "Insufficient wallet balance for this session"
             }
         
-        # 3. Create deduction transaction
-        transaction_data = {
-            'user_id': deduction.user_id,
-            'wallet_id': wallet['wallet_id'],
-            'transaction_type': 'deduction',
-            'amount': deduction.amount,
-            'payment_method': 'wallet',
-            'payment_status': 'completed',
-            'description': f"Chat session with {deduction.astrologer_name}",
-            'metadata': {
-                'conversation_id': deduction.conversation_id,
-                'astrologer_id': deduction.astrologer_id,
-                'astrologer_name': deduction.astrologer_name,
-                'session_duration_minutes': deduction.session_duration_minutes,
-                'deduction_type': deduction.deduction_type,
-                'deduction_timestamp': datetime.now().isoformat()
-            }
-        }
-        
-        transaction_id = db.add_transaction(transaction_data)
-        
-        if not transaction_id:
-            raise HTTPException(status_code=500, detail="Failed to create deduction transaction")
-        
-        # 4. Get updated wallet balance
-        updated_wallet = db.get_wallet(deduction.user_id)
-        new_balance = float(updated_wallet['balance'])
+        transaction_id = result['transaction_id']
+        current_balance = result['balance_before']
+        new_balance = result['balance_after']
         
         print(f"✅ Session deduction completed:")
         print(f"   Transaction ID: {transaction_id}")
@@ -2434,7 +2608,7 @@ async def deduct_session_balance(deduction: SessionDeduction):
 async def get_recharge_products(platform: str = 'android'):
     """Get available recharge products with bonus information"""
     try:
-        products = db.get_recharge_products(platform)
+        products = await async_db.get_recharge_products(platform)
         
         return {
             'success': True,
@@ -2456,7 +2630,7 @@ async def get_filtered_transactions(user_id: str, type: str = None, limit: int =
     - limit: max number of transactions (default 20)
     """
     try:
-        transactions = db.get_filtered_transactions(user_id, type, limit)
+        transactions = await async_db.get_filtered_transactions(user_id, type, limit)
         
         # Format for mobile app
         formatted_transactions = []
@@ -0,0 +1,120 @@
+"""
+Secrets Cache for AstroVoice
+Process-level cache for AWS Secrets Manager values
+
+Lambda keeps the process (and this module) alive between warm invocations,
+so the boto3 client is created once and each secret is fetched once per TTL
+instead of on every DatabaseManager construction.
+
+Rotation:
+- Values expire after ttl_seconds and are fetched again on next use.
+- Callers that see the cached value rejected (e.g. password authentication
+  failed right after a rotation) ask for refresh=True; that refetches at
+  most once per min_refresh_interval so a bad password cannot hammer the API.
+- If a refetch fails, the last known value keeps being served.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class SecretCache:
+    """Thread-safe TTL cache of JSON secrets from AWS Secrets Manager"""
+
+    def __init__(self, ttl_seconds: float = 3600.0, min_refresh_interval: float = 30.0,
+                 region_name: str = 'ap-south-1', client_factory: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            ttl_seconds: How long a fetched secret is used before fetching it again
+            min_refresh_interval: Minimum seconds between forced refreshes of one secret
+            region_name: AWS region of the secrets
+            client_factory: Returns a Secrets Manager client (default: boto3)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.min_refresh_interval = min_refresh_interval
+        self.region_name = region_name
+        self._client_factory = client_factory
+        self._client = None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'fetches': 0, 'rotations_seen': 0, 'fetch_errors': 0}
+
+    def get(self, secret_id: str, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Get a secret's JSON value.
+
+        Args:
+            secret_id: Secret ARN or name
+            refresh: The cached value was rejected - fetch again (rate limited)
+
+        Raises:
+            Exception: If the secret was never fetched successfully and fetching fails
+        """
+        with self._lock:
+            entry = self._entries.get(secret_id)
+            now = time.monotonic()
+            if entry is not None:
+                age = now - entry['fetched_at']
+                fresh = age < self.ttl_seconds
+                if (fresh and not refresh) or (refresh and age < self.min_refresh_interval):
+                    self._stats['hits'] += 1
+                    return dict(entry['value'])
+
+            try:
+                response = self._get_client().get_secret_value(SecretId=secret_id)
+            except Exception as e:
+                self._stats['fetch_errors'] += 1
+                if entry is None:
+                    raise
+                print(f"⚠️ Could not refresh secret, using cached value: {e}")
+                # Don't retry on every call while Secrets Manager is unreachable
+                entry['fetched_at'] = now - self.ttl_seconds + self.min_refresh_interval
+                return dict(entry['value'])
+
+            self._stats['fetches'] += 1
+            version = response.get('VersionId')
+            if entry is not None and version != entry['version']:
+                self._stats['rotations_seen'] += 1
+                print("🔑 Secret rotated - using the new version")
+            self._entries[secret_id] = {
+                'value': json.loads(response['SecretString']),
+                'version': version,
+                'fetched_at': now,
+            }
+            return dict(self._entries[secret_id]['value'])
+
+    def invalidate(self, secret_id: Optional[str] = None) -> None:
+        """Forget one secret (or all of them)"""
+        with self._lock:
+            if secret_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(secret_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'cached': len(self._entries)}
+
+    def _get_client(self):
+        """Secrets Manager client, created on first use (lock held)"""
+        if self._client is None:
+            if self._client_factory is not None:
+                self._client = self._client_factory()
+            else:
+                import boto3
+                self._client = boto3.client('secretsmanager', region_name=self.region_name)
+        return self._client
+
+
+_secret_cache: Optional[SecretCache] = None
+
+
+def get_secret_cache() -> SecretCache:
+    """The process-wide SecretCache (configured from settings on first use)"""
+    global _secret_cache
+    if _secret_cache is None:
+        from backend.config.settings import get_secrets_config
+        _secret_cache = SecretCache(**get_secrets_config())
+    return _secret_cache
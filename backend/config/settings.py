@@ -26,23 +26,107 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_REALTIME_MODEL = os.getenv("OPENAI_REALTIME_MODEL", "gpt-4o-mini-realtime-preview")
 OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
 
+# Text chat handlers (backend/handlers/chat_registry.py) - one shared OpenAI client,
+# per-user handlers kept in a bounded LRU
+CHAT_HANDLER_MAX_ENTRIES = int(os.getenv("CHAT_HANDLER_MAX_ENTRIES", "1000"))
+CHAT_HANDLER_IDLE_TTL_SECONDS = float(os.getenv("CHAT_HANDLER_IDLE_TTL_SECONDS", "1800"))
+CHAT_HANDLER_MAX_MEMORY_MB = float(os.getenv("CHAT_HANDLER_MAX_MEMORY_MB", "64"))  # estimated, all handlers
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))  # seconds
+
 # Server Configuration
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000"))
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 # Database Configuration
+DB_BACKEND = os.getenv("DB_BACKEND", "postgres").lower()  # "memory" = in-process stand-in for tests/benchmarks
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "astrovoice")
 DB_USER = os.getenv("DB_USER", "nikhil")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 
+# AWS Secrets Manager credentials (Lambda) - cached per process (backend/config/secrets.py)
+DB_SECRET_REGION = os.getenv("DB_SECRET_REGION", "ap-south-1")
+DB_SECRET_TTL_SECONDS = float(os.getenv("DB_SECRET_TTL_SECONDS", "3600"))  # refetch after this long
+DB_SECRET_MIN_REFRESH_SECONDS = float(os.getenv("DB_SECRET_MIN_REFRESH_SECONDS", "30"))  # between forced refreshes
+
+# Database Connection Pool
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # seconds
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))  # seconds
+DB_POOL_HEALTH_CHECK_AFTER = float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30"))  # idle seconds
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10"))  # seconds
+
+# Read replicas - comma-separated host[:port] list; credentials and database
+# name are shared with the primary. Empty = all queries go to the primary.
+DB_REPLICA_HOSTS = [h.strip() for h in os.getenv("DB_REPLICA_HOSTS", "").split(",") if h.strip()]
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))  # seconds
+DB_REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", "2"))  # seconds
+DB_READ_YOUR_WRITES_WINDOW = float(os.getenv("DB_READ_YOUR_WRITES_WINDOW", "5"))  # seconds
+
+# Horizontal sharding by user_id (backend/database/sharding.py)
+# Entries are name@host[:port][/database]; credentials come from the primary config
+DB_SHARDS = [entry.strip() for entry in os.getenv("DB_SHARDS", "").split(",") if entry.strip()]
+DB_SHARD_VNODES = int(os.getenv("DB_SHARD_VNODES", "128"))  # ring points per shard
+DB_CATALOG_SHARD = os.getenv("DB_CATALOG_SHARD", "")  # serves astrologers/products/OTP (default: first shard)
+
+# Query instrumentation (/api/admin/db-stats)
+DB_INSTRUMENTATION_ENABLED = os.getenv("DB_INSTRUMENTATION_ENABLED", "true").lower() == "true"
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "10"))  # queries per request
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_EXPLAIN_SAMPLE_INTERVAL = float(os.getenv("DB_EXPLAIN_SAMPLE_INTERVAL", "300"))  # seconds per statement
+
+# Message Archive (cold tier for messages past the hot retention window)
+ARCHIVE_DIR = Path(os.getenv("MESSAGE_ARCHIVE_DIR", str(DATA_DIR / "archive")))
+MESSAGE_ARCHIVE_RETAIN_DAYS = int(os.getenv("MESSAGE_ARCHIVE_RETAIN_DAYS", "365"))
+
+# Write-behind message persistence (off by default on Lambda, where the
+# process is frozen between invocations and a background flusher can't run)
+WRITE_BEHIND_ENABLED = os.getenv(
+    "WRITE_BEHIND_ENABLED", "false" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "true"
+).lower() == "true"
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200"))  # rows
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.25"))  # seconds
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))  # rows
+WRITE_BEHIND_FSYNC = os.getenv("WRITE_BEHIND_FSYNC", "false").lower() == "true"
+WRITE_BEHIND_JOURNAL_DIR = Path(os.getenv("WRITE_BEHIND_JOURNAL_DIR", str(DATA_DIR / "write_behind")))
+
+# Idempotency keys for wallet/purchase endpoints
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))  # how long responses are replayed
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))  # in-memory hot entries
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "30"))  # seconds a duplicate waits
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))  # in-progress claim lifetime
+
+# In-process caches for astrologers/products/users/wallets (backend/database/cache.py).
+# Off by default on Lambda: the invalidation listener is frozen between
+# invocations while its connection still looks up, so entries would keep the
+# long TTL and miss every change made elsewhere in the meantime
+CACHE_ENABLED = os.getenv(
+    "CACHE_ENABLED", "false" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "true"
+).lower() == "true"
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "3600"))  # while LISTEN/NOTIFY invalidation is up
+CACHE_FALLBACK_TTL_SECONDS = float(os.getenv("CACHE_FALLBACK_TTL_SECONDS", "5"))  # while it is down
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))  # per table
+
+# Schema migrations (backend/database/migrator.py)
+DB_MIGRATION_LOCK_TIMEOUT = os.getenv("DB_MIGRATION_LOCK_TIMEOUT", "5s")  # give up instead of queueing behind traffic
+
 # Data Files
 ASTROLOGER_PERSONAS_FILE = DATA_DIR / "astrologer_personas.json"
 USER_PROFILES_FILE = DATA_DIR / "user_profiles.json"
 USER_STATES_FILE = DATA_DIR / "user_states.json"
 
+# Per-user chat/voice handler state (backend/database/state_store.py) - SQLite,
+# in /tmp on Lambda where the code directory is read-only
+_ON_LAMBDA = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+USER_STATE_DB = Path(os.getenv("USER_STATE_DB", "/tmp/user_states.db" if _ON_LAMBDA else str(DATA_DIR / "user_states.db")))
+USER_STATE_FLUSH_INTERVAL = float(os.getenv("USER_STATE_FLUSH_INTERVAL", "0" if _ON_LAMBDA else "1.0"))  # seconds, 0 = write through
+USER_STATE_MAX_PENDING = int(os.getenv("USER_STATE_MAX_PENDING", "500"))  # dirty users before an immediate flush
+
 # Application Settings
 APP_TITLE = "AstroVoice - AI Astrology Platform"
 APP_VERSION = "1.0.0"
@@ -55,17 +139,19 @@ AUDIO_SAMPLE_RATE = 24000
 AUDIO_CHANNELS = 1
 AUDIO_SAMPLE_WIDTH = 2  # 16-bit
 
-def get_database_config() -> dict:
-    """Get database configuration as dictionary"""
+def get_database_config(refresh: bool = False) -> dict:
+    """
+    Get database configuration as dictionary
+
+    Args:
+        refresh: The cached Secrets Manager credentials were rejected - fetch them again
+    """
     # Check if we should read from AWS Secrets Manager (for Lambda)
     secret_arn = os.getenv("DB_SECRET_ARN")
     if secret_arn:
         try:
-            import boto3
-            import json
-            client = boto3.client('secretsmanager', region_name='ap-south-1')
-            response = client.get_secret_value(SecretId=secret_arn)
-            secret = json.loads(response['SecretString'])
+            from backend.config.secrets import get_secret_cache
+            secret = get_secret_cache().get(secret_arn, refresh=refresh)
             
             # Use database name from environment or default to astrovoice
             db_name = os.getenv('DB_NAME', 'astrovoice')
@@ -90,6 +176,122 @@ def get_database_config() -> dict:
         'password': DB_PASSWORD,
     }
 
+def get_secrets_config() -> dict:
+    """Get Secrets Manager cache configuration as dictionary"""
+    return {
+        'ttl_seconds': DB_SECRET_TTL_SECONDS,
+        'min_refresh_interval': DB_SECRET_MIN_REFRESH_SECONDS,
+        'region_name': DB_SECRET_REGION,
+    }
+
+def get_chat_registry_config() -> dict:
+    """Get chat handler registry configuration as dictionary"""
+    return {
+        'max_handlers': CHAT_HANDLER_MAX_ENTRIES,
+        'idle_ttl_seconds': CHAT_HANDLER_IDLE_TTL_SECONDS,
+        'max_memory_mb': CHAT_HANDLER_MAX_MEMORY_MB,
+        'max_connections': OPENAI_MAX_CONNECTIONS,
+        'max_keepalive_connections': OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        'keepalive_expiry': OPENAI_KEEPALIVE_EXPIRY,
+    }
+
+def get_pool_config() -> dict:
+    """Get database connection pool configuration as dictionary"""
+    return {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+        'max_lifetime': DB_POOL_MAX_LIFETIME,
+        'max_idle': DB_POOL_MAX_IDLE,
+        'health_check_after': DB_POOL_HEALTH_CHECK_AFTER,
+        'acquire_timeout': DB_POOL_ACQUIRE_TIMEOUT,
+    }
+
+def get_replica_config() -> dict:
+    """Get read-replica connection and routing configuration as dictionary"""
+    primary = get_database_config()
+    replicas = []
+    for entry in DB_REPLICA_HOSTS:
+        host, _, port = entry.partition(":")
+        replicas.append({**primary, 'host': host, 'port': port or primary['port']})
+    return {
+        'replicas': replicas,
+        'max_lag': DB_REPLICA_MAX_LAG,
+        'lag_check_interval': DB_REPLICA_LAG_CHECK_INTERVAL,
+        'sticky_window': DB_READ_YOUR_WRITES_WINDOW,
+    }
+
+def get_shard_config(shards: list = None) -> dict:
+    """Get shard connection and hashing configuration as dictionary"""
+    primary = get_database_config()
+    parsed = []
+    for entry in (DB_SHARDS if shards is None else shards):
+        name, _, location = entry.partition("@")
+        location, _, database = location.partition("/")
+        host, _, port = location.partition(":")
+        parsed.append({
+            'name': name,
+            'config': {**primary, 'host': host, 'port': port or primary['port'],
+                       'database': database or primary['database']},
+        })
+    return {
+        'shards': parsed,
+        'vnodes': DB_SHARD_VNODES,
+        'catalog_shard': DB_CATALOG_SHARD or None,
+    }
+
+def get_instrumentation_config() -> dict:
+    """Get query instrumentation configuration as dictionary"""
+    return {
+        'enabled': DB_INSTRUMENTATION_ENABLED,
+        'n_plus_one_threshold': DB_N_PLUS_ONE_THRESHOLD,
+        'slow_query_ms': DB_SLOW_QUERY_MS,
+        'explain_interval': DB_EXPLAIN_SAMPLE_INTERVAL,
+    }
+
+def get_write_behind_config() -> dict:
+    """Get write-behind queue configuration as dictionary"""
+    return {
+        'journal_dir': WRITE_BEHIND_JOURNAL_DIR,
+        'batch_size': WRITE_BEHIND_BATCH_SIZE,
+        'flush_interval': WRITE_BEHIND_FLUSH_INTERVAL,
+        'max_pending': WRITE_BEHIND_MAX_PENDING,
+        'fsync': WRITE_BEHIND_FSYNC,
+    }
+
+def get_idempotency_config() -> dict:
+    """Get idempotency key store configuration as dictionary"""
+    return {
+        'ttl_seconds': IDEMPOTENCY_TTL_HOURS * 3600,
+        'cache_size': IDEMPOTENCY_CACHE_SIZE,
+        'wait_timeout': IDEMPOTENCY_WAIT_TIMEOUT,
+        'lease_seconds': IDEMPOTENCY_LEASE_SECONDS,
+    }
+
+def get_cache_config() -> dict:
+    """Get read-through cache configuration as dictionary"""
+    return {
+        'enabled': CACHE_ENABLED,
+        'ttl_seconds': CACHE_TTL_SECONDS,
+        'fallback_ttl_seconds': CACHE_FALLBACK_TTL_SECONDS,
+        'max_entries': CACHE_MAX_ENTRIES,
+    }
+
+def get_user_state_config() -> dict:
+    """Get user state store configuration as dictionary"""
+    return {
+        'path': USER_STATE_DB,
+        'flush_interval': USER_STATE_FLUSH_INTERVAL,
+        'max_pending': USER_STATE_MAX_PENDING,
+        # Handlers used to rewrite user_states.json in the working directory
+        'legacy_files': [BASE_DIR / "user_states.json", USER_STATES_FILE],
+    }
+
+def get_migration_config() -> dict:
+    """Get schema migration runner configuration as dictionary"""
+    return {
+        'lock_timeout': DB_MIGRATION_LOCK_TIMEOUT,
+    }
+
 def validate_config() -> bool:
     """Validate required configuration"""
     if not OPENAI_API_KEY:
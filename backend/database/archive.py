@@ -0,0 +1,267 @@
+"""
+Message Archive for AstroVoice
+Cold storage tier for messages older than the hot retention window
+
+Layout (under ARCHIVE_DIR):
+    <user_id>/index.json
+    <user_id>/<astrologer_id>/segment-000001.jsonl.gz
+    <user_id>/<astrologer_id>/segment-000002.jsonl.gz
+
+Each segment is an immutable, gzip-compressed JSONL file of messages sorted
+by (sent_at, message_id). Segments for a user/astrologer pair never overlap
+and later segments always hold newer messages, so a reader walks them
+newest-first and stops as soon as it has a page. The per-user index records
+each segment's key range so untouched segments are never decompressed.
+
+MessageArchiver moves rows past the retention window out of Postgres:
+segments are written (and the index updated) before rows are deleted, and
+`archived_through` makes a re-run after a crash skip rows already archived.
+"""
+
+import gzip
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from psycopg2.extras import RealDictCursor
+except ImportError:
+    RealDictCursor = None
+
+# Stored per archived message
+ARCHIVE_FIELDS = (
+    'message_id', 'conversation_id', 'sender_type', 'message_type',
+    'content', 'sent_at', 'ai_model', 'tokens_used',
+)
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]')
+
+Key = Tuple[datetime, str]
+
+
+def _safe(name: str) -> str:
+    """Make an ID safe to use as a path component"""
+    return _SAFE_NAME.sub('_', name)
+
+
+def _key(message: Dict[str, Any]) -> Key:
+    return message['sent_at'], message['message_id']
+
+
+class MessageArchive:
+    """Reads and writes archived message segments on local disk"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Index
+    # -------------------------------------------------------------------------
+
+    def _index_path(self, user_id: str) -> Path:
+        return self.root / _safe(user_id) / 'index.json'
+
+    def load_index(self, user_id: str) -> Dict[str, Any]:
+        """Load a user's archive index (empty index if nothing archived)"""
+        path = self._index_path(user_id)
+        if not path.exists():
+            return {'user_id': user_id, 'astrologers': {}}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def has_archive(self, user_id: str, astrologer_id: str) -> bool:
+        """True if any messages are archived for this pair"""
+        pair = self.load_index(user_id)['astrologers'].get(astrologer_id)
+        return bool(pair and pair['segments'])
+
+    def archived_through(self, user_id: str, astrologer_id: str) -> Optional[Key]:
+        """Newest (sent_at, message_id) already archived for this pair"""
+        pair = self.load_index(user_id)['astrologers'].get(astrologer_id)
+        if not pair or not pair.get('archived_through'):
+            return None
+        sent_at, message_id = pair['archived_through']
+        return datetime.fromisoformat(sent_at), message_id
+
+    # -------------------------------------------------------------------------
+    # Write
+    # -------------------------------------------------------------------------
+
+    def append_segment(self, user_id: str, astrologer_id: str,
+                       messages: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Write messages (all newer than anything already archived for the pair)
+        as a new segment and record it in the user's index.
+
+        Returns:
+            Segment file name, or None if there was nothing to write
+        """
+        if not messages:
+            return None
+        messages = sorted(messages, key=_key)
+
+        with self._lock:
+            index = self.load_index(user_id)
+            pair = index['astrologers'].setdefault(
+                astrologer_id, {'segments': [], 'total_messages': 0, 'archived_through': None}
+            )
+
+            through = pair.get('archived_through')
+            if through and _key(messages[0]) <= (datetime.fromisoformat(through[0]), through[1]):
+                raise ValueError("Archive segments must be appended in key order")
+
+            file_name = f"segment-{len(pair['segments']) + 1:06d}.jsonl.gz"
+            lines = []
+            for message in messages:
+                record = {field: message.get(field) for field in ARCHIVE_FIELDS}
+                record['sent_at'] = message['sent_at'].isoformat()
+                lines.append(json.dumps(record, ensure_ascii=False))
+            payload = gzip.compress(('\n'.join(lines) + '\n').encode('utf-8'))
+
+            segment_path = self.root / _safe(user_id) / _safe(astrologer_id) / file_name
+            self._write_atomic(segment_path, payload)
+
+            oldest, newest = _key(messages[0]), _key(messages[-1])
+            pair['segments'].append({
+                'file': file_name,
+                'count': len(messages),
+                'oldest': [oldest[0].isoformat(), oldest[1]],
+                'newest': [newest[0].isoformat(), newest[1]],
+                'bytes': len(payload),
+            })
+            pair['total_messages'] += len(messages)
+            pair['archived_through'] = [newest[0].isoformat(), newest[1]]
+
+            self._write_atomic(self._index_path(user_id),
+                               json.dumps(index, indent=2).encode('utf-8'))
+            return file_name
+
+    # -------------------------------------------------------------------------
+    # Read
+    # -------------------------------------------------------------------------
+
+    def _read_segment(self, user_id: str, astrologer_id: str, file_name: str) -> List[Dict[str, Any]]:
+        path = self.root / _safe(user_id) / _safe(astrologer_id) / file_name
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            messages = [json.loads(line) for line in f if line.strip()]
+        for message in messages:
+            message['sent_at'] = datetime.fromisoformat(message['sent_at'])
+        return messages
+
+    def read_before(self, user_id: str, astrologer_id: str,
+                    before: Optional[Key], limit: int) -> List[Dict[str, Any]]:
+        """
+        Up to `limit` archived messages strictly older than `before`
+        (newest first, like the hot-table history query).
+        """
+        pair = self.load_index(user_id)['astrologers'].get(astrologer_id)
+        if not pair or limit <= 0:
+            return []
+
+        results: List[Dict[str, Any]] = []
+        for segment in reversed(pair['segments']):
+            oldest = (datetime.fromisoformat(segment['oldest'][0]), segment['oldest'][1])
+            if before is not None and oldest >= before:
+                continue  # whole segment is newer than the requested page
+
+            rows = self._read_segment(user_id, astrologer_id, segment['file'])
+            for message in reversed(rows):
+                if before is not None and _key(message) >= before:
+                    continue
+                results.append(message)
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def stats(self, user_id: str) -> Dict[str, Any]:
+        """Archived message counts per astrologer for a user"""
+        index = self.load_index(user_id)
+        return {
+            astrologer_id: {
+                'segments': len(pair['segments']),
+                'messages': pair['total_messages'],
+                'bytes': sum(segment.get('bytes', 0) for segment in pair['segments']),
+            }
+            for astrologer_id, pair in index['astrologers'].items()
+        }
+
+
+class MessageArchiver:
+    """Moves messages past the retention window from Postgres into the archive"""
+
+    def __init__(self, db, archive: MessageArchive):
+        self.db = db
+        self.archive = archive
+
+    def run(self, retain_days: int = 365, batch_size: int = 5000) -> Dict[str, int]:
+        """
+        Archive and delete every message older than `retain_days`.
+
+        Returns:
+            Counts of messages archived and deleted
+        """
+        cutoff = datetime.now() - timedelta(days=retain_days)
+        archived = deleted = 0
+
+        while True:
+            with self.db.get_connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    cursor.execute("""
+                        SELECT c.user_id, c.astrologer_id,
+                               m.message_id, m.conversation_id, m.sender_type, m.message_type,
+                               m.content, m.sent_at, m.ai_model, m.tokens_used
+                        FROM messages m
+                        JOIN conversations c ON c.conversation_id = m.conversation_id
+                        WHERE m.sent_at < %s
+                        ORDER BY c.user_id, c.astrologer_id, m.sent_at, m.message_id
+                        LIMIT %s
+                    """, (cutoff, batch_size))
+                    rows = [dict(row) for row in cursor.fetchall()]
+                    if not rows:
+                        break
+
+                    # Group by pair (rows arrive sorted by pair, then key)
+                    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+                    for row in rows:
+                        groups.setdefault((row['user_id'], row['astrologer_id']), []).append(row)
+
+                    for (user_id, astrologer_id), messages in groups.items():
+                        through = self.archive.archived_through(user_id, astrologer_id)
+                        # Rows at or below archived_through were archived by an
+                        # earlier (interrupted) run - only delete them
+                        fresh = [m for m in messages if through is None or _key(m) > through]
+                        self.archive.append_segment(user_id, astrologer_id, fresh)
+                        archived += len(fresh)
+
+                    # Segments are durable on disk - now drop the hot rows
+                    cursor.execute("""
+                        DELETE FROM messages
+                        WHERE (message_id, sent_at) IN (
+                            SELECT * FROM unnest(%s::varchar[], %s::timestamp[])
+                        )
+                    """, ([row['message_id'] for row in rows], [row['sent_at'] for row in rows]))
+                    deleted += cursor.rowcount
+
+            print(f"🧊 Archived {archived} messages so far...")
+
+        print(f"✅ Archive complete: {archived} archived, {deleted} deleted from hot storage")
+        return {'archived': archived, 'deleted': deleted}
@@ -0,0 +1,119 @@
+"""
+Async Database Manager for AstroVoice
+Awaitable facade over DatabaseManager so async routes never block the event loop
+
+Every public DatabaseManager method is exposed with the same name and
+arguments, but returns a coroutine that runs the query on a dedicated,
+bounded thread pool. The thread pool is sized to the connection pool, so
+at most `DB_POOL_MAX_SIZE` queries are in flight and nothing queues inside
+the connection pool while holding a worker thread.
+
+Usage:
+    from backend.database.async_manager import async_db
+
+    user = await async_db.get_user(user_id)
+    wallet = await async_db.get_wallet(user_id)
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+try:
+    from backend.database.manager import DatabaseManager, db, get_pool_config
+except ImportError:
+    # Fallback if importing as standalone
+    from manager import DatabaseManager, db, get_pool_config
+
+T = TypeVar('T')
+
+# Methods that do no I/O (or are context managers) and are returned as-is
+_PASSTHROUGH = {
+    'generate_user_id',
+    'generate_conversation_id',
+    'generate_message_id',
+    'generate_wallet_id',
+    'generate_transaction_id',
+    'get_connection',
+    'get_pool_stats',
+    'get_write_behind_stats',
+    'connection_for',
+}
+
+
+class AsyncDatabaseManager:
+    """
+    Async variant of DatabaseManager with the same method surface.
+
+    Wraps a synchronous DatabaseManager and runs its methods on a bounded
+    executor. Context variables (request ids, instrumentation) propagate
+    into the worker thread.
+    """
+
+    def __init__(self, manager: DatabaseManager, max_workers: Optional[int] = None):
+        self._manager = manager
+        self._max_workers = max_workers or max(1, int(get_pool_config().get('max_size', 10)))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def sync(self) -> DatabaseManager:
+        """The underlying synchronous manager"""
+        return self._manager
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers,
+                        thread_name_prefix='astrovoice-db'
+                    )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run any blocking callable on the database executor"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, fn, *args, **kwargs)
+        return await loop.run_in_executor(self._get_executor(), call)
+
+    async def run_with_connection(self, fn: Callable[[Any], T], user_id: Optional[str] = None) -> T:
+        """
+        Run `fn(conn)` inside `get_connection()` on the database executor.
+        Use for ad-hoc SQL in routes; the transaction commits when fn returns.
+        Pass user_id when the SQL touches that user's rows (sharded setups
+        route it to the user's shard).
+        """
+        def _call():
+            connection_for = getattr(self._manager, 'connection_for', None)
+            context = connection_for(user_id) if user_id and connection_for else self._manager.get_connection()
+            with context as conn:
+                return fn(conn)
+        return await self.run(_call)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._manager, name)
+        if name.startswith('_') or name in _PASSTHROUGH or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def _async_method(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        # Cache so repeated lookups don't rebuild the wrapper
+        self.__dict__[name] = _async_method
+        return _async_method
+
+    def shutdown(self, wait: bool = True):
+        """Stop the executor (pending queries finish when wait=True)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+# Global async database manager sharing the global pool
+async_db = AsyncDatabaseManager(db)
@@ -0,0 +1,413 @@
+"""
+Read-Through Cache with Cross-Process Invalidation for AstroVoice
+In-process caches for hot rows, kept fresh by Postgres LISTEN/NOTIFY
+
+Triggers on astrologers, recharge_products, users and wallets (migration
+0006) send a NOTIFY on CACHE_CHANNEL with {"table", "key"} for every
+changed row. Each process keeps one listening connection per database and
+evicts the matching entries as notifications arrive, so a change made by
+any worker, Lambda instance or ad-hoc SQL reaches every cache within
+milliseconds of commit and entries can live for a long TTL.
+
+Safety nets:
+- Entries use the long TTL only while every listener is connected; during
+  an outage new entries get the short fallback TTL, and reconnecting clears
+  everything (notifications sent while disconnected are lost).
+- A fill that races with an invalidation of its namespace is not stored.
+- A fill that hit a database error is not stored, even when the method
+  swallowed the error and returned a fallback such as [].
+- Cache fills read from the primary, so a lagging replica cannot put an
+  old row into the cache after the invalidation has passed.
+- Writers in this process evict their keys directly as well
+  (read-your-writes without waiting for the notification).
+
+Usage on DatabaseManager methods:
+    @cached('users', key='user_id')
+    def get_user(self, user_id): ...
+
+    @evicts('users', key=('user_data', 'user_id'))
+    def create_user(self, user_data): ...
+"""
+
+import contextvars
+import copy
+import functools
+import inspect
+import json
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    import psycopg2
+    import psycopg2.extensions
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+CACHE_CHANNEL = 'astrovoice_cache'
+
+_MISS = object()
+
+
+class _Fill:
+    """A cached method loading its value; failed is set by database errors during the load"""
+    __slots__ = ('failed',)
+
+    def __init__(self):
+        self.failed = False
+
+
+# Set while a cached method is loading its value (see DatabaseManager.get_connection)
+_filling: contextvars.ContextVar[Optional[_Fill]] = contextvars.ContextVar('cache_filling', default=None)
+
+
+def cache_fill_in_progress() -> bool:
+    """True inside a cache fill - reads should go to the primary"""
+    return _filling.get() is not None
+
+
+def mark_cache_fill_failed() -> None:
+    """
+    Record a database error during the current cache fill (no-op outside one).
+    Methods that swallow errors and return a fallback ([] or None) are then
+    not cached, so one transient failure is not served for a whole TTL.
+    """
+    fill = _filling.get()
+    if fill is not None:
+        fill.failed = True
+
+
+class InvalidatingCache:
+    """
+    LRU + TTL cache for one namespace (table).
+
+    Entries are tagged with the row key they depend on; collection entries
+    (lists) have no tag and are dropped on any change in the namespace.
+    """
+
+    def __init__(self, name: str, max_entries: int = 10000):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[Any, float, Optional[str]]]" = OrderedDict()
+        self._by_key: Dict[str, set] = {}
+        self._collections: set = set()
+        self._version = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'stale_fills': 0}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, cache_key: Tuple) -> Any:
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._remove(cache_key)
+                self._stats['misses'] += 1
+                return _MISS
+            self._entries.move_to_end(cache_key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def set(self, cache_key: Tuple, value: Any, row_key: Optional[str], version: int, ttl: float) -> bool:
+        """Store a value loaded while the namespace was at `version` (dropped if it changed since)"""
+        with self._lock:
+            if version != self._version:
+                self._stats['stale_fills'] += 1
+                return False
+            self._remove(cache_key)
+            self._entries[cache_key] = (value, time.monotonic() + ttl, row_key)
+            if row_key is None:
+                self._collections.add(cache_key)
+            else:
+                self._by_key.setdefault(row_key, set()).add(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            return True
+
+    def evict(self, row_key: Optional[str]) -> None:
+        """Drop entries for a changed row and every collection (None: everything)"""
+        with self._lock:
+            self._version += 1
+            self._stats['evictions'] += 1
+            if row_key is None:
+                self._entries.clear()
+                self._by_key.clear()
+                self._collections.clear()
+                return
+            for cache_key in list(self._by_key.get(row_key, ())) + list(self._collections):
+                self._remove(cache_key)
+
+    def _remove(self, cache_key: Tuple) -> None:
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return
+        row_key = entry[2]
+        if row_key is None:
+            self._collections.discard(cache_key)
+        else:
+            keys = self._by_key.get(row_key)
+            if keys is not None:
+                keys.discard(cache_key)
+                if not keys:
+                    del self._by_key[row_key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries)}
+
+
+class CacheInvalidationListener:
+    """Background thread LISTENing on one database and evicting cache entries"""
+
+    def __init__(self, registry: 'CacheRegistry', db_config: Dict[str, Any],
+                 channel: str = CACHE_CHANNEL, reconnect_delay: float = 5.0):
+        self.registry = registry
+        self.db_config = db_config
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+        self.notifications = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name=f"cache-listener-{self.db_config.get('host')}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        warned = False
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**self.db_config)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                    # Without the triggers (migration 0006) nothing would ever notify
+                    cursor.execute("SELECT to_regproc('notify_cache_invalidation') IS NOT NULL")
+                    if not cursor.fetchone()[0]:
+                        raise RuntimeError("cache invalidation triggers missing - run the schema migrations")
+                # Anything could have changed while we were not listening
+                self.registry.clear()
+                self.connected = True
+                if warned:
+                    print(f"✅ Cache invalidation listener reconnected ({self.db_config.get('host')})")
+                warned = False
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.handle(conn.notifies.pop(0).payload)
+            except Exception as e:
+                if not warned:
+                    print(f"⚠️ Cache invalidation listener down, using short TTLs: {e}")
+                    warned = True
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(self.reconnect_delay)
+
+    def handle(self, payload: str) -> None:
+        """Apply one notification payload ({"table": ..., "key": ...})"""
+        self.notifications += 1
+        try:
+            message = json.loads(payload)
+            self.registry.evict(message['table'], message.get('key'))
+        except (ValueError, KeyError, TypeError):
+            print(f"⚠️ Unreadable cache notification, clearing caches: {payload!r}")
+            self.registry.clear()
+
+
+class CacheRegistry:
+    """The process's caches and their invalidation listeners"""
+
+    def __init__(self, enabled: bool = True, ttl_seconds: float = 3600.0,
+                 fallback_ttl_seconds: float = 5.0, max_entries: int = 10000):
+        """
+        Args:
+            enabled: Serve cached reads at all
+            ttl_seconds: Entry lifetime while invalidation listeners are connected
+            fallback_ttl_seconds: Entry lifetime while any listener is down
+            max_entries: Entries per namespace (LRU beyond that)
+        """
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.fallback_ttl_seconds = fallback_ttl_seconds
+        self.max_entries = max_entries
+        self._caches: Dict[str, InvalidatingCache] = {}
+        self._listeners: Dict[Tuple, CacheInvalidationListener] = {}
+        self._lock = threading.Lock()
+
+    def namespace(self, name: str) -> InvalidatingCache:
+        cache = self._caches.get(name)
+        if cache is None:
+            with self._lock:
+                cache = self._caches.setdefault(name, InvalidatingCache(name, self.max_entries))
+        return cache
+
+    def evict(self, name: str, row_key: Optional[str]) -> None:
+        self.namespace(name).evict(row_key)
+
+    def clear(self) -> None:
+        for cache in list(self._caches.values()):
+            cache.evict(None)
+
+    @property
+    def healthy(self) -> bool:
+        """Every database this process caches from has a connected listener"""
+        listeners = list(self._listeners.values())
+        return bool(listeners) and all(listener.connected for listener in listeners)
+
+    def current_ttl(self) -> float:
+        return self.ttl_seconds if self.healthy else self.fallback_ttl_seconds
+
+    def ensure_listener(self, db_config: Optional[Dict[str, Any]]) -> None:
+        """Start listening on a database the first time something is cached from it"""
+        if not PSYCOPG2_AVAILABLE or not db_config:
+            return
+        identity = (db_config.get('host'), str(db_config.get('port')), db_config.get('database'))
+        if identity in self._listeners:
+            return
+        with self._lock:
+            if identity not in self._listeners:
+                listener = CacheInvalidationListener(self, db_config)
+                listener.start()
+                self._listeners[identity] = listener
+
+    def stop(self) -> None:
+        """Stop the listeners (application shutdown)"""
+        with self._lock:
+            listeners = list(self._listeners.values())
+            self._listeners.clear()
+        for listener in listeners:
+            listener.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'healthy': self.healthy,
+            'ttl_seconds': self.current_ttl(),
+            'listeners': {f"{host}:{port}/{database}": {'connected': listener.connected,
+                                                       'notifications': listener.notifications}
+                          for (host, port, database), listener in self._listeners.items()},
+            'namespaces': {name: cache.stats() for name, cache in self._caches.items()},
+        }
+
+
+def _load_registry() -> CacheRegistry:
+    try:
+        from backend.config.settings import get_cache_config
+    except ImportError:
+        return CacheRegistry()
+    return CacheRegistry(**get_cache_config())
+
+
+caches = _load_registry()
+
+
+# =============================================================================
+# Method decorators
+# =============================================================================
+
+KeySpec = Union[None, str, Tuple[str, str], Callable[[Dict[str, Any]], Optional[str]]]
+
+
+def _row_key(spec: KeySpec, arguments: Dict[str, Any]) -> Optional[str]:
+    """Row key from bound call arguments: an argument name, (dict argument, field) or a function"""
+    if spec is None:
+        return None
+    if callable(spec):
+        return spec(arguments)
+    if isinstance(spec, tuple):
+        argument, field = spec
+        return (arguments.get(argument) or {}).get(field)
+    return arguments.get(spec)
+
+
+def cached(namespace: str, key: KeySpec = None):
+    """
+    Read-through caching for a DatabaseManager method.
+
+    Args:
+        namespace: Table whose changes invalidate the result
+        key: Row the result depends on (None: a collection, dropped on any change)
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not caches.enabled:
+                return func(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            arguments.pop('self', None)
+            cache_key = (func.__name__,) + tuple(sorted(arguments.items()))
+
+            cache = caches.namespace(namespace)
+            value = cache.get(cache_key)
+            if value is not _MISS:
+                return copy.deepcopy(value)
+
+            caches.ensure_listener(getattr(self, 'db_config', None))
+            version = cache.version
+            fill = _Fill()
+            token = _filling.set(fill)
+            try:
+                value = func(self, *args, **kwargs)
+            finally:
+                _filling.reset(token)
+            # None means "not found" or an error - never cache it, nor a fallback returned after an error
+            if value is not None and not fill.failed:
+                cache.set(cache_key, copy.deepcopy(value), _row_key(key, arguments), version, caches.current_ttl())
+            return value
+        return wrapper
+    return decorate
+
+
+def evicts(namespace: str, key: KeySpec = None):
+    """
+    Evict a namespace's entries for the row a DatabaseManager method writes
+    (after the call, i.e. after commit). key=None clears the namespace.
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                if caches.enabled:
+                    arguments = signature.bind(self, *args, **kwargs).arguments
+                    caches.evict(namespace, _row_key(key, arguments))
+        return wrapper
+    return decorate
+
+
+def user_of_wallet(arguments: Dict[str, Any]) -> Optional[str]:
+    """Wallet rows are cached by user_id; wallet IDs are wallet_<user_id>"""
+    wallet_id = arguments.get('wallet_id') or (arguments.get('transaction_data') or {}).get('wallet_id')
+    if wallet_id and wallet_id.startswith('wallet_'):
+        return wallet_id[len('wallet_'):]
+    return None
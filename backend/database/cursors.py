@@ -0,0 +1,40 @@
+"""
+Pagination Cursors for AstroVoice
+Opaque keyset cursors for chat history paging
+
+A cursor encodes the (sent_at, message_id) of the oldest message already
+returned to the client. The next page is everything strictly older than that
+key, which Postgres can serve straight from the
+(conversation_id, sent_at DESC, message_id DESC) index no matter how deep
+the client has scrolled.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+def encode_cursor(sent_at: datetime, message_id: str) -> str:
+    """Encode a (sent_at, message_id) keyset position as an opaque URL-safe string"""
+    payload = json.dumps({'t': sent_at.isoformat(), 'id': message_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(payload['t']), str(payload['id'])
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {cursor!r}") from e
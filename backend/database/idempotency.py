@@ -0,0 +1,307 @@
+"""
+Idempotency Keys for AstroVoice
+Replays stored responses for retried wallet and purchase requests
+
+A request with an idempotency key runs at most once per key:
+1. Completed responses are served from an in-memory LRU (hot cache) or from
+   the idempotency_keys table, without running the handler again.
+2. Concurrent duplicates in the same process await the first request's
+   in-flight result instead of touching the database.
+3. Across processes, the first request claims the key by inserting its row
+   (unique on scope + key); duplicates poll until it completes. A claim left
+   behind by a crashed process expires after `lease_seconds` and can be
+   taken over by a retry of the same request.
+
+Keys are bound to a fingerprint of the request body; reusing a key for a
+different request raises IdempotencyConflictError. Handler failures release
+the key so the client can retry. Once the handler has returned, its response
+is always returned: a failure to store it is logged and counted, and the
+response is still replayed from the in-memory cache.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+CLAIM_SQL = """
+    INSERT INTO idempotency_keys AS k (
+        scope, idempotency_key, request_fingerprint, status, locked_at, expires_at
+    ) VALUES (
+        %(scope)s, %(key)s, %(fingerprint)s, 'in_progress', CURRENT_TIMESTAMP,
+        CURRENT_TIMESTAMP + make_interval(secs => %(ttl)s)
+    )
+    ON CONFLICT (scope, idempotency_key) DO UPDATE SET
+        request_fingerprint = EXCLUDED.request_fingerprint,
+        status = 'in_progress',
+        response = NULL,
+        locked_at = EXCLUDED.locked_at,
+        completed_at = NULL,
+        expires_at = EXCLUDED.expires_at
+    WHERE k.expires_at < CURRENT_TIMESTAMP
+       OR (k.status = 'in_progress'
+           AND k.request_fingerprint = EXCLUDED.request_fingerprint
+           AND k.locked_at < CURRENT_TIMESTAMP - make_interval(secs => %(lease)s))
+    RETURNING true
+"""
+
+
+class IdempotencyConflictError(Exception):
+    """The idempotency key was already used for a different request"""
+    pass
+
+
+class IdempotencyInProgressError(Exception):
+    """The first request with this key is still running after the wait timeout"""
+    pass
+
+
+def request_fingerprint(payload: Any) -> str:
+    """Stable hash of a request body"""
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+class _InFlight:
+    def __init__(self, fingerprint: str, future: asyncio.Future):
+        self.fingerprint = fingerprint
+        self.future = future
+
+
+_RETRY = object()
+
+
+class IdempotencyStore:
+    """Runs keyed requests at most once and replays their responses"""
+
+    def __init__(self, db, run: Optional[Callable[..., Awaitable[Any]]] = None,
+                 ttl_seconds: float = 86400, cache_size: int = 10000,
+                 wait_timeout: float = 30.0, lease_seconds: float = 60.0):
+        """
+        Args:
+            db: DatabaseManager
+            run: Coroutine running a blocking call off the event loop
+                 (AsyncDatabaseManager.run); defaults to the loop's executor
+            ttl_seconds: How long completed responses are replayed
+            cache_size: Completed responses kept in memory
+            wait_timeout: Seconds a duplicate waits for an in-progress request
+            lease_seconds: Age after which an in-progress claim can be taken over
+        """
+        self.db = db
+        self._run = run or self._run_in_executor
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self.wait_timeout = wait_timeout
+        self.lease_seconds = lease_seconds
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[str, Any, float]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], _InFlight] = {}
+        self._stats = {'executed': 0, 'cache_hits': 0, 'stored_hits': 0, 'inflight_waits': 0,
+                       'complete_failures': 0}
+
+    # -------------------------------------------------------------------------
+    # Request path
+    # -------------------------------------------------------------------------
+
+    async def execute(self, scope: str, key: Optional[str], payload: Any,
+                      handler: Callable[[], Awaitable[Any]],
+                      should_store: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Run `handler` once for (scope, key) and return its response.
+
+        Args:
+            scope: Endpoint name; keys are unique per scope
+            key: Idempotency key (no key runs the handler unconditionally)
+            payload: Request body, fingerprinted to detect key reuse
+            handler: Coroutine function producing the response
+            should_store: Predicate for responses worth replaying (default: all)
+
+        Raises:
+            IdempotencyConflictError: Key already used with a different payload
+            IdempotencyInProgressError: First request still running after wait_timeout
+        """
+        if not key:
+            return await handler()
+
+        fingerprint = request_fingerprint(payload)
+        cache_key = (scope, key)
+
+        while True:
+            cached = self._cache_get(cache_key, fingerprint)
+            if cached is not None:
+                self._count('cache_hits')
+                return cached
+
+            inflight = self._inflight.get(cache_key)
+            if inflight is None:
+                break
+            if inflight.fingerprint != fingerprint:
+                raise IdempotencyConflictError(f"Idempotency key {key!r} was used for a different request")
+            self._count('inflight_waits')
+            result = await asyncio.shield(inflight.future)
+            if result is not _RETRY:
+                return copy.deepcopy(result)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = _InFlight(fingerprint, future)
+        outcome = _RETRY
+        try:
+            stored = await self._wait_for_claim(scope, key, fingerprint)
+            if stored is not None:
+                self._count('stored_hits')
+                self._cache_put(cache_key, fingerprint, stored)
+                outcome = stored
+                return copy.deepcopy(stored)
+
+            try:
+                response = await handler()
+            except BaseException:
+                await self._run(self.release, scope, key)
+                raise
+
+            self._count('executed')
+            outcome = response
+            if should_store is None or should_store(response):
+                # Cache first: even if the row cannot be completed, retries reaching
+                # this process replay the response instead of running it again
+                self._cache_put(cache_key, fingerprint, response)
+                try:
+                    await self._run(self.complete, scope, key, response)
+                except Exception as e:
+                    # The handler's work is committed; failing the request now would
+                    # invite a retry that repeats it
+                    self._count('complete_failures')
+                    print(f"⚠️ Could not store response for idempotency key {key}: {e}")
+            else:
+                await self._run(self.release, scope, key)
+            return response
+        finally:
+            del self._inflight[cache_key]
+            future.set_result(outcome)
+
+    async def _wait_for_claim(self, scope: str, key: str, fingerprint: str) -> Optional[Any]:
+        """Claim the key, or wait for another process's request to finish. Returns its response."""
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.05
+        while True:
+            record = await self._run(self.claim, scope, key, fingerprint)
+            if record is None:
+                return None
+            if record['status'] == 'completed':
+                return record['response']
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgressError(f"Request with idempotency key {key!r} is still in progress")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    # -------------------------------------------------------------------------
+    # Database
+    # -------------------------------------------------------------------------
+
+    def claim(self, scope: str, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Try to claim a key.
+
+        Returns:
+            None if the caller now owns the key, else the existing record
+            ({'status': 'in_progress' | 'completed', 'response'})
+        """
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(CLAIM_SQL, {
+                    'scope': scope, 'key': key, 'fingerprint': fingerprint,
+                    'ttl': self.ttl_seconds, 'lease': self.lease_seconds,
+                })
+                if cursor.fetchone():
+                    return None
+
+                cursor.execute("""
+                    SELECT request_fingerprint, status, response FROM idempotency_keys
+                    WHERE scope = %s AND idempotency_key = %s
+                """, (scope, key))
+                row = cursor.fetchone()
+
+        if row is None:
+            # Released between the two statements - report in progress so the caller retries
+            return {'status': 'in_progress', 'response': None}
+        if row[0] != fingerprint:
+            raise IdempotencyConflictError(f"Idempotency key {key!r} was used for a different request")
+        return {'status': row[1], 'response': row[2]}
+
+    def complete(self, scope: str, key: str, response: Any) -> None:
+        """Store the response of a claimed key"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE idempotency_keys SET
+                        status = 'completed',
+                        response = %s::jsonb,
+                        completed_at = CURRENT_TIMESTAMP
+                    WHERE scope = %s AND idempotency_key = %s
+                """, (json.dumps(response, default=str), scope, key))
+
+    def release(self, scope: str, key: str) -> None:
+        """Give up a claim so a retry can run the request again"""
+        try:
+            with self.db.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        DELETE FROM idempotency_keys
+                        WHERE scope = %s AND idempotency_key = %s AND status = 'in_progress'
+                    """, (scope, key))
+        except Exception as e:
+            # The claim expires after lease_seconds anyway
+            print(f"⚠️ Could not release idempotency key {key}: {e}")
+
+    def purge_expired(self) -> int:
+        """Delete expired keys. Returns the number removed."""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM idempotency_keys WHERE expires_at < CURRENT_TIMESTAMP")
+                removed = cursor.rowcount
+        print(f"✅ Purged {removed} expired idempotency keys")
+        return removed
+
+    # -------------------------------------------------------------------------
+    # Hot cache / metrics
+    # -------------------------------------------------------------------------
+
+    def _cache_get(self, cache_key: Tuple[str, str], fingerprint: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                return None
+            stored_fingerprint, response, expires = entry
+            if expires <= time.monotonic():
+                del self._cache[cache_key]
+                return None
+            self._cache.move_to_end(cache_key)
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyConflictError(f"Idempotency key {cache_key[1]!r} was used for a different request")
+        return copy.deepcopy(response)
+
+    def _cache_put(self, cache_key: Tuple[str, str], fingerprint: str, response: Any) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[cache_key] = (fingerprint, copy.deepcopy(response), time.monotonic() + self.ttl_seconds)
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'cached': len(self._cache), 'in_flight': len(self._inflight)}
+
+    @staticmethod
+    async def _run_in_executor(fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
@@ -0,0 +1,89 @@
+"""
+ID Generation for AstroVoice
+Compact, time-sortable ULID-style identifiers for primary keys
+
+A ULID is 128 bits: a 48-bit millisecond timestamp followed by 80 random
+bits, written as 26 Crockford base32 characters. IDs generated later sort
+after earlier ones, so new rows land at the right-hand edge of the btree
+instead of splitting random pages, and the key stays short no matter how
+long the user/astrologer IDs are.
+
+Within a process generation is monotonic: two IDs created in the same
+millisecond increment the random part instead of drawing a new one, so
+they never collide and still sort in creation order.
+
+    msg_01j9z3k8q4m7w2x5c6v8b0n1r3   (30 chars)
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# Crockford base32 (no I, L, O, U) - lowercase to match the rest of our IDs
+_ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+_DECODE = {char: index for index, char in enumerate(_ALPHABET)}
+
+_TIME_CHARS = 10
+_RANDOM_CHARS = 16
+_RANDOM_BITS = 80
+_MAX_RANDOM = (1 << _RANDOM_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def new_ulid() -> str:
+    """Generate a 26-character, lexicographically time-ordered ULID"""
+    global _last_ms, _last_random
+
+    with _lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _last_ms:
+            # Same millisecond (or clock went backwards): keep the previous
+            # timestamp and bump the random part so ordering is preserved
+            now_ms = _last_ms
+            random_part = _last_random + 1
+            if random_part > _MAX_RANDOM:
+                now_ms += 1
+                random_part = int.from_bytes(os.urandom(10), 'big')
+        else:
+            random_part = int.from_bytes(os.urandom(10), 'big')
+
+        _last_ms = now_ms
+        _last_random = random_part
+
+    return _encode(now_ms, _TIME_CHARS) + _encode(random_part, _RANDOM_CHARS)
+
+
+def prefixed_id(prefix: str) -> str:
+    """Generate a ULID with a readable type prefix, e.g. msg_01j9z3k8q4..."""
+    return f"{prefix}_{new_ulid()}"
+
+
+def ulid_timestamp(value: str) -> datetime:
+    """
+    Extract the creation time from a ULID or prefixed ULID.
+
+    Raises:
+        ValueError: If the value does not end in a valid ULID
+    """
+    ulid = value.rsplit('_', 1)[-1].lower()
+    if len(ulid) != _TIME_CHARS + _RANDOM_CHARS:
+        raise ValueError(f"Not a ULID: {value!r}")
+
+    millis = 0
+    for char in ulid[:_TIME_CHARS]:
+        if char not in _DECODE:
+            raise ValueError(f"Not a ULID: {value!r}")
+        millis = (millis << 5) | _DECODE[char]
+    return datetime.fromtimestamp(millis / 1000, tz=timezone.utc)
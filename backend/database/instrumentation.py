@@ -0,0 +1,509 @@
+"""
+Query Instrumentation for AstroVoice
+Per-method / per-statement database timing, N+1 detection and slow-query plans
+
+How it hooks in:
+- DatabaseManager's public methods are wrapped (instrument_methods) so every
+  statement is attributed to the manager method that issued it.
+- Connections are opened with InstrumentedConnection, whose cursors time
+  execute()/executemany() whatever cursor_factory the caller asks for.
+- API requests open a request_scope(); queries issued while handling the
+  request (including on AsyncDatabaseManager worker threads, which inherit the
+  context) are counted against it and requests over the N+1 threshold are
+  flagged.
+- Read-only statements slower than the threshold get a plain EXPLAIN sample,
+  at most once per statement per interval. The plan is taken without ANALYZE
+  (the statement is not run a second time) inside a savepoint, so a failed
+  EXPLAIN never aborts the caller's transaction.
+
+All state is in-process; `registry.snapshot()` backs /api/admin/db-stats.
+"""
+
+import contextvars
+import functools
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+try:
+    import psycopg2.extensions
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+# Latency histogram bucket upper bounds in milliseconds (last bucket is +inf)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+MAX_STATEMENTS = 500
+UNATTRIBUTED = '<unattributed>'
+
+_current_method: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('db_method', default=None)
+_current_request: contextvars.ContextVar[Optional['RequestStats']] = contextvars.ContextVar('db_request', default=None)
+
+
+# =============================================================================
+# Aggregates
+# =============================================================================
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (not thread-safe - guarded by the registry lock)"""
+
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-th percentile"""
+        if not self.count:
+            return None
+        target = p / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= target:
+                return self.max_ms if bound == float('inf') else float(bound)
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 2),
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'buckets': {('+inf' if b == float('inf') else f"le_{b}ms"): c for b, c in zip(BUCKETS_MS, self.counts)},
+        }
+
+
+class _MethodStats:
+    __slots__ = ('latency', 'queries', 'rows', 'acquire_ms', 'errors')
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.queries = 0
+        self.rows = 0
+        self.acquire_ms = 0.0
+        self.errors = 0
+
+
+class _StatementStats:
+    __slots__ = ('latency', 'rows', 'method')
+
+    def __init__(self, method: str):
+        self.latency = LatencyHistogram()
+        self.rows = 0
+        self.method = method
+
+
+class RequestStats:
+    """Database work done while handling one HTTP request"""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.queries = 0
+        self.db_ms = 0.0
+        self.acquire_ms = 0.0
+        self.methods: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_query(self, method: str, ms: float):
+        with self._lock:
+            self.queries += 1
+            self.db_ms += ms
+            self.methods[method] = self.methods.get(method, 0) + 1
+
+    def add_acquire(self, ms: float):
+        with self._lock:
+            self.acquire_ms += ms
+
+
+class _RouteStats:
+    __slots__ = ('requests', 'queries', 'max_queries', 'db_ms', 'flagged')
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_ms = 0.0
+        self.flagged = 0
+
+
+class InstrumentationRegistry:
+    """Thread-safe in-process store for all instrumentation data"""
+
+    def __init__(self, n_plus_one_threshold: int = 10, slow_query_ms: float = 200.0,
+                 explain_interval: float = 300.0, enabled: bool = True):
+        self.enabled = enabled
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_query_ms = slow_query_ms
+        self.explain_interval = explain_interval
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._methods: Dict[str, _MethodStats] = {}
+            self._statements: Dict[str, _StatementStats] = {}
+            self._routes: Dict[str, _RouteStats] = {}
+            self._flagged_requests = deque(maxlen=50)
+            self._explain_samples = deque(maxlen=20)
+            self._last_explained: Dict[str, float] = {}
+            self._started_at = datetime.now()
+
+    def _method(self, name: str) -> _MethodStats:
+        stats = self._methods.get(name)
+        if stats is None:
+            stats = self._methods[name] = _MethodStats()
+        return stats
+
+    # -- recording ------------------------------------------------------------
+
+    def record_query(self, fingerprint: str, ms: float, rows: int):
+        method = _current_method.get() or UNATTRIBUTED
+        with self._lock:
+            statement = self._statements.get(fingerprint)
+            if statement is None:
+                if len(self._statements) >= MAX_STATEMENTS:
+                    fingerprint = '<other>'
+                    statement = self._statements.setdefault(fingerprint, _StatementStats(method))
+                else:
+                    statement = self._statements[fingerprint] = _StatementStats(method)
+            statement.latency.add(ms)
+            statement.rows += max(rows, 0)
+            method_stats = self._method(method)
+            method_stats.queries += 1
+            method_stats.rows += max(rows, 0)
+
+        request = _current_request.get()
+        if request is not None:
+            request.add_query(method, ms)
+
+    def record_acquire(self, ms: float):
+        method = _current_method.get() or UNATTRIBUTED
+        with self._lock:
+            self._method(method).acquire_ms += ms
+        request = _current_request.get()
+        if request is not None:
+            request.add_acquire(ms)
+
+    def record_call(self, method: str, ms: float, failed: bool):
+        with self._lock:
+            stats = self._method(method)
+            stats.latency.add(ms)
+            if failed:
+                stats.errors += 1
+
+    def record_request(self, request: RequestStats):
+        flagged = request.queries > self.n_plus_one_threshold
+        with self._lock:
+            route = self._routes.get(request.route)
+            if route is None:
+                route = self._routes[request.route] = _RouteStats()
+            route.requests += 1
+            route.queries += request.queries
+            route.max_queries = max(route.max_queries, request.queries)
+            route.db_ms += request.db_ms
+            if flagged:
+                route.flagged += 1
+                self._flagged_requests.append({
+                    'route': request.route,
+                    'queries': request.queries,
+                    'db_ms': round(request.db_ms, 2),
+                    'methods': dict(request.methods),
+                    'at': datetime.now().isoformat(),
+                })
+        if flagged:
+            top = ', '.join(f"{name} x{count}" for name, count in
+                            sorted(request.methods.items(), key=lambda item: -item[1])[:3])
+            print(f"⚠️ Possible N+1: {request.route} issued {request.queries} queries ({top})")
+
+    def should_explain(self, fingerprint: str, ms: float) -> bool:
+        if ms < self.slow_query_ms:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_explained.get(fingerprint)
+            if last is not None and now - last < self.explain_interval:
+                return False
+            self._last_explained[fingerprint] = now
+            return True
+
+    def record_explain(self, fingerprint: str, ms: float, plan: str):
+        method = _current_method.get() or UNATTRIBUTED
+        with self._lock:
+            self._explain_samples.append({
+                'statement': fingerprint,
+                'method': method,
+                'duration_ms': round(ms, 2),
+                'plan': plan,
+                'at': datetime.now().isoformat(),
+            })
+        print(f"🐢 Slow query ({ms:.0f}ms) in {method} - EXPLAIN sample recorded")
+
+    # -- reporting ------------------------------------------------------------
+
+    def snapshot(self, top: int = 50) -> Dict[str, Any]:
+        with self._lock:
+            methods = {
+                name: {
+                    **stats.latency.to_dict(),
+                    'queries': stats.queries,
+                    'rows': stats.rows,
+                    'acquire_ms': round(stats.acquire_ms, 2),
+                    'errors': stats.errors,
+                }
+                for name, stats in self._methods.items()
+            }
+            statements = sorted(
+                ({'statement': fp, 'method': s.method, 'rows': s.rows, **s.latency.to_dict()}
+                 for fp, s in self._statements.items()),
+                key=lambda item: -item['total_ms']
+            )[:top]
+            routes = {
+                name: {
+                    'requests': r.requests,
+                    'avg_queries': round(r.queries / r.requests, 2) if r.requests else 0.0,
+                    'max_queries': r.max_queries,
+                    'avg_db_ms': round(r.db_ms / r.requests, 2) if r.requests else 0.0,
+                    'n_plus_one_flagged': r.flagged,
+                }
+                for name, r in self._routes.items()
+            }
+            return {
+                'enabled': self.enabled,
+                'since': self._started_at.isoformat(),
+                'n_plus_one_threshold': self.n_plus_one_threshold,
+                'slow_query_ms': self.slow_query_ms,
+                'methods': dict(sorted(methods.items(), key=lambda item: -item[1]['total_ms'])),
+                'statements': statements,
+                'routes': routes,
+                'flagged_requests': list(self._flagged_requests),
+                'explain_samples': list(self._explain_samples),
+            }
+
+
+def _load_registry() -> InstrumentationRegistry:
+    try:
+        from backend.config.settings import get_instrumentation_config
+    except ImportError:
+        return InstrumentationRegistry()
+    return InstrumentationRegistry(**get_instrumentation_config())
+
+
+registry = _load_registry()
+
+
+# =============================================================================
+# Scopes
+# =============================================================================
+
+@contextmanager
+def method_scope(name: str):
+    """Attribute queries issued inside the block to `name`"""
+    token = _current_method.set(name)
+    try:
+        yield
+    finally:
+        _current_method.reset(token)
+
+
+@contextmanager
+def request_scope(route: str):
+    """Count the database work of one HTTP request and flag N+1 patterns"""
+    if not registry.enabled:
+        yield None
+        return
+    request = RequestStats(route)
+    previous = _current_request.get()
+    _current_request.set(request)
+    try:
+        yield request
+    finally:
+        _current_request.set(previous)
+        registry.record_request(request)
+
+
+def instrument_methods(cls=None, *, exclude=()):
+    """
+    Class decorator wrapping every public method so its latency is recorded
+    and the statements it issues are attributed to it.
+    """
+    def decorate(target):
+        for name, attr in list(vars(target).items()):
+            if name.startswith('_') or name in exclude:
+                continue
+            if isinstance(attr, (staticmethod, classmethod, property)) or not callable(attr):
+                continue
+            setattr(target, name, _wrap_method(name, attr))
+        return target
+    return decorate(cls) if cls is not None else decorate
+
+
+def _wrap_method(name: str, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not registry.enabled:
+            return func(*args, **kwargs)
+        token = _current_method.set(name)
+        started = time.perf_counter()
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            registry.record_call(name, (time.perf_counter() - started) * 1000, failed)
+            _current_method.reset(token)
+    return wrapper
+
+
+# =============================================================================
+# Statement fingerprints
+# =============================================================================
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_VALUE_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_fingerprints: Dict[Any, str] = {}
+
+
+def fingerprint(query) -> str:
+    """Normalize a statement so executions of the same query group together"""
+    cached = _fingerprints.get(query)
+    if cached is not None:
+        return cached
+    text = query.decode('utf-8', 'replace') if isinstance(query, bytes) else str(query)
+    text = _WHITESPACE.sub(' ', text).strip()
+    text = _STRING_LITERAL.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _VALUE_LISTS.sub('(...), ...', text)
+    text = text[:300]
+    # Parameterised templates repeat; inlined batches (execute_values) don't
+    if isinstance(query, str) and len(_fingerprints) < 2000:
+        _fingerprints[query] = text
+    return text
+
+
+_WRITES = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE)\b')
+_ROW_LOCKS = re.compile(r'\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b')
+
+
+def _is_read_only(query) -> bool:
+    """SELECT (or a WITH ... SELECT) that neither writes nor takes row locks"""
+    text = (query.decode('utf-8', 'replace') if isinstance(query, bytes) else str(query)).lstrip().upper()
+    if _ROW_LOCKS.search(text):
+        return False
+    if text.startswith('SELECT'):
+        return True
+    return text.startswith('WITH') and not _WRITES.search(text)
+
+
+# =============================================================================
+# psycopg2 hooks
+# =============================================================================
+
+_cursor_classes: Dict[type, type] = {}
+_cursor_classes_lock = threading.Lock()
+
+
+def instrumented_cursor_class(base: type) -> type:
+    """Subclass of a psycopg2 cursor class that times its executions"""
+    cls = _cursor_classes.get(base)
+    if cls is not None:
+        return cls
+
+    class InstrumentedCursor(base):
+        def execute(self, query, vars=None):
+            if not registry.enabled:
+                return super().execute(query, vars)
+            started = time.perf_counter()
+            try:
+                result = super().execute(query, vars)
+            except Exception:
+                registry.record_query(fingerprint(query), (time.perf_counter() - started) * 1000, 0)
+                raise
+            ms = (time.perf_counter() - started) * 1000
+            fp = fingerprint(query)
+            registry.record_query(fp, ms, self.rowcount)
+            if registry.should_explain(fp, ms) and _is_read_only(query):
+                _explain(self.connection, self.query, fp, ms)
+            return result
+
+        def executemany(self, query, vars_list):
+            if not registry.enabled:
+                return super().executemany(query, vars_list)
+            started = time.perf_counter()
+            try:
+                return super().executemany(query, vars_list)
+            finally:
+                registry.record_query(fingerprint(query), (time.perf_counter() - started) * 1000, self.rowcount)
+
+    InstrumentedCursor.__name__ = f"Instrumented{base.__name__}"
+    with _cursor_classes_lock:
+        return _cursor_classes.setdefault(base, InstrumentedCursor)
+
+
+def _explain(connection, executed_query: Optional[bytes], fp: str, ms: float):
+    """
+    Record the plan of a slow read-only statement.
+
+    Plain EXPLAIN only plans the statement, so functions it calls are not run
+    and the slow query is not paid for twice. Inside a transaction the EXPLAIN
+    runs under a savepoint that is always rolled back to, leaving the caller's
+    transaction as it was even if the EXPLAIN fails.
+    """
+    if not executed_query:
+        return
+    status = connection.get_transaction_status()
+    if status == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+        return
+    in_transaction = status == psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    try:
+        # Plain cursor from the base class: the EXPLAIN itself is not recorded
+        with psycopg2.extensions.connection.cursor(connection) as cursor:
+            if in_transaction:
+                cursor.execute("SAVEPOINT db_stats_explain")
+            try:
+                cursor.execute(b"EXPLAIN " + executed_query)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            finally:
+                if in_transaction:
+                    cursor.execute("ROLLBACK TO SAVEPOINT db_stats_explain")
+                    cursor.execute("RELEASE SAVEPOINT db_stats_explain")
+        registry.record_explain(fp, ms, plan)
+    except Exception as e:
+        print(f"⚠️ Could not sample EXPLAIN for slow query: {e}")
+
+
+if PSYCOPG2_AVAILABLE:
+    class InstrumentedConnection(psycopg2.extensions.connection):
+        """psycopg2 connection whose cursors (any cursor_factory) are timed"""
+
+        def cursor(self, *args, **kwargs):
+            base = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+            kwargs['cursor_factory'] = instrumented_cursor_class(base)
+            return super().cursor(*args, **kwargs)
+else:
+    InstrumentedConnection = None
@@ -6,9 +6,13 @@ Handles all database operations with PostgreSQL/AWS RDS
 import os
 import json
 import uuid
+import threading
+import time
 from typing import Optional, Dict, Any, List
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
 from contextlib import contextmanager
+from pathlib import Path
 
 try:
     import psycopg2
@@ -20,13 +24,40 @@ except ImportError:
 
 from dotenv import load_dotenv
 
+try:
+    from backend.database.pool import ConnectionPool
+    from backend.database.cursors import encode_cursor, decode_cursor
+    from backend.database.ids import prefixed_id
+    from backend.database.partitions import message_time_lower_bound, PRUNING_SLACK
+    from backend.database.archive import MessageArchive
+    from backend.database.write_behind import WriteBehindQueue, barrier_keys
+    from backend.database.replicas import ReplicaRouter, get_session_key
+    from backend.database.instrumentation import InstrumentedConnection, instrument_methods, registry as query_stats
+    from backend.database.migrator import MigrationRunner
+    from backend.database.cache import cached, evicts, user_of_wallet, cache_fill_in_progress, mark_cache_fill_failed
+except ImportError:
+    # Fallback if importing as standalone
+    from pool import ConnectionPool
+    from cursors import encode_cursor, decode_cursor
+    from ids import prefixed_id
+    from partitions import message_time_lower_bound, PRUNING_SLACK
+    from archive import MessageArchive
+    from write_behind import WriteBehindQueue, barrier_keys
+    from replicas import ReplicaRouter, get_session_key
+    from instrumentation import InstrumentedConnection, instrument_methods, registry as query_stats
+    from migrator import MigrationRunner
+    from cache import cached, evicts, user_of_wallet, cache_fill_in_progress, mark_cache_fill_failed
+
 # Import settings
 try:
-    from backend.config.settings import get_database_config
+    from backend.config.settings import (
+        get_database_config, get_pool_config, get_replica_config, get_write_behind_config,
+        get_migration_config, get_shard_config, ARCHIVE_DIR, WRITE_BEHIND_ENABLED, DB_BACKEND
+    )
 except ImportError:
     # Fallback if importing as standalone
     load_dotenv()
-    def get_database_config():
+    def get_database_config(refresh=False):
         return {
             'host': os.getenv('DB_HOST', 'localhost'),
             'port': os.getenv('DB_PORT', '5432'),
@@ -35,23 +66,80 @@ except ImportError:
             'password': os.getenv('DB_PASSWORD', ''),
         }
 
+    def get_pool_config():
+        return {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        }
+
+    def get_replica_config():
+        return {'replicas': []}
+
+    def get_write_behind_config():
+        return {'journal_dir': Path(os.getenv('WRITE_BEHIND_JOURNAL_DIR', 'data/write_behind'))}
+
+    def get_migration_config():
+        return {'lock_timeout': os.getenv('DB_MIGRATION_LOCK_TIMEOUT', '5s')}
+
+    def get_shard_config():
+        return {'shards': []}
+
+    ARCHIVE_DIR = Path(os.getenv('MESSAGE_ARCHIVE_DIR', 'data/archive'))
+    WRITE_BEHIND_ENABLED = os.getenv(
+        'WRITE_BEHIND_ENABLED', 'false' if os.getenv('AWS_LAMBDA_FUNCTION_NAME') else 'true'
+    ).lower() == 'true'
+    DB_BACKEND = os.getenv('DB_BACKEND', 'postgres').lower()
+
 load_dotenv()
 
 
+@instrument_methods(exclude=(
+    'get_connection', 'get_pool_stats', 'close_pool', 'flush_pending_writes',
+    'get_write_behind_stats', 'stop_write_behind', 'migrate', 'get_migration_status', 'warm_up',
+))
 class DatabaseManager:
     """
     Manages database connections and operations for AstroVoice
     Supports both local PostgreSQL and AWS RDS
     """
+
+    backend = 'postgres'
     
-    def __init__(self):
+    def __init__(self, db_config: Optional[Dict[str, Any]] = None, name: Optional[str] = None):
+        """
+        Args:
+            db_config: Connection settings (default: get_database_config());
+                       an explicit config is a shard, which has no replicas
+            name: Shard name, keeps its pool and write-behind journal apart
+        """
+        self.name = name
+
+        # Connection pool is created lazily on first use so importing the
+        # module (and the global `db` instance) never opens a connection
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        
+        # Read-replica routing, set up with the first read-only connection
+        # (None once checked = no replicas configured)
+        self._router: Optional[ReplicaRouter] = None
+        self._router_checked = db_config is not None
+
+        # Settings-provided credentials are re-read on connect (Secrets Manager rotation)
+        self._reload_config = db_config is None
+        
+        # Write-behind queue for chat messages, also started lazily
+        self._write_behind: Optional[WriteBehindQueue] = None
+        
+        # Cold tier for messages past the retention window
+        self.archive = MessageArchive(ARCHIVE_DIR)
+
         if not PSYCOPG2_AVAILABLE:
             print("⚠️  Database manager initialized but psycopg2 not available")
             self.db_config = {}
             return
             
         # Database configuration
-        self.db_config = get_database_config()
+        self.db_config = db_config or get_database_config()
         
         print(f"✅ Database configured: {self.db_config['host']}:{self.db_config['port']}")
     
@@ -61,53 +149,243 @@ class DatabaseManager:
         return f"user_{uuid.uuid4().hex[:12]}"
     
     @staticmethod
-    def generate_conversation_id(user_id: str, astrologer_id: str) -> str:
-        """Generate a unique conversation ID"""
-        timestamp = int(datetime.now().timestamp())
-        return f"conv_{user_id}_{astrologer_id}_{timestamp}"
+    def generate_conversation_id(user_id: str = None, astrologer_id: str = None) -> str:
+        """
+        Generate a unique, time-sortable conversation ID (conv_<ulid>).
+        user_id/astrologer_id are accepted for backward compatibility but no
+        longer embedded - the conversation row already stores both.
+        """
+        return prefixed_id('conv')
+    
+    @staticmethod
+    def generate_message_id(conversation_id: str = None) -> str:
+        """Generate a unique, time-sortable message ID (msg_<ulid>)"""
+        return prefixed_id('msg')
     
     @staticmethod
-    def generate_message_id(conversation_id: str) -> str:
-        """Generate a unique message ID"""
-        timestamp = int(datetime.now().timestamp() * 1000)
-        return f"msg_{conversation_id}_{timestamp}"
+    def generate_transaction_id() -> str:
+        """Generate a unique, time-sortable transaction ID (txn_<ulid>)"""
+        return prefixed_id('txn')
     
     @staticmethod
     def generate_wallet_id(user_id: str) -> str:
         """Generate a wallet ID for user"""
         return f"wallet_{user_id}"
     
+    def _get_pool(self) -> ConnectionPool:
+        """Get (or lazily create) the connection pool"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    pool_config = get_pool_config()
+                    if self.name:
+                        pool_config = {**pool_config, 'name': f"shard-{self.name}"}
+                    self._pool = ConnectionPool(
+                        connect=self._connect,
+                        **pool_config
+                    )
+                    print(f"🔌 Connection pool ready (min={self._pool.min_size}, max={self._pool.max_size})")
+        return self._pool
+
+    def _connect(self, replica: Optional[Dict[str, Any]] = None):
+        """
+        Open a connection to the primary (or a replica). Credentials are
+        re-read from settings, which cache the Secrets Manager value, so new
+        connections pick up a rotated password; a rejected password forces
+        one refresh of the secret.
+        """
+        def open_connection():
+            config = self.db_config
+            if replica is not None:
+                config = {**replica, 'user': config['user'], 'password': config['password']}
+            return psycopg2.connect(connection_factory=InstrumentedConnection, **config)
+
+        if not self._reload_config:
+            return open_connection()
+        self.db_config = get_database_config()
+        try:
+            return open_connection()
+        except psycopg2.OperationalError as e:
+            if 'authentication failed' not in str(e):
+                raise
+            print("🔑 Database password rejected - refreshing credentials")
+            self.db_config = get_database_config(refresh=True)
+            return open_connection()
+
+    def warm_up(self) -> int:
+        """
+        Open the pool's min_size connections now instead of on the first
+        request (Lambda init phase; warm invocations then reuse them).
+        Returns the number of connections opened.
+        """
+        if not PSYCOPG2_AVAILABLE:
+            return 0
+        return self._get_pool().prefill()
+
+    def _get_router(self) -> Optional[ReplicaRouter]:
+        """Get (or lazily create) the replica router; None without replicas"""
+        if not self._router_checked:
+            with self._pool_lock:
+                if not self._router_checked:
+                    replica_config = get_replica_config()
+                    pool_config = get_pool_config()
+                    pools = [
+                        ConnectionPool(
+                            connect=lambda config=config: self._connect(config),
+                            **{**pool_config, 'name': f"replica-{i + 1}"}
+                        )
+                        for i, config in enumerate(replica_config['replicas'])
+                    ]
+                    if pools:
+                        self._router = ReplicaRouter(
+                            pools,
+                            max_lag=replica_config['max_lag'],
+                            sticky_window=replica_config['sticky_window'],
+                            lag_check_interval=replica_config['lag_check_interval'],
+                        )
+                        print(f"🔀 Read replicas enabled: {', '.join(c['host'] for c in replica_config['replicas'])}")
+                    self._router_checked = True
+        return self._router
+
+    def _record_session_write(self):
+        """Keep the current session's reads on the primary for a short while"""
+        if self._router is not None:
+            self._router.record_write(get_session_key())
+
     @contextmanager
-    def get_connection(self):
-        """Context manager for database connections"""
+    def get_connection(self, read_only: bool = False):
+        """
+        Context manager for database connections.
+        Connections are checked out of the pool and returned on exit;
+        the transaction is committed on success and rolled back on error.
+        
+        Args:
+            read_only: The caller only reads - the connection may come from a
+                       replica unless the current session wrote recently
+        """
         if not PSYCOPG2_AVAILABLE:
             raise ImportError("psycopg2 not available - database features disabled")
         
+        pool = None
         conn = None
+        acquire_started = time.perf_counter()
+        # Cache fills read the primary: a lagging replica could re-cache an invalidated row
+        router = self._get_router() if read_only and not cache_fill_in_progress() else None
+        if router is not None:
+            pool = router.pick(get_session_key())
+            if pool is not None:
+                try:
+                    conn = pool.getconn()
+                except Exception as e:
+                    print(f"⚠️ Replica connection failed, using primary: {e}")
+                    router.mark_down(pool)
+                    pool = None
+        if conn is None:
+            try:
+                pool = self._get_pool()
+                conn = pool.getconn()
+            except Exception:
+                mark_cache_fill_failed()
+                raise
+        query_stats.record_acquire((time.perf_counter() - acquire_started) * 1000)
+        
+        discard = False
         try:
-            conn = psycopg2.connect(**self.db_config)
             yield conn
             conn.commit()
+            if not read_only:
+                self._record_session_write()
         except Exception as e:
-            if conn:
+            mark_cache_fill_failed()
+            try:
                 conn.rollback()
+            except Exception:
+                discard = True
+            # Connection-level failures mean the socket is unusable - don't pool it
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                discard = True
             print(f"❌ Database error: {e}")
             raise
         finally:
-            if conn:
-                conn.close()
+            pool.putconn(conn, discard=discard)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Connection pool metrics (empty if the pool has not been created yet)"""
+        if self._pool is None:
+            return {'initialized': False}
+        stats = {'initialized': True, **self._pool.stats()}
+        if self._router is not None:
+            stats['read_routing'] = self._router.stats()
+        return stats
+
+    def close_pool(self):
+        """Close all pooled connections (used on application shutdown)"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+            print("🔌 Connection pool closed")
+        if self._router is not None:
+            self._router.close()
+            self._router = None
+            self._router_checked = False
     
+    def _get_write_behind(self) -> Optional[WriteBehindQueue]:
+        """Get (or lazily start) the write-behind queue; None when disabled"""
+        if not WRITE_BEHIND_ENABLED or not PSYCOPG2_AVAILABLE:
+            return None
+        if self._write_behind is None:
+            with self._pool_lock:
+                if self._write_behind is None:
+                    config = get_write_behind_config()
+                    if self.name:
+                        # Replayed journal entries must go back to this shard
+                        config = {**config, 'journal_dir': Path(config['journal_dir']) / self.name}
+                    queue = WriteBehindQueue(self, **config)
+                    queue.start()
+                    self._write_behind = queue
+        return self._write_behind
+
+    def flush_pending_writes(self, conversation_id: Optional[str] = None, user_id: Optional[str] = None,
+                             timeout: float = 10.0) -> bool:
+        """
+        Read-your-writes barrier: wait until the chat turns queued for this
+        conversation and/or user are committed (no arguments: everything queued).
+        Readers with nothing of their own queued return immediately.
+        """
+        queue = self._write_behind
+        if queue is None:
+            return True
+        keys = barrier_keys(conversation_id, user_id) if conversation_id or user_id else None
+        if not queue.has_pending(keys):
+            return True
+        # The rows just landed on the primary - replicas may not have them yet
+        self._record_session_write()
+        return queue.flush(timeout, keys)
+
+    def get_write_behind_stats(self) -> Dict[str, Any]:
+        """Write-behind queue metrics (empty if the queue has not started)"""
+        if self._write_behind is None:
+            return {'running': False, 'enabled': WRITE_BEHIND_ENABLED}
+        return {'enabled': True, **self._write_behind.stats()}
+
+    def stop_write_behind(self):
+        """Flush and stop the write-behind queue (used on application shutdown)"""
+        if self._write_behind is not None:
+            self._write_behind.stop()
+            self._write_behind = None
+
     def execute_schema(self, schema_file: str = None):
-        """Execute the database schema file"""
+        """
+        Bring the schema up to date: the baseline schema.sql plus every pending
+        migration (see migrator.py). Passing a file runs just that file once.
+        """
         if not PSYCOPG2_AVAILABLE:
             print("❌ psycopg2 not available - cannot execute schema")
             return False
-            
-        # Default to schema.sql in same directory
+
         if schema_file is None:
-            from pathlib import Path
-            schema_file = Path(__file__).parent / 'schema.sql'
-        
+            return self.migrate()['success']
+
         try:
             with open(schema_file, 'r') as f:
                 schema_sql = f.read()
@@ -121,11 +399,32 @@ class DatabaseManager:
         except Exception as e:
             print(f"❌ Error creating schema: {e}")
             return False
+
+    def migrate(self, target: Optional[int] = None, wait: bool = True) -> Dict[str, Any]:
+        """
+        Apply pending schema migrations (one instance at a time).
+
+        Args:
+            target: Highest version to apply (default: all)
+            wait: Wait for a migration already running elsewhere, or skip it
+
+        Returns:
+            {'success', 'applied': [versions], 'locked', 'error'}
+        """
+        if not PSYCOPG2_AVAILABLE:
+            print("❌ psycopg2 not available - cannot run migrations")
+            return {'success': False, 'applied': [], 'locked': False, 'error': 'psycopg2 not available'}
+        return MigrationRunner(self, **get_migration_config()).migrate(target=target, wait=wait)
+
+    def get_migration_status(self) -> List[Dict[str, Any]]:
+        """Known migrations and whether each has been applied"""
+        return MigrationRunner(self, **get_migration_config()).status()
     
     # =============================================================================
     # USER OPERATIONS
     # =============================================================================
     
+    @evicts('users', key=('user_data', 'user_id'))
     def create_user(self, user_data: Dict[str, Any]) -> Optional[str]:
         """Create a new user"""
         try:
@@ -167,10 +466,11 @@ class DatabaseManager:
             print(f"❌ Error creating user: {e}")
             return None
     
+    @cached('users', key='user_id')
     def get_user(self, user_id: str) -> Optional[Dict]:
         """Get user by ID"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("SELECT * FROM users WHERE user_id = %s", (user_id,))
                     return dict(cursor.fetchone()) if cursor.rowcount > 0 else None
@@ -178,6 +478,7 @@ class DatabaseManager:
             print(f"❌ Error getting user: {e}")
             return None
     
+    @evicts('users', key='user_id')
     def update_user_birth_info(self, user_id: str, birth_info: Dict[str, Any]) -> bool:
         """Update user's birth information"""
         try:
@@ -205,10 +506,11 @@ class DatabaseManager:
     # ASTROLOGER OPERATIONS
     # =============================================================================
     
+    @cached('astrologers', key='astrologer_id')
     def get_astrologer(self, astrologer_id: str) -> Optional[Dict]:
         """Get astrologer by ID"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
                         SELECT * FROM astrologers WHERE astrologer_id = %s
@@ -218,10 +520,11 @@ class DatabaseManager:
             print(f"❌ Error getting astrologer: {e}")
             return None
     
+    @cached('astrologers')
     def get_all_astrologers(self, active_only: bool = True) -> List[Dict]:
         """Get all astrologers"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     query = "SELECT * FROM astrologers"
                     if active_only:
@@ -241,6 +544,7 @@ class DatabaseManager:
             print(f"❌ Error getting astrologers: {e}")
             return []
     
+    @evicts('astrologers', key='astrologer_id')
     def update_astrologer_stats(self, astrologer_id: str, rating: float = None,
                                 increment_consultations: bool = False) -> bool:
         """Update astrologer statistics"""
@@ -300,7 +604,7 @@ class DatabaseManager:
                     audio_url: str = None, transcription: str = None) -> Optional[str]:
         """Add a message to a conversation"""
         try:
-            message_id = f"msg_{conversation_id}_{int(datetime.now().timestamp() * 1000)}"
+            message_id = self.generate_message_id()
             
             with self.get_connection() as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
@@ -328,6 +632,115 @@ class DatabaseManager:
             print(f"❌ Error adding message: {e}")
             return None
     
+    def record_turn(self, conversation_id: str, user_msg: str, ai_msg: str,
+                    tokens: Optional[int] = None, model: Optional[str] = None,
+                    message_type: str = 'text') -> Optional[Dict[str, str]]:
+        """
+        Persist a full chat turn (user message + astrologer reply) in one round trip.
+        
+        Both messages are inserted and the conversation's counters/preview are
+        updated by a single statement, so the turn is atomic and costs one
+        connection checkout instead of four. The preview shows the user's
+        message, as update_conversation_last_message did for chat turns.
+        
+        Returns:
+            Dict with user_message_id and ai_message_id, or None on failure
+        """
+        try:
+            # Generated in order, so the reply's ID sorts after the user's
+            user_message_id = self.generate_message_id()
+            ai_message_id = self.generate_message_id()
+            preview = user_msg[:200] if len(user_msg) > 200 else user_msg
+            
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    # The reply is stamped strictly after the user message so
+                    # history ordering by sent_at is deterministic
+                    cursor.execute("""
+                        WITH turn AS (
+                            INSERT INTO messages (
+                                message_id, conversation_id, sender_type,
+                                message_type, content, ai_model, tokens_used, sent_at
+                            ) VALUES
+                                (%(user_message_id)s, %(conversation_id)s, 'user',
+                                 %(message_type)s, %(user_msg)s, NULL, NULL, CURRENT_TIMESTAMP),
+                                (%(ai_message_id)s, %(conversation_id)s, 'astrologer',
+                                 %(message_type)s, %(ai_msg)s, %(model)s, %(tokens)s,
+                                 GREATEST(clock_timestamp()::timestamp, CURRENT_TIMESTAMP + INTERVAL '1 microsecond'))
+                            RETURNING sent_at
+                        )
+                        UPDATE conversations SET
+                            total_messages = total_messages + (SELECT COUNT(*) FROM turn),
+                            last_message_at = (SELECT MAX(sent_at) FROM turn),
+                            last_message_text = %(user_msg)s,
+                            last_message_preview = %(preview)s
+                        WHERE conversation_id = %(conversation_id)s
+                    """, {
+                        'conversation_id': conversation_id,
+                        'user_message_id': user_message_id,
+                        'ai_message_id': ai_message_id,
+                        'message_type': message_type,
+                        'user_msg': user_msg,
+                        'ai_msg': ai_msg,
+                        'model': model,
+                        'tokens': tokens,
+                        'preview': preview,
+                    })
+                    
+                    return {
+                        'user_message_id': user_message_id,
+                        'ai_message_id': ai_message_id,
+                    }
+        except Exception as e:
+            print(f"❌ Error recording chat turn: {e}")
+            return None
+    
+    def queue_turn(self, conversation_id: str, user_msg: str, ai_msg: str,
+                   tokens: Optional[int] = None, model: Optional[str] = None,
+                   message_type: str = 'text', user_id: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """
+        Persist a chat turn through the write-behind queue.
+        
+        Returns as soon as the turn is journaled locally; the rows and the
+        conversation's counters/preview are committed by the next batch flush.
+        Falls back to record_turn() when the queue is disabled or full.
+        
+        user_id (default: the current session's user) lets that user's
+        thread list and search wait for the turn (see flush_pending_writes).
+        
+        Returns:
+            Dict with user_message_id and ai_message_id, or None on failure
+        """
+        queue = self._get_write_behind()
+        if queue is not None:
+            user_message_id = self.generate_message_id()
+            ai_message_id = self.generate_message_id()
+            sent_at = datetime.now()
+            rows = [
+                {
+                    'message_id': user_message_id, 'conversation_id': conversation_id,
+                    'sender_type': 'user', 'message_type': message_type,
+                    'content': user_msg, 'sent_at': sent_at,
+                },
+                {
+                    'message_id': ai_message_id, 'conversation_id': conversation_id,
+                    'sender_type': 'astrologer', 'message_type': message_type,
+                    'content': ai_msg, 'ai_model': model, 'tokens_used': tokens,
+                    # Strictly after the user message so ordering is deterministic
+                    'sent_at': max(datetime.now(), sent_at + timedelta(microseconds=1)),
+                },
+            ]
+            if queue.submit(rows, barrier_keys(conversation_id, user_id or get_session_key())):
+                self._record_session_write()
+                return {
+                    'user_message_id': user_message_id,
+                    'ai_message_id': ai_message_id,
+                }
+            print("⚠️ Write-behind queue full - writing chat turn synchronously")
+        
+        return self.record_turn(conversation_id, user_msg, ai_msg,
+                                tokens=tokens, model=model, message_type=message_type)
+    
     def update_conversation_last_message(self, conversation_id: str, message_text: str):
         """Update the last message info for a conversation"""
         try:
@@ -347,8 +760,10 @@ class DatabaseManager:
     
     def get_conversation(self, conversation_id: str) -> Optional[Dict]:
         """Get conversation by ID"""
+        # Counters and preview of chat turns still in the write-behind queue
+        self.flush_pending_writes(conversation_id=conversation_id)
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
                         SELECT * FROM conversations WHERE conversation_id = %s
@@ -359,14 +774,13 @@ class DatabaseManager:
             return None
     
     def update_conversation_activity(self, conversation_id: str) -> bool:
-        """Update conversation activity timestamp"""
+        """Update conversation activity timestamp (message counts are maintained by add_message)"""
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
                     cursor.execute("""
                         UPDATE conversations SET
-                            last_message_at = CURRENT_TIMESTAMP,
-                            total_messages = total_messages + 1
+                            last_message_at = CURRENT_TIMESTAMP
                         WHERE conversation_id = %s
                     """, (conversation_id,))
                     return True
@@ -501,7 +915,7 @@ class DatabaseManager:
     def get_conversation_session_status(self, conversation_id: str) -> Optional[Dict]:
         """Get conversation session status and details"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
                         SELECT 
@@ -540,18 +954,31 @@ class DatabaseManager:
             
         Returns:
             List of message dictionaries in chronological order
+            
+        Note: offset paging gets slower the deeper it goes - prefer
+        get_conversation_history_page() with a cursor.
         """
+        # Chat turns still in the write-behind queue must be visible here
+        self.flush_pending_writes(conversation_id=conversation_id)
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    params: List[Any] = [conversation_id]
+                    pruning = ""
+                    lower_bound = message_time_lower_bound(conversation_id)
+                    if lower_bound:
+                        # Lets Postgres skip partitions older than the conversation
+                        pruning = "AND sent_at >= %s"
+                        params.append(lower_bound)
+                    
                     # Get messages ordered by sent_at DESC (newest first)
                     # Then apply offset to skip messages
-                    cursor.execute("""
+                    cursor.execute(f"""
                         SELECT * FROM messages
-                        WHERE conversation_id = %s
-                        ORDER BY sent_at DESC
+                        WHERE conversation_id = %s {pruning}
+                        ORDER BY sent_at DESC, message_id DESC
                         LIMIT %s OFFSET %s
-                    """, (conversation_id, limit, offset))
+                    """, params + [limit, offset])
                     
                     messages = [dict(row) for row in cursor.fetchall()]
                     # Return in chronological order (oldest first) for display
@@ -560,26 +987,88 @@ class DatabaseManager:
             print(f"❌ Error getting conversation history: {e}")
             return []
     
+    def get_conversation_history_page(self, conversation_id: str, limit: int = 50,
+                                      before_cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of a conversation's messages using keyset pagination.
+        
+        Args:
+            conversation_id: ID of the conversation
+            limit: Number of messages to return (default 50)
+            before_cursor: Cursor from a previous page's next_cursor (None = newest page)
+            
+        Returns:
+            Dict with messages (chronological), has_more and next_cursor
+            
+        Raises:
+            InvalidCursorError: If before_cursor is malformed
+        """
+        self.flush_pending_writes(conversation_id=conversation_id)
+        before = decode_cursor(before_cursor) if before_cursor else None
+        
+        try:
+            with self.get_connection(read_only=True) as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    params: List[Any] = [conversation_id]
+                    keyset = ""
+                    lower_bound = message_time_lower_bound(conversation_id)
+                    if lower_bound:
+                        # Lets Postgres skip partitions older than the conversation
+                        keyset += " AND sent_at >= %s"
+                        params.append(lower_bound)
+                    if before:
+                        # The plain sent_at bound prunes newer partitions; the
+                        # row comparison gives the exact keyset position
+                        keyset += " AND sent_at <= %s AND (sent_at, message_id) < (%s, %s)"
+                        params.extend([before[0], *before])
+                    
+                    # Fetch one extra row to know whether an older page exists
+                    cursor.execute(f"""
+                        SELECT * FROM messages
+                        WHERE conversation_id = %s {keyset}
+                        ORDER BY sent_at DESC, message_id DESC
+                        LIMIT %s
+                    """, params + [limit + 1])
+                    
+                    rows = [dict(row) for row in cursor.fetchall()]
+                    has_more = len(rows) > limit
+                    rows = rows[:limit]
+                    
+                    oldest = rows[-1] if rows else None
+                    return {
+                        "messages": list(reversed(rows)),
+                        "has_more": has_more,
+                        "next_cursor": encode_cursor(oldest['sent_at'], oldest['message_id']) if has_more else None
+                    }
+        except Exception as e:
+            print(f"❌ Error getting conversation history page: {e}")
+            return {"messages": [], "has_more": False, "next_cursor": None}
+    
     def get_user_conversations(self, user_id: str, limit: int = 20) -> List[Dict]:
-        """Get user's conversation history grouped by astrologer"""
+        """
+        Get user's conversation history grouped by astrologer.
+        
+        Served from the user_astrologer_threads read model (one row per
+        astrologer, maintained by triggers) as a single index range scan.
+        """
+        self.flush_pending_writes(user_id=user_id)
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # Get the most recent conversation for each astrologer
                     cursor.execute("""
-                        SELECT DISTINCT ON (c.astrologer_id)
-                            c.conversation_id,
-                            c.astrologer_id,
-                            a.display_name as astrologer_name,
-                            a.profile_picture_url as astrologer_image,
-                            COALESCE(c.last_message_preview, 'No messages yet') as last_message,
-                            COALESCE(c.last_message_at, c.started_at) as last_message_time,
-                            c.status,
-                            COALESCE(c.total_messages, 0) as total_messages
-                        FROM conversations c
-                        JOIN astrologers a ON c.astrologer_id = a.astrologer_id
-                        WHERE c.user_id = %s
-                        ORDER BY c.astrologer_id, c.last_message_at DESC NULLS LAST, c.started_at DESC
+                        SELECT
+                            conversation_id,
+                            astrologer_id,
+                            astrologer_name,
+                            astrologer_image,
+                            COALESCE(last_message_preview, 'No messages yet') as last_message,
+                            last_activity_at as last_message_time,
+                            status,
+                            total_messages,
+                            unread_count
+                        FROM user_astrologer_threads
+                        WHERE user_id = %s
+                        ORDER BY last_activity_at DESC
                         LIMIT %s
                     """, (user_id, limit))
                     
@@ -596,14 +1085,43 @@ class DatabaseManager:
             print(f"❌ Error getting user conversations: {e}")
             return []
     
+    def mark_thread_read(self, user_id: str, astrologer_id: str) -> bool:
+        """Clear the unread count of a user's chat with an astrologer"""
+        # Queued replies must land first or they would count as unread later
+        self.flush_pending_writes(user_id=user_id)
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE user_astrologer_threads SET
+                            unread_count = 0,
+                            last_read_at = CURRENT_TIMESTAMP
+                        WHERE user_id = %s AND astrologer_id = %s
+                    """, (user_id, astrologer_id))
+                    return cursor.rowcount > 0
+        except Exception as e:
+            print(f"❌ Error marking thread read: {e}")
+            return False
+    
     def get_unified_chat_history(self, user_id: str, astrologer_id: str, 
-                                limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+                                limit: int = 50, offset: int = 0,
+                                before_cursor: Optional[str] = None) -> Dict[str, Any]:
         """
         Get unified chat history for a user-astrologer pair.
         Returns all messages from all conversations with date separators.
+        
+        Pages with a (sent_at, message_id) keyset: pass the previous response's
+        next_cursor as before_cursor to load older messages. `offset` is only
+        honoured for older clients that don't send a cursor.
+        
+        Raises:
+            InvalidCursorError: If before_cursor is malformed
         """
+        self.flush_pending_writes(user_id=user_id)
+        before = decode_cursor(before_cursor) if before_cursor else None
+        
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     # Get astrologer details
                     cursor.execute("""
@@ -630,12 +1148,31 @@ class DatabaseManager:
                             "astrologer": dict(astrologer),
                             "messages": [],
                             "total_conversations": 0,
-                            "has_more": False
+                            "has_more": False,
+                            "next_cursor": None
                         }
                     
-                    # Get all messages from all conversations with pagination
+                    # Get one page of messages across all conversations
                     conversation_ids = [conv['conversation_id'] for conv in conversations]
-                    placeholders = ','.join(['%s'] * len(conversation_ids))
+                    # No message predates the first conversation - bounding
+                    # sent_at lets Postgres prune older partitions
+                    first_started = min((conv['started_at'] for conv in conversations if conv.get('started_at')), default=None)
+                    params: List[Any] = [conversation_ids]
+                    keyset = ""
+                    paging = "LIMIT %s"
+                    if first_started:
+                        keyset += " AND m.sent_at >= %s"
+                        params.append(first_started - PRUNING_SLACK)
+                    if before:
+                        keyset += " AND m.sent_at <= %s AND (m.sent_at, m.message_id) < (%s, %s)"
+                        params.extend([before[0], *before])
+                    elif offset:
+                        paging = "LIMIT %s OFFSET %s"
+                    
+                    # Fetch one extra row to know whether an older page exists
+                    params.append(limit + 1)
+                    if paging.endswith("OFFSET %s"):
+                        params.append(offset)
                     
                     cursor.execute(f"""
                         SELECT 
@@ -644,17 +1181,34 @@ class DatabaseManager:
                             m.sender_type,
                             m.content,
                             m.sent_at,
-                            m.message_type,
-                            c.started_at as conversation_started_at
+                            m.message_type
                         FROM messages m
-                        JOIN conversations c ON m.conversation_id = c.conversation_id
-                        WHERE m.conversation_id IN ({placeholders})
-                        ORDER BY m.sent_at DESC
-                        LIMIT %s OFFSET %s
-                    """, conversation_ids + [limit, offset])
+                        WHERE m.conversation_id = ANY(%s) {keyset}
+                        ORDER BY m.sent_at DESC, m.message_id DESC
+                        {paging}
+                    """, params)
                     
                     messages = [dict(row) for row in cursor.fetchall()]
                     
+                    # Hot rows exhausted: continue seamlessly into the archive
+                    # (offset paging can't be mapped onto it, cursors can)
+                    if len(messages) <= limit and not (offset and not before):
+                        if messages:
+                            archive_before = (messages[-1]['sent_at'], messages[-1]['message_id'])
+                        else:
+                            archive_before = before
+                        messages.extend(self.archive.read_before(
+                            user_id, astrologer_id, archive_before, limit + 1 - len(messages)
+                        ))
+                    
+                    has_more = len(messages) > limit
+                    messages = messages[:limit]
+                    
+                    next_cursor = None
+                    if has_more:
+                        oldest = messages[-1]
+                        next_cursor = encode_cursor(oldest['sent_at'], oldest['message_id'])
+                    
                     # Reverse to get chronological order (oldest first)
                     messages = list(reversed(messages))
                     
@@ -668,16 +1222,7 @@ class DatabaseManager:
                         # Add separator if date changed
                         if current_date != msg_date:
                             if current_date is not None:  # Not the first message
-                                # Find the conversation that started on this date
-                                conv_started_today = None
-                                for conv in conversations:
-                                    if conv['started_at'].date() == msg_date:
-                                        conv_started_today = conv
-                                        break
-                                
                                 separator_text = f"Chat started on {msg_date.strftime('%b %d, %Y')}"
-                                if conv_started_today:
-                                    separator_text = f"Chat started on {msg_date.strftime('%b %d, %Y')}"
                                 
                                 messages_with_separators.append({
                                     "is_separator": True,
@@ -700,15 +1245,9 @@ class DatabaseManager:
                             "is_separator": False
                         })
                     
-                    # Check if there are more messages
-                    total_messages_query = f"""
-                        SELECT COUNT(*) FROM messages 
-                        WHERE conversation_id IN ({placeholders})
-                    """
-                    cursor.execute(total_messages_query, conversation_ids)
-                    result = cursor.fetchone()
-                    total_messages = result['count'] if result else 0
-                    has_more = (offset + limit) < total_messages
+                    # Message totals come from the per-conversation counters
+                    # instead of counting every message on each page load
+                    total_messages = sum(conv.get('total_messages') or 0 for conv in conversations)
                     
                     return {
                         "success": True,
@@ -717,6 +1256,7 @@ class DatabaseManager:
                         "total_conversations": len(conversations),
                         "total_messages": total_messages,
                         "has_more": has_more,
+                        "next_cursor": next_cursor,
                         "offset": offset,
                         "limit": limit
                     }
@@ -726,7 +1266,143 @@ class DatabaseManager:
             import traceback
             traceback.print_exc()
             return {"success": False, "error": str(e)}
-    
+
+    def search_messages(self, user_id: str, query: str, astrologer_id: Optional[str] = None,
+                        limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """
+        Full-text search over a user's chat history, best matches first.
+
+        The query uses web-search syntax ("quoted phrases", -excluded, or) and
+        matches both English stems and exact Hinglish/Devanagari words. Only
+        hot messages are searched - archived messages are not indexed.
+
+        Args:
+            user_id: ID of the user whose messages are searched
+            query: Search text
+            astrologer_id: Restrict to one astrologer (optional)
+            limit: Number of results to return (default 20)
+            offset: Number of results to skip
+
+        Returns:
+            Dict with results (rank order, each with a highlighted snippet) and has_more
+        """
+        self.flush_pending_writes(user_id=user_id)
+        try:
+            with self.get_connection(read_only=True) as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    sql_filter = "WHERE user_id = %s"
+                    params: List[Any] = [user_id]
+                    if astrologer_id:
+                        sql_filter += " AND astrologer_id = %s"
+                        params.append(astrologer_id)
+
+                    cursor.execute(f"""
+                        SELECT conversation_id, started_at FROM conversations {sql_filter}
+                    """, params)
+                    conversations = [dict(row) for row in cursor.fetchall()]
+
+                    if not conversations:
+                        return {"success": True, "results": [], "has_more": False}
+
+                    conversation_ids = [conv['conversation_id'] for conv in conversations]
+                    first_started = min((conv['started_at'] for conv in conversations if conv.get('started_at')), default=None)
+                    bound = ""
+                    params = [query, query, conversation_ids]
+                    if first_started:
+                        bound = "AND m.sent_at >= %s"
+                        params.append(first_started - PRUNING_SLACK)
+
+                    # Rank every match, but build snippets for the returned page only.
+                    # ts_rank, not ts_rank_cd: cover density costs more than the index
+                    # scan itself when a common word matches thousands of messages
+                    cursor.execute(f"""
+                        WITH parsed AS (
+                            SELECT websearch_to_tsquery('english', %s) AS english,
+                                   websearch_to_tsquery('simple', %s) AS simple
+                        ),
+                        q AS (
+                            -- Words without an English stem parse the same both ways; OR-ing
+                            -- identical queries would walk the index twice
+                            SELECT CASE WHEN english = simple THEN simple ELSE english || simple END AS query
+                            FROM parsed
+                        ),
+                        hits AS (
+                            SELECT m.message_id, m.conversation_id, m.sender_type, m.content, m.sent_at,
+                                   ts_rank(m.search_vector, q.query) AS rank
+                            FROM messages m, q
+                            WHERE m.conversation_id = ANY(%s) {bound}
+                              AND m.search_vector @@ q.query
+                            ORDER BY rank DESC, m.sent_at DESC, m.message_id DESC
+                            LIMIT %s OFFSET %s
+                        )
+                        SELECT h.message_id, h.conversation_id, c.astrologer_id,
+                               a.display_name AS astrologer_name,
+                               h.sender_type, h.content, h.sent_at, h.rank,
+                               ts_headline('english', h.content, q.query,
+                                           'StartSel=<b>, StopSel=</b>, MaxWords=20, MinWords=8') AS snippet
+                        FROM hits h
+                        CROSS JOIN q
+                        JOIN conversations c ON c.conversation_id = h.conversation_id
+                        LEFT JOIN astrologers a ON a.astrologer_id = c.astrologer_id
+                        ORDER BY h.rank DESC, h.sent_at DESC, h.message_id DESC
+                    """, params + [limit + 1, offset])
+
+                    rows = [dict(row) for row in cursor.fetchall()]
+                    has_more = len(rows) > limit
+                    results = []
+                    for row in rows[:limit]:
+                        row['sent_at'] = row['sent_at'].isoformat() if row['sent_at'] else None
+                        row['rank'] = float(row['rank'])
+                        results.append(row)
+
+                    return {"success": True, "results": results, "has_more": has_more}
+        except Exception as e:
+            print(f"❌ Error searching messages: {e}")
+            return {"success": False, "error": str(e)}
+
+    def backfill_search_vectors(self, batch_size: int = 5000) -> int:
+        """
+        Fill search_vector for messages written before full-text search existed.
+        New and edited messages are kept current by trg_messages_search_vector.
+
+        Walks messages in primary-key order, one committed batch at a time, so
+        each batch reads batch_size index entries instead of rescanning rows
+        that earlier batches already filled.
+
+        Returns:
+            Number of messages updated
+        """
+        updated = 0
+        scanned = 0
+        last_key = None
+        while True:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    after = "WHERE (message_id, sent_at) > (%s, %s)" if last_key else ""
+                    cursor.execute(f"""
+                        SELECT message_id, sent_at FROM messages {after}
+                        ORDER BY message_id, sent_at
+                        LIMIT %s
+                    """, (*(last_key or ()), batch_size))
+                    keys = cursor.fetchall()
+                    if keys:
+                        cursor.execute("""
+                            UPDATE messages m
+                            SET search_vector = message_search_vector(m.content)
+                            FROM unnest(%s::varchar[], %s::timestamp[]) AS todo(message_id, sent_at)
+                            WHERE m.message_id = todo.message_id AND m.sent_at = todo.sent_at
+                              AND m.search_vector IS NULL
+                        """, ([k[0] for k in keys], [k[1] for k in keys]))
+                        updated += cursor.rowcount
+            if len(keys) < batch_size:
+                break
+            last_key = keys[-1]
+            scanned += len(keys)
+            print(f"🔍 Checked {scanned} messages, indexed {updated} so far...")
+
+        print(f"✅ Search backfill complete: {updated} messages indexed")
+        return updated
+
     def create_unified_conversation(self, user_id: str, astrologer_id: str, 
                                    topic: str = 'general') -> Optional[str]:
         """
@@ -803,6 +1479,7 @@ class DatabaseManager:
     # WALLET OPERATIONS
     # =============================================================================
     
+    @evicts('wallets', key='user_id')
     def create_wallet(self, user_id: str, initial_balance: float = 50.00) -> Optional[str]:
         """Create wallet for new user"""
         try:
@@ -825,10 +1502,11 @@ class DatabaseManager:
             print(f"❌ Error creating wallet: {e}")
             return None
     
+    @cached('wallets', key='user_id')
     def get_wallet(self, user_id: str) -> Optional[Dict]:
         """Get user wallet details"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
                         SELECT * FROM wallets WHERE user_id = %s
@@ -838,6 +1516,7 @@ class DatabaseManager:
             print(f"❌ Error getting wallet: {e}")
             return None
     
+    @evicts('wallets', key=user_of_wallet)
     def update_wallet_balance(self, wallet_id: str, new_balance: float) -> bool:
         """Update wallet balance"""
         try:
@@ -854,85 +1533,143 @@ class DatabaseManager:
             print(f"❌ Error updating wallet balance: {e}")
             return False
     
+    @staticmethod
+    def _post_wallet_transaction(cursor, key_column: str, key: str, delta: float,
+                                 columns: Dict[str, Any]) -> Optional[Dict]:
+        """
+        Apply a balance change and write its ledger row in one statement.
+        
+        The conditional UPDATE takes the wallet row lock and re-checks the
+        balance against the latest committed value, so concurrent debits
+        serialize on the row and can neither lose an update nor overdraw.
+        A debit (negative delta) only applies if the balance covers it.
+        
+        Returns:
+            The transaction_id, wallet_id and balances, or None if the wallet
+            doesn't exist or can't cover the debit
+        """
+        names = ', '.join(columns)
+        values = ', '.join(f'%({name})s' for name in columns)
+        cursor.execute(f"""
+            WITH wallet AS (
+                UPDATE wallets SET
+                    balance = balance + (%(delta)s),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE {key_column} = %(key)s
+                  AND balance + (%(delta)s) >= LEAST(balance, 0)
+                RETURNING wallet_id, user_id,
+                          balance - (%(delta)s) AS balance_before,
+                          balance AS balance_after
+            )
+            INSERT INTO transactions (
+                user_id, wallet_id, balance_before, balance_after, {names}
+            )
+            SELECT wallet.user_id, wallet.wallet_id, wallet.balance_before, wallet.balance_after, {values}
+            FROM wallet
+            RETURNING transaction_id, wallet_id, balance_before, balance_after
+        """, {**columns, 'delta': Decimal(str(delta)), 'key': key})
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    @evicts('wallets', key=user_of_wallet)
     def add_transaction(self, transaction_data: Dict[str, Any]) -> Optional[str]:
-        """Record wallet transaction"""
+        """
+        Record wallet transaction and apply it to the balance atomically.
+        
+        Deductions are refused (None) if the balance doesn't cover them.
+        """
         try:
-            transaction_id = f"txn_{transaction_data['user_id']}_{int(datetime.now().timestamp() * 1000)}"
+            amount = float(transaction_data['amount'])
+            transaction_type = transaction_data['transaction_type']
+            
+            if transaction_type in ('recharge', 'refund'):
+                delta = amount
+            elif transaction_type == 'deduction':
+                delta = -amount
+            else:
+                delta = 0.0
             
             with self.get_connection() as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # Get current balance
-                    cursor.execute("""
-                        SELECT balance FROM wallets WHERE wallet_id = %s
-                    """, (transaction_data['wallet_id'],))
+                    result = self._post_wallet_transaction(cursor, 'wallet_id', transaction_data['wallet_id'], delta, {
+                        'transaction_id': self.generate_transaction_id(),
+                        'transaction_type': transaction_type,
+                        'amount': amount,
+                        'payment_method': transaction_data.get('payment_method', 'upi'),
+                        'payment_status': transaction_data.get('payment_status', 'completed'),
+                        'payment_reference': transaction_data.get('payment_reference'),
+                        'reference_type': transaction_data.get('reference_type', 'recharge'),
+                        'reference_id': transaction_data.get('reference_id'),
+                        'description': transaction_data.get('description'),
+                        'metadata': Json(transaction_data.get('metadata', {})),
+                    })
                     
-                    wallet = cursor.fetchone()
-                    if not wallet:
-                        print(f"❌ Wallet not found: {transaction_data['wallet_id']}")
+                    if not result:
+                        print(f"❌ Wallet not found or insufficient balance: {transaction_data['wallet_id']}")
                         return None
                     
-                    current_balance = float(wallet['balance'])
-                    amount = float(transaction_data['amount'])
-                    transaction_type = transaction_data['transaction_type']
-                    
-                    # Calculate new balance
-                    if transaction_type == 'recharge':
-                        new_balance = current_balance + amount
-                    elif transaction_type == 'deduction':
-                        new_balance = max(0, current_balance - amount)
-                    elif transaction_type == 'refund':
-                        new_balance = current_balance + amount
-                    else:
-                        new_balance = current_balance
-                    
-                    # Insert transaction
-                    cursor.execute("""
-                        INSERT INTO transactions (
-                            transaction_id, user_id, wallet_id, transaction_type,
-                            amount, balance_before, balance_after, payment_method,
-                            payment_status, payment_reference, reference_type,
-                            reference_id, description, metadata
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                        )
-                        RETURNING transaction_id
-                    """, (
-                        transaction_id,
-                        transaction_data['user_id'],
-                        transaction_data['wallet_id'],
-                        transaction_type,
-                        amount,
-                        current_balance,
-                        new_balance,
-                        transaction_data.get('payment_method', 'upi'),
-                        transaction_data.get('payment_status', 'completed'),
-                        transaction_data.get('payment_reference'),
-                        transaction_data.get('reference_type', 'recharge'),
-                        transaction_data.get('reference_id'),
-                        transaction_data.get('description'),
-                        Json(transaction_data.get('metadata', {}))
-                    ))
-                    
-                    result = cursor.fetchone()
-                    
-                    # Update wallet balance
-                    cursor.execute("""
-                        UPDATE wallets SET
-                            balance = %s,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE wallet_id = %s
-                    """, (new_balance, transaction_data['wallet_id']))
-                    
-                    print(f"✅ Transaction created: {result['transaction_id'] if result else transaction_id}")
-                    return result['transaction_id'] if result else transaction_id
+                    print(f"✅ Transaction created: {result['transaction_id']}")
+                    return result['transaction_id']
         except Exception as e:
             print(f"❌ Error adding transaction: {e}")
             return None
     
+    @evicts('wallets', key='user_id')
+    def debit_wallet(self, user_id: str, amount: float, description: Optional[str] = None,
+                     reference_type: str = 'conversation', reference_id: Optional[str] = None,
+                     metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Deduct from a user's wallet if the balance covers the amount.
+        
+        One conditional UPDATE + ledger INSERT on one connection; safe under
+        concurrent deductions for the same user.
+        
+        Returns:
+            {'success': True, 'transaction_id', 'wallet_id', 'balance_before', 'balance_after'}
+            or {'success': False, 'error': 'insufficient_balance' | 'wallet_not_found' | 'database_error',
+                'current_balance'}
+        """
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    result = self._post_wallet_transaction(cursor, 'user_id', user_id, -float(amount), {
+                        'transaction_id': self.generate_transaction_id(),
+                        'transaction_type': 'deduction',
+                        'amount': float(amount),
+                        'payment_method': 'wallet',
+                        'payment_status': 'completed',
+                        'reference_type': reference_type,
+                        'reference_id': reference_id,
+                        'description': description,
+                        'metadata': Json(metadata or {}),
+                    })
+                    if result:
+                        return {
+                            'success': True,
+                            'transaction_id': result['transaction_id'],
+                            'wallet_id': result['wallet_id'],
+                            'balance_before': float(result['balance_before']),
+                            'balance_after': float(result['balance_after']),
+                        }
+                    
+                    # Nothing applied - tell a missing wallet from a short balance
+                    cursor.execute("SELECT balance FROM wallets WHERE user_id = %s", (user_id,))
+                    wallet = cursor.fetchone()
+                    if not wallet:
+                        return {'success': False, 'error': 'wallet_not_found', 'current_balance': 0.0}
+                    return {
+                        'success': False,
+                        'error': 'insufficient_balance',
+                        'current_balance': float(wallet['balance']),
+                    }
+        except Exception as e:
+            print(f"❌ Error debiting wallet: {e}")
+            return {'success': False, 'error': 'database_error', 'current_balance': None}
+    
     def get_user_transactions(self, user_id: str, limit: int = 20) -> List[Dict]:
         """Get user transaction history"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
                         SELECT * FROM transactions
@@ -950,10 +1687,11 @@ class DatabaseManager:
     # GOOGLE PLAY BILLING OPERATIONS
     # =============================================================================
     
+    @cached('recharge_products')
     def get_recharge_products(self, platform: str = 'android') -> List[Dict]:
         """Get all active recharge products for a platform"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
                         SELECT product_id, platform, amount, bonus_percentage,
@@ -968,10 +1706,11 @@ class DatabaseManager:
             print(f"❌ Error getting recharge products: {e}")
             return []
     
+    @cached('recharge_products', key='product_id')
     def get_product_by_id(self, product_id: str) -> Optional[Dict]:
         """Get a specific recharge product by ID"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
                         SELECT * FROM recharge_products
@@ -1020,6 +1759,7 @@ class DatabaseManager:
             print(f"❌ Error checking first recharge bonus: {e}")
             return False
     
+    @evicts('wallets', key='user_id')
     def create_google_play_transaction(
         self,
         user_id: str,
@@ -1036,62 +1776,40 @@ class DatabaseManager:
         Handles wallet balance update and first-time bonus if applicable.
         """
         try:
-            transaction_id = f"txn_{user_id}_{int(datetime.now().timestamp())}"
+            transaction_id = self.generate_transaction_id()
             total_amount = float(amount) + float(bonus_amount)
             
             with self.get_connection() as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # Get current wallet balance
-                    cursor.execute("""
-                        SELECT balance FROM wallets WHERE wallet_id = %s
-                    """, (wallet_id,))
+                    # Credit the wallet and record the transaction in one statement
+                    result = self._post_wallet_transaction(cursor, 'wallet_id', wallet_id, total_amount, {
+                        'transaction_id': transaction_id,
+                        'transaction_type': 'recharge',
+                        'amount': total_amount,
+                        'bonus_amount': bonus_amount,
+                        'payment_method': 'google_play',
+                        'payment_status': 'completed',
+                        'payment_reference': order_id,
+                        'google_play_purchase_token': purchase_token,
+                        'google_play_product_id': product_id,
+                        'google_play_order_id': order_id,
+                        'platform': platform,
+                        'reference_type': 'recharge',
+                        'description': f'Wallet recharge via Google Play - ₹{amount} + ₹{bonus_amount} bonus',
+                    })
                     
-                    wallet_result = cursor.fetchone()
-                    if not wallet_result:
+                    if not result:
                         print(f"❌ Wallet not found: {wallet_id}")
                         return None
                     
-                    balance_before = float(wallet_result['balance'])
-                    balance_after = balance_before + total_amount
-                    
-                    # Insert transaction record
-                    cursor.execute("""
-                        INSERT INTO transactions (
-                            transaction_id, user_id, wallet_id,
-                            transaction_type, amount, bonus_amount,
-                            balance_before, balance_after,
-                            payment_method, payment_status, payment_reference,
-                            google_play_purchase_token, google_play_product_id,
-                            google_play_order_id, platform,
-                            reference_type, description, created_at
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP
-                        )
-                        RETURNING transaction_id
-                    """, (
-                        transaction_id, user_id, wallet_id,
-                        'recharge', total_amount, bonus_amount,
-                        balance_before, balance_after,
-                        'google_play', 'completed', order_id,
-                        purchase_token, product_id, order_id, platform,
-                        'recharge',
-                        f'Wallet recharge via Google Play - ₹{amount} + ₹{bonus_amount} bonus'
-                    ))
-                    
-                    # Update wallet balance
-                    cursor.execute("""
-                        UPDATE wallets SET
-                            balance = %s,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE wallet_id = %s
-                    """, (balance_after, wallet_id))
+                    balance_after = float(result['balance_after'])
                     
                     # Check if this includes first-time bonus and record it
                     is_first_recharge = not self.has_first_recharge_bonus(user_id)
                     if is_first_recharge and bonus_amount > 0:
                         # Assuming ₹50 is always the first-time bonus portion
                         first_time_bonus = min(50.00, bonus_amount)
-                        bonus_id = f"bonus_{user_id}_{int(datetime.now().timestamp())}"
+                        bonus_id = prefixed_id('bonus')
                         
                         cursor.execute("""
                             INSERT INTO first_recharge_bonuses (
@@ -1128,7 +1846,7 @@ class DatabaseManager:
             limit: Maximum number of transactions to return
         """
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     if transaction_type:
                         cursor.execute("""
@@ -1164,6 +1882,7 @@ class DatabaseManager:
     # SESSION REVIEW OPERATIONS
     # =============================================================================
     
+    @evicts('astrologers', key=('review_data', 'astrologer_id'))
     def create_session_review(self, review_data: Dict[str, Any]) -> Optional[str]:
         """Store chat session review"""
         try:
@@ -1211,7 +1930,7 @@ class DatabaseManager:
     def get_astrologer_reviews(self, astrologer_id: str, limit: int = 20) -> List[Dict]:
         """Get reviews for an astrologer"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
                         SELECT sr.*, u.display_name as user_name
@@ -1251,12 +1970,23 @@ class DatabaseManager:
     # =============================================================================
     
     def get_user_stats(self, user_id: str) -> Dict[str, Any]:
-        """Get user statistics"""
+        """Get user statistics (maintained by triggers - a primary-key lookup)"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
-                        SELECT * FROM user_activity WHERE user_id = %s
+                        SELECT 
+                            u.user_id, u.display_name, u.email, u.subscription_type,
+                            COALESCE(s.total_conversations, 0) as total_conversations,
+                            COALESCE(s.total_messages, 0) as total_messages,
+                            COALESCE(s.total_readings, 0) as total_readings,
+                            COALESCE(s.total_reviews, 0) as total_reviews,
+                            COALESCE(s.total_session_seconds, 0) as total_session_seconds,
+                            s.last_activity,
+                            u.created_at as joined_at
+                        FROM users u
+                        LEFT JOIN user_statistics s ON s.user_id = u.user_id
+                        WHERE u.user_id = %s
                     """, (user_id,))
                     
                     result = cursor.fetchone()
@@ -1266,12 +1996,25 @@ class DatabaseManager:
             return {}
     
     def get_astrologer_stats(self, astrologer_id: str) -> Dict[str, Any]:
-        """Get astrologer statistics"""
+        """Get astrologer statistics (maintained by triggers - summed over the counter slots)"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=True) as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
-                        SELECT * FROM astrologer_stats WHERE astrologer_id = %s
+                        SELECT 
+                            a.astrologer_id, a.display_name, a.rating, a.total_consultations,
+                            COALESCE(s.total_conversations, 0) as total_conversations,
+                            COALESCE(s.active_conversations, 0) as active_conversations,
+                            COALESCE(s.total_readings, 0) as total_readings,
+                            CASE WHEN s.rated_readings > 0
+                                 THEN s.reading_rating_sum::numeric / s.rated_readings END as average_user_rating,
+                            COALESCE(s.total_reviews, 0) as total_reviews,
+                            CASE WHEN s.total_reviews > 0
+                                 THEN s.review_rating_sum::numeric / s.total_reviews END as average_review_rating,
+                            COALESCE(s.total_session_seconds, 0) as total_session_seconds
+                        FROM astrologers a
+                        LEFT JOIN astrologer_statistics_totals s ON s.astrologer_id = a.astrologer_id
+                        WHERE a.astrologer_id = %s
                     """, (astrologer_id,))
                     
                     result = cursor.fetchone()
@@ -1285,8 +2028,38 @@ class DatabaseManager:
 # CONVENIENCE FUNCTIONS
 # =============================================================================
 
+def create_database_manager(backend: Optional[str] = None):
+    """
+    Build the database manager for a storage backend.
+
+    Args:
+        backend: 'postgres' (default) or 'memory' (in-process stand-in for
+                 tests and benchmarks); defaults to DB_BACKEND. With
+                 DB_SHARDS set, postgres users are sharded (see sharding.py)
+    """
+    backend = (backend or DB_BACKEND).lower()
+    if backend == 'memory':
+        try:
+            from backend.database.memory import MemoryDatabaseManager
+        except ImportError:
+            from memory import MemoryDatabaseManager
+        print("⚠️ Using the in-memory database backend - data is not persisted")
+        return MemoryDatabaseManager()
+    if backend != 'postgres':
+        raise ValueError(f"Unknown DB_BACKEND: {backend!r} (expected 'postgres' or 'memory')")
+
+    shard_config = get_shard_config()
+    if shard_config['shards']:
+        try:
+            from backend.database.sharding import ShardedDatabaseManager
+        except ImportError:
+            from sharding import ShardedDatabaseManager
+        return ShardedDatabaseManager.from_config(shard_config)
+    return DatabaseManager()
+
+
 # Global instance
-db = DatabaseManager()
+db = create_database_manager()
 
 
 def init_database():
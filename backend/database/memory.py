@@ -0,0 +1,1397 @@
+"""
+In-Memory Database Backend for AstroVoice
+Embedded stand-in for DatabaseManager used by tests, benchmarks and load tests
+
+MemoryDatabaseManager implements the same public methods as DatabaseManager
+(same arguments, same return shapes) on in-process tables, so the API layer
+runs hermetically without PostgreSQL. Select it with DB_BACKEND=memory (see
+create_database_manager in manager.py) or construct it directly.
+
+What it mirrors:
+- Table defaults, upserts and foreign keys that the methods rely on
+  (conversations need a user and astrologer, wallets need a user, ...)
+- Wallet debits/credits: the same conditional balance check, ledger rows
+  with balance_before/balance_after, serialized under one lock
+- The trigger-maintained read models: user_astrologer_threads (chat list,
+  unread counts) and user/astrologer statistics
+- Keyset pagination cursors, so page tokens are interchangeable
+
+What it does not:
+- Ad-hoc SQL: get_connection() raises, so routes that run their own SQL
+  (OTP, user profile, admin) need the postgres backend
+- Full-text search is a simple word matcher (web-search syntax, light
+  English suffix stripping), not Postgres tsvector ranking
+- Durability: data lives for the lifetime of the process
+
+seed_dataset() generates users, conversations, chat turns and wallets in
+bulk for benchmarks at realistic data volumes.
+"""
+
+import bisect
+import copy
+import json
+import random
+import re
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from backend.database.ids import prefixed_id
+    from backend.database.cursors import encode_cursor, decode_cursor
+    from backend.database.idempotency import IdempotencyStore, IdempotencyConflictError
+except ImportError:
+    from ids import prefixed_id
+    from cursors import encode_cursor, decode_cursor
+    from idempotency import IdempotencyStore, IdempotencyConflictError
+
+CENT = Decimal('0.01')
+
+# Featured astrologers listed first by get_all_astrologers (same list as the SQL)
+FEATURED_ASTROLOGERS = ('tina_kulkarni_vedic_marriage', 'arjun_sharma_career', 'meera_nanda_love')
+
+USER_DEFAULTS = {
+    'email': None, 'phone_number': None, 'full_name': None, 'display_name': None,
+    'password_hash': None, 'auth_provider': 'email', 'gender': None, 'profile_picture_url': None,
+    'language_preference': 'hi', 'birth_date': None, 'birth_time': None, 'birth_location': None,
+    'birth_timezone': None, 'birth_latitude': None, 'birth_longitude': None,
+    'preferred_astrology_system': 'vedic',
+    'notification_preferences': {'daily': True, 'weekly': True, 'transits': True},
+    'subscription_type': 'free', 'subscription_start_date': None, 'subscription_end_date': None,
+    'account_status': 'active', 'email_verified': False, 'phone_verified': False,
+    'last_login_at': None, 'metadata': {},
+}
+
+ASTROLOGER_DEFAULTS = {
+    'bio': None, 'specialization': None, 'expertise_areas': None, 'languages': None,
+    'years_of_experience': None, 'certifications': None, 'education': None,
+    'personality_type': None, 'speaking_style': None, 'voice_tone': None,
+    'system_prompt': None, 'response_style': {'length': 'medium', 'formality': 'moderate'},
+    'greeting_message': None, 'profile_picture_url': None, 'sample_audio_url': None,
+    'video_intro_url': None, 'rating': Decimal('0.00'), 'total_consultations': 0, 'total_reviews': 0,
+    'is_active': True, 'is_featured': False, 'availability_schedule': None,
+    'consultation_rate': None, 'currency': 'INR', 'metadata': {}, 'custom_fields': {},
+}
+
+CONVERSATION_DEFAULTS = {
+    'title': None, 'topic': None, 'parent_conversation_id': None, 'status': 'active',
+    'ended_at': None, 'last_message_at': None, 'total_messages': 0, 'total_duration_seconds': 0,
+    'last_message_text': None, 'last_message_preview': None, 'metadata': {},
+    'session_status': 'active', 'paused_at': None, 'resumed_at': None, 'total_paused_duration': 0,
+}
+
+MESSAGE_DEFAULTS = {
+    'message_type': 'text', 'content': None, 'audio_url': None, 'audio_duration_seconds': None,
+    'audio_format': None, 'transcription': None, 'ai_model': None, 'tokens_used': None,
+    'delivered_at': None, 'read_at': None, 'metadata': {},
+}
+
+TRANSACTION_DEFAULTS = {
+    'payment_method': None, 'payment_status': 'pending', 'payment_reference': None,
+    'reference_type': None, 'reference_id': None, 'description': None, 'metadata': {},
+    'bonus_amount': Decimal('0.00'), 'google_play_purchase_token': None,
+    'google_play_product_id': None, 'google_play_order_id': None, 'platform': None,
+    'session_duration_minutes': None, 'astrologer_name': None,
+}
+
+RECHARGE_PRODUCTS = [
+    # product_id, amount, bonus_percentage, bonus_amount, total_amount, display_name, is_most_popular
+    ('astro_recharge_1', '1.00', '0.00', '0.00', '1.00', '₹1 Test', False),
+    ('astro_recharge_50', '50.00', '0.00', '0.00', '50.00', '₹50 Recharge', False),
+    ('astro_recharge_100', '100.00', '10.00', '10.00', '110.00', '₹100 Recharge', False),
+    ('astro_recharge_200', '200.00', '12.50', '25.00', '225.00', '₹200 Recharge', True),
+    ('astro_recharge_500', '500.00', '15.00', '75.00', '575.00', '₹500 Recharge', False),
+    ('astro_recharge_1000', '1000.00', '20.00', '200.00', '1200.00', '₹1000 Recharge', False),
+]
+
+WORD = re.compile(r"[\wऀ-ॿ]+")
+SUFFIXES = ('ing', 'ed', 'es', 's')
+
+
+class MemoryBackendError(Exception):
+    """Operation not supported by (or invalid in) the in-memory backend"""
+    pass
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value)).quantize(CENT)
+
+
+def _stem(word: str) -> str:
+    """Lowercase and strip a common English suffix (marriages, marriage -> marriag)"""
+    word = word.lower()
+    for suffix in SUFFIXES:
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word[:-1] if len(word) > 4 and word.endswith('e') else word
+
+
+def _parse_search_query(query: str) -> List[Tuple[List[List[str]], List[List[str]]]]:
+    """
+    Parse web-search syntax into OR-ed clauses of (required, excluded) phrases.
+    Each phrase is a list of stemmed words.
+    """
+    clauses = [([], [])]
+    for match in re.finditer(r'(-?)"([^"]*)"|(\S+)', query):
+        negate, phrase, word = match.group(1), match.group(2), match.group(3)
+        if word is not None:
+            if word.lower() == 'or':
+                clauses.append(([], []))
+                continue
+            negate = '-' if word.startswith('-') else ''
+            phrase = word.lstrip('-')
+        words = [_stem(w) for w in WORD.findall(phrase)]
+        if words:
+            clauses[-1][1 if negate else 0].append(words)
+    return [clause for clause in clauses if clause[0]]
+
+
+def _phrase_positions(tokens: List[str], phrase: List[str]) -> List[int]:
+    n = len(phrase)
+    return [i for i in range(len(tokens) - n + 1) if tokens[i:i + n] == phrase]
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """IdempotencyStore keeping its idempotency_keys table in a MemoryDatabaseManager"""
+
+    def claim(self, scope, key, fingerprint):
+        return self.db._idempotency_claim(scope, key, fingerprint, self.ttl_seconds, self.lease_seconds)
+
+    def complete(self, scope, key, response):
+        self.db._idempotency_complete(scope, key, json.loads(json.dumps(response, default=str)))
+
+    def release(self, scope, key):
+        self.db._idempotency_release(scope, key)
+
+    def purge_expired(self):
+        removed = self.db._idempotency_purge()
+        print(f"✅ Purged {removed} expired idempotency keys")
+        return removed
+
+
+class MemoryDatabaseManager:
+    """
+    DatabaseManager with in-process tables instead of PostgreSQL.
+    Thread-safe: every operation runs under one lock, like a single-writer engine.
+    """
+
+    backend = 'memory'
+
+    def __init__(self, personas_file: Optional[Path] = None, seed_sample_data: bool = True):
+        """
+        Args:
+            personas_file: astrologer_personas.json to load astrologers from
+                           (defaults to the bundled data file)
+            seed_sample_data: Load astrologers and recharge products
+        """
+        self._lock = threading.RLock()
+        self.db_config = {'backend': 'memory'}
+        self.archive = None
+
+        self.users: Dict[str, Dict] = {}
+        self.astrologers: Dict[str, Dict] = {}
+        self.conversations: Dict[str, Dict] = {}
+        self.messages: Dict[str, List[Dict]] = defaultdict(list)  # conversation_id -> sorted by (sent_at, id)
+        self.readings: Dict[str, Dict] = {}
+        self.wallets: Dict[str, Dict] = {}  # wallet_id -> row
+        self.transactions: List[Dict] = []
+        self.recharge_products: Dict[str, Dict] = {}
+        self.first_recharge_bonuses: Dict[str, Dict] = {}  # user_id -> row
+        self.session_reviews: List[Dict] = []
+        self.threads: Dict[Tuple[str, str], Dict] = {}
+        self.idempotency_keys: Dict[Tuple[str, str], Dict] = {}
+        self.user_statistics: Dict[str, Dict] = {}
+        self.astrologer_statistics: Dict[str, Dict] = {}
+
+        # Secondary indexes
+        self._conversations_by_pair: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        self._conversations_by_user: Dict[str, List[str]] = defaultdict(list)
+        self._conversations_by_astrologer: Dict[str, List[str]] = defaultdict(list)
+        self._wallet_by_user: Dict[str, str] = {}
+        self._transactions_by_user: Dict[str, List[Dict]] = defaultdict(list)
+        self._purchase_tokens = set()
+        self._emails: Dict[str, str] = {}
+
+        if seed_sample_data:
+            self._seed_recharge_products()
+            self._seed_astrologers(personas_file)
+
+    # =============================================================================
+    # IDS / LIFECYCLE (same as DatabaseManager)
+    # =============================================================================
+
+    @staticmethod
+    def generate_user_id() -> str:
+        """Generate a unique UUID-based user ID"""
+        return f"user_{uuid.uuid4().hex[:12]}"
+
+    @staticmethod
+    def generate_conversation_id(user_id: str = None, astrologer_id: str = None) -> str:
+        """Generate a unique, time-sortable conversation ID (conv_<ulid>)"""
+        return prefixed_id('conv')
+
+    @staticmethod
+    def generate_message_id(conversation_id: str = None) -> str:
+        """Generate a unique, time-sortable message ID (msg_<ulid>)"""
+        return prefixed_id('msg')
+
+    @staticmethod
+    def generate_transaction_id() -> str:
+        """Generate a unique, time-sortable transaction ID (txn_<ulid>)"""
+        return prefixed_id('txn')
+
+    @staticmethod
+    def generate_wallet_id(user_id: str) -> str:
+        """Generate a wallet ID for user"""
+        return f"wallet_{user_id}"
+
+    def get_connection(self, read_only: bool = False):
+        raise MemoryBackendError("Ad-hoc SQL is not available with DB_BACKEND=memory - use the postgres backend")
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'users': len(self.users),
+                'conversations': len(self.conversations),
+                'messages': sum(len(rows) for rows in self.messages.values()),
+            }
+
+    def close_pool(self):
+        pass
+
+    def warm_up(self) -> int:
+        return 0
+
+    def flush_pending_writes(self, conversation_id: Optional[str] = None, user_id: Optional[str] = None,
+                             timeout: float = 10.0) -> bool:
+        return True
+
+    def get_write_behind_stats(self) -> Dict[str, Any]:
+        return {'running': False, 'enabled': False}
+
+    def stop_write_behind(self):
+        pass
+
+    def execute_schema(self, schema_file: str = None):
+        return True
+
+    def migrate(self, target: Optional[int] = None, wait: bool = True) -> Dict[str, Any]:
+        return {'success': True, 'applied': [], 'locked': False, 'error': None}
+
+    def get_migration_status(self) -> List[Dict[str, Any]]:
+        return []
+
+    # =============================================================================
+    # USER OPERATIONS
+    # =============================================================================
+
+    def create_user(self, user_data: Dict[str, Any]) -> Optional[str]:
+        """Create a new user (upsert on user_id, like the SQL)"""
+        try:
+            with self._lock:
+                user_id = user_data['user_id']
+                email = user_data.get('email')
+                if email and self._emails.get(email, user_id) != user_id:
+                    raise MemoryBackendError(f"duplicate key value violates unique constraint users_email_key: {email}")
+
+                now = datetime.now()
+                existing = self.users.get(user_id)
+                if existing:
+                    for field in ('email', 'phone_number', 'full_name', 'birth_date', 'birth_time',
+                                  'birth_location', 'birth_timezone', 'gender'):
+                        existing[field] = user_data.get(field)
+                    existing['updated_at'] = now
+                else:
+                    row = {**USER_DEFAULTS, **copy.deepcopy(user_data), 'created_at': now, 'updated_at': now}
+                    row['metadata'] = row.get('metadata') or {}
+                    self.users[user_id] = row
+                    self._user_statistics_row(user_id)
+                if email:
+                    self._emails[email] = user_id
+                return user_id
+        except Exception as e:
+            print(f"❌ Error creating user: {e}")
+            return None
+
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        """Get user by ID"""
+        with self._lock:
+            row = self.users.get(user_id)
+            return copy.deepcopy(row) if row else None
+
+    def update_user_birth_info(self, user_id: str, birth_info: Dict[str, Any]) -> bool:
+        """Update user's birth information"""
+        try:
+            with self._lock:
+                user = self.users.get(user_id)
+                if user:
+                    for field in ('birth_date', 'birth_time', 'birth_location', 'birth_timezone',
+                                  'birth_latitude', 'birth_longitude'):
+                        user[field] = birth_info[field]
+                    user['updated_at'] = datetime.now()
+                return True
+        except Exception as e:
+            print(f"❌ Error updating birth info: {e}")
+            return False
+
+    # =============================================================================
+    # ASTROLOGER OPERATIONS
+    # =============================================================================
+
+    def add_astrologer(self, astrologer_data: Dict[str, Any]) -> str:
+        """Insert or replace an astrologer row (seeding helper, no SQL equivalent)"""
+        with self._lock:
+            now = datetime.now()
+            astrologer_id = astrologer_data['astrologer_id']
+            row = {**ASTROLOGER_DEFAULTS, 'created_at': now, 'updated_at': now,
+                   **self.astrologers.get(astrologer_id, {}), **copy.deepcopy(astrologer_data)}
+            row['rating'] = _money(row['rating'])
+            self.astrologers[astrologer_id] = row
+            for thread in self.threads.values():
+                if thread['astrologer_id'] == astrologer_id:
+                    thread['astrologer_name'] = row['display_name']
+                    thread['astrologer_image'] = row['profile_picture_url']
+            return astrologer_id
+
+    def get_astrologer(self, astrologer_id: str) -> Optional[Dict]:
+        """Get astrologer by ID"""
+        with self._lock:
+            row = self.astrologers.get(astrologer_id)
+            return copy.deepcopy(row) if row else None
+
+    def get_all_astrologers(self, active_only: bool = True) -> List[Dict]:
+        """Get all astrologers (featured first, then recently updated)"""
+        with self._lock:
+            rows = [copy.deepcopy(a) for a in self.astrologers.values() if a['is_active'] or not active_only]
+        # Stable sorts from the least to the most significant key
+        rows.sort(key=lambda a: a['rating'], reverse=True)
+        rows.sort(key=lambda a: a['created_at'], reverse=True)
+        rows.sort(key=lambda a: a['updated_at'] or datetime.min, reverse=True)
+        rows.sort(key=lambda a: 0 if a['astrologer_id'] in FEATURED_ASTROLOGERS else 1)
+        return rows
+
+    def update_astrologer_stats(self, astrologer_id: str, rating: float = None,
+                                increment_consultations: bool = False) -> bool:
+        """Update astrologer statistics"""
+        with self._lock:
+            astrologer = self.astrologers.get(astrologer_id)
+            if astrologer:
+                if rating is not None:
+                    astrologer['rating'] = _money(rating)
+                    astrologer['total_reviews'] += 1
+                    astrologer['updated_at'] = datetime.now()
+                if increment_consultations:
+                    astrologer['total_consultations'] += 1
+                    astrologer['updated_at'] = datetime.now()
+            return True
+
+    # =============================================================================
+    # CONVERSATION OPERATIONS
+    # =============================================================================
+
+    def create_conversation(self, user_id: str, astrologer_id: str,
+                            topic: str = 'general') -> Optional[str]:
+        """Create a new conversation"""
+        try:
+            with self._lock:
+                return self._insert_conversation(user_id, astrologer_id, topic)
+        except Exception as e:
+            print(f"❌ Error creating conversation: {e}")
+            return None
+
+    def add_message(self, conversation_id: str, sender_type: str,
+                    content: str, message_type: str = 'text',
+                    audio_url: str = None, transcription: str = None) -> Optional[str]:
+        """Add a message to a conversation"""
+        try:
+            with self._lock:
+                now = datetime.now()
+                message_id = self.generate_message_id()
+                self._insert_messages([{
+                    'message_id': message_id, 'conversation_id': conversation_id,
+                    'sender_type': sender_type, 'message_type': message_type, 'content': content,
+                    'audio_url': audio_url, 'transcription': transcription, 'sent_at': now,
+                }])
+                conversation = self.conversations[conversation_id]
+                conversation['total_messages'] += 1
+                conversation['last_message_at'] = now
+                self._touch_user_activity(conversation)
+                return message_id
+        except Exception as e:
+            print(f"❌ Error adding message: {e}")
+            return None
+
+    def record_turn(self, conversation_id: str, user_msg: str, ai_msg: str,
+                    tokens: Optional[int] = None, model: Optional[str] = None,
+                    message_type: str = 'text') -> Optional[Dict[str, str]]:
+        """Persist a full chat turn (user message + astrologer reply) atomically"""
+        try:
+            with self._lock:
+                user_message_id = self.generate_message_id()
+                ai_message_id = self.generate_message_id()
+                sent_at = datetime.now()
+                reply_at = max(datetime.now(), sent_at + timedelta(microseconds=1))
+                self._insert_messages([
+                    {'message_id': user_message_id, 'conversation_id': conversation_id,
+                     'sender_type': 'user', 'message_type': message_type, 'content': user_msg,
+                     'sent_at': sent_at},
+                    {'message_id': ai_message_id, 'conversation_id': conversation_id,
+                     'sender_type': 'astrologer', 'message_type': message_type, 'content': ai_msg,
+                     'ai_model': model, 'tokens_used': tokens, 'sent_at': reply_at},
+                ])
+                conversation = self.conversations[conversation_id]
+                conversation['total_messages'] += 2
+                conversation['last_message_at'] = reply_at
+                conversation['last_message_text'] = user_msg
+                conversation['last_message_preview'] = user_msg[:200]
+                self._touch_user_activity(conversation)
+                return {'user_message_id': user_message_id, 'ai_message_id': ai_message_id}
+        except Exception as e:
+            print(f"❌ Error recording chat turn: {e}")
+            return None
+
+    def queue_turn(self, conversation_id: str, user_msg: str, ai_msg: str,
+                   tokens: Optional[int] = None, model: Optional[str] = None,
+                   message_type: str = 'text', user_id: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Persist a chat turn (no write-behind queue - writes are already in memory)"""
+        return self.record_turn(conversation_id, user_msg, ai_msg,
+                                tokens=tokens, model=model, message_type=message_type)
+
+    def update_conversation_last_message(self, conversation_id: str, message_text: str):
+        """Update the last message info for a conversation"""
+        with self._lock:
+            conversation = self.conversations.get(conversation_id)
+            if conversation:
+                conversation['last_message_text'] = message_text
+                conversation['last_message_preview'] = message_text[:200]
+                conversation['last_message_at'] = datetime.now()
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        """Get conversation by ID"""
+        with self._lock:
+            row = self.conversations.get(conversation_id)
+            return copy.deepcopy(row) if row else None
+
+    def update_conversation_activity(self, conversation_id: str) -> bool:
+        """Update conversation activity timestamp"""
+        with self._lock:
+            conversation = self.conversations.get(conversation_id)
+            if conversation:
+                conversation['last_message_at'] = datetime.now()
+            return True
+
+    def pause_conversation_session(self, conversation_id: str, paused_at: datetime = None) -> bool:
+        """Pause an active conversation session"""
+        with self._lock:
+            conversation = self.conversations.get(conversation_id)
+            if not conversation or conversation['session_status'] != 'active':
+                print(f"⚠️ Conversation not found or not active: {conversation_id}")
+                return False
+            conversation['session_status'] = 'paused'
+            conversation['paused_at'] = paused_at or datetime.now()
+            return True
+
+    def resume_conversation_session(self, conversation_id: str, resumed_at: datetime = None) -> bool:
+        """Resume a paused conversation session"""
+        with self._lock:
+            conversation = self.conversations.get(conversation_id)
+            if not conversation or conversation['session_status'] != 'paused':
+                print(f"⚠️ Conversation not found or not paused: {conversation_id}")
+                return False
+            resumed_at = resumed_at or datetime.now()
+            paused_at = conversation['paused_at']
+            if paused_at.tzinfo is None and resumed_at.tzinfo is not None:
+                paused_at = paused_at.replace(tzinfo=resumed_at.tzinfo)
+            elif paused_at.tzinfo is not None and resumed_at.tzinfo is None:
+                resumed_at = resumed_at.replace(tzinfo=paused_at.tzinfo)
+            paused_duration = max(0, int((resumed_at - paused_at).total_seconds()))
+
+            conversation['session_status'] = 'active'
+            conversation['resumed_at'] = resumed_at
+            conversation['total_paused_duration'] += paused_duration
+            conversation['paused_at'] = None
+            return True
+
+    def end_conversation_session(self, conversation_id: str, ended_at: datetime = None,
+                                 total_duration: int = None) -> bool:
+        """End a conversation session"""
+        with self._lock:
+            conversation = self.conversations.get(conversation_id)
+            if not conversation:
+                print(f"⚠️ Conversation not found: {conversation_id}")
+                return False
+            ended_at = ended_at or datetime.now()
+            if not total_duration:
+                total_duration = (int((ended_at - conversation['started_at']).total_seconds())
+                                  - conversation['total_paused_duration'])
+            self._set_session_seconds(conversation, total_duration)
+            conversation['session_status'] = 'completed'
+            conversation['ended_at'] = ended_at
+            return True
+
+    def get_conversation_session_status(self, conversation_id: str) -> Optional[Dict]:
+        """Get conversation session status and details"""
+        with self._lock:
+            c = self.conversations.get(conversation_id)
+            if not c:
+                return None
+            astrologer = self.astrologers.get(c['astrologer_id'], {})
+            return {
+                'conversation_id': c['conversation_id'],
+                'user_id': c['user_id'],
+                'astrologer_id': c['astrologer_id'],
+                'session_status': c['status'],
+                'session_type': c['topic'],
+                'started_at': c['started_at'],
+                'ended_at': c['ended_at'],
+                'last_message_at': c['last_message_at'],
+                'astrologer_name': astrologer.get('name'),
+                'astrologer_image': astrologer.get('profile_picture_url'),
+            }
+
+    def get_conversation_history(self, conversation_id: str,
+                                 limit: int = 50, offset: int = 0) -> List[Dict]:
+        """Get chat message history for a conversation with pagination (chronological)"""
+        with self._lock:
+            rows = self.messages.get(conversation_id, [])
+            end = max(len(rows) - offset, 0)
+            return [copy.deepcopy(m) for m in rows[max(end - limit, 0):end]]
+
+    def get_conversation_history_page(self, conversation_id: str, limit: int = 50,
+                                      before_cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of a conversation's messages using keyset pagination.
+
+        Raises:
+            InvalidCursorError: If before_cursor is malformed
+        """
+        before = decode_cursor(before_cursor) if before_cursor else None
+        with self._lock:
+            rows = self.messages.get(conversation_id, [])
+            end = bisect.bisect_left(rows, before, key=self._message_key) if before else len(rows)
+            page = [copy.deepcopy(m) for m in rows[max(end - limit, 0):end]]
+            has_more = end > limit
+        return {
+            "messages": page,
+            "has_more": has_more,
+            "next_cursor": encode_cursor(page[0]['sent_at'], page[0]['message_id']) if has_more else None
+        }
+
+    def get_user_conversations(self, user_id: str, limit: int = 20) -> List[Dict]:
+        """Get user's conversation history grouped by astrologer (the chat list)"""
+        with self._lock:
+            pairs = {(user_id, self.conversations[c]['astrologer_id'])
+                     for c in self._conversations_by_user.get(user_id, [])}
+            threads = [self.threads[pair] for pair in pairs]
+            threads.sort(key=lambda t: t['last_activity_at'], reverse=True)
+            return [
+                {
+                    'conversation_id': t['conversation_id'],
+                    'astrologer_id': t['astrologer_id'],
+                    'astrologer_name': t['astrologer_name'],
+                    'astrologer_image': t['astrologer_image'],
+                    'last_message': t['last_message_preview'] if t['last_message_preview'] is not None
+                                    else 'No messages yet',
+                    'last_message_time': t['last_activity_at'].isoformat() if t['last_activity_at'] else None,
+                    'status': t['status'],
+                    'total_messages': t['total_messages'],
+                    'unread_count': t['unread_count'],
+                }
+                for t in threads[:limit]
+            ]
+
+    def mark_thread_read(self, user_id: str, astrologer_id: str) -> bool:
+        """Clear the unread count of a user's chat with an astrologer"""
+        with self._lock:
+            thread = self.threads.get((user_id, astrologer_id))
+            if not thread:
+                return False
+            thread['unread_count'] = 0
+            thread['last_read_at'] = datetime.now()
+            return True
+
+    def get_unified_chat_history(self, user_id: str, astrologer_id: str,
+                                 limit: int = 50, offset: int = 0,
+                                 before_cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get unified chat history for a user-astrologer pair, with date separators.
+
+        Raises:
+            InvalidCursorError: If before_cursor is malformed
+        """
+        before = decode_cursor(before_cursor) if before_cursor else None
+        with self._lock:
+            a = self.astrologers.get(astrologer_id)
+            if not a:
+                return {"success": False, "error": "Astrologer not found"}
+            astrologer = {
+                'astrologer_id': a['astrologer_id'], 'display_name': a['display_name'],
+                'profile_picture_url': a['profile_picture_url'], 'specialization': a['specialization'],
+            }
+            conversations = [self.conversations[c] for c in self._conversations_by_pair.get((user_id, astrologer_id), [])]
+            if not conversations:
+                return {"success": True, "astrologer": astrologer, "messages": [],
+                        "total_conversations": 0, "has_more": False, "next_cursor": None}
+
+            # Newest first across every conversation of the pair
+            merged = sorted(
+                (m for c in conversations for m in self.messages.get(c['conversation_id'], [])),
+                key=self._message_key, reverse=True
+            )
+            if before:
+                merged = [m for m in merged if self._message_key(m) < before]
+            elif offset:
+                merged = merged[offset:]
+            rows = [copy.deepcopy(m) for m in merged[:limit + 1]]
+            total_messages = sum(c['total_messages'] or 0 for c in conversations)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['sent_at'], rows[-1]['message_id']) if has_more else None
+
+        messages = []
+        current_date = None
+        for msg in reversed(rows):
+            msg_date = msg['sent_at'].date()
+            if current_date != msg_date:
+                if current_date is not None:
+                    separator_text = f"Chat started on {msg_date.strftime('%b %d, %Y')}"
+                    messages.append({
+                        "is_separator": True,
+                        "text": separator_text,
+                        "separator_text": separator_text,
+                        "conversation_id": msg['conversation_id'],
+                        "date": msg_date.isoformat()
+                    })
+                current_date = msg_date
+            messages.append({
+                "message_id": msg['message_id'],
+                "conversation_id": msg['conversation_id'],
+                "sender_type": msg['sender_type'],
+                "content": msg['content'],
+                "sent_at": msg['sent_at'].isoformat(),
+                "message_type": msg['message_type'],
+                "is_separator": False
+            })
+
+        return {
+            "success": True,
+            "astrologer": astrologer,
+            "messages": messages,
+            "total_conversations": len(conversations),
+            "total_messages": total_messages,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
+            "offset": offset,
+            "limit": limit
+        }
+
+    def search_messages(self, user_id: str, query: str, astrologer_id: Optional[str] = None,
+                        limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Word search over a user's chat history, most matches first"""
+        clauses = _parse_search_query(query)
+        hits = []
+        with self._lock:
+            for conversation_id in self._conversations_by_user.get(user_id, []):
+                conversation = self.conversations[conversation_id]
+                if astrologer_id and conversation['astrologer_id'] != astrologer_id:
+                    continue
+                for message in self.messages.get(conversation_id, []):
+                    words = WORD.findall(message['content'] or '')
+                    tokens = [_stem(w) for w in words]
+                    for required, excluded in clauses:
+                        positions = [_phrase_positions(tokens, phrase) for phrase in required]
+                        if all(positions) and not any(_phrase_positions(tokens, p) for p in excluded):
+                            matched = {i + k for phrase, found in zip(required, positions)
+                                       for i in found for k in range(len(phrase))}
+                            hits.append((len(matched) / (1 + len(tokens) / 20), message, conversation, words, matched))
+                            break
+
+            hits.sort(key=lambda h: (h[0], h[1]['sent_at'], h[1]['message_id']), reverse=True)
+            page = hits[offset:offset + limit + 1]
+            results = []
+            for rank, message, conversation, words, matched in page[:limit]:
+                astrologer = self.astrologers.get(conversation['astrologer_id'], {})
+                first = min(matched)
+                window = range(max(first - 8, 0), min(first + 12, len(words)))
+                results.append({
+                    'message_id': message['message_id'],
+                    'conversation_id': message['conversation_id'],
+                    'astrologer_id': conversation['astrologer_id'],
+                    'astrologer_name': astrologer.get('display_name'),
+                    'sender_type': message['sender_type'],
+                    'content': message['content'],
+                    'sent_at': message['sent_at'].isoformat(),
+                    'rank': float(rank),
+                    'snippet': ' '.join(f"<b>{words[i]}</b>" if i in matched else words[i] for i in window),
+                })
+        return {"success": True, "results": results, "has_more": len(page) > limit}
+
+    def backfill_search_vectors(self, batch_size: int = 5000) -> int:
+        """Nothing to backfill - search reads message content directly"""
+        return 0
+
+    def create_unified_conversation(self, user_id: str, astrologer_id: str,
+                                    topic: str = 'general') -> Optional[str]:
+        """Create a new conversation linked to the pair's latest active one"""
+        try:
+            with self._lock:
+                active = [self.conversations[c] for c in self._conversations_by_pair.get((user_id, astrologer_id), [])
+                          if self.conversations[c]['status'] == 'active']
+                parent = max(active, key=lambda c: c['started_at'])['conversation_id'] if active else None
+                return self._insert_conversation(user_id, astrologer_id, topic, parent_conversation_id=parent)
+        except Exception as e:
+            print(f"❌ Error creating unified conversation: {e}")
+            return None
+
+    # =============================================================================
+    # READING OPERATIONS
+    # =============================================================================
+
+    def create_reading(self, reading_data: Dict[str, Any]) -> Optional[str]:
+        """Create a new reading record"""
+        try:
+            with self._lock:
+                reading_id = f"read_{reading_data['user_id']}_{int(datetime.now().timestamp())}"
+                if reading_id in self.readings:
+                    raise MemoryBackendError(f"duplicate key value violates unique constraint readings_pkey: {reading_id}")
+                self._require('users', reading_data['user_id'])
+                self._require('astrologers', reading_data['astrologer_id'])
+                row = {
+                    'reading_id': reading_id, 'user_id': reading_data['user_id'],
+                    'astrologer_id': reading_data['astrologer_id'],
+                    'conversation_id': reading_data.get('conversation_id'),
+                    'reading_type': reading_data.get('reading_type'), 'topic': reading_data.get('topic'),
+                    'reading_text': reading_data.get('reading_text'),
+                    'status': reading_data.get('status') or 'completed',
+                    'requested_at': datetime.now(), 'user_rating': None,
+                }
+                self.readings[reading_id] = row
+                self._user_statistics_row(row['user_id'])['total_readings'] += 1
+                return reading_id
+        except Exception as e:
+            print(f"❌ Error creating reading: {e}")
+            return None
+
+    # =============================================================================
+    # WALLET OPERATIONS
+    # =============================================================================
+
+    def create_wallet(self, user_id: str, initial_balance: float = 50.00) -> Optional[str]:
+        """Create wallet for new user (existing wallets are kept)"""
+        try:
+            with self._lock:
+                self._require('users', user_id)
+                now = datetime.now()
+                wallet_id = self._wallet_by_user.get(user_id)
+                if wallet_id:
+                    self.wallets[wallet_id]['updated_at'] = now
+                    return wallet_id
+                wallet_id = f"wallet_{user_id}"
+                self.wallets[wallet_id] = {
+                    'wallet_id': wallet_id, 'user_id': user_id, 'balance': _money(initial_balance),
+                    'currency': 'INR', 'created_at': now, 'updated_at': now,
+                }
+                self._wallet_by_user[user_id] = wallet_id
+                return wallet_id
+        except Exception as e:
+            print(f"❌ Error creating wallet: {e}")
+            return None
+
+    def get_wallet(self, user_id: str) -> Optional[Dict]:
+        """Get user wallet details"""
+        with self._lock:
+            wallet_id = self._wallet_by_user.get(user_id)
+            return dict(self.wallets[wallet_id]) if wallet_id else None
+
+    def update_wallet_balance(self, wallet_id: str, new_balance: float) -> bool:
+        """Update wallet balance"""
+        with self._lock:
+            wallet = self.wallets.get(wallet_id)
+            if wallet:
+                wallet['balance'] = _money(new_balance)
+                wallet['updated_at'] = datetime.now()
+            return True
+
+    def add_transaction(self, transaction_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Record wallet transaction and apply it to the balance atomically.
+        Deductions are refused (None) if the balance doesn't cover them.
+        """
+        try:
+            amount = float(transaction_data['amount'])
+            transaction_type = transaction_data['transaction_type']
+            if transaction_type in ('recharge', 'refund'):
+                delta = amount
+            elif transaction_type == 'deduction':
+                delta = -amount
+            else:
+                delta = 0.0
+
+            with self._lock:
+                result = self._post_wallet_transaction(self.wallets.get(transaction_data['wallet_id']), delta, {
+                    'transaction_id': self.generate_transaction_id(),
+                    'transaction_type': transaction_type,
+                    'amount': amount,
+                    'payment_method': transaction_data.get('payment_method', 'upi'),
+                    'payment_status': transaction_data.get('payment_status', 'completed'),
+                    'payment_reference': transaction_data.get('payment_reference'),
+                    'reference_type': transaction_data.get('reference_type', 'recharge'),
+                    'reference_id': transaction_data.get('reference_id'),
+                    'description': transaction_data.get('description'),
+                    'metadata': transaction_data.get('metadata', {}),
+                })
+            if not result:
+                print(f"❌ Wallet not found or insufficient balance: {transaction_data['wallet_id']}")
+                return None
+            return result['transaction_id']
+        except Exception as e:
+            print(f"❌ Error adding transaction: {e}")
+            return None
+
+    def debit_wallet(self, user_id: str, amount: float, description: Optional[str] = None,
+                     reference_type: str = 'conversation', reference_id: Optional[str] = None,
+                     metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Deduct from a user's wallet if the balance covers the amount.
+
+        Returns:
+            {'success': True, 'transaction_id', 'wallet_id', 'balance_before', 'balance_after'}
+            or {'success': False, 'error': 'insufficient_balance' | 'wallet_not_found', 'current_balance'}
+        """
+        with self._lock:
+            wallet = self.wallets.get(self._wallet_by_user.get(user_id))
+            if not wallet:
+                return {'success': False, 'error': 'wallet_not_found', 'current_balance': 0.0}
+            result = self._post_wallet_transaction(wallet, -float(amount), {
+                'transaction_id': self.generate_transaction_id(),
+                'transaction_type': 'deduction',
+                'amount': float(amount),
+                'payment_method': 'wallet',
+                'payment_status': 'completed',
+                'reference_type': reference_type,
+                'reference_id': reference_id,
+                'description': description,
+                'metadata': metadata or {},
+            })
+            if not result:
+                return {'success': False, 'error': 'insufficient_balance', 'current_balance': float(wallet['balance'])}
+            return {
+                'success': True,
+                'transaction_id': result['transaction_id'],
+                'wallet_id': result['wallet_id'],
+                'balance_before': float(result['balance_before']),
+                'balance_after': float(result['balance_after']),
+            }
+
+    def get_user_transactions(self, user_id: str, limit: int = 20) -> List[Dict]:
+        """Get user transaction history (newest first)"""
+        with self._lock:
+            rows = self._transactions_by_user.get(user_id, [])
+            return [copy.deepcopy(t) for t in reversed(rows[-limit:])] if limit > 0 else []
+
+    # =============================================================================
+    # GOOGLE PLAY BILLING OPERATIONS
+    # =============================================================================
+
+    def get_recharge_products(self, platform: str = 'android') -> List[Dict]:
+        """Get all active recharge products for a platform"""
+        columns = ('product_id', 'platform', 'amount', 'bonus_percentage', 'bonus_amount',
+                   'total_amount', 'display_name', 'is_most_popular')
+        with self._lock:
+            rows = sorted(
+                (p for p in self.recharge_products.values() if p['platform'] == platform and p['is_active']),
+                key=lambda p: p['sort_order']
+            )
+            return [{column: p[column] for column in columns} for p in rows]
+
+    def get_product_by_id(self, product_id: str) -> Optional[Dict]:
+        """Get a specific recharge product by ID"""
+        with self._lock:
+            product = self.recharge_products.get(product_id)
+            return dict(product) if product and product['is_active'] else None
+
+    def check_purchase_token_exists(self, purchase_token: str) -> bool:
+        """Check if a purchase token has already been processed"""
+        with self._lock:
+            return purchase_token in self._purchase_tokens
+
+    def has_first_recharge_bonus(self, user_id: str) -> bool:
+        """Check if user has already claimed first recharge bonus"""
+        with self._lock:
+            return user_id in self.first_recharge_bonuses
+
+    def create_google_play_transaction(
+        self,
+        user_id: str,
+        wallet_id: str,
+        product_id: str,
+        amount: float,
+        bonus_amount: float,
+        purchase_token: str,
+        order_id: str,
+        platform: str = 'android'
+    ) -> Optional[str]:
+        """Create a wallet recharge transaction with Google Play details (+ first-time bonus)"""
+        try:
+            transaction_id = self.generate_transaction_id()
+            total_amount = float(amount) + float(bonus_amount)
+            with self._lock:
+                if purchase_token in self._purchase_tokens:
+                    raise MemoryBackendError(
+                        "duplicate key value violates unique constraint idx_transactions_purchase_token_unique"
+                    )
+                result = self._post_wallet_transaction(self.wallets.get(wallet_id), total_amount, {
+                    'transaction_id': transaction_id,
+                    'transaction_type': 'recharge',
+                    'amount': total_amount,
+                    'bonus_amount': bonus_amount,
+                    'payment_method': 'google_play',
+                    'payment_status': 'completed',
+                    'payment_reference': order_id,
+                    'google_play_purchase_token': purchase_token,
+                    'google_play_product_id': product_id,
+                    'google_play_order_id': order_id,
+                    'platform': platform,
+                    'reference_type': 'recharge',
+                    'description': f'Wallet recharge via Google Play - ₹{amount} + ₹{bonus_amount} bonus',
+                })
+                if not result:
+                    print(f"❌ Wallet not found: {wallet_id}")
+                    return None
+
+                if user_id not in self.first_recharge_bonuses and bonus_amount > 0:
+                    self.first_recharge_bonuses[user_id] = {
+                        'bonus_id': prefixed_id('bonus'), 'user_id': user_id,
+                        'bonus_amount': _money(min(50.00, bonus_amount)),
+                        'transaction_id': transaction_id, 'claimed_at': datetime.now(),
+                    }
+                return transaction_id
+        except Exception as e:
+            print(f"❌ Error creating Google Play transaction: {e}")
+            return None
+
+    def get_filtered_transactions(
+        self,
+        user_id: str,
+        transaction_type: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict]:
+        """Get user transactions with optional filtering by type (newest first)"""
+        columns = ('transaction_id', 'transaction_type', 'amount', 'bonus_amount', 'payment_method',
+                   'payment_status', 'payment_reference', 'description', 'created_at',
+                   'session_duration_minutes', 'astrologer_name', 'google_play_order_id')
+        with self._lock:
+            rows = [t for t in reversed(self._transactions_by_user.get(user_id, []))
+                    if not transaction_type or t['transaction_type'] == transaction_type]
+            return [{column: t[column] for column in columns} for t in rows[:limit]]
+
+    # =============================================================================
+    # SESSION REVIEW OPERATIONS
+    # =============================================================================
+
+    def create_session_review(self, review_data: Dict[str, Any]) -> Optional[str]:
+        """Store chat session review and refresh the astrologer's average rating"""
+        try:
+            with self._lock:
+                review_id = f"review_{review_data['user_id']}_{int(datetime.now().timestamp())}"
+                if any(r['review_id'] == review_id for r in self.session_reviews[-100:]):
+                    raise MemoryBackendError(f"duplicate key value violates unique constraint session_reviews_pkey: {review_id}")
+                self._require('users', review_data['user_id'])
+                astrologer = self._require('astrologers', review_data['astrologer_id'])
+                rating = int(review_data['rating'])
+                if not 1 <= rating <= 5:
+                    raise MemoryBackendError("new row violates check constraint session_reviews_rating_check")
+
+                self.session_reviews.append({
+                    'review_id': review_id,
+                    'user_id': review_data['user_id'],
+                    'astrologer_id': review_data['astrologer_id'],
+                    'conversation_id': review_data.get('conversation_id'),
+                    'rating': rating,
+                    'review_text': review_data.get('review_text'),
+                    'session_duration': review_data.get('session_duration'),
+                    'created_at': datetime.now(),
+                    'metadata': review_data.get('metadata', {}),
+                })
+                stats = self._astrologer_statistics_row(astrologer['astrologer_id'])
+                stats['total_reviews'] += 1
+                stats['review_rating_sum'] += rating
+                self._user_statistics_row(review_data['user_id'])['total_reviews'] += 1
+
+                astrologer['total_reviews'] += 1
+                astrologer['rating'] = _money(Decimal(stats['review_rating_sum']) / stats['total_reviews'])
+                astrologer['updated_at'] = datetime.now()
+                return review_id
+        except Exception as e:
+            print(f"❌ Error creating review: {e}")
+            return None
+
+    def get_astrologer_reviews(self, astrologer_id: str, limit: int = 20) -> List[Dict]:
+        """Get reviews for an astrologer (newest first)"""
+        with self._lock:
+            rows = []
+            for review in reversed(self.session_reviews):
+                if review['astrologer_id'] == astrologer_id:
+                    rows.append({**copy.deepcopy(review),
+                                 'user_name': self.users[review['user_id']]['display_name']})
+                    if len(rows) >= limit:
+                        break
+            return rows
+
+    def update_conversation_end(self, conversation_id: str, duration_seconds: int) -> bool:
+        """Update conversation when ended"""
+        with self._lock:
+            conversation = self.conversations.get(conversation_id)
+            if conversation:
+                self._set_session_seconds(conversation, duration_seconds)
+                conversation['ended_at'] = datetime.now()
+                self._set_status(conversation, 'completed')
+            return True
+
+    # =============================================================================
+    # ANALYTICS & REPORTS
+    # =============================================================================
+
+    def get_user_stats(self, user_id: str) -> Dict[str, Any]:
+        """Get user statistics"""
+        with self._lock:
+            user = self.users.get(user_id)
+            if not user:
+                return {}
+            stats = self._user_statistics_row(user_id)
+            return {
+                'user_id': user_id,
+                'display_name': user['display_name'],
+                'email': user['email'],
+                'subscription_type': user['subscription_type'],
+                'total_conversations': stats['total_conversations'],
+                'total_messages': stats['total_messages'],
+                'total_readings': stats['total_readings'],
+                'total_reviews': stats['total_reviews'],
+                'total_session_seconds': stats['total_session_seconds'],
+                'last_activity': stats['last_activity'],
+                'joined_at': user['created_at'],
+            }
+
+    def get_astrologer_stats(self, astrologer_id: str) -> Dict[str, Any]:
+        """Get astrologer statistics"""
+        with self._lock:
+            astrologer = self.astrologers.get(astrologer_id)
+            if not astrologer:
+                return {}
+            stats = self._astrologer_statistics_row(astrologer_id)
+            return {
+                'astrologer_id': astrologer_id,
+                'display_name': astrologer['display_name'],
+                'rating': astrologer['rating'],
+                'total_consultations': astrologer['total_consultations'],
+                'total_conversations': stats['total_conversations'],
+                'active_conversations': stats['active_conversations'],
+                'total_readings': stats['total_readings'],
+                'average_user_rating': None,
+                'total_reviews': stats['total_reviews'],
+                'average_review_rating': (Decimal(stats['review_rating_sum']) / stats['total_reviews']
+                                          if stats['total_reviews'] else None),
+                'total_session_seconds': stats['total_session_seconds'],
+            }
+
+    # =============================================================================
+    # BULK DATA FOR BENCHMARKS
+    # =============================================================================
+
+    def seed_dataset(self, users: int = 1000, conversations_per_user: int = 3,
+                     turns_per_conversation: int = 20, days: int = 180,
+                     seed: int = 0) -> List[str]:
+        """
+        Generate users with wallets, conversations and chat history.
+
+        Messages are spread over the last `days` days, so history paging,
+        date separators and the chat list behave as with production data.
+
+        Returns:
+            The generated user IDs
+        """
+        rng = random.Random(seed)
+        astrologer_ids = list(self.astrologers)
+        if not astrologer_ids:
+            raise MemoryBackendError("No astrologers to attach conversations to")
+        phrases = [
+            "Meri shaadi kab hogi?", "Career mein growth kab aayegi?", "शादी में देरी क्यों हो रही है?",
+            "Mangal dosh ka upay batayein", "Will I get a job abroad next year?",
+            "Aapke saptam bhav mein shukra strong hai 🔮", "Venus transit brings marriage prospects ✨",
+            "Har Shanivar ko til ka daan karein 🙏", "Your career house shows promotion after June",
+        ]
+        now = datetime.now()
+        user_ids = []
+
+        with self._lock:
+            for u in range(users):
+                user_id = self.generate_user_id()
+                self.create_user({'user_id': user_id, 'full_name': f'Load User {u}',
+                                  'display_name': f'Load User {u}', 'metadata': {'synthetic': True}})
+                self.create_wallet(user_id, initial_balance=500.0)
+                user_ids.append(user_id)
+
+                for _ in range(conversations_per_user):
+                    started = now - timedelta(days=rng.uniform(0, days))
+                    conversation_id = self._insert_conversation(
+                        user_id, rng.choice(astrologer_ids), 'general', started_at=started
+                    )
+                    conversation = self.conversations[conversation_id]
+                    sent_at = started
+                    rows = []
+                    for _ in range(turns_per_conversation):
+                        sent_at += timedelta(seconds=rng.uniform(5, 600))
+                        for sender in ('user', 'astrologer'):
+                            sent_at += timedelta(microseconds=1)
+                            rows.append({'message_id': self.generate_message_id(),
+                                         'conversation_id': conversation_id, 'sender_type': sender,
+                                         'content': rng.choice(phrases), 'sent_at': sent_at})
+                    if rows:
+                        self._insert_messages(rows)
+                        conversation['total_messages'] += len(rows)
+                        conversation['last_message_at'] = sent_at
+                        conversation['last_message_text'] = rows[-1]['content']
+                        conversation['last_message_preview'] = rows[-1]['content'][:200]
+                        self._touch_user_activity(conversation)
+
+        print(f"✅ Seeded {users} users, {users * conversations_per_user} conversations, "
+              f"{users * conversations_per_user * turns_per_conversation * 2} messages")
+        return user_ids
+
+    # =============================================================================
+    # INTERNALS (table writes and the trigger-maintained read models)
+    # =============================================================================
+
+    @staticmethod
+    def _message_key(message: Dict) -> Tuple[datetime, str]:
+        return (message['sent_at'], message['message_id'])
+
+    def _require(self, table: str, key: str) -> Dict:
+        row = getattr(self, table).get(key)
+        if row is None:
+            raise MemoryBackendError(f"insert violates foreign key constraint: {table} {key} does not exist")
+        return row
+
+    def _insert_conversation(self, user_id: str, astrologer_id: str, topic: str,
+                             parent_conversation_id: Optional[str] = None,
+                             started_at: Optional[datetime] = None) -> str:
+        self._require('users', user_id)
+        astrologer = self._require('astrologers', astrologer_id)
+        conversation_id = self.generate_conversation_id(user_id, astrologer_id)
+        row = {**copy.deepcopy(CONVERSATION_DEFAULTS), 'conversation_id': conversation_id,
+               'user_id': user_id, 'astrologer_id': astrologer_id, 'topic': topic,
+               'parent_conversation_id': parent_conversation_id, 'started_at': started_at or datetime.now()}
+        self.conversations[conversation_id] = row
+        self._conversations_by_pair[(user_id, astrologer_id)].append(conversation_id)
+        self._conversations_by_user[user_id].append(conversation_id)
+        self._conversations_by_astrologer[astrologer_id].append(conversation_id)
+
+        user_stats = self._user_statistics_row(user_id)
+        user_stats['total_conversations'] += 1
+        user_stats['last_activity'] = max(filter(None, (user_stats['last_activity'], row['started_at'])))
+        astrologer_stats = self._astrologer_statistics_row(astrologer_id)
+        astrologer_stats['total_conversations'] += 1
+        astrologer_stats['active_conversations'] += 1
+
+        # conversations_threads_trigger (INSERT)
+        thread = self.threads.get((user_id, astrologer_id))
+        if thread is None:
+            self.threads[(user_id, astrologer_id)] = {
+                'user_id': user_id, 'astrologer_id': astrologer_id, 'conversation_id': conversation_id,
+                'conversation_started_at': row['started_at'], 'status': row['status'],
+                'astrologer_name': astrologer['display_name'], 'astrologer_image': astrologer['profile_picture_url'],
+                'last_message_preview': None, 'last_message_at': None, 'last_sender_type': None,
+                'last_activity_at': row['started_at'], 'total_messages': 0, 'unread_count': 0, 'last_read_at': None,
+            }
+        else:
+            if thread['last_message_at'] is None:
+                thread.update(conversation_id=conversation_id, conversation_started_at=row['started_at'],
+                              status=row['status'])
+            thread['last_activity_at'] = max(thread['last_activity_at'], row['started_at'])
+        return conversation_id
+
+    def _insert_messages(self, rows: List[Dict]) -> None:
+        """Insert a batch of messages, then apply messages_threads_trigger once for it"""
+        batch = []
+        for row in rows:
+            conversation = self._require('conversations', row['conversation_id'])
+            message = {**copy.deepcopy(MESSAGE_DEFAULTS), **row}
+            history = self.messages[row['conversation_id']]
+            if not history or self._message_key(history[-1]) <= self._message_key(message):
+                history.append(message)
+            else:
+                bisect.insort(history, message, key=self._message_key)
+            batch.append((conversation, message))
+
+        by_pair = defaultdict(list)
+        for conversation, message in batch:
+            by_pair[(conversation['user_id'], conversation['astrologer_id'])].append((conversation, message))
+
+        for pair, items in by_pair.items():
+            conversation, latest = max(items, key=lambda item: self._message_key(item[1]))
+            asked = max((m for c, m in items if m['sender_type'] == 'user'
+                         and c['conversation_id'] == conversation['conversation_id']),
+                        key=self._message_key, default=None)
+            preview = (asked['content'] or '')[:200] if asked else None
+            read_at = max((m['sent_at'] for _, m in items if m['sender_type'] == 'user'), default=None)
+            unread = sum(1 for _, m in items if m['sender_type'] == 'astrologer'
+                         and (read_at is None or m['sent_at'] > read_at))
+            thread = self.threads[pair]
+            if thread['last_message_at'] is None or latest['sent_at'] >= thread['last_message_at']:
+                if preview is None and thread['conversation_id'] == conversation['conversation_id']:
+                    preview = thread['last_message_preview']
+                thread.update(conversation_id=conversation['conversation_id'],
+                              conversation_started_at=conversation['started_at'], status=conversation['status'],
+                              last_message_preview=preview,
+                              last_sender_type=latest['sender_type'], last_message_at=latest['sent_at'])
+            thread['last_activity_at'] = max(thread['last_activity_at'], latest['sent_at'])
+            thread['total_messages'] += len(items)
+            if read_at is not None:
+                thread['unread_count'] = unread
+                thread['last_read_at'] = max(filter(None, (thread['last_read_at'], read_at)))
+            else:
+                thread['unread_count'] += unread
+
+    def _touch_user_activity(self, conversation: Dict) -> None:
+        """Mirror of the statistics trigger on conversation counter updates"""
+        stats = self._user_statistics_row(conversation['user_id'])
+        stats['total_messages'] = sum(
+            self.conversations[c]['total_messages'] for c in self._conversations_by_user[conversation['user_id']]
+        )
+        stats['last_activity'] = max(filter(None, (stats['last_activity'], conversation['last_message_at'])))
+
+    def _set_status(self, conversation: Dict, status: str) -> None:
+        """Status change with the statistics and thread trigger effects"""
+        if conversation['status'] == status:
+            return
+        stats = self._astrologer_statistics_row(conversation['astrologer_id'])
+        stats['active_conversations'] += (status == 'active') - (conversation['status'] == 'active')
+        conversation['status'] = status
+        thread = self.threads.get((conversation['user_id'], conversation['astrologer_id']))
+        if thread and thread['conversation_id'] == conversation['conversation_id']:
+            thread['status'] = status
+
+    def _set_session_seconds(self, conversation: Dict, seconds: Optional[int]) -> None:
+        delta = (seconds or 0) - (conversation['total_duration_seconds'] or 0)
+        conversation['total_duration_seconds'] = seconds
+        self._user_statistics_row(conversation['user_id'])['total_session_seconds'] += delta
+        self._astrologer_statistics_row(conversation['astrologer_id'])['total_session_seconds'] += delta
+
+    def _user_statistics_row(self, user_id: str) -> Dict:
+        stats = self.user_statistics
+        if user_id not in stats:
+            stats[user_id] = {'total_conversations': 0, 'total_messages': 0, 'total_readings': 0,
+                              'total_reviews': 0, 'total_session_seconds': 0, 'last_activity': None}
+        return stats[user_id]
+
+    def _astrologer_statistics_row(self, astrologer_id: str) -> Dict:
+        stats = self.astrologer_statistics
+        if astrologer_id not in stats:
+            stats[astrologer_id] = {'total_conversations': 0, 'active_conversations': 0, 'total_readings': 0,
+                                    'total_reviews': 0, 'review_rating_sum': 0, 'total_session_seconds': 0}
+        return stats[astrologer_id]
+
+    def _post_wallet_transaction(self, wallet: Optional[Dict], delta: float,
+                                 columns: Dict[str, Any]) -> Optional[Dict]:
+        """Same rule as the SQL: a debit applies only if the balance covers it"""
+        if wallet is None:
+            return None
+        delta = _money(delta)
+        before = wallet['balance']
+        if before + delta < min(before, Decimal('0')):
+            return None
+        if columns.get('google_play_purchase_token'):
+            self._purchase_tokens.add(columns['google_play_purchase_token'])
+
+        now = datetime.now()
+        wallet['balance'] = before + delta
+        wallet['updated_at'] = now
+        row = {**copy.deepcopy(TRANSACTION_DEFAULTS), **copy.deepcopy(columns),
+               'user_id': wallet['user_id'], 'wallet_id': wallet['wallet_id'],
+               'amount': _money(columns['amount']), 'bonus_amount': _money(columns.get('bonus_amount') or 0),
+               'balance_before': before, 'balance_after': wallet['balance'], 'created_at': now}
+        self.transactions.append(row)
+        self._transactions_by_user[wallet['user_id']].append(row)
+        return {'transaction_id': row['transaction_id'], 'wallet_id': wallet['wallet_id'],
+                'balance_before': before, 'balance_after': wallet['balance']}
+
+    def _idempotency_claim(self, scope: str, key: str, fingerprint: str,
+                           ttl_seconds: float, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Same claim rules as idempotency.CLAIM_SQL"""
+        with self._lock:
+            now = datetime.now()
+            row = self.idempotency_keys.get((scope, key))
+            takeover = row is not None and (
+                row['expires_at'] < now
+                or (row['status'] == 'in_progress' and row['request_fingerprint'] == fingerprint
+                    and row['locked_at'] < now - timedelta(seconds=lease_seconds))
+            )
+            if row is None or takeover:
+                self.idempotency_keys[(scope, key)] = {
+                    'request_fingerprint': fingerprint, 'status': 'in_progress', 'response': None,
+                    'locked_at': now, 'expires_at': now + timedelta(seconds=ttl_seconds),
+                }
+                return None
+            if row['request_fingerprint'] != fingerprint:
+                raise IdempotencyConflictError(f"Idempotency key {key!r} was used for a different request")
+            return {'status': row['status'], 'response': copy.deepcopy(row['response'])}
+
+    def _idempotency_complete(self, scope: str, key: str, response: Any) -> None:
+        with self._lock:
+            row = self.idempotency_keys.get((scope, key))
+            if row:
+                row.update(status='completed', response=response)
+
+    def _idempotency_release(self, scope: str, key: str) -> None:
+        with self._lock:
+            row = self.idempotency_keys.get((scope, key))
+            if row and row['status'] == 'in_progress':
+                del self.idempotency_keys[(scope, key)]
+
+    def _idempotency_purge(self) -> int:
+        with self._lock:
+            now = datetime.now()
+            expired = [k for k, row in self.idempotency_keys.items() if row['expires_at'] < now]
+            for k in expired:
+                del self.idempotency_keys[k]
+            return len(expired)
+
+    def _seed_recharge_products(self) -> None:
+        now = datetime.now()
+        for sort_order, (product_id, amount, pct, bonus, total, name, popular) in enumerate(RECHARGE_PRODUCTS):
+            self.recharge_products[product_id] = {
+                'product_id': product_id, 'platform': 'android', 'amount': Decimal(amount),
+                'bonus_percentage': Decimal(pct), 'bonus_amount': Decimal(bonus),
+                'total_amount': Decimal(total), 'display_name': name, 'is_most_popular': popular,
+                'sort_order': sort_order, 'is_active': True, 'created_at': now, 'updated_at': now,
+            }
+
+    def _seed_astrologers(self, personas_file: Optional[Path]) -> None:
+        """Load the bundled astrologer personas (the same ones the app serves)"""
+        if personas_file is None:
+            personas_file = Path(__file__).resolve().parent.parent.parent / 'data' / 'astrologer_personas.json'
+        try:
+            with open(personas_file, 'r', encoding='utf-8') as f:
+                personas = json.load(f).get('astrologers', [])
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No astrologer personas loaded for the memory backend: {e}")
+            return
+
+        for persona in personas:
+            self.add_astrologer({
+                'astrologer_id': persona['astrologer_id'],
+                'name': persona.get('name', persona['astrologer_id']),
+                'display_name': persona.get('name', persona['astrologer_id']),
+                'bio': persona.get('persona'),
+                'specialization': persona.get('speciality'),
+                'languages': [persona['language'].lower()] if persona.get('language') else None,
+                'system_prompt': persona.get('system_prompt'),
+                'profile_picture_url': persona.get('image_url') or persona.get('profile_picture_url'),
+            })
@@ -0,0 +1,23 @@
+"""
+Message indexes added after the baseline
+Keyset pagination and full-text search, built without blocking chat writes
+
+messages is usually partitioned, so each index is built concurrently on
+every partition and attached to the parent (see create_index_concurrently).
+"""
+
+TRANSACTIONAL = False
+
+
+def upgrade(ctx):
+    # Keyset pagination for chat history: WHERE conversation_id = ? AND (sent_at, message_id) < (?, ?)
+    ctx.create_index_concurrently(
+        'idx_messages_conversation_keyset', 'messages',
+        '(conversation_id, sent_at DESC, message_id DESC)'
+    )
+    # btree_gin lets the GIN index carry conversation_id, so a search only visits
+    # the searching user's conversations instead of every matching message
+    ctx.create_index_concurrently(
+        'idx_messages_search', 'messages',
+        'USING GIN (conversation_id, search_vector)'
+    )
@@ -0,0 +1,6 @@
+-- migrate: no-transaction
+-- A purchase token can credit a wallet only once (backstop for /wallet/verify-purchase).
+-- Fails if earlier duplicate credits exist; clean those up and re-run the migration.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_purchase_token_unique
+    ON transactions(google_play_purchase_token)
+    WHERE google_play_purchase_token IS NOT NULL;
@@ -0,0 +1,13 @@
+"""
+Backfill messages.search_vector
+Fills the full-text vector for messages written before its trigger existed
+
+backfill_search_vectors commits every batch on its own, so chat writes to
+the same partitions are never blocked for long.
+"""
+
+TRANSACTIONAL = False
+
+
+def upgrade(ctx):
+    ctx.db.backfill_search_vectors(batch_size=5000)
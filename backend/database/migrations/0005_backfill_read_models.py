@@ -0,0 +1,21 @@
+"""
+Backfill the maintained read models
+Statistics rows and chat-list threads for data written before their triggers
+
+Both rebuilders walk users/astrologers in small committed batches and only
+rewrite rows that differ, so this is safe to run against live traffic.
+"""
+
+TRANSACTIONAL = False
+
+try:
+    from backend.database.statistics import StatisticsReconciler
+    from backend.database.threads import ThreadRebuilder
+except ImportError:
+    from database.statistics import StatisticsReconciler
+    from database.threads import ThreadRebuilder
+
+
+def upgrade(ctx):
+    StatisticsReconciler(ctx.db).run()
+    ThreadRebuilder(ctx.db).run()
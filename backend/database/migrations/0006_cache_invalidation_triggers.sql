@@ -0,0 +1,39 @@
+-- NOTIFY astrovoice_cache on every change to a table that processes cache in memory
+-- (backend/database/cache.py). Payload: {"table": ..., "key": <row key>}.
+-- Identical notifications within a transaction are delivered once, at commit.
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_key TEXT;
+    old_key TEXT;
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        new_key := to_jsonb(NEW) ->> TG_ARGV[0];
+        PERFORM pg_notify('astrovoice_cache', json_build_object('table', TG_TABLE_NAME, 'key', new_key)::text);
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        old_key := to_jsonb(OLD) ->> TG_ARGV[0];
+        IF old_key IS DISTINCT FROM new_key THEN
+            PERFORM pg_notify('astrovoice_cache', json_build_object('table', TG_TABLE_NAME, 'key', old_key)::text);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_astrologers_cache ON astrologers;
+CREATE TRIGGER trg_astrologers_cache AFTER INSERT OR UPDATE OR DELETE ON astrologers
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('astrologer_id');
+
+DROP TRIGGER IF EXISTS trg_recharge_products_cache ON recharge_products;
+CREATE TRIGGER trg_recharge_products_cache AFTER INSERT OR UPDATE OR DELETE ON recharge_products
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('product_id');
+
+DROP TRIGGER IF EXISTS trg_users_cache ON users;
+CREATE TRIGGER trg_users_cache AFTER INSERT OR UPDATE OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('user_id');
+
+-- Wallets are cached per user (get_wallet(user_id))
+DROP TRIGGER IF EXISTS trg_wallets_cache ON wallets;
+CREATE TRIGGER trg_wallets_cache AFTER INSERT OR UPDATE OR DELETE ON wallets
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('user_id');
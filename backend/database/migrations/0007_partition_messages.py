@@ -0,0 +1,24 @@
+"""
+Partition a plain messages table
+Converts databases created before messages was partitioned by month
+
+The baseline only creates partitions when messages is already partitioned;
+on older databases the table is swapped here for the partitioned layout
+(same conversion as `db_maintenance.py partitions migrate`). Rows are copied
+under an exclusive lock on messages, inside the migration's transaction, so
+a failure leaves the plain table untouched. Already partitioned databases
+skip it.
+"""
+
+try:
+    from backend.database.partitions import PartitionManager
+except ImportError:
+    from database.partitions import PartitionManager
+
+
+def upgrade(ctx):
+    rows = ctx.fetchall("SELECT relkind FROM pg_class WHERE oid = to_regclass('messages')")
+    if rows and rows[0][0] == 'p':
+        return
+    with ctx.conn.cursor() as cursor:
+        PartitionManager.convert_to_partitioned(cursor)
@@ -0,0 +1,63 @@
+-- Spread astrologer statistics over counter slots (see schema.sql). Every session
+-- start bumped its astrologer's single statistics row, so concurrent sessions
+-- with one astrologer queued on that row's lock until each transaction committed.
+-- Existing rows become slot 0; databases created from the current baseline
+-- already have the slots and only get the functions and views re-created.
+ALTER TABLE astrologer_statistics ADD COLUMN IF NOT EXISTS slot SMALLINT NOT NULL DEFAULT 0;
+
+DO $$
+BEGIN
+    IF (SELECT indnatts FROM pg_index
+        WHERE indrelid = 'astrologer_statistics'::regclass AND indisprimary) = 1 THEN
+        ALTER TABLE astrologer_statistics DROP CONSTRAINT astrologer_statistics_pkey;
+        ALTER TABLE astrologer_statistics ADD PRIMARY KEY (astrologer_id, slot);
+    END IF;
+END $$;
+
+CREATE OR REPLACE VIEW astrologer_statistics_totals AS
+SELECT
+    astrologer_id,
+    SUM(total_conversations)::bigint as total_conversations,
+    SUM(active_conversations)::bigint as active_conversations,
+    SUM(total_readings)::bigint as total_readings,
+    SUM(rated_readings)::bigint as rated_readings,
+    SUM(reading_rating_sum)::bigint as reading_rating_sum,
+    SUM(total_reviews)::bigint as total_reviews,
+    SUM(review_rating_sum)::bigint as review_rating_sum,
+    SUM(total_session_seconds)::bigint as total_session_seconds
+FROM astrologer_statistics
+GROUP BY astrologer_id;
+
+CREATE OR REPLACE FUNCTION bump_astrologer_statistics(
+    p_astrologer_id VARCHAR, d_conversations BIGINT, d_active BIGINT, d_readings BIGINT,
+    d_rated_readings BIGINT, d_reading_rating_sum BIGINT, d_reviews BIGINT,
+    d_review_rating_sum BIGINT, d_session_seconds BIGINT
+) RETURNS void AS $$
+    INSERT INTO astrologer_statistics AS s (
+        astrologer_id, slot, total_conversations, active_conversations, total_readings, rated_readings,
+        reading_rating_sum, total_reviews, review_rating_sum, total_session_seconds
+    ) VALUES (p_astrologer_id, pg_backend_pid() % 16, d_conversations, d_active, d_readings, d_rated_readings,
+              d_reading_rating_sum, d_reviews, d_review_rating_sum, d_session_seconds)
+    ON CONFLICT (astrologer_id, slot) DO UPDATE SET
+        total_conversations = s.total_conversations + EXCLUDED.total_conversations,
+        active_conversations = s.active_conversations + EXCLUDED.active_conversations,
+        total_readings = s.total_readings + EXCLUDED.total_readings,
+        rated_readings = s.rated_readings + EXCLUDED.rated_readings,
+        reading_rating_sum = s.reading_rating_sum + EXCLUDED.reading_rating_sum,
+        total_reviews = s.total_reviews + EXCLUDED.total_reviews,
+        review_rating_sum = s.review_rating_sum + EXCLUDED.review_rating_sum,
+        total_session_seconds = s.total_session_seconds + EXCLUDED.total_session_seconds,
+        updated_at = CURRENT_TIMESTAMP;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE VIEW astrologer_stats AS
+SELECT
+    a.astrologer_id,
+    a.display_name,
+    a.rating,
+    a.total_consultations,
+    COALESCE(s.active_conversations, 0)::bigint as active_conversations,
+    COALESCE(s.total_readings, 0)::bigint as total_readings,
+    CASE WHEN s.rated_readings > 0 THEN s.reading_rating_sum::numeric / s.rated_readings END as average_user_rating
+FROM astrologers a
+LEFT JOIN astrologer_statistics_totals s ON s.astrologer_id = a.astrologer_id;
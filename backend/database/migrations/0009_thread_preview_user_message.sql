@@ -0,0 +1,72 @@
+-- Chat list preview: the user's latest message in the shown conversation, as the
+-- list showed before the read model (conversations.last_message_preview), rather
+-- than the latest message from either side. Stored previews are rebuilt by 0010.
+CREATE OR REPLACE FUNCTION messages_threads_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH batch AS (
+        SELECT c.user_id, c.astrologer_id, c.started_at, c.status,
+               n.conversation_id, n.message_id, n.sender_type, n.content, n.sent_at
+        FROM new_messages n
+        JOIN conversations c ON c.conversation_id = n.conversation_id
+    ), latest AS (
+        SELECT DISTINCT ON (user_id, astrologer_id) *
+        FROM batch
+        ORDER BY user_id, astrologer_id, sent_at DESC, message_id DESC
+    ), asked AS (
+        SELECT DISTINCT ON (user_id, astrologer_id) user_id, astrologer_id, conversation_id, content
+        FROM batch WHERE sender_type = 'user'
+        ORDER BY user_id, astrologer_id, sent_at DESC, message_id DESC
+    ), reads AS (
+        SELECT user_id, astrologer_id, MAX(sent_at) AS read_at
+        FROM batch WHERE sender_type = 'user'
+        GROUP BY user_id, astrologer_id
+    ), counts AS (
+        SELECT b.user_id, b.astrologer_id, r.read_at,
+               COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE b.sender_type = 'astrologer'
+                                  AND (r.read_at IS NULL OR b.sent_at > r.read_at)) AS unread
+        FROM batch b
+        LEFT JOIN reads r ON r.user_id = b.user_id AND r.astrologer_id = b.astrologer_id
+        GROUP BY b.user_id, b.astrologer_id, r.read_at
+    )
+    INSERT INTO user_astrologer_threads AS t (
+        user_id, astrologer_id, conversation_id, conversation_started_at, status,
+        astrologer_name, astrologer_image, last_message_preview, last_message_at,
+        last_sender_type, last_activity_at, total_messages, unread_count, last_read_at
+    )
+    SELECT l.user_id, l.astrologer_id, l.conversation_id, l.started_at, l.status,
+           a.display_name, a.profile_picture_url, LEFT(q.content, 200), l.sent_at,
+           l.sender_type, l.sent_at, n.total, n.unread, n.read_at
+    FROM latest l
+    JOIN counts n ON n.user_id = l.user_id AND n.astrologer_id = l.astrologer_id
+    LEFT JOIN asked q ON q.user_id = l.user_id AND q.astrologer_id = l.astrologer_id
+                     AND q.conversation_id = l.conversation_id
+    JOIN astrologers a ON a.astrologer_id = l.astrologer_id
+    ORDER BY l.user_id, l.astrologer_id
+    ON CONFLICT (user_id, astrologer_id) DO UPDATE SET
+        conversation_id = CASE WHEN t.last_message_at IS NULL OR EXCLUDED.last_message_at >= t.last_message_at
+                               THEN EXCLUDED.conversation_id ELSE t.conversation_id END,
+        conversation_started_at = CASE WHEN t.last_message_at IS NULL OR EXCLUDED.last_message_at >= t.last_message_at
+                                       THEN EXCLUDED.conversation_started_at ELSE t.conversation_started_at END,
+        status = CASE WHEN t.last_message_at IS NULL OR EXCLUDED.last_message_at >= t.last_message_at
+                      THEN EXCLUDED.status ELSE t.status END,
+        -- The user's latest message in the shown conversation (kept when the batch has none)
+        last_message_preview = CASE WHEN t.last_message_at IS NULL OR EXCLUDED.last_message_at >= t.last_message_at
+                                    THEN CASE WHEN EXCLUDED.conversation_id = t.conversation_id
+                                              THEN COALESCE(EXCLUDED.last_message_preview, t.last_message_preview)
+                                              ELSE EXCLUDED.last_message_preview END
+                                    ELSE t.last_message_preview END,
+        last_sender_type = CASE WHEN t.last_message_at IS NULL OR EXCLUDED.last_message_at >= t.last_message_at
+                                THEN EXCLUDED.last_sender_type ELSE t.last_sender_type END,
+        last_message_at = GREATEST(t.last_message_at, EXCLUDED.last_message_at),
+        last_activity_at = GREATEST(t.last_activity_at, EXCLUDED.last_activity_at),
+        total_messages = t.total_messages + EXCLUDED.total_messages,
+        -- A user message in the batch resets the count to the replies after it
+        unread_count = CASE WHEN EXCLUDED.last_read_at IS NOT NULL THEN EXCLUDED.unread_count
+                            ELSE t.unread_count + EXCLUDED.unread_count END,
+        last_read_at = GREATEST(t.last_read_at, EXCLUDED.last_read_at),
+        updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
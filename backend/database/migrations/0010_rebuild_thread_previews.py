@@ -0,0 +1,18 @@
+"""
+Rebuild the chat list read model
+Recomputes thread previews written by the previous messages_threads_trigger
+
+Same batched, diff-only pass as `db_maintenance.py threads rebuild`, safe to
+run against live traffic.
+"""
+
+TRANSACTIONAL = False
+
+try:
+    from backend.database.threads import ThreadRebuilder
+except ImportError:
+    from database.threads import ThreadRebuilder
+
+
+def upgrade(ctx):
+    ThreadRebuilder(ctx.db).run()
@@ -0,0 +1,429 @@
+"""
+Schema Migrations for AstroVoice
+Versioned, lock-protected schema changes that are safe on a loaded database
+
+Version 1 is the baseline, schema.sql. It is idempotent and applies over a
+database created from the schema.sql that predates migrations; the plain
+messages table such a database has is left alone by the baseline and
+partitioned by migration 0007. Later versions live in
+backend/database/migrations/ as NNNN_description.sql or NNNN_description.py
+and run once each, in order. Applied versions are recorded in
+schema_migrations with a checksum of the file.
+
+Only one instance migrates at a time: the runner holds a session-level
+advisory lock for the whole run, so instances started together (Lambda cold
+starts, several API workers) wait for or skip the one already migrating.
+
+Transactions:
+- A .sql migration runs in one transaction unless its header contains
+  `-- migrate: no-transaction`. Non-transactional migrations run statement
+  by statement in autocommit, which CREATE INDEX CONCURRENTLY needs; their
+  statements must be idempotent (IF NOT EXISTS), since a failed run is
+  retried from the top. Invalid indexes left by a failed concurrent build
+  are dropped before the build is retried.
+- A .py migration defines `upgrade(ctx)` and optionally TRANSACTIONAL = False.
+  The context offers execute(), create_index_concurrently() (also for
+  partitioned tables) and backfill(), which commits in small batches so
+  long-running data changes never hold locks on the whole table.
+
+Every statement runs with lock_timeout set, so a migration that would queue
+behind a long transaction fails fast instead of blocking traffic behind it.
+"""
+
+import hashlib
+import importlib.util
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
+BASELINE_FILE = Path(__file__).parent / 'schema.sql'
+
+# Arbitrary application-wide key for pg_advisory_lock
+MIGRATION_LOCK_KEY = 7348201611
+
+NO_TRANSACTION_DIRECTIVE = re.compile(r'^\s*--\s*migrate:\s*no-transaction\s*$', re.MULTILINE | re.IGNORECASE)
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.(sql|py)$')
+CONCURRENT_INDEX = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?("?[\w.]+"?)',
+    re.IGNORECASE
+)
+
+CREATE_MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        execution_ms INTEGER
+    )
+"""
+
+
+class MigrationError(Exception):
+    """A migration failed or the migration set is inconsistent"""
+    pass
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    path: Path
+    kind: str            # 'sql' or 'py'
+    transactional: bool
+    checksum: str
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Split a SQL script into statements on top-level semicolons.
+    Quotes, dollar-quoted bodies and comments are kept intact.
+    """
+    statements = []
+    current = []
+    i = 0
+    n = len(sql)
+
+    while i < n:
+        ch = sql[i]
+        if ch == '-' and sql.startswith('--', i):
+            end = sql.find('\n', i)
+            end = n if end == -1 else end
+            current.append(sql[i:end])
+            i = end
+        elif ch == '/' and sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            current.append(sql[i:end])
+            i = end
+        elif ch in ("'", '"'):
+            end = i + 1
+            while end < n:
+                if sql[end] == ch:
+                    if end + 1 < n and sql[end + 1] == ch:  # doubled quote
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+        elif ch == '$':
+            match = re.match(r'\$(\w*)\$', sql[i:])
+            if match:
+                tag = match.group(0)
+                end = sql.find(tag, i + len(tag))
+                end = n if end == -1 else end + len(tag)
+                current.append(sql[i:end])
+                i = end
+            else:
+                current.append(ch)
+                i += 1
+        elif ch == ';':
+            statements.append(''.join(current))
+            current = []
+            i += 1
+        else:
+            current.append(ch)
+            i += 1
+
+    statements.append(''.join(current))
+    return [s.strip() for s in statements if _has_code(s)]
+
+
+def _has_code(statement: str) -> bool:
+    """True if the statement is more than whitespace and comments"""
+    without_comments = re.sub(r'--[^\n]*|/\*.*?\*/', '', statement, flags=re.DOTALL)
+    return bool(without_comments.strip())
+
+
+def _checksum(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def discover_migrations(migrations_dir: Path = MIGRATIONS_DIR,
+                        baseline: Path = BASELINE_FILE) -> List[Migration]:
+    """List the baseline and every migration file, ordered by version"""
+    migrations = [Migration(1, 'baseline', baseline, 'sql', True, _checksum(baseline))]
+    seen = {1: baseline.name}
+
+    for path in sorted(Path(migrations_dir).iterdir()) if Path(migrations_dir).exists() else []:
+        match = MIGRATION_FILE.match(path.name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in seen:
+            raise MigrationError(f"Duplicate migration version {version}: {seen[version]} and {path.name}")
+        seen[version] = path.name
+
+        kind = match.group(3)
+        if kind == 'sql':
+            transactional = not NO_TRANSACTION_DIRECTIVE.search(path.read_text())
+        else:
+            transactional = getattr(_load_module(path), 'TRANSACTIONAL', True)
+        migrations.append(Migration(version, match.group(2), path, kind, transactional, _checksum(path)))
+
+    return sorted(migrations, key=lambda m: m.version)
+
+
+def _load_module(path: Path):
+    spec = importlib.util.spec_from_file_location(f"astrovoice_migration_{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class MigrationContext:
+    """What a Python migration's upgrade(ctx) can do"""
+
+    def __init__(self, conn, db, transactional: bool):
+        self.conn = conn
+        self.db = db
+        self.transactional = transactional
+
+    def execute(self, sql: str, params: Any = None) -> int:
+        """Run one statement. Returns the affected row count."""
+        if not self.transactional:
+            match = CONCURRENT_INDEX.search(sql)
+            if match:
+                self._drop_if_invalid(match.group(1).strip('"'))
+        with self.conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def fetchall(self, sql: str, params: Any = None) -> List[tuple]:
+        with self.conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def create_index_concurrently(self, name: str, table: str, definition: str, unique: bool = False) -> None:
+        """
+        Build an index without blocking writes.
+
+        On a partitioned table (where CONCURRENTLY is not supported) the index
+        is created ON ONLY the parent, built concurrently on each partition
+        and attached; the parent index becomes valid once all are attached.
+
+        Args:
+            name: Index name
+            table: Table name
+            definition: Everything after the table, e.g. "(user_id, created_at DESC)"
+                        or "USING GIN (search_vector) WHERE ..."
+        """
+        self._require_autocommit('create_index_concurrently')
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+
+        rows = self.fetchall("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        if not rows:
+            raise MigrationError(f"Table {table} does not exist")
+
+        if rows[0][0] != 'p':
+            self.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+            return
+
+        if self.fetchall("SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(%s) AND indisvalid", (name,)):
+            return
+
+        self.execute(f"CREATE {kind} IF NOT EXISTS {name} ON ONLY {table} {definition}")
+        # Partitions without an index attached to the parent index yet
+        partitions = self.fetchall("""
+            SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%(table)s)
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_inherits ii JOIN pg_index x ON x.indexrelid = ii.inhrelid
+                  WHERE ii.inhparent = to_regclass(%(index)s) AND x.indrelid = c.oid
+              )
+            ORDER BY c.relname
+        """, {'table': table, 'index': name})
+        for (partition,) in partitions:
+            child = f"{partition}_{name.replace('idx_', '', 1)}"[:63]
+            self.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {child} ON {partition} {definition}")
+            self.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}")
+
+    def backfill(self, sql: str, batch_size: int = 5000, pause: float = 0.0, label: str = 'rows') -> int:
+        """
+        Repeat a batched UPDATE/DELETE until it affects fewer than batch_size rows.
+        Each batch commits on its own, so locks are held only briefly.
+
+        Args:
+            sql: Statement limiting itself with %(batch_size)s
+            pause: Seconds to sleep between batches (throttle on a busy primary)
+
+        Returns:
+            Total rows affected
+        """
+        self._require_autocommit('backfill')
+        total = 0
+        while True:
+            count = self.execute(sql, {'batch_size': batch_size})
+            total += count
+            if count < batch_size:
+                break
+            print(f"📝 Backfilled {total} {label} so far...")
+            if pause:
+                time.sleep(pause)
+        print(f"✅ Backfilled {total} {label}")
+        return total
+
+    def _require_autocommit(self, what: str) -> None:
+        if self.transactional:
+            raise MigrationError(f"{what}() needs a non-transactional migration (TRANSACTIONAL = False)")
+
+    def _drop_if_invalid(self, index_name: str) -> None:
+        """Drop an invalid index left by an interrupted concurrent build"""
+        rows = self.fetchall("""
+            SELECT i.indisvalid, c.relkind FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indexrelid = to_regclass(%s)
+        """, (index_name,))
+        # Partitioned parent indexes are invalid until every partition is attached
+        if rows and not rows[0][0] and rows[0][1] != 'I':
+            print(f"⚠️ Dropping invalid index {index_name} left by an earlier run")
+            with self.conn.cursor() as cursor:
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+class MigrationRunner:
+    """Applies pending migrations under an advisory lock"""
+
+    def __init__(self, db, migrations_dir: Path = MIGRATIONS_DIR, baseline: Path = BASELINE_FILE,
+                 lock_timeout: str = '5s', connect: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            db: DatabaseManager (connection settings; passed to Python migrations)
+            lock_timeout: Postgres lock_timeout for migration statements
+            connect: Returns a new dedicated connection (defaults to db.db_config)
+        """
+        self.db = db
+        self.migrations_dir = Path(migrations_dir)
+        self.baseline = Path(baseline)
+        self.lock_timeout = lock_timeout
+        self._connect = connect or (lambda: psycopg2.connect(**db.db_config))
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Every known migration with whether (and when) it was applied"""
+        conn = self._connect()
+        try:
+            conn.autocommit = True
+            applied = self._applied(conn)
+        finally:
+            conn.close()
+
+        return [
+            {
+                'version': m.version,
+                'name': m.name,
+                'transactional': m.transactional,
+                'applied': m.version in applied,
+                'applied_at': applied[m.version]['applied_at'].isoformat()
+                              if m.version in applied and applied[m.version]['applied_at'] else None,
+                'modified_since_applied': m.version in applied and applied[m.version]['checksum'] != m.checksum,
+            }
+            for m in discover_migrations(self.migrations_dir, self.baseline)
+        ]
+
+    def migrate(self, target: Optional[int] = None, wait: bool = True) -> Dict[str, Any]:
+        """
+        Apply pending migrations up to `target` (default: all).
+
+        Args:
+            wait: Wait for another instance's run to finish (True) or return
+                  immediately with locked=True (False)
+
+        Returns:
+            {'success', 'applied': [versions], 'locked', 'error'}
+        """
+        migrations = discover_migrations(self.migrations_dir, self.baseline)
+        conn = self._connect()
+        conn.autocommit = True
+        result = {'success': False, 'applied': [], 'locked': False, 'error': None}
+        try:
+            with conn.cursor() as cursor:
+                if wait:
+                    cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+                else:
+                    cursor.execute("SELECT pg_try_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+                    if not cursor.fetchone()[0]:
+                        print("⚠️ Another instance is migrating - skipping")
+                        result['locked'] = True
+                        return result
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(CREATE_MIGRATIONS_TABLE_SQL)
+                    cursor.execute("SELECT set_config('lock_timeout', %s, false)", (self.lock_timeout,))
+                applied = self._applied(conn)
+
+                for migration in migrations:
+                    if target is not None and migration.version > target:
+                        break
+                    if migration.version in applied:
+                        if applied[migration.version]['checksum'] != migration.checksum:
+                            print(f"⚠️ Migration {migration.version} ({migration.name}) changed after it was applied")
+                        continue
+                    self._apply(conn, migration)
+                    result['applied'].append(migration.version)
+
+                result['success'] = True
+            finally:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            result['error'] = str(e)
+        finally:
+            conn.close()
+
+        if result['success']:
+            print(f"✅ Schema up to date ({len(result['applied'])} migration(s) applied)")
+        return result
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _applied(conn) -> Dict[int, Dict[str, Any]]:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('schema_migrations')")
+            if cursor.fetchone()[0] is None:
+                return {}
+            cursor.execute("SELECT version, checksum, applied_at FROM schema_migrations")
+            return {row[0]: {'checksum': row[1], 'applied_at': row[2]} for row in cursor.fetchall()}
+
+    def _apply(self, conn, migration: Migration) -> None:
+        print(f"🔧 Applying migration {migration.version:04d}_{migration.name}"
+              f"{'' if migration.transactional else ' (no transaction)'}...")
+        started = time.perf_counter()
+        conn.autocommit = not migration.transactional
+        try:
+            ctx = MigrationContext(conn, self.db, migration.transactional)
+            if migration.kind == 'py':
+                _load_module(migration.path).upgrade(ctx)
+            elif migration.transactional:
+                ctx.execute(migration.path.read_text())
+            else:
+                for statement in split_statements(migration.path.read_text()):
+                    ctx.execute(statement)
+
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO schema_migrations (version, name, checksum, execution_ms)
+                    VALUES (%s, %s, %s, %s)
+                """, (migration.version, migration.name, migration.checksum, elapsed_ms))
+            if migration.transactional:
+                conn.commit()
+        except Exception as e:
+            if migration.transactional:
+                conn.rollback()
+            raise MigrationError(f"{migration.version:04d}_{migration.name}: {e}") from e
+        finally:
+            conn.autocommit = True
+
+        print(f"✅ Migration {migration.version:04d}_{migration.name} applied in {elapsed_ms}ms")
@@ -0,0 +1,297 @@
+"""
+Message Partition Management for AstroVoice
+Maintains the monthly range partitions of the messages table
+
+- ensure_partitions(): create partitions for the coming months (moving any
+  matching rows out of messages_default first)
+- detach_old_partitions(): detach (and optionally drop) months past retention
+- migrate_to_partitioned(): one-time conversion of a plain messages table
+- message_time_lower_bound(): derive a sent_at lower bound from a
+  conversation ID so history queries prune to recent partitions
+
+Run on a schedule via scripts/db_maintenance.py.
+"""
+
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+try:
+    from psycopg2 import sql
+    from psycopg2.extras import RealDictCursor
+except ImportError:
+    sql = None
+
+try:
+    from backend.database.ids import ulid_timestamp
+except ImportError:
+    from ids import ulid_timestamp
+
+PARENT_TABLE = 'messages'
+DEFAULT_PARTITION = 'messages_default'
+_PARTITION_NAME = re.compile(r'^messages_y(\d{4})m(\d{2})$')
+_LEGACY_CONVERSATION_TS = re.compile(r'_(\d{10})$')
+
+# Messages can't predate their conversation; the slack absorbs clock skew and
+# the app (UTC) vs database session timezone difference.
+PRUNING_SLACK = timedelta(days=1)
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + (value.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"messages_y{month.year:04d}m{month.month:02d}"
+
+
+def message_time_lower_bound(conversation_id: str) -> Optional[datetime]:
+    """
+    Earliest sent_at any message of this conversation can have, derived from
+    the conversation ID alone (ULID timestamp or legacy _<unix seconds> suffix).
+    Returns None if the ID carries no timestamp.
+    """
+    try:
+        started = ulid_timestamp(conversation_id)
+    except ValueError:
+        match = _LEGACY_CONVERSATION_TS.search(conversation_id or '')
+        if not match:
+            return None
+        started = datetime.fromtimestamp(int(match.group(1)), tz=timezone.utc)
+    # sent_at is TIMESTAMP WITHOUT TIME ZONE
+    return started.replace(tzinfo=None) - PRUNING_SLACK
+
+
+class PartitionManager:
+    """Creates, lists and detaches monthly messages partitions"""
+
+    def __init__(self, db):
+        """
+        Args:
+            db: DatabaseManager providing get_connection()
+        """
+        self.db = db
+
+    def is_partitioned(self) -> bool:
+        """True if messages is already a partitioned table"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (PARENT_TABLE,))
+                row = cursor.fetchone()
+                return bool(row) and row[0] == 'p'
+
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        """Monthly partitions attached to messages, oldest first, with row estimates"""
+        with self.db.get_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT c.relname AS name,
+                           c.reltuples::bigint AS estimated_rows,
+                           pg_total_relation_size(c.oid) AS total_bytes
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = to_regclass(%s)
+                    ORDER BY c.relname
+                """, (PARENT_TABLE,))
+                partitions = []
+                for row in cursor.fetchall():
+                    match = _PARTITION_NAME.match(row['name'])
+                    partitions.append({
+                        **dict(row),
+                        'month': date(int(match.group(1)), int(match.group(2)), 1).isoformat() if match else None,
+                    })
+                return partitions
+
+    def ensure_partitions(self, months_ahead: int = 3, today: Optional[date] = None) -> List[str]:
+        """
+        Create partitions from the current month through `months_ahead` months ahead.
+
+        Rows that already landed in messages_default for a new month are moved
+        into the new partition (ATTACH would otherwise fail its default-partition check).
+
+        Returns:
+            Names of partitions created
+        """
+        current = month_start(today or date.today())
+        created = []
+
+        for offset in range(months_ahead + 1):
+            start = add_months(current, offset)
+            if self._create_partition(start):
+                created.append(partition_name(start))
+
+        if created:
+            print(f"🗂️  Created message partitions: {', '.join(created)}")
+        return created
+
+    def detach_old_partitions(self, retain_months: int = 24, drop: bool = False,
+                              today: Optional[date] = None) -> List[str]:
+        """
+        Detach partitions whose whole month is older than the retention window.
+        Detached tables are kept (for archiving) unless drop=True.
+
+        Returns:
+            Names of partitions detached
+        """
+        cutoff = add_months(month_start(today or date.today()), -retain_months)
+        detached = []
+
+        for partition in self.list_partitions():
+            match = _PARTITION_NAME.match(partition['name'])
+            if not match:
+                continue
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            if add_months(month, 1) > cutoff:
+                continue
+
+            with self.db.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                        sql.Identifier(PARENT_TABLE), sql.Identifier(partition['name'])))
+                    if drop:
+                        cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(partition['name'])))
+            detached.append(partition['name'])
+
+        if detached:
+            action = "Dropped" if drop else "Detached"
+            print(f"🗂️  {action} message partitions: {', '.join(detached)}")
+        return detached
+
+    def migrate_to_partitioned(self, months_ahead: int = 3) -> bool:
+        """
+        Convert an existing plain messages table into the partitioned layout.
+
+        Runs in one transaction and holds an exclusive lock on messages while
+        rows are copied - schedule it in a maintenance window. Migration 0007
+        runs the same conversion as part of `migrate`.
+
+        Returns:
+            True if a conversion happened, False if already partitioned
+        """
+        if self.is_partitioned():
+            print("✅ messages is already partitioned")
+            return False
+
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                self.convert_to_partitioned(cursor, months_ahead)
+        return True
+
+    @classmethod
+    def convert_to_partitioned(cls, cursor, months_ahead: int = 3) -> int:
+        """
+        Swap a plain messages table for the partitioned one on the caller's
+        cursor (and transaction). Returns the number of messages copied.
+        """
+        cursor.execute("LOCK TABLE messages IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("SELECT min(sent_at), count(*) FROM messages")
+        oldest, row_count = cursor.fetchone()
+
+        cursor.execute("ALTER TABLE messages RENAME TO messages_unpartitioned")
+        # Free the primary key's name for the new table
+        cursor.execute("ALTER INDEX IF EXISTS messages_pkey RENAME TO messages_unpartitioned_pkey")
+        cursor.execute("ALTER TABLE messages_unpartitioned ALTER COLUMN sent_at SET NOT NULL")
+
+        # Same columns/defaults as before, new key and partitioning
+        cursor.execute("""
+            CREATE TABLE messages (
+                LIKE messages_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                PRIMARY KEY (message_id, sent_at)
+            ) PARTITION BY RANGE (sent_at)
+        """)
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF messages DEFAULT")
+
+        first = month_start(oldest.date()) if oldest else month_start(date.today())
+        last = add_months(month_start(date.today()), months_ahead)
+        month = first
+        while month <= last:
+            cls._create_partition_sql(cursor, month)
+            month = add_months(month, 1)
+
+        cursor.execute("INSERT INTO messages SELECT * FROM messages_unpartitioned")
+        cursor.execute("SELECT count(*) FROM messages")
+        copied = cursor.fetchone()[0]
+        if copied != row_count:
+            raise RuntimeError(f"Partition migration copied {copied} of {row_count} messages")
+
+        cursor.execute("DROP TABLE messages_unpartitioned")
+        cursor.execute("""
+            ALTER TABLE messages ADD CONSTRAINT fk_conversation
+                FOREIGN KEY (conversation_id) REFERENCES conversations(conversation_id) ON DELETE CASCADE
+        """)
+        cursor.execute("CREATE INDEX idx_messages_sent_at ON messages(sent_at DESC)")
+        cursor.execute("CREATE INDEX idx_messages_sender_type ON messages(sender_type)")
+        cursor.execute("""
+            CREATE INDEX idx_messages_conversation_keyset
+                ON messages(conversation_id, sent_at DESC, message_id DESC)
+        """)
+        # Full-text search trigger and index, if the schema has them
+        cursor.execute("SELECT to_regprocedure('update_message_search_vector()')")
+        if cursor.fetchone()[0]:
+            cursor.execute("""
+                CREATE TRIGGER trg_messages_search_vector
+                    BEFORE INSERT OR UPDATE OF content ON messages
+                    FOR EACH ROW EXECUTE FUNCTION update_message_search_vector()
+            """)
+            cursor.execute("""
+                CREATE INDEX idx_messages_search
+                    ON messages USING GIN (conversation_id, search_vector)
+            """)
+        # Chat list read-model trigger, if the schema has it
+        cursor.execute("SELECT to_regprocedure('messages_threads_trigger()')")
+        if cursor.fetchone()[0]:
+            cursor.execute("""
+                CREATE TRIGGER trg_messages_threads
+                    AFTER INSERT ON messages
+                    REFERENCING NEW TABLE AS new_messages
+                    FOR EACH STATEMENT EXECUTE FUNCTION messages_threads_trigger()
+            """)
+
+        print(f"✅ Migrated {row_count} messages into monthly partitions")
+        return row_count
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    def _create_partition(self, start: date) -> bool:
+        """Create one monthly partition if missing. Returns True if created."""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT to_regclass(%s)", (partition_name(start),))
+                if cursor.fetchone()[0]:
+                    return False
+                self._create_partition_sql(cursor, start)
+                return True
+
+    @staticmethod
+    def _create_partition_sql(cursor, start: date) -> None:
+        name = partition_name(start)
+        end = add_months(start, 1)
+
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE sent_at >= %s AND sent_at < %s)",
+            (start, end)
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                sql.Identifier(name), sql.Identifier(PARENT_TABLE)), (start, end))
+            return
+
+        # Rows for this month are sitting in the default partition: build the
+        # partition standalone, move them over, then attach it
+        cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(
+            sql.Identifier(name), sql.Identifier(PARENT_TABLE)))
+        cursor.execute(sql.SQL("""
+            WITH moved AS (
+                DELETE FROM {} WHERE sent_at >= %s AND sent_at < %s RETURNING *
+            )
+            INSERT INTO {} SELECT * FROM moved
+        """).format(sql.Identifier(DEFAULT_PARTITION), sql.Identifier(name)), (start, end))
+        cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)").format(
+            sql.Identifier(PARENT_TABLE), sql.Identifier(name)), (start, end))
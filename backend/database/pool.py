@@ -0,0 +1,339 @@
+"""
+Connection Pool for AstroVoice
+Thread-safe PostgreSQL connection pool used by DatabaseManager
+
+Features:
+- min/max sizing (connections are opened lazily, idle ones above min are trimmed)
+- health check on checkout for connections that sat idle too long
+- max-lifetime recycling so RDS failovers / credential rotation are picked up
+- pool-wait metrics (acquisitions, waits, wait time, timeouts)
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be acquired within the acquire timeout"""
+
+
+class _PooledConnection:
+    """Bookkeeping for a single pooled connection"""
+
+    __slots__ = ('connection', 'created_at', 'last_used_at')
+
+    def __init__(self, connection: Any):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used_at = now
+
+
+class ConnectionPool:
+    """
+    Thread-safe connection pool.
+
+    The pool does not know about psycopg2 directly - it is given a `connect`
+    callable that opens a new DB-API connection. Idle connections are reused
+    LIFO so the warmest connection is handed out first.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        max_lifetime: float = 1800.0,
+        max_idle: float = 300.0,
+        health_check_after: float = 30.0,
+        acquire_timeout: float = 10.0,
+        name: str = 'primary'
+    ):
+        """
+        Args:
+            connect: Callable returning a new DB-API connection
+            min_size: Idle connections kept open even when unused
+            max_size: Hard cap on open connections (idle + checked out)
+            max_lifetime: Seconds after which a connection is closed and replaced
+            max_idle: Seconds an idle connection above min_size is kept before closing
+            health_check_after: Idle seconds after which a connection is pinged on checkout
+            acquire_timeout: Seconds to wait for a free connection before failing
+            name: Pool name used in logs and metrics
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self.name = name
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: deque = deque()
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._size = 0
+        self._closed = False
+
+        # Metrics
+        self._acquisitions = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._closed_count = 0
+        self._recycled = 0
+        self._failed_health_checks = 0
+
+    # -------------------------------------------------------------------------
+    # Checkout / checkin
+    # -------------------------------------------------------------------------
+
+    def getconn(self, timeout: Optional[float] = None) -> Any:
+        """
+        Check out a connection, waiting up to `timeout` seconds if the pool is exhausted.
+
+        Raises:
+            PoolTimeoutError: If no connection became available in time
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            entry = None
+            create = False
+
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError(f"Connection pool '{self.name}' is closed")
+
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout:.1f}s waiting for a connection "
+                            f"from pool '{self.name}' (max_size={self.max_size})"
+                        )
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                    self._cond.wait(remaining)
+
+            if create:
+                entry = self._open()
+            else:
+                entry = self._validate(entry)
+                if entry is None:
+                    # Connection was dead and its slot released - try again
+                    continue
+
+            wait_time = time.monotonic() - start
+            with self._cond:
+                self._in_use[id(entry.connection)] = entry
+                self._acquisitions += 1
+                if waited:
+                    self._wait_time_total += wait_time
+                    self._wait_time_max = max(self._wait_time_max, wait_time)
+
+            return entry.connection
+
+    def putconn(self, connection: Any, discard: bool = False) -> None:
+        """
+        Return a connection to the pool.
+
+        Any open transaction is rolled back. Broken, expired or explicitly
+        discarded connections are closed instead of being reused.
+        """
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+
+        if entry is None:
+            # Not ours (or returned twice) - just close it
+            self._close_quietly(connection)
+            return
+
+        now = time.monotonic()
+        if not discard and not getattr(connection, 'closed', False):
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        expired = (now - entry.created_at) >= self.max_lifetime
+        if discard or expired or getattr(connection, 'closed', False) or self._closed:
+            if expired and not discard:
+                self._recycled += 1
+            self._release_slot(entry)
+            return
+
+        entry.last_used_at = now
+        with self._cond:
+            self._idle.append(entry)
+            self._trim_idle_locked(now)
+            self._cond.notify()
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def prefill(self) -> int:
+        """Open connections until min_size idle connections exist. Returns number opened."""
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return opened
+                self._size += 1
+            entry = self._open()
+            entry.last_used_at = time.monotonic()
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+            opened += 1
+
+    def close(self) -> None:
+        """Close all idle connections and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+
+        for entry in idle:
+            self._close_quietly(entry.connection)
+            self._closed_count += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool metrics snapshot"""
+        with self._cond:
+            return {
+                'name': self.name,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'acquisitions': self._acquisitions,
+                'waits': self._waits,
+                'wait_time_total_ms': round(self._wait_time_total * 1000, 2),
+                'wait_time_max_ms': round(self._wait_time_max * 1000, 2),
+                'wait_time_avg_ms': round(self._wait_time_total * 1000 / self._waits, 2) if self._waits else 0.0,
+                'timeouts': self._timeouts,
+                'connections_created': self._created,
+                'connections_closed': self._closed_count,
+                'recycled_max_lifetime': self._recycled,
+                'failed_health_checks': self._failed_health_checks,
+            }
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    def _open(self) -> _PooledConnection:
+        """Open a new connection for a slot already reserved in _size"""
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        self._created += 1
+        return _PooledConnection(connection)
+
+    def _validate(self, entry: _PooledConnection) -> Optional[_PooledConnection]:
+        """
+        Check an idle connection before handing it out.
+        Returns the entry, a freshly opened replacement, or None if the slot was released.
+        """
+        now = time.monotonic()
+        connection = entry.connection
+
+        if getattr(connection, 'closed', False):
+            self._failed_health_checks += 1
+            self._release_slot(entry)
+            return None
+
+        if (now - entry.created_at) >= self.max_lifetime:
+            self._recycled += 1
+            self._close_quietly(connection)
+            self._closed_count += 1
+            # Keep the slot and open a replacement in its place
+            try:
+                return _PooledConnection(self._reconnect())
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        if (now - entry.last_used_at) >= self.health_check_after:
+            if not self._ping(connection):
+                self._failed_health_checks += 1
+                self._release_slot(entry)
+                return None
+
+        return entry
+
+    def _reconnect(self) -> Any:
+        connection = self._connect()
+        self._created += 1
+        return connection
+
+    @staticmethod
+    def _ping(connection: Any) -> bool:
+        """Cheap liveness check - SELECT 1 and roll back the implicit transaction"""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _release_slot(self, entry: _PooledConnection) -> None:
+        """Close a connection and free its slot for a waiter"""
+        self._close_quietly(entry.connection)
+        with self._cond:
+            self._size -= 1
+            self._closed_count += 1
+            self._cond.notify()
+
+    def _trim_idle_locked(self, now: float) -> None:
+        """Close idle connections above min_size that exceeded max_idle (lock held)"""
+        # Oldest-used connections sit at the left of the deque
+        while self._size > self.min_size and self._idle:
+            oldest = self._idle[0]
+            if (now - oldest.last_used_at) < self.max_idle:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._closed_count += 1
+            self._close_quietly(oldest.connection)
+
+    @staticmethod
+    def _close_quietly(connection: Any) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,216 @@
+"""
+Read-Replica Routing for AstroVoice
+Sends read-only queries to replicas while keeping users' own writes visible
+
+Routing rules for a read:
+1. If the current session (usually the user) wrote within the sticky window,
+   read from the primary so the user sees their own change.
+2. Otherwise pick the next healthy replica (round robin) whose replication
+   lag is within `max_lag` seconds. Lag is re-measured at most every
+   `lag_check_interval` seconds per replica.
+3. If no replica qualifies, read from the primary.
+
+The session key lives in a ContextVar. API routes bind it to the user ID and
+AsyncDatabaseManager copies the context into its worker threads, so the
+manager sees it without threading user IDs through every method.
+"""
+
+import contextvars
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from backend.database.pool import ConnectionPool
+except ImportError:
+    from pool import ConnectionPool
+
+# Replication lag in seconds (0 on a primary or a fully caught-up replica)
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_session_key: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('db_session_key', default=None)
+
+
+def set_session_key(key: Optional[str]) -> None:
+    """Bind the current request/task to a session (user) for read-your-writes"""
+    _session_key.set(key)
+
+
+def get_session_key() -> Optional[str]:
+    return _session_key.get()
+
+
+def measure_replication_lag(pool: ConnectionPool) -> float:
+    """Query a replica for its replication lag in seconds"""
+    conn = pool.getconn()
+    discard = False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = float(cursor.fetchone()[0] or 0)
+        conn.rollback()
+        return lag
+    except Exception:
+        discard = True
+        raise
+    finally:
+        pool.putconn(conn, discard=discard)
+
+
+class _Replica:
+    """Routing state for one replica pool"""
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.lag: Optional[float] = None
+        self.checked_at = float('-inf')
+        self.down_until = 0.0
+        self.reads = 0
+        self.check_lock = threading.Lock()
+
+
+class ReplicaRouter:
+    """Chooses a replica pool (or None for the primary) for each read"""
+
+    def __init__(self, replicas: List[ConnectionPool], max_lag: float = 5.0,
+                 sticky_window: float = 5.0, lag_check_interval: float = 2.0,
+                 down_for: float = 10.0,
+                 measure_lag: Callable[[ConnectionPool], float] = measure_replication_lag,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            replicas: One connection pool per replica
+            max_lag: Replicas lagging more than this many seconds are skipped
+            sticky_window: Seconds after a session's write during which its reads use the primary
+            lag_check_interval: Minimum seconds between lag checks of a replica
+            down_for: Seconds a replica is skipped after a connection failure
+            measure_lag: Callable returning a replica pool's lag in seconds
+            clock: Monotonic time source (injectable for tests)
+        """
+        self._replicas = [_Replica(pool) for pool in replicas]
+        self.max_lag = max_lag
+        self.sticky_window = sticky_window
+        self.lag_check_interval = lag_check_interval
+        self.down_for = down_for
+        self._measure_lag = measure_lag
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._recent_writes: Dict[str, float] = {}   # session key -> sticky until
+        self._next = 0
+        self._stats = {'primary_reads': 0, 'replica_reads': 0, 'sticky_reads': 0, 'lagging_skips': 0}
+
+    # -------------------------------------------------------------------------
+    # Read-your-writes
+    # -------------------------------------------------------------------------
+
+    def record_write(self, key: Optional[str]) -> None:
+        """Pin `key`'s reads to the primary for the sticky window"""
+        if not key:
+            return
+        now = self._clock()
+        with self._lock:
+            self._recent_writes[key] = now + self.sticky_window
+            if len(self._recent_writes) > 10000:
+                self._recent_writes = {k: until for k, until in self._recent_writes.items() if until > now}
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            until = self._recent_writes.get(key)
+        return until is not None and until > self._clock()
+
+    # -------------------------------------------------------------------------
+    # Routing
+    # -------------------------------------------------------------------------
+
+    def pick(self, key: Optional[str] = None) -> Optional[ConnectionPool]:
+        """
+        Choose a replica for a read.
+
+        Returns:
+            A replica pool, or None if the read should go to the primary
+        """
+        if self.is_sticky(key):
+            self._count('sticky_reads')
+            self._count('primary_reads')
+            return None
+
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % max(len(self._replicas), 1)
+
+        now = self._clock()
+        for offset in range(len(self._replicas)):
+            replica = self._replicas[(start + offset) % len(self._replicas)]
+            if replica.down_until > now:
+                continue
+            if not self._lag_ok(replica, now):
+                self._count('lagging_skips')
+                continue
+            replica.reads += 1
+            self._count('replica_reads')
+            return replica.pool
+
+        self._count('primary_reads')
+        return None
+
+    def mark_down(self, pool: ConnectionPool) -> None:
+        """Skip a replica for a while after a connection failure"""
+        for replica in self._replicas:
+            if replica.pool is pool:
+                replica.down_until = self._clock() + self.down_for
+                print(f"⚠️ Replica {pool.name} unavailable - reading from primary for {self.down_for:.0f}s")
+
+    def _lag_ok(self, replica: _Replica, now: float) -> bool:
+        # Only one thread re-measures; the others use the last known lag
+        if now - replica.checked_at >= self.lag_check_interval and replica.check_lock.acquire(blocking=False):
+            try:
+                replica.lag = self._measure_lag(replica.pool)
+            except Exception as e:
+                print(f"⚠️ Replica {replica.pool.name} lag check failed: {e}")
+                replica.lag = None
+                replica.down_until = now + self.down_for
+            finally:
+                replica.checked_at = now
+                replica.check_lock.release()
+        return replica.lag is not None and replica.lag <= self.max_lag
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    # -------------------------------------------------------------------------
+    # Metrics / lifecycle
+    # -------------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        with self._lock:
+            counters = dict(self._stats)
+            sticky_sessions = sum(1 for until in self._recent_writes.values() if until > now)
+        return {
+            **counters,
+            'sticky_sessions': sticky_sessions,
+            'replicas': [
+                {
+                    'name': replica.pool.name,
+                    'lag_seconds': replica.lag,
+                    'available': replica.down_until <= now,
+                    'reads': replica.reads,
+                    'pool': replica.pool.stats(),
+                }
+                for replica in self._replicas
+            ],
+        }
+
+    def close(self) -> None:
+        for replica in self._replicas:
+            replica.pool.close()
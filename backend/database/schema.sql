@@ -1,6 +1,10 @@
 -- AstroVoice Database Schema
 -- PostgreSQL Database for Users and Astrologers
 -- Designed for scalability and future extensions
+--
+-- This file is migration version 1 (the baseline) of backend/database/migrator.py
+-- and must stay idempotent: it is re-applied to databases created from older
+-- copies of it. Put new schema changes in backend/database/migrations/.
 
 -- =============================================================================
 -- USERS TABLE
@@ -53,11 +57,11 @@ CREATE TABLE IF NOT EXISTS users (
     CONSTRAINT valid_email CHECK (email ~* '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$')
 );
 
-CREATE INDEX idx_users_email ON users(email);
-CREATE INDEX idx_users_phone ON users(phone_number);
-CREATE INDEX idx_users_subscription ON users(subscription_type);
-CREATE INDEX idx_users_created_at ON users(created_at);
-CREATE INDEX idx_users_metadata ON users USING GIN (metadata);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone_number);
+CREATE INDEX IF NOT EXISTS idx_users_subscription ON users(subscription_type);
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at);
+CREATE INDEX IF NOT EXISTS idx_users_metadata ON users USING GIN (metadata);
 
 -- =============================================================================
 -- ASTROLOGERS TABLE
@@ -116,11 +120,11 @@ CREATE TABLE IF NOT EXISTS astrologers (
     custom_fields JSONB DEFAULT '{}'::jsonb
 );
 
-CREATE INDEX idx_astrologers_specialization ON astrologers(specialization);
-CREATE INDEX idx_astrologers_rating ON astrologers(rating DESC);
-CREATE INDEX idx_astrologers_is_active ON astrologers(is_active);
-CREATE INDEX idx_astrologers_metadata ON astrologers USING GIN (metadata);
-CREATE INDEX idx_astrologers_custom_fields ON astrologers USING GIN (custom_fields);
+CREATE INDEX IF NOT EXISTS idx_astrologers_specialization ON astrologers(specialization);
+CREATE INDEX IF NOT EXISTS idx_astrologers_rating ON astrologers(rating DESC);
+CREATE INDEX IF NOT EXISTS idx_astrologers_is_active ON astrologers(is_active);
+CREATE INDEX IF NOT EXISTS idx_astrologers_metadata ON astrologers USING GIN (metadata);
+CREATE INDEX IF NOT EXISTS idx_astrologers_custom_fields ON astrologers USING GIN (custom_fields);
 
 -- =============================================================================
 -- CONVERSATIONS TABLE
@@ -161,18 +165,21 @@ CREATE TABLE IF NOT EXISTS conversations (
     CONSTRAINT fk_parent_conversation FOREIGN KEY (parent_conversation_id) REFERENCES conversations(conversation_id)
 );
 
-CREATE INDEX idx_conversations_user ON conversations(user_id);
-CREATE INDEX idx_conversations_astrologer ON conversations(astrologer_id);
-CREATE INDEX idx_conversations_started_at ON conversations(started_at DESC);
-CREATE INDEX idx_conversations_status ON conversations(status);
-CREATE INDEX idx_conversations_parent ON conversations(parent_conversation_id);
-CREATE INDEX idx_conversations_user_astrologer_started ON conversations(user_id, astrologer_id, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_user ON conversations(user_id);
+CREATE INDEX IF NOT EXISTS idx_conversations_astrologer ON conversations(astrologer_id);
+CREATE INDEX IF NOT EXISTS idx_conversations_started_at ON conversations(started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_status ON conversations(status);
+CREATE INDEX IF NOT EXISTS idx_conversations_parent ON conversations(parent_conversation_id);
+CREATE INDEX IF NOT EXISTS idx_conversations_user_astrologer_started ON conversations(user_id, astrologer_id, started_at DESC);
 
 -- =============================================================================
--- MESSAGES TABLE
+-- MESSAGES TABLE (range-partitioned by month on sent_at)
 -- =============================================================================
+-- Partitions are named messages_yYYYYmMM. Future partitions are created and
+-- old ones detached by backend/database/partitions.py (scripts/db_maintenance.py).
+-- Rows outside every monthly range land in messages_default.
 CREATE TABLE IF NOT EXISTS messages (
-    message_id VARCHAR(255) PRIMARY KEY,
+    message_id VARCHAR(255) NOT NULL,
     conversation_id VARCHAR(255) NOT NULL REFERENCES conversations(conversation_id) ON DELETE CASCADE,
     
     -- Message Details
@@ -191,19 +198,78 @@ CREATE TABLE IF NOT EXISTS messages (
     tokens_used INTEGER,
     
     -- Timestamps
-    sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     delivered_at TIMESTAMP,
     read_at TIMESTAMP,
     
     -- Metadata
     metadata JSONB DEFAULT '{}'::jsonb,
     
+    -- Full-text search (maintained by trg_messages_search_vector)
+    search_vector tsvector,
+    
+    -- The partition key must be part of the primary key
+    PRIMARY KEY (message_id, sent_at),
     CONSTRAINT fk_conversation FOREIGN KEY (conversation_id) REFERENCES conversations(conversation_id)
-);
+) PARTITION BY RANGE (sent_at);
+
+-- Default partition plus the current month and the next two. A database
+-- created before partitioning still has a plain messages table here; it is
+-- left as is and converted by migrations/0007_partition_messages.py.
+DO $$
+DECLARE
+    month_start DATE;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass('messages') AND relkind = 'p') THEN
+        RAISE NOTICE 'messages is not partitioned yet - migration 0007 converts it';
+        RETURN;
+    END IF;
+
+    CREATE TABLE IF NOT EXISTS messages_default PARTITION OF messages DEFAULT;
+    FOR i IN 0..2 LOOP
+        month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::date;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+            'messages_' || to_char(month_start, '"y"YYYY"m"MM'),
+            month_start,
+            (month_start + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+-- Indexes are declared on the parent and cascade to every partition
+CREATE INDEX IF NOT EXISTS idx_messages_sent_at ON messages(sent_at DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_sender_type ON messages(sender_type);
+-- The keyset pagination and full-text search indexes are built partition by
+-- partition without blocking writes by migrations/0002_message_indexes.py
+
+-- Full-text search over message content
+-- Messages mix English, Hinglish (romanised Hindi) and Devanagari. The vector
+-- holds both English stems (marriage -> marriag) and the unstemmed 'simple'
+-- lexemes, so "shaadi" and "शादी" match exactly while English words also
+-- match their inflections.
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION message_search_vector(body TEXT)
+RETURNS tsvector AS $$
+    SELECT to_tsvector('english', coalesce(body, '')) || to_tsvector('simple', coalesce(body, ''));
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION update_message_search_vector()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector = message_search_vector(NEW.content);
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
 
-CREATE INDEX idx_messages_conversation ON messages(conversation_id);
-CREATE INDEX idx_messages_sent_at ON messages(sent_at DESC);
-CREATE INDEX idx_messages_sender_type ON messages(sender_type);
+-- Row triggers on the parent are cloned onto every partition
+DROP TRIGGER IF EXISTS trg_messages_search_vector ON messages;
+CREATE TRIGGER trg_messages_search_vector BEFORE INSERT OR UPDATE OF content ON messages
+    FOR EACH ROW EXECUTE FUNCTION update_message_search_vector();
+
+-- btree_gin lets the search index (migration 0002) carry conversation_id
+CREATE EXTENSION IF NOT EXISTS btree_gin;
 
 -- =============================================================================
 -- USER_PROFILES TABLE (Astrology-specific data)
@@ -244,7 +310,7 @@ CREATE TABLE IF NOT EXISTS user_profiles (
     CONSTRAINT fk_user_profile FOREIGN KEY (user_id) REFERENCES users(user_id)
 );
 
-CREATE INDEX idx_user_profiles_user ON user_profiles(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_profiles_user ON user_profiles(user_id);
 
 -- =============================================================================
 -- READINGS TABLE (Consultation/Reading Records)
@@ -287,10 +353,10 @@ CREATE TABLE IF NOT EXISTS readings (
     CONSTRAINT valid_rating CHECK (user_rating >= 1 AND user_rating <= 5)
 );
 
-CREATE INDEX idx_readings_user ON readings(user_id);
-CREATE INDEX idx_readings_astrologer ON readings(astrologer_id);
-CREATE INDEX idx_readings_requested_at ON readings(requested_at DESC);
-CREATE INDEX idx_readings_topic ON readings(topic);
+CREATE INDEX IF NOT EXISTS idx_readings_user ON readings(user_id);
+CREATE INDEX IF NOT EXISTS idx_readings_astrologer ON readings(astrologer_id);
+CREATE INDEX IF NOT EXISTS idx_readings_requested_at ON readings(requested_at DESC);
+CREATE INDEX IF NOT EXISTS idx_readings_topic ON readings(topic);
 
 -- =============================================================================
 -- USER_SESSIONS TABLE (Track active sessions)
@@ -319,9 +385,9 @@ CREATE TABLE IF NOT EXISTS user_sessions (
     CONSTRAINT fk_session_user FOREIGN KEY (user_id) REFERENCES users(user_id)
 );
 
-CREATE INDEX idx_sessions_user ON user_sessions(user_id);
-CREATE INDEX idx_sessions_active ON user_sessions(is_active);
-CREATE INDEX idx_sessions_started_at ON user_sessions(started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_sessions_user ON user_sessions(user_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_active ON user_sessions(is_active);
+CREATE INDEX IF NOT EXISTS idx_sessions_started_at ON user_sessions(started_at DESC);
 
 -- =============================================================================
 -- TRIGGERS (Auto-update timestamps)
@@ -334,15 +400,350 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
+DROP TRIGGER IF EXISTS update_users_updated_at ON users;
 CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON users
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+DROP TRIGGER IF EXISTS update_astrologers_updated_at ON astrologers;
 CREATE TRIGGER update_astrologers_updated_at BEFORE UPDATE ON astrologers
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+DROP TRIGGER IF EXISTS update_user_profiles_updated_at ON user_profiles;
 CREATE TRIGGER update_user_profiles_updated_at BEFORE UPDATE ON user_profiles
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- =============================================================================
+-- STATISTICS TABLES (incrementally maintained)
+-- =============================================================================
+-- One row per user / astrologer, kept current by the triggers below on
+-- conversation, reading and review changes. Message counts follow
+-- conversations.total_messages, so a chat turn costs one small upsert on the
+-- user's row rather than a trigger per message.
+-- Every session start touches its astrologer's statistics, so astrologer
+-- counters are spread over slots (one row per astrologer and slot, chosen by
+-- backend pid): concurrent sessions with the same astrologer update different
+-- rows instead of queueing on one row lock. Read them through
+-- astrologer_statistics_totals.
+-- StatisticsReconciler (scripts/db_maintenance.py stats reconcile) recomputes
+-- them from the base tables to repair any drift.
+CREATE TABLE IF NOT EXISTS user_statistics (
+    user_id VARCHAR(255) PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    total_conversations BIGINT NOT NULL DEFAULT 0,
+    total_messages BIGINT NOT NULL DEFAULT 0,
+    total_readings BIGINT NOT NULL DEFAULT 0,
+    total_reviews BIGINT NOT NULL DEFAULT 0,
+    total_session_seconds BIGINT NOT NULL DEFAULT 0,
+    last_activity TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS astrologer_statistics (
+    astrologer_id VARCHAR(255) NOT NULL REFERENCES astrologers(astrologer_id) ON DELETE CASCADE,
+    slot SMALLINT NOT NULL DEFAULT 0,
+    total_conversations BIGINT NOT NULL DEFAULT 0,
+    active_conversations BIGINT NOT NULL DEFAULT 0,
+    total_readings BIGINT NOT NULL DEFAULT 0,
+    rated_readings BIGINT NOT NULL DEFAULT 0,
+    reading_rating_sum BIGINT NOT NULL DEFAULT 0,
+    total_reviews BIGINT NOT NULL DEFAULT 0,
+    review_rating_sum BIGINT NOT NULL DEFAULT 0,
+    total_session_seconds BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (astrologer_id, slot)
+);
+
+CREATE OR REPLACE VIEW astrologer_statistics_totals AS
+SELECT
+    astrologer_id,
+    SUM(total_conversations)::bigint as total_conversations,
+    SUM(active_conversations)::bigint as active_conversations,
+    SUM(total_readings)::bigint as total_readings,
+    SUM(rated_readings)::bigint as rated_readings,
+    SUM(reading_rating_sum)::bigint as reading_rating_sum,
+    SUM(total_reviews)::bigint as total_reviews,
+    SUM(review_rating_sum)::bigint as review_rating_sum,
+    SUM(total_session_seconds)::bigint as total_session_seconds
+FROM astrologer_statistics
+GROUP BY astrologer_id;
+
+CREATE OR REPLACE FUNCTION bump_user_statistics(
+    p_user_id VARCHAR, d_conversations BIGINT, d_messages BIGINT, d_readings BIGINT,
+    d_reviews BIGINT, d_session_seconds BIGINT, p_activity TIMESTAMP
+) RETURNS void AS $$
+    INSERT INTO user_statistics AS s (
+        user_id, total_conversations, total_messages, total_readings,
+        total_reviews, total_session_seconds, last_activity
+    ) VALUES (p_user_id, d_conversations, d_messages, d_readings, d_reviews, d_session_seconds, p_activity)
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_conversations = s.total_conversations + EXCLUDED.total_conversations,
+        total_messages = s.total_messages + EXCLUDED.total_messages,
+        total_readings = s.total_readings + EXCLUDED.total_readings,
+        total_reviews = s.total_reviews + EXCLUDED.total_reviews,
+        total_session_seconds = s.total_session_seconds + EXCLUDED.total_session_seconds,
+        last_activity = GREATEST(s.last_activity, EXCLUDED.last_activity),
+        updated_at = CURRENT_TIMESTAMP;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION bump_astrologer_statistics(
+    p_astrologer_id VARCHAR, d_conversations BIGINT, d_active BIGINT, d_readings BIGINT,
+    d_rated_readings BIGINT, d_reading_rating_sum BIGINT, d_reviews BIGINT,
+    d_review_rating_sum BIGINT, d_session_seconds BIGINT
+) RETURNS void AS $$
+    INSERT INTO astrologer_statistics AS s (
+        astrologer_id, slot, total_conversations, active_conversations, total_readings, rated_readings,
+        reading_rating_sum, total_reviews, review_rating_sum, total_session_seconds
+    ) VALUES (p_astrologer_id, pg_backend_pid() % 16, d_conversations, d_active, d_readings, d_rated_readings,
+              d_reading_rating_sum, d_reviews, d_review_rating_sum, d_session_seconds)
+    ON CONFLICT (astrologer_id, slot) DO UPDATE SET
+        total_conversations = s.total_conversations + EXCLUDED.total_conversations,
+        active_conversations = s.active_conversations + EXCLUDED.active_conversations,
+        total_readings = s.total_readings + EXCLUDED.total_readings,
+        rated_readings = s.rated_readings + EXCLUDED.rated_readings,
+        reading_rating_sum = s.reading_rating_sum + EXCLUDED.reading_rating_sum,
+        total_reviews = s.total_reviews + EXCLUDED.total_reviews,
+        review_rating_sum = s.review_rating_sum + EXCLUDED.review_rating_sum,
+        total_session_seconds = s.total_session_seconds + EXCLUDED.total_session_seconds,
+        updated_at = CURRENT_TIMESTAMP;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION conversations_statistics_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    d_active BIGINT;
+    d_messages BIGINT;
+    d_seconds BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_user_statistics(NEW.user_id, 1, COALESCE(NEW.total_messages, 0), 0, 0,
+                                     COALESCE(NEW.total_duration_seconds, 0),
+                                     COALESCE(NEW.last_message_at, NEW.started_at));
+        PERFORM bump_astrologer_statistics(NEW.astrologer_id, 1, COALESCE(NEW.status = 'active', false)::int,
+                                           0, 0, 0, 0, 0, COALESCE(NEW.total_duration_seconds, 0));
+    ELSIF TG_OP = 'UPDATE' THEN
+        d_messages := COALESCE(NEW.total_messages, 0) - COALESCE(OLD.total_messages, 0);
+        d_seconds := COALESCE(NEW.total_duration_seconds, 0) - COALESCE(OLD.total_duration_seconds, 0);
+        d_active := COALESCE(NEW.status = 'active', false)::int - COALESCE(OLD.status = 'active', false)::int;
+        IF d_messages <> 0 OR d_seconds <> 0 OR NEW.last_message_at IS DISTINCT FROM OLD.last_message_at THEN
+            PERFORM bump_user_statistics(NEW.user_id, 0, d_messages, 0, 0, d_seconds, NEW.last_message_at);
+        END IF;
+        IF d_active <> 0 OR d_seconds <> 0 THEN
+            PERFORM bump_astrologer_statistics(NEW.astrologer_id, 0, d_active, 0, 0, 0, 0, 0, d_seconds);
+        END IF;
+    ELSE
+        PERFORM bump_user_statistics(OLD.user_id, -1, -COALESCE(OLD.total_messages, 0), 0, 0,
+                                     -COALESCE(OLD.total_duration_seconds, 0), NULL);
+        PERFORM bump_astrologer_statistics(OLD.astrologer_id, -1, -COALESCE(OLD.status = 'active', false)::int,
+                                           0, 0, 0, 0, 0, -COALESCE(OLD.total_duration_seconds, 0));
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION readings_statistics_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_user_statistics(OLD.user_id, 0, 0, -1, 0, 0, NULL);
+        PERFORM bump_astrologer_statistics(OLD.astrologer_id, 0, 0, -1, -(OLD.user_rating IS NOT NULL)::int,
+                                           -COALESCE(OLD.user_rating, 0), 0, 0, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_user_statistics(NEW.user_id, 0, 0, 1, 0, 0, NULL);
+        PERFORM bump_astrologer_statistics(NEW.astrologer_id, 0, 0, 1, (NEW.user_rating IS NOT NULL)::int,
+                                           COALESCE(NEW.user_rating, 0), 0, 0, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS trg_conversations_statistics ON conversations;
+CREATE TRIGGER trg_conversations_statistics
+    AFTER INSERT OR DELETE OR UPDATE OF status, total_messages, last_message_at, total_duration_seconds
+    ON conversations
+    FOR EACH ROW EXECUTE FUNCTION conversations_statistics_trigger();
+
+DROP TRIGGER IF EXISTS trg_readings_statistics ON readings;
+CREATE TRIGGER trg_readings_statistics
+    AFTER INSERT OR DELETE OR UPDATE OF user_rating ON readings
+    FOR EACH ROW EXECUTE FUNCTION readings_statistics_trigger();
+
+-- =============================================================================
+-- CHAT LIST READ MODEL (user_astrologer_threads)
+-- =============================================================================
+-- One row per user/astrologer pair backing the app's chat list, so the list is
+-- a single range scan of idx_threads_user_activity with no join or DISTINCT ON.
+-- Message inserts update it through a statement-level trigger (one upsert per
+-- pair per INSERT statement, so a write-behind batch costs one pass); the
+-- conversation and astrologer triggers keep status and display fields current.
+-- Sending a message marks the thread read up to that message; unread_count
+-- counts astrologer messages after last_read_at.
+-- The shown conversation is the one with the latest message from either side;
+-- its preview is the user's latest message there, as the chat list showed
+-- before (conversations.last_message_preview).
+-- ThreadRebuilder (scripts/db_maintenance.py threads rebuild) backfills it.
+CREATE TABLE IF NOT EXISTS user_astrologer_threads (
+    user_id VARCHAR(255) NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    astrologer_id VARCHAR(255) NOT NULL REFERENCES astrologers(astrologer_id) ON DELETE CASCADE,
+
+    -- Conversation shown for the pair (the one with the latest message)
+    conversation_id VARCHAR(255),
+    conversation_started_at TIMESTAMP,
+    status VARCHAR(50),
+
+    -- Denormalized astrologer display fields
+    astrologer_name VARCHAR(255),
+    astrologer_image TEXT,
+
+    -- Latest message (the preview is the user's latest message)
+    last_message_preview VARCHAR(200),
+    last_message_at TIMESTAMP,
+    last_sender_type VARCHAR(20),
+    last_activity_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    -- Counters
+    total_messages BIGINT NOT NULL DEFAULT 0,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    last_read_at TIMESTAMP,
+
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, astrologer_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_threads_user_activity ON user_astrologer_threads(user_id, last_activity_at DESC);
+CREATE INDEX IF NOT EXISTS idx_threads_astrologer ON user_astrologer_threads(astrologer_id);
+
+CREATE OR REPLACE FUNCTION messages_threads_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH batch AS (
+        SELECT c.user_id, c.astrologer_id, c.started_at, c.status,
+               n.conversation_id, n.message_id, n.sender_type, n.content, n.sent_at
+        FROM new_messages n
+        JOIN conversations c ON c.conversation_id = n.conversation_id
+    ), latest AS (
+        SELECT DISTINCT ON (user_id, astrologer_id) *
+        FROM batch
+        ORDER BY user_id, astrologer_id, sent_at DESC, message_id DESC
+    ), asked AS (
+        SELECT DISTINCT ON (user_id, astrologer_id) user_id, astrologer_id, conversation_id, content
+        FROM batch WHERE sender_type = 'user'
+        ORDER BY user_id, astrologer_id, sent_at DESC, message_id DESC
+    ), reads AS (
+        SELECT user_id, astrologer_id, MAX(sent_at) AS read_at
+        FROM batch WHERE sender_type = 'user'
+        GROUP BY user_id, astrologer_id
+    ), counts AS (
+        SELECT b.user_id, b.astrologer_id, r.read_at,
+               COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE b.sender_type = 'astrologer'
+                                  AND (r.read_at IS NULL OR b.sent_at > r.read_at)) AS unread
+        FROM batch b
+        LEFT JOIN reads r ON r.user_id = b.user_id AND r.astrologer_id = b.astrologer_id
+        GROUP BY b.user_id, b.astrologer_id, r.read_at
+    )
+    INSERT INTO user_astrologer_threads AS t (
+        user_id, astrologer_id, conversation_id, conversation_started_at, status,
+        astrologer_name, astrologer_image, last_message_preview, last_message_at,
+        last_sender_type, last_activity_at, total_messages, unread_count, last_read_at
+    )
+    SELECT l.user_id, l.astrologer_id, l.conversation_id, l.started_at, l.status,
+           a.display_name, a.profile_picture_url, LEFT(q.content, 200), l.sent_at,
+           l.sender_type, l.sent_at, n.total, n.unread, n.read_at
+    FROM latest l
+    JOIN counts n ON n.user_id = l.user_id AND n.astrologer_id = l.astrologer_id
+    LEFT JOIN asked q ON q.user_id = l.user_id AND q.astrologer_id = l.astrologer_id
+                     AND q.conversation_id = l.conversation_id
+    JOIN astrologers a ON a.astrologer_id = l.astrologer_id
+    ORDER BY l.user_id, l.astrologer_id
+    ON CONFLICT (user_id, astrologer_id) DO UPDATE SET
+        conversation_id = CASE WHEN t.last_message_at IS NULL OR EXCLUDED.last_message_at >= t.last_message_at
+                               THEN EXCLUDED.conversation_id ELSE t.conversation_id END,
+        conversation_started_at = CASE WHEN t.last_message_at IS NULL OR EXCLUDED.last_message_at >= t.last_message_at
+                                       THEN EXCLUDED.conversation_started_at ELSE t.conversation_started_at END,
+        status = CASE WHEN t.last_message_at IS NULL OR EXCLUDED.last_message_at >= t.last_message_at
+                      THEN EXCLUDED.status ELSE t.status END,
+        -- The user's latest message in the shown conversation (kept when the batch has none)
+        last_message_preview = CASE WHEN t.last_message_at IS NULL OR EXCLUDED.last_message_at >= t.last_message_at
+                                    THEN CASE WHEN EXCLUDED.conversation_id = t.conversation_id
+                                              THEN COALESCE(EXCLUDED.last_message_preview, t.last_message_preview)
+                                              ELSE EXCLUDED.last_message_preview END
+                                    ELSE t.last_message_preview END,
+        last_sender_type = CASE WHEN t.last_message_at IS NULL OR EXCLUDED.last_message_at >= t.last_message_at
+                                THEN EXCLUDED.last_sender_type ELSE t.last_sender_type END,
+        last_message_at = GREATEST(t.last_message_at, EXCLUDED.last_message_at),
+        last_activity_at = GREATEST(t.last_activity_at, EXCLUDED.last_activity_at),
+        total_messages = t.total_messages + EXCLUDED.total_messages,
+        -- A user message in the batch resets the count to the replies after it
+        unread_count = CASE WHEN EXCLUDED.last_read_at IS NOT NULL THEN EXCLUDED.unread_count
+                            ELSE t.unread_count + EXCLUDED.unread_count END,
+        last_read_at = GREATEST(t.last_read_at, EXCLUDED.last_read_at),
+        updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION conversations_threads_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        -- A new conversation moves the pair to the top; it becomes the shown
+        -- conversation once it has the latest message
+        INSERT INTO user_astrologer_threads AS t (
+            user_id, astrologer_id, conversation_id, conversation_started_at, status,
+            astrologer_name, astrologer_image, last_activity_at
+        )
+        SELECT NEW.user_id, NEW.astrologer_id, NEW.conversation_id, NEW.started_at, NEW.status,
+               a.display_name, a.profile_picture_url, COALESCE(NEW.started_at, CURRENT_TIMESTAMP)
+        FROM astrologers a WHERE a.astrologer_id = NEW.astrologer_id
+        ON CONFLICT (user_id, astrologer_id) DO UPDATE SET
+            conversation_id = CASE WHEN t.last_message_at IS NULL
+                                   THEN EXCLUDED.conversation_id ELSE t.conversation_id END,
+            conversation_started_at = CASE WHEN t.last_message_at IS NULL
+                                           THEN EXCLUDED.conversation_started_at ELSE t.conversation_started_at END,
+            status = CASE WHEN t.last_message_at IS NULL THEN EXCLUDED.status ELSE t.status END,
+            last_activity_at = GREATEST(t.last_activity_at, EXCLUDED.last_activity_at),
+            updated_at = CURRENT_TIMESTAMP;
+    ELSE
+        UPDATE user_astrologer_threads SET status = NEW.status, updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = NEW.user_id AND astrologer_id = NEW.astrologer_id
+          AND conversation_id = NEW.conversation_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION astrologers_threads_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE user_astrologer_threads SET
+        astrologer_name = NEW.display_name,
+        astrologer_image = NEW.profile_picture_url
+    WHERE astrologer_id = NEW.astrologer_id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Statement trigger with a transition table on the partitioned parent: fires
+-- once per INSERT statement, including the multi-row write-behind flush
+DROP TRIGGER IF EXISTS trg_messages_threads ON messages;
+CREATE TRIGGER trg_messages_threads
+    AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_messages
+    FOR EACH STATEMENT EXECUTE FUNCTION messages_threads_trigger();
+
+DROP TRIGGER IF EXISTS trg_conversations_threads ON conversations;
+CREATE TRIGGER trg_conversations_threads
+    AFTER INSERT OR UPDATE OF status ON conversations
+    FOR EACH ROW EXECUTE FUNCTION conversations_threads_trigger();
+
+DROP TRIGGER IF EXISTS trg_astrologers_threads ON astrologers;
+CREATE TRIGGER trg_astrologers_threads
+    AFTER UPDATE OF display_name, profile_picture_url ON astrologers
+    FOR EACH ROW
+    WHEN (OLD.display_name IS DISTINCT FROM NEW.display_name
+          OR OLD.profile_picture_url IS DISTINCT FROM NEW.profile_picture_url)
+    EXECUTE FUNCTION astrologers_threads_trigger();
+
 -- =============================================================================
 -- VIEWS (Convenient queries)
 -- =============================================================================
@@ -365,36 +766,32 @@ JOIN astrologers a ON c.astrologer_id = a.astrologer_id
 WHERE c.status = 'active'
 ORDER BY c.last_message_at DESC;
 
--- Astrologer Statistics View
+-- Astrologer Statistics View (reads the maintained statistics slots)
 CREATE OR REPLACE VIEW astrologer_stats AS
 SELECT 
     a.astrologer_id,
     a.display_name,
     a.rating,
     a.total_consultations,
-    COUNT(DISTINCT c.conversation_id) as active_conversations,
-    COUNT(DISTINCT r.reading_id) as total_readings,
-    AVG(r.user_rating) as average_user_rating
+    COALESCE(s.active_conversations, 0)::bigint as active_conversations,
+    COALESCE(s.total_readings, 0)::bigint as total_readings,
+    CASE WHEN s.rated_readings > 0 THEN s.reading_rating_sum::numeric / s.rated_readings END as average_user_rating
 FROM astrologers a
-LEFT JOIN conversations c ON a.astrologer_id = c.astrologer_id AND c.status = 'active'
-LEFT JOIN readings r ON a.astrologer_id = r.astrologer_id
-GROUP BY a.astrologer_id, a.display_name, a.rating, a.total_consultations;
+LEFT JOIN astrologer_statistics_totals s ON s.astrologer_id = a.astrologer_id;
 
--- User Activity View
+-- User Activity View (reads the maintained statistics row)
 CREATE OR REPLACE VIEW user_activity AS
 SELECT 
     u.user_id,
     u.display_name,
     u.email,
     u.subscription_type,
-    COUNT(DISTINCT c.conversation_id) as total_conversations,
-    COUNT(DISTINCT r.reading_id) as total_readings,
-    MAX(c.last_message_at) as last_activity,
+    COALESCE(s.total_conversations, 0)::bigint as total_conversations,
+    COALESCE(s.total_readings, 0)::bigint as total_readings,
+    s.last_activity,
     u.created_at as joined_at
 FROM users u
-LEFT JOIN conversations c ON u.user_id = c.user_id
-LEFT JOIN readings r ON u.user_id = r.user_id
-GROUP BY u.user_id, u.display_name, u.email, u.subscription_type, u.created_at;
+LEFT JOIN user_statistics s ON s.user_id = u.user_id;
 
 -- =============================================================================
 -- SAMPLE DATA
@@ -428,7 +825,8 @@ INSERT INTO astrologers (
  30, 'mystical_sage', 'spiritual', 'authoritative',
  'You are Cosmic Sage, a deeply spiritual and learned astrologer. Share wisdom with authority and grace.',
  'ॐ। मैं Cosmic Sage हूं। आपके जीवन के रहस्यों को समझने में मैं आपकी सहायता करूंगा।',
- true, false);
+ true, false)
+ON CONFLICT (astrologer_id) DO NOTHING;
 
 -- =============================================================================
 -- WALLETS TABLE (User wallet for consultations)
@@ -444,8 +842,8 @@ CREATE TABLE IF NOT EXISTS wallets (
     CONSTRAINT fk_wallet_user FOREIGN KEY (user_id) REFERENCES users(user_id)
 );
 
-CREATE INDEX idx_wallets_user ON wallets(user_id);
-CREATE INDEX idx_wallets_balance ON wallets(balance);
+CREATE INDEX IF NOT EXISTS idx_wallets_user ON wallets(user_id);
+CREATE INDEX IF NOT EXISTS idx_wallets_balance ON wallets(balance);
 
 -- =============================================================================
 -- TRANSACTIONS TABLE (Wallet transaction history)
@@ -481,11 +879,11 @@ CREATE TABLE IF NOT EXISTS transactions (
     CONSTRAINT fk_transaction_wallet FOREIGN KEY (wallet_id) REFERENCES wallets(wallet_id)
 );
 
-CREATE INDEX idx_transactions_user ON transactions(user_id);
-CREATE INDEX idx_transactions_wallet ON transactions(wallet_id);
-CREATE INDEX idx_transactions_created_at ON transactions(created_at DESC);
-CREATE INDEX idx_transactions_type ON transactions(transaction_type);
-CREATE INDEX idx_transactions_status ON transactions(payment_status);
+CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_wallet ON transactions(wallet_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_created_at ON transactions(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(transaction_type);
+CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions(payment_status);
 
 -- =============================================================================
 -- OTP_VERIFICATIONS TABLE (Phone number verification)
@@ -521,13 +919,13 @@ CREATE TABLE IF NOT EXISTS otp_verifications (
     CONSTRAINT valid_customer_id CHECK (message_central_customer_id ~ '^C-[A-F0-9]+$')
 );
 
-CREATE INDEX idx_otp_phone ON otp_verifications(phone_number);
-CREATE INDEX idx_otp_status ON otp_verifications(status);
-CREATE INDEX idx_otp_created_at ON otp_verifications(created_at DESC);
-CREATE INDEX idx_otp_expires_at ON otp_verifications(expires_at);
-CREATE INDEX idx_otp_user_id ON otp_verifications(user_id);
-CREATE INDEX idx_otp_customer_id ON otp_verifications(message_central_customer_id);
-CREATE INDEX idx_otp_mc_verification_id ON otp_verifications(message_central_verification_id);
+CREATE INDEX IF NOT EXISTS idx_otp_phone ON otp_verifications(phone_number);
+CREATE INDEX IF NOT EXISTS idx_otp_status ON otp_verifications(status);
+CREATE INDEX IF NOT EXISTS idx_otp_created_at ON otp_verifications(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_otp_expires_at ON otp_verifications(expires_at);
+CREATE INDEX IF NOT EXISTS idx_otp_user_id ON otp_verifications(user_id);
+CREATE INDEX IF NOT EXISTS idx_otp_customer_id ON otp_verifications(message_central_customer_id);
+CREATE INDEX IF NOT EXISTS idx_otp_mc_verification_id ON otp_verifications(message_central_verification_id);
 
 -- =============================================================================
 -- SESSION_REVIEWS TABLE (Chat session reviews and ratings)
@@ -554,15 +952,36 @@ CREATE TABLE IF NOT EXISTS session_reviews (
     CONSTRAINT fk_review_conversation FOREIGN KEY (conversation_id) REFERENCES conversations(conversation_id)
 );
 
-CREATE INDEX idx_session_reviews_user ON session_reviews(user_id);
-CREATE INDEX idx_session_reviews_astrologer ON session_reviews(astrologer_id);
-CREATE INDEX idx_session_reviews_conversation ON session_reviews(conversation_id);
-CREATE INDEX idx_session_reviews_rating ON session_reviews(rating);
-CREATE INDEX idx_session_reviews_created_at ON session_reviews(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_session_reviews_user ON session_reviews(user_id);
+CREATE INDEX IF NOT EXISTS idx_session_reviews_astrologer ON session_reviews(astrologer_id);
+CREATE INDEX IF NOT EXISTS idx_session_reviews_conversation ON session_reviews(conversation_id);
+CREATE INDEX IF NOT EXISTS idx_session_reviews_rating ON session_reviews(rating);
+CREATE INDEX IF NOT EXISTS idx_session_reviews_created_at ON session_reviews(created_at DESC);
+
+CREATE OR REPLACE FUNCTION session_reviews_statistics_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_user_statistics(OLD.user_id, 0, 0, 0, -1, 0, NULL);
+        PERFORM bump_astrologer_statistics(OLD.astrologer_id, 0, 0, 0, 0, 0, -1, -OLD.rating, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_user_statistics(NEW.user_id, 0, 0, 0, 1, 0, NULL);
+        PERFORM bump_astrologer_statistics(NEW.astrologer_id, 0, 0, 0, 0, 0, 1, NEW.rating, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS trg_session_reviews_statistics ON session_reviews;
+CREATE TRIGGER trg_session_reviews_statistics
+    AFTER INSERT OR DELETE OR UPDATE OF rating ON session_reviews
+    FOR EACH ROW EXECUTE FUNCTION session_reviews_statistics_trigger();
 
 -- =============================================================================
 -- TRIGGERS (Auto-update timestamps for new tables)
 -- =============================================================================
+DROP TRIGGER IF EXISTS update_wallets_updated_at ON wallets;
 CREATE TRIGGER update_wallets_updated_at BEFORE UPDATE ON wallets
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
@@ -608,6 +1027,29 @@ ADD COLUMN IF NOT EXISTS astrologer_name VARCHAR(255);
 CREATE INDEX IF NOT EXISTS idx_transactions_purchase_token ON transactions(google_play_purchase_token);
 CREATE INDEX IF NOT EXISTS idx_transactions_platform ON transactions(platform);
 
+-- The unique index on google_play_purchase_token is built without locking by
+-- migrations/0003_purchase_token_unique.sql
+
+-- =============================================================================
+-- IDEMPOTENCY_KEYS TABLE (Replay of retried wallet/purchase requests)
+-- =============================================================================
+-- Written by backend/database/idempotency.py. A row is claimed (in_progress)
+-- before the request runs and holds the response once it completes.
+-- Expired rows are removed by scripts/db_maintenance.py idempotency purge.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope VARCHAR(100) NOT NULL, -- endpoint, e.g. verify_purchase, deduct_session
+    idempotency_key VARCHAR(255) NOT NULL,
+    request_fingerprint CHAR(64) NOT NULL, -- sha256 of the request body
+    status VARCHAR(20) NOT NULL DEFAULT 'in_progress', -- in_progress, completed
+    response JSONB,
+    locked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (scope, idempotency_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at);
+
 -- =============================================================================
 -- RECHARGE_PRODUCTS TABLE (Product catalog with bonus structure)
 -- =============================================================================
@@ -626,9 +1068,9 @@ CREATE TABLE IF NOT EXISTS recharge_products (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_recharge_products_platform ON recharge_products(platform);
-CREATE INDEX idx_recharge_products_active ON recharge_products(is_active);
-CREATE INDEX idx_recharge_products_sort ON recharge_products(sort_order);
+CREATE INDEX IF NOT EXISTS idx_recharge_products_platform ON recharge_products(platform);
+CREATE INDEX IF NOT EXISTS idx_recharge_products_active ON recharge_products(is_active);
+CREATE INDEX IF NOT EXISTS idx_recharge_products_sort ON recharge_products(sort_order);
 
 -- Insert initial products for Android (based on screenshots)
 INSERT INTO recharge_products (product_id, platform, amount, bonus_percentage, bonus_amount, total_amount, display_name, is_most_popular, sort_order, is_active) 
@@ -655,10 +1097,11 @@ CREATE TABLE IF NOT EXISTS first_recharge_bonuses (
     CONSTRAINT fk_bonus_transaction FOREIGN KEY (transaction_id) REFERENCES transactions(transaction_id)
 );
 
-CREATE INDEX idx_first_recharge_user ON first_recharge_bonuses(user_id);
-CREATE INDEX idx_first_recharge_claimed ON first_recharge_bonuses(claimed_at);
+CREATE INDEX IF NOT EXISTS idx_first_recharge_user ON first_recharge_bonuses(user_id);
+CREATE INDEX IF NOT EXISTS idx_first_recharge_claimed ON first_recharge_bonuses(claimed_at);
 
 -- Trigger for recharge_products table
+DROP TRIGGER IF EXISTS update_recharge_products_updated_at ON recharge_products;
 CREATE TRIGGER update_recharge_products_updated_at BEFORE UPDATE ON recharge_products
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
@@ -0,0 +1,623 @@
+"""
+User Sharding for AstroVoice
+Spreads users across several PostgreSQL instances by consistent hashing on user_id
+
+Every per-user table (users, wallets, conversations, messages, transactions,
+readings, reviews and their read models) lives on the shard that owns the
+user, so a user's requests touch exactly one instance and write throughput
+grows with the number of shards.
+
+ShardedDatabaseManager has the DatabaseManager method surface:
+- Methods taking a user_id (or a wallet_id, which embeds it) go to the
+  owner's shard.
+- Methods taking a conversation_id go to the shard holding the conversation.
+  Conversation IDs do not carry the user, so the shard is found once by
+  probing and then remembered (conversations never move while running).
+- The catalog (astrologers, recharge products) is replicated on every shard:
+  reads are served by the catalog shard, writes are applied to all shards.
+- A few queries are global by nature (an astrologer's reviews and stats,
+  purchase token lookups) and fan out to every shard.
+- Ad-hoc SQL via get_connection() runs on the catalog shard, which also
+  holds the non-user tables (OTPs, idempotency keys). Use connection_for()
+  for SQL on a user's tables.
+
+Resharding (adding or removing shards) moves only the users whose ring
+position changes, with Resharder:
+1. plan     - count the users that would move between shards
+2. copy     - bulk copy moved users to their new shard while live
+              (rows already there are kept)
+3. sync     - with writes paused: upsert moved users again (the old shard
+              is authoritative), then switch DB_SHARDS and restart
+4. cleanup  - delete moved users from their old shards
+Shards dropped from the layout are emptied by copy/sync and then retired.
+Rows are copied with session_replication_role = replica, so triggers do not
+re-count them; the role needs permission to set it (rds_superuser on RDS).
+"""
+
+import bisect
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from psycopg2.extras import Json, execute_values
+except ImportError:
+    Json = execute_values = None
+
+try:
+    from backend.database.manager import DatabaseManager
+    from backend.database.statistics import StatisticsReconciler
+except ImportError:
+    from manager import DatabaseManager
+    from statistics import StatisticsReconciler
+
+# Routing tables: method name -> argument holding the routing key
+# (a (argument, field) pair means the key is a field of a dict argument)
+_BY_USER = {
+    'create_user': ('user_data', 'user_id'),
+    'get_user': 'user_id',
+    'update_user_birth_info': 'user_id',
+    'create_conversation': 'user_id',
+    'get_user_conversations': 'user_id',
+    'mark_thread_read': 'user_id',
+    'get_unified_chat_history': 'user_id',
+    'search_messages': 'user_id',
+    'create_unified_conversation': 'user_id',
+    'create_reading': ('reading_data', 'user_id'),
+    'create_wallet': 'user_id',
+    'get_wallet': 'user_id',
+    'debit_wallet': 'user_id',
+    'get_user_transactions': 'user_id',
+    'has_first_recharge_bonus': 'user_id',
+    'create_google_play_transaction': 'user_id',
+    'get_filtered_transactions': 'user_id',
+    'get_user_stats': 'user_id',
+}
+
+_BY_WALLET = {
+    'update_wallet_balance': 'wallet_id',
+    'add_transaction': ('transaction_data', 'wallet_id'),
+}
+
+_BY_CONVERSATION = {
+    'add_message', 'record_turn', 'queue_turn', 'update_conversation_last_message',
+    'get_conversation', 'update_conversation_activity', 'pause_conversation_session',
+    'resume_conversation_session', 'end_conversation_session', 'get_conversation_session_status',
+    'get_conversation_history', 'get_conversation_history_page', 'update_conversation_end',
+}
+
+_CATALOG_READS = {'get_astrologer', 'get_all_astrologers', 'get_recharge_products', 'get_product_by_id'}
+
+_SIGNATURES: Dict[str, inspect.Signature] = {}
+
+# Methods without I/O
+_PASSTHROUGH = {
+    'generate_user_id', 'generate_conversation_id', 'generate_message_id',
+    'generate_transaction_id', 'generate_wallet_id',
+}
+
+# Tables holding a user's data, in insert order:
+# (table, rows of the batch's users, conflict key, columns left to the target's defaults)
+MESSAGES_OF_USERS = "conversation_id IN (SELECT conversation_id FROM conversations WHERE user_id = ANY(%s))"
+USER_TABLES = [
+    ('users', "user_id = ANY(%s)", ('user_id',), ()),
+    ('user_profiles', "user_id = ANY(%s)", ('user_id',), ('profile_id',)),
+    ('user_sessions', "user_id = ANY(%s)", ('session_id',), ()),
+    ('wallets', "user_id = ANY(%s)", ('wallet_id',), ()),
+    ('conversations', "user_id = ANY(%s)", ('conversation_id',), ()),
+    ('messages', MESSAGES_OF_USERS, ('message_id', 'sent_at'), ()),
+    ('transactions', "user_id = ANY(%s)", ('transaction_id',), ()),
+    ('readings', "user_id = ANY(%s)", ('reading_id',), ()),
+    ('session_reviews', "user_id = ANY(%s)", ('review_id',), ()),
+    ('first_recharge_bonuses', "user_id = ANY(%s)", ('bonus_id',), ()),
+    ('user_statistics', "user_id = ANY(%s)", ('user_id',), ()),
+    ('user_astrologer_threads', "user_id = ANY(%s)", ('user_id', 'astrologer_id'), ()),
+]
+
+# Replicated catalog: (table, conflict key)
+CATALOG_TABLES = [
+    ('astrologers', ('astrologer_id',)),
+    ('recharge_products', ('product_id',)),
+]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring. Each shard owns `vnodes` points; a key belongs to
+    the first point clockwise from its hash. Adding a shard moves only ~1/N
+    of the keys, all of them to the new shard.
+    """
+
+    def __init__(self, shards: List[str], vnodes: int = 128):
+        if not shards:
+            raise ValueError("HashRing needs at least one shard")
+        if len(set(shards)) != len(shards):
+            raise ValueError(f"Duplicate shard names: {shards}")
+        self.shards = list(shards)
+        self.vnodes = vnodes
+        points = sorted((_hash(f"{shard}#{i}"), shard) for shard in shards for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> str:
+        """Name of the shard owning `key`"""
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class ShardedDatabaseManager:
+    """DatabaseManager facade routing each call to the shard that owns its data"""
+
+    backend = 'postgres'
+
+    def __init__(self, shards: Dict[str, Any], vnodes: int = 128,
+                 catalog_shard: Optional[str] = None, locator_cache_size: int = 100000):
+        """
+        Args:
+            shards: Shard name -> DatabaseManager (names, not order, define the ring)
+            vnodes: Ring points per shard
+            catalog_shard: Shard serving catalog reads and ad-hoc SQL (default: first)
+            locator_cache_size: Conversation -> shard entries remembered
+        """
+        self.shards = dict(shards)
+        self.ring = HashRing(list(self.shards), vnodes)
+        self.catalog_name = catalog_shard or next(iter(self.shards))
+        if self.catalog_name not in self.shards:
+            raise ValueError(f"Unknown catalog shard: {self.catalog_name}")
+        self.catalog = self.shards[self.catalog_name]
+        self.db_config = getattr(self.catalog, 'db_config', {})
+        self.archive = getattr(self.catalog, 'archive', None)
+
+        self._locator: "OrderedDict[str, str]" = OrderedDict()
+        self._locator_size = locator_cache_size
+        self._locator_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'ShardedDatabaseManager':
+        """Build from get_shard_config()"""
+        shards = {entry['name']: DatabaseManager(db_config=entry['config'], name=entry['name'])
+                  for entry in config['shards']}
+        print(f"🧩 Sharding users across {len(shards)} databases: {', '.join(shards)}")
+        return cls(shards, vnodes=config.get('vnodes', 128), catalog_shard=config.get('catalog_shard'))
+
+    # =============================================================================
+    # ROUTING
+    # =============================================================================
+
+    def shard_name_for_user(self, user_id: str) -> str:
+        return self.ring.shard_for(user_id)
+
+    def shard_for_user(self, user_id: str):
+        """The DatabaseManager owning a user"""
+        return self.shards[self.ring.shard_for(user_id)]
+
+    def shard_for_conversation(self, conversation_id: str):
+        """The DatabaseManager holding a conversation (catalog shard if unknown)"""
+        with self._locator_lock:
+            name = self._locator.get(conversation_id)
+            if name is not None:
+                self._locator.move_to_end(conversation_id)
+                return self.shards[name]
+
+        for name, shard in self.shards.items():
+            if shard.get_conversation(conversation_id) is not None:
+                self._remember(conversation_id, name)
+                return shard
+        return self.catalog
+
+    def _remember(self, conversation_id: Optional[str], name: str) -> None:
+        if not conversation_id:
+            return
+        with self._locator_lock:
+            self._locator[conversation_id] = name
+            self._locator.move_to_end(conversation_id)
+            while len(self._locator) > self._locator_size:
+                self._locator.popitem(last=False)
+
+    @staticmethod
+    def _argument(name: str, spec, args, kwargs) -> Optional[str]:
+        """Routing key of a call, read from DatabaseManager's signature for `name`"""
+        signature = _SIGNATURES.get(name)
+        if signature is None:
+            signature = _SIGNATURES[name] = inspect.signature(getattr(DatabaseManager, name))
+        arguments = signature.bind(None, *args, **kwargs).arguments
+        if isinstance(spec, tuple):
+            argument, field = spec
+            return (arguments.get(argument) or {}).get(field)
+        return arguments.get(spec)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in _PASSTHROUGH:
+            return getattr(DatabaseManager, name)
+
+        if name in _BY_USER or name in _BY_WALLET:
+            by_wallet = name in _BY_WALLET
+            spec = _BY_WALLET[name] if by_wallet else _BY_USER[name]
+
+            def routed(*args, **kwargs):
+                key = self._argument(name, spec, args, kwargs)
+                if by_wallet and key and key.startswith('wallet_'):
+                    key = key[len('wallet_'):]
+                shard_name = self.ring.shard_for(key or '')
+                result = getattr(self.shards[shard_name], name)(*args, **kwargs)
+                if name in ('create_conversation', 'create_unified_conversation'):
+                    self._remember(result, shard_name)
+                return result
+        elif name in _BY_CONVERSATION:
+
+            def routed(*args, **kwargs):
+                conversation_id = self._argument(name, 'conversation_id', args, kwargs)
+                return getattr(self.shard_for_conversation(conversation_id), name)(*args, **kwargs)
+        elif name in _CATALOG_READS:
+            return getattr(self.catalog, name)
+        else:
+            raise AttributeError(f"'{type(self).__name__}' has no routed method '{name}'")
+
+        routed.__name__ = name
+        routed.__doc__ = getattr(DatabaseManager, name).__doc__
+        self.__dict__[name] = routed
+        return routed
+
+    def _each(self, method: str, *args, **kwargs) -> Dict[str, Any]:
+        """Call a method on every shard. Returns shard name -> result."""
+        return {name: getattr(shard, method)(*args, **kwargs) for name, shard in self.shards.items()}
+
+    # =============================================================================
+    # CONNECTIONS / LIFECYCLE
+    # =============================================================================
+
+    def get_connection(self, read_only: bool = False):
+        """Connection to the catalog shard (non-user tables)"""
+        return self.catalog.get_connection(read_only)
+
+    def connection_for(self, user_id: str, read_only: bool = False):
+        """Connection to the shard owning a user"""
+        return self.shard_for_user(user_id).get_connection(read_only)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return {'shards': self._each('get_pool_stats'), 'catalog_shard': self.catalog_name}
+
+    def close_pool(self):
+        self._each('close_pool')
+
+    def warm_up(self) -> int:
+        return sum(self._each('warm_up').values())
+
+    def flush_pending_writes(self, conversation_id: Optional[str] = None, user_id: Optional[str] = None,
+                             timeout: float = 10.0) -> bool:
+        return all(self._each('flush_pending_writes', conversation_id, user_id, timeout).values())
+
+    def get_write_behind_stats(self) -> Dict[str, Any]:
+        return {'shards': self._each('get_write_behind_stats')}
+
+    def stop_write_behind(self):
+        self._each('stop_write_behind')
+
+    def execute_schema(self, schema_file: str = None):
+        return all(self._each('execute_schema', schema_file).values())
+
+    def migrate(self, target: Optional[int] = None, wait: bool = True) -> Dict[str, Any]:
+        """Apply pending migrations on every shard"""
+        results = self._each('migrate', target=target, wait=wait)
+        errors = [f"{name}: {r['error']}" for name, r in results.items() if r.get('error')]
+        return {
+            'success': all(r['success'] for r in results.values()),
+            'applied': sorted({version for r in results.values() for version in r['applied']}),
+            'locked': any(r['locked'] for r in results.values()),
+            'error': '; '.join(errors) or None,
+        }
+
+    def get_migration_status(self) -> List[Dict[str, Any]]:
+        """Migration status; a migration counts as applied once every shard has it"""
+        merged: Dict[int, Dict[str, Any]] = {}
+        for rows in self._each('get_migration_status').values():
+            for row in rows:
+                entry = merged.setdefault(row['version'], {**row, 'applied': True, 'applied_at': None})
+                entry['applied'] = entry['applied'] and row['applied']
+                entry['modified_since_applied'] = entry['modified_since_applied'] or row['modified_since_applied']
+                if row['applied_at'] and (entry['applied_at'] is None or row['applied_at'] > entry['applied_at']):
+                    entry['applied_at'] = row['applied_at']
+        for entry in merged.values():
+            if not entry['applied']:
+                entry['applied_at'] = None
+        return [merged[version] for version in sorted(merged)]
+
+    def backfill_search_vectors(self, batch_size: int = 5000) -> int:
+        return sum(self._each('backfill_search_vectors', batch_size=batch_size).values())
+
+    # =============================================================================
+    # CATALOG WRITES AND FAN-OUT QUERIES
+    # =============================================================================
+
+    def update_astrologer_stats(self, astrologer_id: str, rating: float = None,
+                                increment_consultations: bool = False) -> bool:
+        """Update astrologer statistics on every catalog copy"""
+        return all(self._each('update_astrologer_stats', astrologer_id, rating=rating,
+                              increment_consultations=increment_consultations).values())
+
+    def create_session_review(self, review_data: Dict[str, Any]) -> Optional[str]:
+        """Store a review on the user's shard, then refresh the astrologer's rating everywhere"""
+        owner = self.ring.shard_for(review_data['user_id'])
+        review_id = self.shards[owner].create_session_review(review_data)
+        if review_id:
+            self._sync_astrologer_rating(review_data['astrologer_id'], owner)
+        return review_id
+
+    def _sync_astrologer_rating(self, astrologer_id: str, reviewed_on: str) -> None:
+        """
+        The review updated the catalog copy on its own shard with that shard's
+        average. Set the global average on every copy and count the review on
+        the other copies.
+        """
+        stats = self.get_astrologer_stats(astrologer_id)
+        rating = stats.get('average_review_rating')
+        if rating is None:
+            return
+        for name, shard in self.shards.items():
+            try:
+                with shard.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute("""
+                            UPDATE astrologers SET
+                                rating = %s,
+                                total_reviews = total_reviews + %s,
+                                updated_at = CURRENT_TIMESTAMP
+                            WHERE astrologer_id = %s
+                        """, (round(rating, 2), 0 if name == reviewed_on else 1, astrologer_id))
+            except Exception as e:
+                # StatisticsReconciler / the next review will correct it
+                print(f"⚠️ Could not sync rating of {astrologer_id} on shard {name}: {e}")
+
+    def check_purchase_token_exists(self, purchase_token: str) -> bool:
+        """Check if a purchase token has been processed on any shard"""
+        return any(shard.check_purchase_token_exists(purchase_token) for shard in self.shards.values())
+
+    def get_astrologer_reviews(self, astrologer_id: str, limit: int = 20) -> List[Dict]:
+        """Newest reviews for an astrologer across all shards"""
+        reviews = [review for rows in self._each('get_astrologer_reviews', astrologer_id, limit).values()
+                   for review in rows]
+        reviews.sort(key=lambda review: review['created_at'], reverse=True)
+        return reviews[:limit]
+
+    def get_astrologer_stats(self, astrologer_id: str) -> Dict[str, Any]:
+        """Astrologer statistics summed over all shards"""
+        parts = [stats for stats in self._each('get_astrologer_stats', astrologer_id).values() if stats]
+        if not parts:
+            return {}
+        combined = dict(parts[0])
+        for field in ('total_conversations', 'active_conversations', 'total_readings',
+                      'total_reviews', 'total_session_seconds'):
+            combined[field] = sum(part.get(field) or 0 for part in parts)
+
+        def weighted(average_field: str, count_field: str):
+            total = sum(part.get(count_field) or 0 for part in parts if part.get(average_field) is not None)
+            if not total:
+                return None
+            return sum(Decimal(part[average_field]) * (part.get(count_field) or 0)
+                       for part in parts if part.get(average_field) is not None) / total
+
+        combined['average_review_rating'] = weighted('average_review_rating', 'total_reviews')
+        combined['average_user_rating'] = weighted('average_user_rating', 'total_readings')
+        return combined
+
+
+class Resharder:
+    """Moves users whose owning shard changes between two shard layouts"""
+
+    def __init__(self, current: ShardedDatabaseManager, target_shards: Dict[str, Any],
+                 vnodes: Optional[int] = None, batch_size: int = 200):
+        """
+        Args:
+            current: Router for the layout in use (DB_SHARDS)
+            target_shards: Shard name -> DatabaseManager for the new layout
+                           (existing shards may be passed again or reused by name)
+            vnodes: Ring points per shard in the new layout (default: current)
+            batch_size: Users moved per transaction
+        """
+        self.current = current
+        self.target = {name: current.shards.get(name, shard) for name, shard in target_shards.items()}
+        self.target_ring = HashRing(list(self.target), vnodes or current.ring.vnodes)
+        self.batch_size = batch_size
+        self._jsonb_columns: Dict[str, set] = {}
+
+    # -------------------------------------------------------------------------
+    # Planning
+    # -------------------------------------------------------------------------
+
+    def _user_batches(self, shard) -> Iterator[List[str]]:
+        last_user_id = ''
+        while True:
+            with shard.get_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT user_id FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                        (last_user_id, self.batch_size)
+                    )
+                    user_ids = [row[0] for row in cursor.fetchall()]
+            if not user_ids:
+                return
+            yield user_ids
+            last_user_id = user_ids[-1]
+
+    def moves(self) -> Iterator[Tuple[str, str, List[str]]]:
+        """Yield (source shard, target shard, user IDs) for every batch of moving users"""
+        for source_name, shard in self.current.shards.items():
+            for user_ids in self._user_batches(shard):
+                by_target: Dict[str, List[str]] = {}
+                for user_id in user_ids:
+                    target_name = self.target_ring.shard_for(user_id)
+                    if target_name != source_name:
+                        by_target.setdefault(target_name, []).append(user_id)
+                for target_name, moving in by_target.items():
+                    yield source_name, target_name, moving
+
+    def plan(self) -> Dict[str, int]:
+        """Count moving users per 'source -> target'"""
+        counts: Dict[str, int] = {}
+        total = 0
+        for source_name in self.current.shards:
+            for user_ids in self._user_batches(self.current.shards[source_name]):
+                total += len(user_ids)
+                for user_id in user_ids:
+                    target_name = self.target_ring.shard_for(user_id)
+                    if target_name != source_name:
+                        route = f"{source_name} -> {target_name}"
+                        counts[route] = counts.get(route, 0) + 1
+        moving = sum(counts.values())
+        print(f"📊 {moving} of {total} users move ({moving / total * 100 if total else 0:.1f}%)")
+        for route, count in sorted(counts.items()):
+            print(f"   {route}: {count}")
+        return counts
+
+    # -------------------------------------------------------------------------
+    # Copy / sync / cleanup
+    # -------------------------------------------------------------------------
+
+    def copy(self, overwrite: bool = False) -> int:
+        """
+        Copy every moving user to its new shard.
+
+        Args:
+            overwrite: Replace rows already on the target (sync, with writes
+                       paused); otherwise existing rows are kept (online copy)
+
+        Returns:
+            Number of users copied
+        """
+        for name, shard in self.target.items():
+            if name not in self.current.shards:
+                if not shard.migrate()['success']:
+                    raise RuntimeError(f"Schema migration failed on new shard {name}")
+            if name != self.current.catalog_name:
+                self._copy_catalog(shard)
+
+        copied = 0
+        touched = set()
+        for source_name, target_name, user_ids in self.moves():
+            self._copy_users(self.current.shards[source_name], self.target[target_name], user_ids, overwrite)
+            copied += len(user_ids)
+            touched.add(target_name)
+            print(f"✅ {'Synced' if overwrite else 'Copied'} {len(user_ids)} users {source_name} -> {target_name}")
+
+        # Copied rows bypassed the triggers - recount the per-astrologer statistics
+        for name in touched:
+            StatisticsReconciler(self.target[name]).reconcile('astrologers')
+        print(f"🎉 {copied} users {'synced' if overwrite else 'copied'}")
+        return copied
+
+    def sync(self) -> int:
+        """Final copy during the write pause (source rows win)"""
+        return self.copy(overwrite=True)
+
+    def cleanup(self) -> int:
+        """
+        Delete users from shards of the new layout that no longer own them.
+        Works before or after switching DB_SHARDS; users missing on their
+        owner are kept and reported.
+
+        Returns:
+            Number of users deleted
+        """
+        deleted = 0
+        for name, shard in self.target.items():
+            removed = 0
+            for user_ids in self._user_batches(shard):
+                by_owner: Dict[str, List[str]] = {}
+                for user_id in user_ids:
+                    owner = self.target_ring.shard_for(user_id)
+                    if owner != name:
+                        by_owner.setdefault(owner, []).append(user_id)
+
+                for owner, misplaced in by_owner.items():
+                    with self.target[owner].get_connection(read_only=True) as conn:
+                        with conn.cursor() as cursor:
+                            cursor.execute("SELECT user_id FROM users WHERE user_id = ANY(%s)", (misplaced,))
+                            present = [row[0] for row in cursor.fetchall()]
+                    if len(present) < len(misplaced):
+                        print(f"⚠️ {len(misplaced) - len(present)} users not on {owner} yet - run copy/sync first")
+                    if not present:
+                        continue
+
+                    # Foreign keys cascade from users to every per-user table
+                    with shard.get_connection() as conn:
+                        with conn.cursor() as cursor:
+                            cursor.execute("DELETE FROM users WHERE user_id = ANY(%s)", (present,))
+                            removed += cursor.rowcount
+
+            if removed:
+                StatisticsReconciler(shard).reconcile('astrologers')
+                print(f"✅ Removed {removed} moved users from {name}")
+            deleted += removed
+        print(f"🎉 {deleted} moved users removed from their old shards")
+        return deleted
+
+    def _copy_catalog(self, shard) -> None:
+        """Bring a shard's catalog tables up to date with the catalog shard"""
+        with self.current.catalog.get_connection(read_only=True) as source:
+            with shard.get_connection() as target:
+                with target.cursor() as cursor:
+                    cursor.execute("SET LOCAL session_replication_role = replica")
+                for table, key in CATALOG_TABLES:
+                    self._copy_rows(source, target, table, "true", None, key, (), overwrite=True)
+
+    def _copy_users(self, source_shard, target_shard, user_ids: List[str], overwrite: bool) -> None:
+        """Copy a batch of users' rows in one target transaction"""
+        with source_shard.get_connection(read_only=True) as source:
+            with target_shard.get_connection() as target:
+                with target.cursor() as cursor:
+                    cursor.execute("SET LOCAL session_replication_role = replica")
+                for table, where, key, skip in USER_TABLES:
+                    self._copy_rows(source, target, table, where, user_ids, key, skip, overwrite)
+
+    def _copy_rows(self, source, target, table: str, where: str, user_ids: Optional[List[str]],
+                   key: Tuple[str, ...], skip: Tuple[str, ...], overwrite: bool) -> int:
+        """Stream matching rows from source to target with INSERT ... ON CONFLICT"""
+        jsonb = self._jsonb(source, table)
+        copied = 0
+        with source.cursor(name=f"reshard_{table}") as reader:
+            reader.itersize = 2000
+            reader.execute(f"SELECT * FROM {table} WHERE {where}", (user_ids,) if user_ids is not None else None)
+            columns = None
+            while True:
+                rows = reader.fetchmany(2000)
+                if not rows:
+                    break
+                if columns is None:
+                    names = [column[0] for column in reader.description]
+                    keep = [i for i, column in enumerate(names) if column not in skip]
+                    columns = [names[i] for i in keep]
+                    updates = [column for column in columns if column not in key]
+                    conflict = (
+                        "DO UPDATE SET " + ", ".join(f"{column} = EXCLUDED.{column}" for column in updates)
+                        if overwrite and updates else "DO NOTHING"
+                    )
+                    statement = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s "
+                                 f"ON CONFLICT ({', '.join(key)}) {conflict}")
+                values = [
+                    tuple(Json(row[i]) if names[i] in jsonb and row[i] is not None else row[i] for i in keep)
+                    for row in rows
+                ]
+                with target.cursor() as writer:
+                    execute_values(writer, statement, values, page_size=500)
+                copied += len(rows)
+        return copied
+
+    def _jsonb(self, conn, table: str) -> set:
+        """JSONB columns of a table (psycopg2 returns them as dicts/lists)"""
+        if table not in self._jsonb_columns:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = %s AND data_type IN ('json', 'jsonb')
+                """, (table,))
+                self._jsonb_columns[table] = {row[0] for row in cursor.fetchall()}
+        return self._jsonb_columns[table]
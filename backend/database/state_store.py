@@ -0,0 +1,279 @@
+"""
+User State Store for AstroVoice
+Keyed, incremental persistence for the chat/voice handlers' per-user state
+
+Replaces rewriting the whole user_states.json on every turn. Each user's
+state is one row in a local SQLite database (WAL mode, safe to share between
+worker processes on a host):
+- put() serializes only that user's state and marks it dirty; the cost of a
+  turn depends on one user's state size, not on how many users exist.
+- Dirty users are written together, one upsert each inside a single
+  transaction, `flush_interval` seconds after the first change (debounced),
+  or immediately once `max_pending` users are dirty. flush_interval=0 writes
+  through (Lambda, where a frozen process cannot run a timer).
+- Transactions make every flush atomic; a crash loses at most the last
+  debounce window, never corrupts the file.
+- get() sees unflushed changes from this process, and returns the same dict
+  to every caller while anyone holds it. Handlers for different astrologers
+  mutate one copy of a user's state, so a put() from either saves both
+  handlers' changes instead of the last stale copy winning.
+
+An existing user_states.json is imported once, when the database is empty.
+If the database file cannot be opened (read-only filesystem) the store keeps
+state in memory for the life of the process.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, Optional
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS user_states (
+        user_id TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    )
+"""
+
+UPSERT_SQL = """
+    INSERT INTO user_states (user_id, state, updated_at) VALUES (?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at
+"""
+
+
+class SharedState(dict):
+    """A user's state as handed out by the store (a dict that can be weakly referenced)"""
+
+
+class UserStateStore:
+    """Per-user JSON state in SQLite with debounced, batched upserts"""
+
+    def __init__(self, path: str, flush_interval: float = 1.0, max_pending: int = 500,
+                 legacy_files: Iterable[str] = ()):
+        """
+        Args:
+            path: SQLite database file
+            flush_interval: Seconds a change may wait before it is written (0: write through)
+            max_pending: Dirty users that trigger an immediate flush
+            legacy_files: user_states.json files to import into an empty store
+        """
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.legacy_files = [str(f) for f in legacy_files]
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: Dict[str, str] = {}
+        self._live: "weakref.WeakValueDictionary[str, SharedState]" = weakref.WeakValueDictionary()
+        self._absent = set()
+        self._versions: Dict[str, int] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+        self._stats = {'puts': 0, 'flushes': 0, 'rows_written': 0, 'bytes_written': 0, 'flush_errors': 0}
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """A user's state, shared with every other caller in this process (None if there is none)"""
+        with self._lock:
+            state = self._live.get(user_id)
+            if state is not None or user_id in self._absent:
+                return state
+            raw = self._pending.get(user_id)
+            if raw is None:
+                row = self._connection().execute(
+                    "SELECT state FROM user_states WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                raw = row[0] if row else None
+            if raw is None:
+                self._absent.add(user_id)
+                return None
+            state = self._live[user_id] = SharedState(json.loads(raw))
+            return state
+
+    def attach(self, user_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Start state for a user (e.g. a handler's new `{}`). Returns the shared
+        dict to keep: an existing one with `state` merged in, or `state` itself.
+        """
+        with self._lock:
+            shared = self.get(user_id)
+            if shared is None:
+                shared = self._live[user_id] = SharedState(state)
+                self._absent.discard(user_id)
+            elif shared is not state:
+                shared.update(state)
+            return shared
+
+    def put(self, user_id: str, state: Dict[str, Any]) -> None:
+        """Save one user's state (written at the next flush)"""
+        raw = json.dumps(state, ensure_ascii=False, separators=(',', ':'), default=str)
+        with self._lock:
+            shared = self._live.get(user_id)
+            if shared is not None and shared is not state:
+                shared.clear()
+                shared.update(state)
+            self._absent.discard(user_id)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._pending[user_id] = raw
+            self._stats['puts'] += 1
+            if self.flush_interval <= 0 or len(self._pending) >= self.max_pending:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> int:
+        """Write all dirty users in one transaction. Returns rows written."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            now = time.time()
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(UPSERT_SQL, [(user_id, raw, now) for user_id, raw in pending.items()])
+            except sqlite3.Error as e:
+                # Keep the changes (newer puts win) and try again with the next flush
+                self._pending = {**pending, **self._pending}
+                self._stats['flush_errors'] += 1
+                print(f"⚠️ Failed to save user states: {e}")
+                return 0
+            self._stats['flushes'] += 1
+            self._stats['rows_written'] += len(pending)
+            self._stats['bytes_written'] += sum(len(raw) for raw in pending.values())
+            return len(pending)
+
+    def version(self, user_id: str) -> int:
+        """Number of puts for a user in this process (changes whenever their state is saved)"""
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def delete(self, user_id: str) -> None:
+        with self._lock:
+            self._pending.pop(user_id, None)
+            self._live.pop(user_id, None)
+            self._absent.add(user_id)
+            with self._connection() as conn:
+                conn.execute("DELETE FROM user_states WHERE user_id = ?", (user_id,))
+
+    def count(self) -> int:
+        with self._lock:
+            self.flush()
+            return self._connection().execute("SELECT COUNT(*) FROM user_states").fetchone()[0]
+
+    def close(self) -> None:
+        """Flush and close (application shutdown)"""
+        with self._lock:
+            self.flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'pending': len(self._pending), 'path': self.path}
+
+    # -------------------------------------------------------------------------
+    # Internals (lock held)
+    # -------------------------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️ Cannot open user state store at {self.path} ({e}) - keeping state in memory")
+                self.path = ':memory:'
+                conn = sqlite3.connect(':memory:', check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            self._conn = conn
+            self._import_legacy()
+        return self._conn
+
+    def _import_legacy(self) -> None:
+        """Import user_states.json files into an empty store (one-time migration)"""
+        if self._conn.execute("SELECT 1 FROM user_states LIMIT 1").fetchone():
+            return
+        for legacy in self.legacy_files:
+            if not os.path.exists(legacy):
+                continue
+            try:
+                with open(legacy, "r", encoding="utf-8") as f:
+                    states = json.load(f)
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(UPSERT_SQL, [
+                        (user_id, json.dumps(state, ensure_ascii=False, separators=(',', ':'), default=str), now)
+                        for user_id, state in states.items()
+                    ])
+                print(f"✅ Imported {len(states)} user states from {legacy}")
+            except Exception as e:
+                print(f"⚠️ Could not import {legacy}: {e}")
+
+
+class UserStateView(dict):
+    """
+    The dict handlers keep as `self.user_states`, filled from the store on demand.
+
+    Looking up a user (`in`, [], get) loads their saved state on first access,
+    so a handler only holds the users it actually talks to. Every view holds
+    the store's shared dict for a user, so views see each other's changes.
+    """
+
+    def __init__(self, store: UserStateStore):
+        super().__init__()
+        self.store = store
+
+    def _ensure(self, user_id: Any) -> None:
+        if not isinstance(user_id, str) or dict.__contains__(self, user_id):
+            return
+        state = self.store.get(user_id)
+        if state is not None:
+            dict.__setitem__(self, user_id, state)
+
+    def __setitem__(self, user_id: Any, state: Any) -> None:
+        if isinstance(user_id, str) and isinstance(state, dict):
+            state = self.store.attach(user_id, state)
+        dict.__setitem__(self, user_id, state)
+
+    def __contains__(self, user_id: Any) -> bool:
+        self._ensure(user_id)
+        return dict.__contains__(self, user_id)
+
+    def __getitem__(self, user_id: Any) -> Any:
+        self._ensure(user_id)
+        return dict.__getitem__(self, user_id)
+
+    def get(self, user_id: Any, default: Any = None) -> Any:
+        self._ensure(user_id)
+        return dict.get(self, user_id, default)
+
+
+def _load_store() -> UserStateStore:
+    try:
+        from backend.config.settings import get_user_state_config
+    except ImportError:
+        return UserStateStore("user_states.db", legacy_files=["user_states.json"])
+    return UserStateStore(**get_user_state_config())
+
+
+user_state_store = _load_store()
+atexit.register(user_state_store.flush)
@@ -0,0 +1,182 @@
+"""
+Statistics Reconciliation for AstroVoice
+Recomputes user_statistics / astrologer_statistics from the base tables
+
+The statistics rows are maintained incrementally by triggers (see schema.sql).
+Reconciliation is the safety net: it walks users and astrologers in key order
+in small batches, locks each batch's statistics rows, recomputes the true
+values and rewrites only the rows that drifted.
+
+Locking the rows before recomputing makes the pass safe under live traffic:
+a writer whose trigger already touched a row holds that row's lock, so the
+recompute waits for it to commit and then sees its changes; writers arriving
+later wait for the batch and apply their deltas on top of the fresh values.
+
+Astrologer statistics are spread over counter slots; a drifted astrologer
+gets the recomputed totals in slot 0 and its other slots are removed.
+"""
+
+from typing import Dict, List
+
+USER_RECONCILE_SQL = """
+    WITH actual AS (
+        SELECT u.user_id,
+               COALESCE(c.total_conversations, 0) AS total_conversations,
+               COALESCE(c.total_messages, 0) AS total_messages,
+               COALESCE(r.total_readings, 0) AS total_readings,
+               COALESCE(v.total_reviews, 0) AS total_reviews,
+               COALESCE(c.total_session_seconds, 0) AS total_session_seconds,
+               c.last_activity
+        FROM unnest(%(keys)s::varchar[]) AS u(user_id)
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS total_conversations,
+                   SUM(COALESCE(total_messages, 0)) AS total_messages,
+                   SUM(COALESCE(total_duration_seconds, 0)) AS total_session_seconds,
+                   MAX(COALESCE(last_message_at, started_at)) AS last_activity
+            FROM conversations WHERE user_id = u.user_id
+        ) c ON true
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS total_readings FROM readings WHERE user_id = u.user_id
+        ) r ON true
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS total_reviews FROM session_reviews WHERE user_id = u.user_id
+        ) v ON true
+    )
+    UPDATE user_statistics s SET
+        total_conversations = a.total_conversations,
+        total_messages = a.total_messages,
+        total_readings = a.total_readings,
+        total_reviews = a.total_reviews,
+        total_session_seconds = a.total_session_seconds,
+        last_activity = a.last_activity,
+        updated_at = CURRENT_TIMESTAMP
+    FROM actual a
+    WHERE s.user_id = a.user_id
+      AND (s.total_conversations, s.total_messages, s.total_readings, s.total_reviews,
+           s.total_session_seconds, s.last_activity)
+          IS DISTINCT FROM
+          (a.total_conversations, a.total_messages, a.total_readings, a.total_reviews,
+           a.total_session_seconds, a.last_activity)
+"""
+
+ASTROLOGER_RECONCILE_SQL = """
+    WITH actual AS (
+        SELECT a.astrologer_id,
+               COALESCE(c.total_conversations, 0) AS total_conversations,
+               COALESCE(c.active_conversations, 0) AS active_conversations,
+               COALESCE(c.total_session_seconds, 0) AS total_session_seconds,
+               COALESCE(r.total_readings, 0) AS total_readings,
+               COALESCE(r.rated_readings, 0) AS rated_readings,
+               COALESCE(r.reading_rating_sum, 0) AS reading_rating_sum,
+               COALESCE(v.total_reviews, 0) AS total_reviews,
+               COALESCE(v.review_rating_sum, 0) AS review_rating_sum
+        FROM unnest(%(keys)s::varchar[]) AS a(astrologer_id)
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS total_conversations,
+                   COUNT(*) FILTER (WHERE status = 'active') AS active_conversations,
+                   SUM(COALESCE(total_duration_seconds, 0)) AS total_session_seconds
+            FROM conversations WHERE astrologer_id = a.astrologer_id
+        ) c ON true
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS total_readings,
+                   COUNT(user_rating) AS rated_readings,
+                   SUM(COALESCE(user_rating, 0)) AS reading_rating_sum
+            FROM readings WHERE astrologer_id = a.astrologer_id
+        ) r ON true
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS total_reviews, SUM(rating) AS review_rating_sum
+            FROM session_reviews WHERE astrologer_id = a.astrologer_id
+        ) v ON true
+    ),
+    drifted AS (
+        SELECT a.* FROM actual a
+        JOIN astrologer_statistics_totals s ON s.astrologer_id = a.astrologer_id
+        WHERE (s.total_conversations, s.active_conversations, s.total_readings, s.rated_readings,
+               s.reading_rating_sum, s.total_reviews, s.review_rating_sum, s.total_session_seconds)
+              IS DISTINCT FROM
+              (a.total_conversations, a.active_conversations, a.total_readings, a.rated_readings,
+               a.reading_rating_sum, a.total_reviews, a.review_rating_sum, a.total_session_seconds)
+    ),
+    other_slots AS (
+        DELETE FROM astrologer_statistics s USING drifted a
+        WHERE s.astrologer_id = a.astrologer_id AND s.slot <> 0
+    )
+    UPDATE astrologer_statistics s SET
+        total_conversations = a.total_conversations,
+        active_conversations = a.active_conversations,
+        total_readings = a.total_readings,
+        rated_readings = a.rated_readings,
+        reading_rating_sum = a.reading_rating_sum,
+        total_reviews = a.total_reviews,
+        review_rating_sum = a.review_rating_sum,
+        total_session_seconds = a.total_session_seconds,
+        updated_at = CURRENT_TIMESTAMP
+    FROM drifted a
+    WHERE s.astrologer_id = a.astrologer_id AND s.slot = 0
+"""
+
+# (entity table, key column, statistics table, its primary key, recompute statement)
+_TARGETS = {
+    'users': ('users', 'user_id', 'user_statistics', 'user_id', USER_RECONCILE_SQL),
+    'astrologers': ('astrologers', 'astrologer_id', 'astrologer_statistics', 'astrologer_id, slot',
+                    ASTROLOGER_RECONCILE_SQL),
+}
+
+
+class StatisticsReconciler:
+    """Repairs drift in the incrementally maintained statistics tables"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def run(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Reconcile every user and astrologer.
+
+        Returns:
+            Counts of rows checked and corrected per table
+        """
+        result = {}
+        for target in ('astrologers', 'users'):
+            checked, corrected = self.reconcile(target, batch_size)
+            result[f'{target}_checked'] = checked
+            result[f'{target}_corrected'] = corrected
+        print(f"✅ Statistics reconciled: {result}")
+        return result
+
+    def reconcile(self, target: str, batch_size: int = 500) -> tuple:
+        """Reconcile one statistics table. Returns (rows checked, rows corrected)."""
+        entity_table, key, stats_table, stats_key, recompute_sql = _TARGETS[target]
+        checked = corrected = 0
+        last_key = ''
+
+        while True:
+            with self.db.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT {key} FROM {entity_table} WHERE {key} > %s ORDER BY {key} LIMIT %s",
+                        (last_key, batch_size)
+                    )
+                    keys: List[str] = [row[0] for row in cursor.fetchall()]
+                    if not keys:
+                        break
+
+                    # Rows for entities created before the triggers existed
+                    cursor.execute(
+                        f"INSERT INTO {stats_table} ({key}) SELECT unnest(%s::varchar[]) ON CONFLICT DO NOTHING",
+                        (keys,)
+                    )
+                    # Lock in key order, then recompute with a fresh snapshot
+                    cursor.execute(
+                        f"SELECT {key} FROM {stats_table} WHERE {key} = ANY(%s) ORDER BY {stats_key} FOR UPDATE",
+                        (keys,)
+                    )
+                    cursor.execute(recompute_sql, {'keys': keys})
+                    corrected += cursor.rowcount
+
+            checked += len(keys)
+            last_key = keys[-1]
+
+        if corrected:
+            print(f"⚠️ Corrected {corrected} of {checked} {stats_table} rows")
+        return checked, corrected
@@ -0,0 +1,155 @@
+"""
+Chat List Read Model for AstroVoice
+Rebuilds user_astrologer_threads from conversations and messages
+
+The threads table is maintained by triggers on messages, conversations and
+astrologers (see schema.sql). The rebuild backfills it for data written before
+the triggers existed and repairs drift. It walks users in key order in small
+batches, locks the batch's thread rows and rewrites only rows that differ.
+
+The preview is the user's latest message in the shown conversation, as the
+trigger maintains it. Read state is preserved: last_read_at is the later of the stored value and
+the user's latest own message, and unread_count is recounted from it.
+"""
+
+from typing import Dict, List
+
+REBUILD_SQL = """
+    WITH latest AS (
+        SELECT DISTINCT ON (c.user_id, c.astrologer_id)
+               c.user_id, c.astrologer_id, c.conversation_id, c.started_at, c.status
+        FROM conversations c
+        WHERE c.user_id = ANY(%(user_ids)s)
+        ORDER BY c.user_id, c.astrologer_id, c.last_message_at DESC NULLS LAST, c.started_at DESC
+    ), actual AS (
+        SELECT l.user_id, l.astrologer_id, l.conversation_id, l.started_at, l.status,
+               a.display_name, a.profile_picture_url,
+               asked.content, last_msg.sent_at, last_msg.sender_type,
+               totals.total_messages, totals.last_activity_at,
+               GREATEST(t.last_read_at, reads.last_user_message_at) AS last_read_at
+        FROM latest l
+        JOIN astrologers a ON a.astrologer_id = l.astrologer_id
+        LEFT JOIN user_astrologer_threads t
+               ON t.user_id = l.user_id AND t.astrologer_id = l.astrologer_id
+        CROSS JOIN LATERAL (
+            SELECT SUM(COALESCE(c.total_messages, 0)) AS total_messages,
+                   MAX(GREATEST(c.last_message_at, c.started_at)) AS last_activity_at
+            FROM conversations c
+            WHERE c.user_id = l.user_id AND c.astrologer_id = l.astrologer_id
+        ) totals
+        LEFT JOIN LATERAL (
+            SELECT m.content, m.sent_at, m.sender_type
+            FROM messages m
+            WHERE m.conversation_id = l.conversation_id
+            ORDER BY m.sent_at DESC, m.message_id DESC
+            LIMIT 1
+        ) last_msg ON true
+        LEFT JOIN LATERAL (
+            SELECT m.content
+            FROM messages m
+            WHERE m.conversation_id = l.conversation_id AND m.sender_type = 'user'
+            ORDER BY m.sent_at DESC, m.message_id DESC
+            LIMIT 1
+        ) asked ON true
+        LEFT JOIN LATERAL (
+            SELECT MAX(m.sent_at) AS last_user_message_at
+            FROM conversations c
+            JOIN messages m ON m.conversation_id = c.conversation_id
+            WHERE c.user_id = l.user_id AND c.astrologer_id = l.astrologer_id
+              AND m.sender_type = 'user'
+        ) reads ON true
+    )
+    INSERT INTO user_astrologer_threads AS t (
+        user_id, astrologer_id, conversation_id, conversation_started_at, status,
+        astrologer_name, astrologer_image, last_message_preview, last_message_at,
+        last_sender_type, last_activity_at, total_messages, unread_count, last_read_at
+    )
+    SELECT x.user_id, x.astrologer_id, x.conversation_id, x.started_at, x.status,
+           x.display_name, x.profile_picture_url, LEFT(x.content, 200), x.sent_at,
+           x.sender_type, COALESCE(x.last_activity_at, CURRENT_TIMESTAMP), x.total_messages,
+           (SELECT COUNT(*)
+            FROM conversations c
+            JOIN messages m ON m.conversation_id = c.conversation_id
+            WHERE c.user_id = x.user_id AND c.astrologer_id = x.astrologer_id
+              AND m.sender_type = 'astrologer'
+              AND (x.last_read_at IS NULL OR m.sent_at > x.last_read_at)),
+           x.last_read_at
+    FROM actual x
+    ORDER BY x.user_id, x.astrologer_id
+    ON CONFLICT (user_id, astrologer_id) DO UPDATE SET
+        conversation_id = EXCLUDED.conversation_id,
+        conversation_started_at = EXCLUDED.conversation_started_at,
+        status = EXCLUDED.status,
+        astrologer_name = EXCLUDED.astrologer_name,
+        astrologer_image = EXCLUDED.astrologer_image,
+        last_message_preview = EXCLUDED.last_message_preview,
+        last_message_at = EXCLUDED.last_message_at,
+        last_sender_type = EXCLUDED.last_sender_type,
+        last_activity_at = EXCLUDED.last_activity_at,
+        total_messages = EXCLUDED.total_messages,
+        unread_count = EXCLUDED.unread_count,
+        last_read_at = EXCLUDED.last_read_at,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE (t.conversation_id, t.conversation_started_at, t.status, t.astrologer_name, t.astrologer_image,
+           t.last_message_preview, t.last_message_at, t.last_sender_type, t.last_activity_at,
+           t.total_messages, t.unread_count, t.last_read_at)
+          IS DISTINCT FROM
+          (EXCLUDED.conversation_id, EXCLUDED.conversation_started_at, EXCLUDED.status,
+           EXCLUDED.astrologer_name, EXCLUDED.astrologer_image, EXCLUDED.last_message_preview,
+           EXCLUDED.last_message_at, EXCLUDED.last_sender_type, EXCLUDED.last_activity_at,
+           EXCLUDED.total_messages, EXCLUDED.unread_count, EXCLUDED.last_read_at)
+"""
+
+# Threads whose conversations have all been deleted
+PRUNE_SQL = """
+    DELETE FROM user_astrologer_threads t
+    WHERE t.user_id = ANY(%(user_ids)s)
+      AND NOT EXISTS (
+          SELECT 1 FROM conversations c
+          WHERE c.user_id = t.user_id AND c.astrologer_id = t.astrologer_id
+      )
+"""
+
+
+class ThreadRebuilder:
+    """Backfills and repairs the user_astrologer_threads read model"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def run(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Rebuild the thread rows of every user.
+
+        Returns:
+            Counts of users checked and thread rows written / removed
+        """
+        result = {'users_checked': 0, 'threads_written': 0, 'threads_removed': 0}
+        last_user = ''
+
+        while True:
+            with self.db.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT user_id FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                        (last_user, batch_size)
+                    )
+                    user_ids: List[str] = [row[0] for row in cursor.fetchall()]
+                    if not user_ids:
+                        break
+
+                    # Lock existing rows in key order, then recompute with a fresh snapshot
+                    cursor.execute("""
+                        SELECT 1 FROM user_astrologer_threads WHERE user_id = ANY(%s)
+                        ORDER BY user_id, astrologer_id FOR UPDATE
+                    """, (user_ids,))
+                    cursor.execute(REBUILD_SQL, {'user_ids': user_ids})
+                    result['threads_written'] += cursor.rowcount
+                    cursor.execute(PRUNE_SQL, {'user_ids': user_ids})
+                    result['threads_removed'] += cursor.rowcount
+
+            result['users_checked'] += len(user_ids)
+            last_user = user_ids[-1]
+
+        print(f"✅ Conversation threads rebuilt: {result}")
+        return result
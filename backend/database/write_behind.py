@@ -0,0 +1,441 @@
+"""
+Write-Behind Message Queue for AstroVoice
+Takes message inserts off the chat response path and group-commits them
+
+Callers submit message rows and return immediately. A background thread
+drains the queue when it reaches `batch_size` rows or `flush_interval`
+seconds have passed, writing every pending row with one multi-row INSERT
+per page inside a single transaction. Conversation counters and previews
+are updated by the same statement from the rows that were actually inserted.
+
+Durability: each submitted entry is appended to a local JSONL journal before
+submit() returns. Journals are rotated at every flush and deleted once their
+rows are committed; journals left behind by a crash are replayed on the next
+start. Replays are idempotent - inserts use ON CONFLICT DO NOTHING on the
+(message_id, sent_at) key and counters only count rows that were inserted.
+
+Memory is bounded by `max_pending` rows. When the queue is full submit()
+returns False and the caller writes synchronously instead.
+
+Read barrier: entries are tagged with the keys they belong to (conversation,
+user) and commit in submission order, so flush(keys) waits only for the
+latest entry of those keys - readers with nothing queued never wait.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows - journals are not shared between processes
+    fcntl = None
+
+try:
+    from backend.database.instrumentation import method_scope
+except ImportError:
+    from instrumentation import method_scope
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:
+    psycopg2 = None
+    execute_values = None
+
+# Columns written for every queued message (in statement order)
+MESSAGE_COLUMNS = (
+    'message_id', 'conversation_id', 'sender_type', 'message_type',
+    'content', 'ai_model', 'tokens_used', 'sent_at',
+)
+
+# Inserts a batch and bumps each conversation's counters; like record_turn,
+# the preview follows the latest user message
+FLUSH_SQL = """
+    WITH incoming (message_id, conversation_id, sender_type, message_type,
+                   content, ai_model, tokens_used, sent_at) AS (
+        VALUES %s
+    ),
+    inserted AS (
+        INSERT INTO messages (message_id, conversation_id, sender_type, message_type,
+                              content, ai_model, tokens_used, sent_at)
+        SELECT * FROM incoming
+        ON CONFLICT (message_id, sent_at) DO NOTHING
+        RETURNING conversation_id, sender_type, content, sent_at
+    ),
+    latest AS (
+        SELECT DISTINCT ON (conversation_id) conversation_id, content, sent_at
+        FROM inserted
+        WHERE sender_type = 'user'
+        ORDER BY conversation_id, sent_at DESC
+    ),
+    counts AS (
+        SELECT conversation_id, COUNT(*) AS inserted_count, MAX(sent_at) AS last_sent_at
+        FROM inserted
+        GROUP BY conversation_id
+    )
+    UPDATE conversations c SET
+        total_messages = COALESCE(c.total_messages, 0) + counts.inserted_count,
+        last_message_at = GREATEST(c.last_message_at, counts.last_sent_at),
+        last_message_text = CASE WHEN latest.sent_at >= COALESCE(c.last_message_at, latest.sent_at)
+                                 THEN latest.content ELSE c.last_message_text END,
+        last_message_preview = CASE WHEN latest.sent_at >= COALESCE(c.last_message_at, latest.sent_at)
+                                    THEN LEFT(latest.content, 200) ELSE c.last_message_preview END
+    FROM counts LEFT JOIN latest ON latest.conversation_id = counts.conversation_id
+    WHERE c.conversation_id = counts.conversation_id
+"""
+
+ROW_TEMPLATE = "(%s, %s, %s, %s, %s, %s, %s::integer, %s::timestamp)"
+
+
+class WriteBehindQueue:
+    """Buffers message rows in memory and a local journal, flushing in batches"""
+
+    def __init__(self, db, journal_dir: Path, batch_size: int = 200,
+                 flush_interval: float = 0.25, max_pending: int = 10000,
+                 fsync: bool = False):
+        self.db = db
+        self.journal_dir = Path(journal_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.fsync = fsync
+
+        self._cond = threading.Condition()
+        self._pending: List[Dict[str, Any]] = []   # entries: {'rows': [...]}
+        self._pending_rows = 0
+        self._journal = None
+        self._journal_path: Optional[str] = None
+        self._sealed: List[tuple] = []             # (path, file) awaiting commit
+        self._journal_counter = 0
+        self._submitted = 0                        # entries ever submitted
+        self._committed = 0                        # entries known committed
+        self._latest: Dict[str, int] = {}          # key -> sequence of its last uncommitted entry
+        self._flush_requested = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._stats = {
+            'flushes': 0,
+            'rows_written': 0,
+            'failed_flushes': 0,
+            'rejected_entries': 0,
+            'replayed_entries': 0,
+            'last_flush_ms': 0.0,
+        }
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        """Replay journals left by a previous run and start the flusher thread"""
+        if self._thread is not None:
+            return
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self._recover_journals()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        print(f"📝 Write-behind queue started (batch={self.batch_size}, interval={self.flush_interval}s)")
+
+    def stop(self, timeout: float = 30.0):
+        """Flush everything pending and stop the flusher thread"""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+        with self._cond:
+            if self._journal is not None:
+                self._close_journal(self._journal)
+                self._journal = None
+            for path, handle in self._sealed:
+                self._close_journal(handle)
+            self._sealed = []
+            left = self._pending_rows
+        if left:
+            print(f"⚠️ Write-behind stopped with {left} rows unflushed - kept in {self.journal_dir} for replay")
+        else:
+            print("📝 Write-behind queue stopped (all rows flushed)")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    # -------------------------------------------------------------------------
+    # Producer side
+    # -------------------------------------------------------------------------
+
+    def submit(self, rows: List[Dict[str, Any]], keys: Iterable[str] = ()) -> bool:
+        """
+        Queue message rows that must be committed together.
+
+        Args:
+            rows: Message rows
+            keys: Read-barrier keys the rows belong to (see flush)
+
+        Returns:
+            True once the rows are journaled, False if the queue is full or
+            stopped (the caller should write synchronously)
+        """
+        entry = {'rows': rows, 'keys': list(keys)}
+        line = json.dumps(entry, default=_json_default, ensure_ascii=False) + '\n'
+
+        with self._cond:
+            if self._stopping or self._thread is None:
+                return False
+            if self._pending_rows + len(rows) > self.max_pending:
+                return False
+
+            if self._journal is None:
+                self._open_journal()
+            self._journal.write(line)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+
+            self._pending.append(entry)
+            self._pending_rows += len(rows)
+            self._submitted += 1
+            self._track(entry['keys'], self._submitted)
+            if self._pending_rows >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: float = 10.0, keys: Optional[Iterable[str]] = None) -> bool:
+        """
+        Block until everything submitted before this call is committed - or,
+        with keys, everything submitted for those keys. Used as a read barrier
+        so history reads see the caller's own writes.
+        """
+        with self._cond:
+            target = self._target(keys)
+            if self._committed >= target or self._thread is None:
+                return self._committed >= target
+            self._flush_requested = True
+            self._cond.notify_all()
+            deadline = time.monotonic() + timeout
+            while self._committed < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def has_pending(self, keys: Optional[Iterable[str]] = None) -> bool:
+        """True if anything (or anything for these keys) is not committed yet"""
+        with self._cond:
+            return self._committed < self._target(keys)
+
+    def _target(self, keys: Optional[Iterable[str]]) -> int:
+        if keys is None:
+            return self._submitted
+        return max((self._latest.get(key, 0) for key in keys), default=0)
+
+    def _track(self, keys: Iterable[str], sequence: int):
+        for key in keys:
+            self._latest[key] = sequence
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            flushes = self._stats['flushes']
+            return {
+                'running': self.running,
+                'pending_rows': self._pending_rows,
+                'avg_rows_per_flush': round(self._stats['rows_written'] / flushes, 1) if flushes else 0.0,
+                **self._stats,
+            }
+
+    # -------------------------------------------------------------------------
+    # Flusher thread
+    # -------------------------------------------------------------------------
+
+    def _run(self):
+        retry_delay = self.flush_interval
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while (not self._stopping and not self._flush_requested
+                       and self._pending_rows < self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                stopping = self._stopping
+                self._flush_requested = False
+                if not self._pending:
+                    if stopping:
+                        return
+                    continue
+
+                # Take everything and rotate the journal: the sealed files hold
+                # exactly the taken entries plus anything re-queued earlier
+                batch = self._pending
+                batch_entries = self._submitted
+                self._pending = []
+                self._pending_rows = 0
+                if self._journal is not None:
+                    self._sealed.append((self._journal_path, self._journal))
+                    self._journal = None
+                sealed = list(self._sealed)
+
+            ok = self._write_batch(batch)
+
+            with self._cond:
+                if ok:
+                    self._sealed = [item for item in self._sealed if item not in sealed]
+                    for path, handle in sealed:
+                        self._close_journal(handle)
+                        _remove(path)
+                    self._committed = max(self._committed, batch_entries)
+                    self._latest = {key: seq for key, seq in self._latest.items() if seq > self._committed}
+                    retry_delay = self.flush_interval
+                else:
+                    # Put the batch back in front of anything newer
+                    self._pending = batch + self._pending
+                    self._pending_rows += sum(len(entry['rows']) for entry in batch)
+                self._cond.notify_all()
+
+            if not ok:
+                if stopping:
+                    return
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 5.0)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> bool:
+        rows = [_row_tuple(row) for entry in batch for row in entry['rows']]
+        started = time.perf_counter()
+        try:
+            self._execute(rows)
+        except Exception as e:
+            if psycopg2 is not None and isinstance(e, psycopg2.IntegrityError):
+                # One bad entry (e.g. its conversation was deleted) must not
+                # block the queue: retry entry by entry and set aside rejects
+                return self._write_individually(batch)
+            self._stats['failed_flushes'] += 1
+            print(f"❌ Write-behind flush failed ({len(rows)} rows), will retry: {e}")
+            return False
+
+        self._stats['flushes'] += 1
+        self._stats['rows_written'] += len(rows)
+        self._stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return True
+
+    def _write_individually(self, batch: List[Dict[str, Any]]) -> bool:
+        for entry in batch:
+            rows = [_row_tuple(row) for row in entry['rows']]
+            try:
+                self._execute(rows)
+                self._stats['rows_written'] += len(rows)
+            except Exception as e:
+                if psycopg2 is not None and isinstance(e, psycopg2.IntegrityError):
+                    self._reject(entry, e)
+                    continue
+                self._stats['failed_flushes'] += 1
+                print(f"❌ Write-behind flush failed, will retry: {e}")
+                return False
+        self._stats['flushes'] += 1
+        return True
+
+    def _execute(self, rows: List[tuple]):
+        with method_scope('write_behind_flush'), self.db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                execute_values(cursor, FLUSH_SQL, rows, template=ROW_TEMPLATE, page_size=self.batch_size)
+
+    def _reject(self, entry: Dict[str, Any], error: Exception):
+        self._stats['rejected_entries'] += 1
+        print(f"❌ Write-behind rejected {len(entry['rows'])} rows: {error}")
+        with open(self.journal_dir / 'rejected.jsonl', 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'error': str(error), **entry}, default=_json_default, ensure_ascii=False) + '\n')
+
+    # -------------------------------------------------------------------------
+    # Journal files
+    # -------------------------------------------------------------------------
+
+    def _open_journal(self):
+        self._journal_counter += 1
+        path = str(self.journal_dir / f"journal-{os.getpid()}-{int(time.time() * 1000)}-{self._journal_counter}.jsonl")
+        handle = open(path, 'a', encoding='utf-8')
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        self._journal = handle
+        self._journal_path = path
+
+    @staticmethod
+    def _close_journal(handle):
+        try:
+            handle.close()
+        except Exception:
+            pass
+
+    def _recover_journals(self):
+        """Queue entries from journals no live process holds"""
+        for path in sorted(glob.glob(str(self.journal_dir / 'journal-*.jsonl'))):
+            handle = open(path, 'r+', encoding='utf-8')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    handle.close()  # another worker is still writing it
+                    continue
+
+            entries = []
+            for line in handle:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break  # torn final line from a crash mid-write
+            if not entries:
+                handle.close()
+                _remove(path)
+                continue
+
+            self._pending.extend(entries)
+            self._pending_rows += sum(len(entry['rows']) for entry in entries)
+            for entry in entries:
+                self._submitted += 1
+                self._track(entry.get('keys', ()), self._submitted)
+            self._sealed.append((path, handle))
+            self._stats['replayed_entries'] += len(entries)
+
+        if self._stats['replayed_entries']:
+            print(f"📝 Replaying {self._stats['replayed_entries']} journaled write-behind entries")
+
+
+def barrier_keys(conversation_id: Optional[str] = None, user_id: Optional[str] = None) -> List[str]:
+    """Read-barrier keys for a conversation and/or a user"""
+    keys = []
+    if conversation_id:
+        keys.append(f"conversation:{conversation_id}")
+    if user_id:
+        keys.append(f"user:{user_id}")
+    return keys
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _row_tuple(row: Dict[str, Any]) -> tuple:
+    values = [row.get(column) for column in MESSAGE_COLUMNS]
+    sent_at = values[-1]
+    if isinstance(sent_at, str):
+        values[-1] = datetime.fromisoformat(sent_at)
+    return tuple(values)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
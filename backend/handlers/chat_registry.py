@@ -0,0 +1,294 @@
+"""
+Chat Handler Registry for AstroVoice
+Process-wide, bounded cache of OpenAIChatHandler instances
+
+One handler per (user_id, astrologer_id) holds that user's in-memory
+conversation state. Everything else is shared across handlers:
+- a single AsyncOpenAI client over one keep-alive httpx connection pool
+- astrologer personas (config + system prompts), built once per astrologer
+- saved user profiles, which live in the user state store
+  (backend/database/state_store.py) and load per user on first access
+
+Handlers are kept in an LRU and dropped when idle longer than
+`idle_ttl_seconds`, when there are more than `max_handlers`, or when their
+estimated resident size exceeds `max_memory_mb` (sizes are re-measured each
+time a handler is handed out). A returning user's new handler starts from
+their saved profile with a fresh short-term history.
+
+The registry also keeps recent reply latencies per mode ('blocking' for
+/chat/send, 'streaming' for SSE/WebSocket), with time to first token kept
+separately from total time, reported as p50/p95 by stats().
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Rough fixed cost of a handler object plus its per-message bookkeeping
+_HANDLER_OVERHEAD_BYTES = 2048
+_MESSAGE_OVERHEAD_BYTES = 128
+# Recent latency samples kept per mode
+_LATENCY_SAMPLES = 1000
+
+
+class _Entry:
+    __slots__ = ('handler', 'user_id', 'last_used', 'size')
+
+    def __init__(self, handler: Any, user_id: str, now: float):
+        self.handler = handler
+        self.user_id = user_id
+        self.last_used = now
+        self.size = 0
+
+
+def _default_handler_factory(**kwargs) -> Any:
+    try:
+        from backend.handlers.openai_chat import OpenAIChatHandler
+    except ImportError:
+        from handlers.openai_chat import OpenAIChatHandler
+    return OpenAIChatHandler(**kwargs)
+
+
+def _default_persona_loader(astrologer_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        from backend.services.astrologer_service import get_astrologer_config
+    except ImportError:
+        from astrologer_manager import get_astrologer_config
+    return get_astrologer_config(astrologer_id)
+
+
+def estimate_handler_bytes(handler: Any) -> int:
+    """Approximate memory held by a handler's conversation state"""
+    size = _HANDLER_OVERHEAD_BYTES
+    for messages in getattr(handler, 'conversation_history', {}).values():
+        size += sum(len(m.get('content') or '') + _MESSAGE_OVERHEAD_BYTES for m in messages)
+    try:
+        size += len(json.dumps(getattr(handler, 'user_states', {}), ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        pass
+    return size
+
+
+class ChatHandlerRegistry:
+    """Bounded LRU of chat handlers sharing one OpenAI client and per-astrologer personas"""
+
+    def __init__(
+        self,
+        max_handlers: int = 1000,
+        idle_ttl_seconds: float = 1800.0,
+        max_memory_mb: float = 64.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        handler_factory: Callable[..., Any] = _default_handler_factory,
+        persona_loader: Callable[[str], Optional[Dict[str, Any]]] = _default_persona_loader,
+        client_factory: Optional[Callable[[], Any]] = None,
+    ):
+        """
+        Args:
+            max_handlers: Handlers kept at most (LRU beyond that)
+            idle_ttl_seconds: Handlers unused for this long are dropped
+            max_memory_mb: Cap on the estimated size of all handlers
+            max_connections: Connection limit of the shared OpenAI HTTP pool
+            max_keepalive_connections: Idle keep-alive connections kept in that pool
+            keepalive_expiry: Seconds an idle keep-alive connection is kept
+            handler_factory: Builds a handler (default: OpenAIChatHandler)
+            persona_loader: astrologer_id -> persona config
+            client_factory: Builds the shared OpenAI client (default: AsyncOpenAI over httpx)
+        """
+        self.max_handlers = max_handlers
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self._handler_factory = handler_factory
+        self._persona_loader = persona_loader
+        self._client_factory = client_factory or self._build_client
+
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._resident_bytes = 0
+        self._personas: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._client = None
+        self._lock = threading.RLock()
+        self._stats = {
+            'hits': 0, 'misses': 0,
+            'evicted_idle': 0, 'evicted_capacity': 0, 'evicted_memory': 0,
+            'personas_loaded': 0, 'clients_created': 0,
+        }
+        self._latency: Dict[str, Dict[str, deque]] = {}
+
+    # -------------------------------------------------------------------------
+    # Shared resources
+    # -------------------------------------------------------------------------
+
+    def client(self):
+        """The process's OpenAI client (created on first use)"""
+        with self._lock:
+            if self._client is None:
+                self._client = self._client_factory()
+                self._stats['clients_created'] += 1
+            return self._client
+
+    def _build_client(self):
+        import httpx
+        from openai import AsyncOpenAI
+        try:
+            from backend.config.settings import OPENAI_API_KEY
+        except ImportError:
+            OPENAI_API_KEY = None
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
+        print(f"🔌 Shared OpenAI client ready (keep-alive {self.max_keepalive_connections}/{self.max_connections})")
+        return AsyncOpenAI(api_key=OPENAI_API_KEY or os.getenv("OPENAI_API_KEY"), http_client=http_client)
+
+    def persona(self, astrologer_id: str) -> Optional[Dict[str, Any]]:
+        """Astrologer persona config, loaded once per astrologer"""
+        with self._lock:
+            if astrologer_id not in self._personas:
+                self._personas[astrologer_id] = self._persona_loader(astrologer_id)
+                self._stats['personas_loaded'] += 1
+            return self._personas[astrologer_id]
+
+    # -------------------------------------------------------------------------
+    # Handlers
+    # -------------------------------------------------------------------------
+
+    def get(self, user_id: str, astrologer_id: str) -> Any:
+        """Handler for a user talking to an astrologer (created on first use)"""
+        key = (user_id, astrologer_id)
+        now = time.monotonic()
+        with self._lock:
+            self._expire_idle(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._stats['hits'] += 1
+                self._entries.move_to_end(key)
+                entry.last_used = now
+            else:
+                self._stats['misses'] += 1
+                handler = self._handler_factory(
+                    astrologer_id=astrologer_id,
+                    client=self.client(),
+                    astrologer_config=self.persona(astrologer_id),
+                )
+                entry = self._entries[key] = _Entry(handler, user_id, now)
+
+            size = estimate_handler_bytes(entry.handler)
+            self._resident_bytes += size - entry.size
+            entry.size = size
+            self._enforce_limits()
+            return entry.handler
+
+    def discard(self, user_id: str, astrologer_id: Optional[str] = None) -> int:
+        """Drop a user's handlers (all astrologers if astrologer_id is None). Returns how many."""
+        with self._lock:
+            keys = [k for k in self._entries if k[0] == user_id and astrologer_id in (None, k[1])]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client (application shutdown)"""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            await client.close()
+
+    def record_latency(self, mode: str, total_ms: float, ttft_ms: Optional[float] = None) -> None:
+        """Record one reply's latency (ttft_ms: time to first token, streaming only)"""
+        with self._lock:
+            samples = self._latency.setdefault(mode, {
+                'ttft_ms': deque(maxlen=_LATENCY_SAMPLES),
+                'total_ms': deque(maxlen=_LATENCY_SAMPLES),
+            })
+            samples['total_ms'].append(total_ms)
+            if ttft_ms is not None:
+                samples['ttft_ms'].append(ttft_ms)
+
+    def _latency_stats(self) -> Dict[str, Any]:
+        report = {}
+        for mode, samples in self._latency.items():
+            report[mode] = {'count': len(samples['total_ms'])}
+            for name, values in samples.items():
+                if values:
+                    ordered = sorted(values)
+                    report[mode][name] = {
+                        'p50': round(ordered[len(ordered) // 2], 1),
+                        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+                    }
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire_idle(time.monotonic())
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'handlers': len(self._entries),
+                'users': len({entry.user_id for entry in self._entries.values()}),
+                'resident_bytes': self._resident_bytes,
+                'max_handlers': self.max_handlers,
+                'max_bytes': self.max_bytes,
+                'idle_ttl_seconds': self.idle_ttl_seconds,
+                'personas': len(self._personas),
+                'latency': self._latency_stats(),
+            }
+
+    # -------------------------------------------------------------------------
+    # Eviction (lock held)
+    # -------------------------------------------------------------------------
+
+    def _expire_idle(self, now: float) -> None:
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.last_used < self.idle_ttl_seconds:
+                break
+            self._remove(key)
+            self._stats['evicted_idle'] += 1
+
+    def _enforce_limits(self) -> None:
+        # The most recently used handler (the one being handed out) is never evicted
+        while len(self._entries) > 1:
+            if len(self._entries) > self.max_handlers:
+                reason = 'evicted_capacity'
+            elif self._resident_bytes > self.max_bytes:
+                reason = 'evicted_memory'
+            else:
+                break
+            self._remove(next(iter(self._entries)))
+            self._stats[reason] += 1
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key)
+        self._resident_bytes -= entry.size
+
+
+def _load_registry() -> ChatHandlerRegistry:
+    try:
+        from backend.config.settings import get_chat_registry_config
+    except ImportError:
+        return ChatHandlerRegistry()
+    return ChatHandlerRegistry(**get_chat_registry_config())
+
+
+chat_handlers = _load_registry()
@@ -6,8 +6,10 @@ Mirrors the structure and patterns from openai_realtime_handler.py
 
 import os
 import json
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+import time
+from datetime import datetime, date
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 
@@ -23,6 +25,13 @@ except ImportError:
     OPENAI_API_KEY = None
     OPENAI_CHAT_MODEL = None
 
+try:
+    from backend.database.state_store import user_state_store, UserStateView
+    from backend.services.text_analysis import ConversationSignals, update_user_state
+except ImportError:
+    from database.state_store import user_state_store, UserStateView
+    from services.text_analysis import ConversationSignals, update_user_state
+
 load_dotenv()
 
 # Load ritual remedies knowledge base
@@ -35,18 +44,157 @@ try:
 except Exception as e:
     print(f"⚠️ Could not load ritual remedies knowledge base: {e}")
 
+# Sampling settings shared by send_message and stream_message
+COMPLETION_PARAMS = {
+    'temperature': 0.95,  # Higher for emotional warmth and variability
+    'max_tokens': 250,  # Reduced for shorter, punchier responses
+    'top_p': 0.9,
+    'frequency_penalty': 0.3,
+    'presence_penalty': 0.6,  # Higher to encourage diverse, human-like responses
+}
+
+NEW_USER_CONTEXT = "New user - no previous info"
+
+# Strict response length enforcement, appended to every system prompt
+RESPONSE_RULES = (
+    "\n\n⚠️ CRITICAL RESPONSE RULES:"
+    "\n- Maximum 2-4 lines only (not sentences, LINES)"
+    "\n- Must end with ONE engaging question or curiosity hook"
+    "\n- Use emojis in every response"
+    "\n- Speak conversationally, NO bullet points or lists"
+)
+
+EMOTION_INSTRUCTIONS = {
+    'sad': "The user seems sad or upset. Be extra comforting and reassuring. Use phrases like 'Sab theek ho jayega' and offer hope through astrological insights.",
+    'worried': "The user is worried or anxious. Be calming and confident. Reassure them with phrases like 'Tension mat lo' and provide clear guidance.",
+    'excited': "The user seems excited or happy. Match their energy! Be enthusiastic and curious. Use celebratory emojis ✨🎉",
+    'curious': "The user is curious and engaged. Build on their curiosity with mysterious hints and intriguing questions.",
+    'hopeful': "The user is hopeful and seeking help. Be encouraging and supportive. Give them confidence that solutions exist.",
+    'neutral': "Maintain warm, engaging tone. Build curiosity and connection."
+}
+
+# Map topics to planets
+TOPIC_PLANETS = {
+    'marriage': ['shukra', 'mangal'],
+    'love': ['shukra'],
+    'career': ['shani', 'guru', 'surya'],
+    'finance': ['guru', 'shukra'],
+    'health': ['surya', 'chandra']
+}
+
+
+@lru_cache(maxsize=64)
+def build_remedy_guidance(topics: Tuple[str, ...]) -> str:
+    """
+    Remedy guidance for the discussed topics, with planetary context.
+    Depends only on the topics and the remedies knowledge base, so it is built once per topic set.
+    """
+    if not RITUAL_REMEDIES or 'planetary_remedies' not in RITUAL_REMEDIES:
+        return ""
+    
+    guidance = []
+    
+    relevant_planets = set()
+    for topic in topics:
+        if topic in TOPIC_PLANETS:
+            relevant_planets.update(TOPIC_PLANETS[topic])
+    
+    if relevant_planets:
+        guidance.append("\n[Remedy Knowledge Base Available]")
+        guidance.append("You have access to detailed remedy information for these planets:")
+        for planet in list(relevant_planets)[:2]:  # Limit to 2 most relevant
+            if planet in RITUAL_REMEDIES['planetary_remedies']:
+                planet_data = RITUAL_REMEDIES['planetary_remedies'][planet]
+                guidance.append(f"- {planet_data['planet_name']}: Known remedies include {', '.join([r['remedy'] for r in planet_data['remedies'][:2]])}")
+        
+        guidance.append("\nWhen suggesting remedies:")
+        guidance.append("1. Mention the planet affecting the situation")
+        guidance.append("2. Explain HOW the remedy connects to that planet")
+        guidance.append("3. Explain WHY it works (the spiritual logic)")
+        guidance.append("4. Keep it conversational and in Hinglish")
+    
+    return "\n".join(guidance)
+
+
+@lru_cache(maxsize=256)
+def build_humanization_layer(phase: int, emotion: str, topics: Tuple[str, ...] = ()) -> str:
+    """
+    Humanization instructions for a conversation phase and detected emotion:
+    emotional mirroring, phase-specific engagement tactics and conversational elements.
+    topics only affect phase 3 (remedy guidance).
+    """
+    instructions = [f"Emotional Context: {EMOTION_INSTRUCTIONS.get(emotion, EMOTION_INSTRUCTIONS['neutral'])}"]
+    
+    # Phase-specific engagement tactics
+    if phase == 1:
+        instructions.append("\n[Phase 1 Engagement] Drop mysterious hints about what you're seeing. Ask curious questions about their birth details. Don't give solutions yet - build intrigue! Example: 'Hmm... kuch interesting dikh raha hai 🔮 Aapka birth time exact hai na?'")
+    elif phase == 2:
+        instructions.append("\n[Phase 2 Engagement] Deepen the analysis with storytelling. Mention similar cases you've seen (anonymously). Build trust. Example: 'Ek client the bilkul aapke jaise... unke liye bhi yeh pattern tha.'")
+    elif phase == 3:
+        # Add remedy guidance for Phase 3
+        instructions.append("\n[Phase 3 Engagement - REMEDY PHASE] Give ONE simple remedy with FULL planetary explanation:")
+        instructions.append("MUST include: 1) Which planet is affected, 2) HOW the remedy works, 3) WHY it's effective")
+        instructions.append("Example: 'Aapke chart mein Shukra (Venus) weak hai jo marriage ko control karta hai 💍 Friday ko chhoti ladkiyon ko white sweets donate karein 🙏 Kyunki young girls Goddess Lakshmi ki representative hain aur Lakshmi Shukra ki wife hain. Jab aap unhe khilate ho, Shukra directly pleased hota hai aur marriage mein delay kam hota hai ✨'")
+        
+        # Add specific remedy knowledge if topics are known
+        remedy_guidance = build_remedy_guidance(topics)
+        if remedy_guidance:
+            instructions.append(remedy_guidance)
+    else:  # phase 4+
+        instructions.append("\n[Phase 4 Engagement] Provide comprehensive guidance with confidence. Give timelines and dates. Reassure them. Example: 'October 2026 ke baad clear yog dikh rahe hain 💍 Patience rakhiye.'")
+        instructions.append("Can give 2-3 remedies with planetary explanations if needed.")
+    
+    # Add conversational elements
+    instructions.append("\n[Humanization] Use natural pause fillers ('Hmm...', 'Ek minute...', 'Interesting...'). Reference previous conversations if any. Mention cultural elements (festivals, rituals, family traditions) naturally.")
+    
+    return "\n".join(instructions)
+
+
+class SystemPromptTemplate:
+    """
+    A system prompt with everything but the user context assembled up front:
+    the astrologer persona, then the phase/emotion humanization layer and response rules.
+    """
+    __slots__ = ('persona', 'tail')
+    
+    def __init__(self, persona: str, tail: str):
+        self.persona = persona
+        self.tail = tail
+    
+    def render(self, user_context: str) -> str:
+        """The full system prompt (one string allocation per turn)"""
+        if user_context == NEW_USER_CONTEXT:
+            return f"{self.persona}{self.tail}"
+        return f"{self.persona}\n\nUser Context:\n{user_context}{self.tail}"
+
+
+@lru_cache(maxsize=512)
+def compile_system_template(persona: str, phase: int, emotion: str, topics: Tuple[str, ...] = ()) -> SystemPromptTemplate:
+    """Template for an astrologer persona, phase and emotion, compiled once (pass topics in phase 3 only)"""
+    return SystemPromptTemplate(persona, f"\n\n{build_humanization_layer(phase, emotion, topics)}{RESPONSE_RULES}")
+
+
 class OpenAIChatHandler:
     """
     Handles text-based conversation with astrologer personas.
     Mirrors OpenAIRealtimeHandler architecture for consistency.
     """
 
-    def __init__(self, astrologer_id: Optional[str] = None):
+    def __init__(
+        self,
+        astrologer_id: Optional[str] = None,
+        client: Optional[AsyncOpenAI] = None,
+        astrologer_config: Optional[Dict[str, Any]] = None,
+        user_states: Optional[Dict[str, Any]] = None
+    ):
         """
         Initialize chat handler with astrologer persona.
         
         Args:
             astrologer_id: Optional astrologer ID (ast_001, ast_002, etc.)
+            client: Shared OpenAI client (default: a new one for this handler)
+            astrologer_config: Already-loaded persona for astrologer_id
+            user_states: Saved user state to start from (default: the user state store)
         
         Raises:
             Exception: If OPENAI_API_KEY not found in environment
@@ -82,23 +230,39 @@ class OpenAIChatHandler:
         elif self.model == "gpt-4o-mini":
             print(f"⚡ Cost-effective model - good balance")
 
-        # Initialize OpenAI async client
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        # Initialize OpenAI async client (the chat registry passes its shared one)
+        self.client = client or AsyncOpenAI(api_key=self.api_key)
 
         # Conversation memory and persona (same as voice handler)
         self.user_states = {}
         self.conversation_history = {}
         self.user_astrologers = {}
+        # Conversation each user's turns are saved to. Kept per handler: the
+        # user's state is shared with their handlers for other astrologers
+        self.conversation_ids: Dict[str, str] = {}
+
+        # Prompt context fragments per user, rebuilt only when their state
+        # (saved through _save_user_states, here or by another handler) or
+        # astrology profile changes
+        self._state_versions: Dict[str, int] = {}
+        self._state_context: Dict[str, Tuple[int, str]] = {}
+        self._profile_context: Dict[str, Tuple[Tuple[int, date], str]] = {}
+
+        # Emotion/topic keywords, scanned once per user message
+        self.text_signals = ConversationSignals()
 
         # Astrologer configuration
         self.current_astrologer_id = astrologer_id
         self.current_astrologer_config = None
         self.system_instructions = self._default_instructions()
         if astrologer_id:
-            self._load_astrologer(astrologer_id)
+            self._load_astrologer(astrologer_id, astrologer_config)
 
         # Load persistent state
-        self._load_user_states()
+        if user_states is None:
+            self._load_user_states()
+        else:
+            self.user_states = user_states
 
     def _default_instructions(self) -> str:
         """Enhanced Hinglish astrologer system prompt with emotional intelligence"""
@@ -144,12 +308,12 @@ Off-Topic/NSFW Handling:
 
 Remember: Real Indian astrologers don't just predict — they connect, soothe, and mystify. 🌙"""
 
-    def _load_astrologer(self, astrologer_id: str) -> None:
+    def _load_astrologer(self, astrologer_id: str, config: Optional[Dict[str, Any]] = None) -> None:
         """
         Load astrologer persona configuration.
         Same logic as voice handler for consistency.
         """
-        config = get_astrologer_config(astrologer_id)
+        config = config or get_astrologer_config(astrologer_id)
         if config:
             self.current_astrologer_config = config
             # Use text_system_prompt if available, else system_prompt
@@ -170,33 +334,64 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
         self.current_astrologer_id = astrologer_id
         if user_id:
             self.user_astrologers[user_id] = astrologer_id
-            self._save_user_states()
+            self._save_user_states(user_id)
 
     def _load_user_states(self) -> None:
-        """Load user states from JSON file (matches voice handler)"""
-        try:
-            if os.path.exists("user_states.json"):
-                with open("user_states.json", "r", encoding="utf-8") as f:
-                    self.user_states = json.load(f)
-        except Exception as e:
-            print(f"⚠️ Failed to load user states: {e}")
+        """Attach the user state store (each user's state loads on first access)"""
+        self.user_states = UserStateView(user_state_store)
 
-    def _save_user_states(self) -> None:
-        """Save user states to JSON file (matches voice handler)"""
+    def _save_user_states(self, user_id: Optional[str] = None) -> None:
+        """
+        Save a user's state (every loaded user if None) to the state store.
+        One keyed upsert per user, written in the store's next batched flush.
+        """
         try:
-            with open("user_states.json", "w", encoding="utf-8") as f:
-                json.dump(self.user_states, f, indent=2, ensure_ascii=False)
+            for key in ([user_id] if user_id is not None else list(self.user_states)):
+                if key in self.user_states:
+                    self._state_versions[key] = self._state_versions.get(key, 0) + 1
+                    user_state_store.put(key, self.user_states[key])
         except Exception as e:
             print(f"⚠️ Failed to save user states: {e}")
 
+    def set_conversation_id(self, user_id: str, conversation_id: str) -> None:
+        """Remember which conversation the user's messages belong to (saved when it changes)"""
+        self.conversation_ids[user_id] = conversation_id
+        if user_id not in self.user_states:
+            self.user_states[user_id] = {}
+        if self.user_states[user_id].get('conversation_id') != conversation_id:
+            self.user_states[user_id]['conversation_id'] = conversation_id
+            self._save_user_states(user_id)
+
     def _get_user_context(self, user_id: str) -> str:
         """
         Build enhanced user context string for system prompt.
         Includes emotional state, past topics, and cultural context.
         """
-        parts = []
+        parts = [
+            self._get_state_context(user_id),
+            self._get_profile_context(user_id),
+        ]
+
+        # Recent conversation history
+        if user_id in self.conversation_history:
+            dialogue = ["\nRecent dialogue:"]
+            for msg in self.conversation_history[user_id][-5:]:
+                role = msg.get('role', 'unknown')
+                content = msg.get('content', '')[:100]
+                dialogue.append(f"{role}: {content}")
+            parts.append("\n".join(dialogue))
+
+        parts = [part for part in parts if part]
+        return "\n".join(parts) if parts else NEW_USER_CONTEXT
 
-        # Existing profile or partial info
+    def _get_state_context(self, user_id: str) -> str:
+        """Existing profile or partial info (cached until the user's state is saved again)"""
+        version = (self._state_versions.get(user_id, 0), user_state_store.version(user_id))
+        cached = self._state_context.get(user_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        parts = []
         if user_id in self.user_states:
             state = self.user_states[user_id]
             parts.append(f"Collected details for user {user_id}:")
@@ -213,67 +408,31 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
                 topics = ', '.join(state['past_topics'][-3:])  # Last 3 topics
                 parts.append(f"Previous discussions: {topics}")
 
-        # Astrology profile
-        profile = astrology_profile_manager.get_profile(user_id)
-        if profile:
-            parts.append("Complete astrology profile:")
-            parts.append(profile.get_context_for_ai())
+        text = "\n".join(parts)
+        self._state_context[user_id] = (version, text)
+        return text
 
-        # Recent conversation history
-        if user_id in self.conversation_history:
-            parts.append("\nRecent dialogue:")
-            for msg in self.conversation_history[user_id][-5:]:
-                role = msg.get('role', 'unknown')
-                content = msg.get('content', '')[:100]
-                parts.append(f"{role}: {content}")
+    def _get_profile_context(self, user_id: str) -> str:
+        """Astrology profile (cached per profile version; age makes it date dependent)"""
+        key = (astrology_profile_manager.profile_version(user_id), date.today())
+        cached = self._profile_context.get(user_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
 
-        return "\n".join(parts) if parts else "New user - no previous info"
+        profile = astrology_profile_manager.get_profile(user_id)
+        text = f"Complete astrology profile:\n{profile.get_context_for_ai()}" if profile else ""
+        self._profile_context[user_id] = (key, text)
+        return text
     
     def _detect_user_emotion(self, user_id: str) -> str:
         """
-        Detect emotional tone from recent user messages.
+        Detect emotional tone from recent user messages (last 3).
+        Keyword hits are counted as messages arrive (see text_analysis.py).
         
         Returns:
             str: Detected emotion ('sad', 'worried', 'excited', 'curious', 'hopeful', 'neutral')
         """
-        if user_id not in self.conversation_history:
-            return 'neutral'
-        
-        # Get last 2-3 user messages
-        user_messages = [msg['content'].lower() for msg in self.conversation_history[user_id][-6:]
-                        if msg.get('role') == 'user']
-        
-        if not user_messages:
-            return 'neutral'
-        
-        combined_text = ' '.join(user_messages[-3:])
-        
-        # Keyword-based emotion detection (English and Hindi/Hinglish)
-        sad_keywords = ['sad', 'upset', 'depressed', 'dukhi', 'pareshan', 'tension', 'hurt', 'pain', 'dard']
-        worried_keywords = ['worried', 'anxiety', 'scared', 'fear', 'chinta', 'dar', 'nervous', 'problem', 'issue']
-        excited_keywords = ['excited', 'happy', 'great', 'wonderful', 'khush', 'amazing', 'good news']
-        curious_keywords = ['curious', 'interested', 'want to know', 'tell me', 'batao', 'kya hai']
-        hopeful_keywords = ['hope', 'wish', 'please', 'help', 'aasha', 'ummeed', 'possible']
-        
-        # Count matches
-        sad_count = sum(1 for word in sad_keywords if word in combined_text)
-        worried_count = sum(1 for word in worried_keywords if word in combined_text)
-        excited_count = sum(1 for word in excited_keywords if word in combined_text)
-        curious_count = sum(1 for word in curious_keywords if word in combined_text)
-        hopeful_count = sum(1 for word in hopeful_keywords if word in combined_text)
-        
-        # Determine dominant emotion
-        emotions = {
-            'sad': sad_count,
-            'worried': worried_count,
-            'excited': excited_count,
-            'curious': curious_count,
-            'hopeful': hopeful_count
-        }
-        
-        max_emotion = max(emotions.items(), key=lambda x: x[1])
-        
-        return max_emotion[0] if max_emotion[1] > 0 else 'neutral'
+        return self.text_signals.emotion(user_id)
     
     def _get_remedy_guidance(self, topics: List[str]) -> str:
         """
@@ -286,40 +445,7 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
         Returns:
             str: Remedy guidance with planetary explanations
         """
-        if not RITUAL_REMEDIES or 'planetary_remedies' not in RITUAL_REMEDIES:
-            return ""
-        
-        guidance = []
-        
-        # Map topics to planets
-        topic_planet_map = {
-            'marriage': ['shukra', 'mangal'],
-            'love': ['shukra'],
-            'career': ['shani', 'guru', 'surya'],
-            'finance': ['guru', 'shukra'],
-            'health': ['surya', 'chandra']
-        }
-        
-        relevant_planets = set()
-        for topic in topics:
-            if topic in topic_planet_map:
-                relevant_planets.update(topic_planet_map[topic])
-        
-        if relevant_planets:
-            guidance.append("\n[Remedy Knowledge Base Available]")
-            guidance.append("You have access to detailed remedy information for these planets:")
-            for planet in list(relevant_planets)[:2]:  # Limit to 2 most relevant
-                if planet in RITUAL_REMEDIES['planetary_remedies']:
-                    planet_data = RITUAL_REMEDIES['planetary_remedies'][planet]
-                    guidance.append(f"- {planet_data['planet_name']}: Known remedies include {', '.join([r['remedy'] for r in planet_data['remedies'][:2]])}")
-            
-            guidance.append("\nWhen suggesting remedies:")
-            guidance.append("1. Mention the planet affecting the situation")
-            guidance.append("2. Explain HOW the remedy connects to that planet")
-            guidance.append("3. Explain WHY it works (the spiritual logic)")
-            guidance.append("4. Keep it conversational and in Hinglish")
-        
-        return "\n".join(guidance)
+        return build_remedy_guidance(tuple(topics))
     
     def _add_humanization_layer(self, user_id: str, phase: int) -> str:
         """
@@ -333,47 +459,13 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
         Returns:
             str: Additional system instructions for humanization
         """
-        instructions = []
-        
-        # Detect and mirror user emotion
-        emotion = self._detect_user_emotion(user_id)
-        
-        emotion_instructions = {
-            'sad': "The user seems sad or upset. Be extra comforting and reassuring. Use phrases like 'Sab theek ho jayega' and offer hope through astrological insights.",
-            'worried': "The user is worried or anxious. Be calming and confident. Reassure them with phrases like 'Tension mat lo' and provide clear guidance.",
-            'excited': "The user seems excited or happy. Match their energy! Be enthusiastic and curious. Use celebratory emojis ✨🎉",
-            'curious': "The user is curious and engaged. Build on their curiosity with mysterious hints and intriguing questions.",
-            'hopeful': "The user is hopeful and seeking help. Be encouraging and supportive. Give them confidence that solutions exist.",
-            'neutral': "Maintain warm, engaging tone. Build curiosity and connection."
-        }
-        
-        instructions.append(f"Emotional Context: {emotion_instructions.get(emotion, emotion_instructions['neutral'])}")
-        
-        # Phase-specific engagement tactics
-        if phase == 1:
-            instructions.append("\n[Phase 1 Engagement] Drop mysterious hints about what you're seeing. Ask curious questions about their birth details. Don't give solutions yet - build intrigue! Example: 'Hmm... kuch interesting dikh raha hai 🔮 Aapka birth time exact hai na?'")
-        elif phase == 2:
-            instructions.append("\n[Phase 2 Engagement] Deepen the analysis with storytelling. Mention similar cases you've seen (anonymously). Build trust. Example: 'Ek client the bilkul aapke jaise... unke liye bhi yeh pattern tha.'")
-        elif phase == 3:
-            # Add remedy guidance for Phase 3
-            instructions.append("\n[Phase 3 Engagement - REMEDY PHASE] Give ONE simple remedy with FULL planetary explanation:")
-            instructions.append("MUST include: 1) Which planet is affected, 2) HOW the remedy works, 3) WHY it's effective")
-            instructions.append("Example: 'Aapke chart mein Shukra (Venus) weak hai jo marriage ko control karta hai 💍 Friday ko chhoti ladkiyon ko white sweets donate karein 🙏 Kyunki young girls Goddess Lakshmi ki representative hain aur Lakshmi Shukra ki wife hain. Jab aap unhe khilate ho, Shukra directly pleased hota hai aur marriage mein delay kam hota hai ✨'")
-            
-            # Add specific remedy knowledge if topics are known
-            if user_id in self.user_states and 'past_topics' in self.user_states[user_id]:
-                topics = self.user_states[user_id]['past_topics']
-                remedy_guidance = self._get_remedy_guidance(topics)
-                if remedy_guidance:
-                    instructions.append(remedy_guidance)
-        else:  # phase 4+
-            instructions.append("\n[Phase 4 Engagement] Provide comprehensive guidance with confidence. Give timelines and dates. Reassure them. Example: 'October 2026 ke baad clear yog dikh rahe hain 💍 Patience rakhiye.'")
-            instructions.append("Can give 2-3 remedies with planetary explanations if needed.")
-        
-        # Add conversational elements
-        instructions.append("\n[Humanization] Use natural pause fillers ('Hmm...', 'Ek minute...', 'Interesting...'). Reference previous conversations if any. Mention cultural elements (festivals, rituals, family traditions) naturally.")
-        
-        return "\n".join(instructions)
+        return build_humanization_layer(phase, self._detect_user_emotion(user_id), self._remedy_topics(user_id, phase))
+
+    def _remedy_topics(self, user_id: str, phase: int) -> Tuple[str, ...]:
+        """Past topics that shape the prompt (remedy phase only)"""
+        if phase == 3 and user_id in self.user_states:
+            return tuple(self.user_states[user_id].get('past_topics') or ())
+        return ()
 
     def get_conversation_phase(self, user_id: str) -> int:
         """
@@ -424,6 +516,8 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
             'timestamp': datetime.now().isoformat(),
             'mode': 'text'
         })
+        if role == 'user' and content:
+            self.text_signals.observe(user_id, content)
 
         # Keep only last 15 turns (30 messages) to save memory while maintaining good context
         if len(self.conversation_history[user_id]) > 30:
@@ -473,7 +567,8 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
     async def send_message(
         self, 
         user_id: str, 
-        message: str
+        message: str,
+        persist: bool = True
     ) -> Dict[str, Any]:
         """
         Send text message and get AI response.
@@ -482,6 +577,8 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
         Args:
             user_id: User identifier
             message: User's text message
+            persist: Save the turn to the database (callers that record the
+                turn themselves pass False)
             
         Returns:
             Dict with response, tokens_used, thinking_phase, etc.
@@ -504,11 +601,7 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
             response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                temperature=0.95,  # Higher for emotional warmth and variability
-                max_tokens=250,  # Reduced for shorter, punchier responses
-                top_p=0.9,
-                frequency_penalty=0.3,
-                presence_penalty=0.6  # Higher to encourage diverse, human-like responses
+                **COMPLETION_PARAMS
             )
             
             assistant_message = response.choices[0].message.content
@@ -516,49 +609,122 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
             
             print(f"✅ Response generated ({tokens_used} tokens): {assistant_message[:50]}...")
             
-            # Update conversation history
-            self.increment_conversation_turn(user_id, "user", message)
-            self.increment_conversation_turn(user_id, "assistant", assistant_message)
-            
-            # Save messages to database if we have a valid conversation ID
-            try:
-                if 'conversation_id' in self.user_states.get(user_id, {}):
-                    conversation_id = self.user_states[user_id]['conversation_id']
-                    
-                    # Only save to database if conversation_id doesn't start with 'unified_'
-                    if not conversation_id.startswith('unified_'):
-                        from backend.database.manager import db
-                        
-                        # Save user message
-                        db.add_message(conversation_id, 'user', message, 'text')
-                        
-                        # Save astrologer response
-                        db.add_message(conversation_id, 'assistant', assistant_message, 'text')
-                        
-                        print(f"💾 Messages saved to database for conversation: {conversation_id}")
-                    else:
-                        print(f"⚠️ Skipping database save for temporary unified conversation: {conversation_id}")
-            except Exception as db_error:
-                print(f"⚠️ Could not save messages to database: {db_error}")
-            
-            # Extract and save user info if present
-            self._extract_user_info(user_id, message, assistant_message)
-            
-            return {
-                "success": True,
-                "message": assistant_message,
-                "tokens_used": tokens_used,
-                "thinking_phase": phase,
-                "astrologer_id": self.current_astrologer_id,
-                "astrologer_name": self.current_astrologer_config.get("name") if self.current_astrologer_config else "Default",
-                "mode": "text",
-                "timestamp": datetime.now().isoformat()
-            }
+            return await self._complete_turn(user_id, message, assistant_message, tokens_used, phase, persist)
             
         except Exception as e:
             print(f"❌ Error in send_message: {e}")
             raise
 
+    async def _complete_turn(
+        self,
+        user_id: str,
+        message: str,
+        assistant_message: str,
+        tokens_used: int,
+        phase: int,
+        persist: bool
+    ) -> Dict[str, Any]:
+        """
+        Post-process a finished reply: update history, persist the turn and
+        extract user info. Returns the send_message result.
+        """
+        # Update conversation history
+        self.increment_conversation_turn(user_id, "user", message)
+        self.increment_conversation_turn(user_id, "assistant", assistant_message)
+        
+        # Save messages to database if we have a valid conversation ID
+        try:
+            conversation_id = self.conversation_ids.get(user_id)
+            if persist and conversation_id:
+                # Only save to database if conversation_id doesn't start with 'unified_'
+                if not conversation_id.startswith('unified_'):
+                    from backend.database.async_manager import async_db
+                    
+                    # Queue both messages; counters and preview are committed with the next batch
+                    await async_db.queue_turn(
+                        conversation_id, message, assistant_message,
+                        tokens=tokens_used, model=self.model, user_id=user_id
+                    )
+                    
+                    print(f"💾 Messages saved to database for conversation: {conversation_id}")
+                else:
+                    print(f"⚠️ Skipping database save for temporary unified conversation: {conversation_id}")
+        except Exception as db_error:
+            print(f"⚠️ Could not save messages to database: {db_error}")
+        
+        # Extract and save user info if present
+        self._extract_user_info(user_id, message, assistant_message)
+        
+        return {
+            "success": True,
+            "message": assistant_message,
+            "tokens_used": tokens_used,
+            "model": self.model,
+            "thinking_phase": phase,
+            "astrologer_id": self.current_astrologer_id,
+            "astrologer_name": self.current_astrologer_config.get("name") if self.current_astrologer_config else "Default",
+            "mode": "text",
+            "timestamp": datetime.now().isoformat()
+        }
+
+    async def stream_message(
+        self,
+        user_id: str,
+        message: str,
+        persist: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of send_message.
+        
+        Yields {"type": "delta", "text": ...} for each token delta as it
+        arrives, then one {"type": "done", ...} event carrying the
+        send_message result plus ttft_ms (time to first token) and total_ms.
+        History, persistence and user-info extraction run after the stream
+        ends; a stream abandoned by the caller records nothing.
+        """
+        started = time.perf_counter()
+        print(f"💬 Text message from {user_id} (streaming): {message[:50]}...")
+        
+        user_context = self._get_user_context(user_id)
+        phase = self.get_conversation_phase(user_id)
+        messages = self._build_messages(user_id, message, user_context, phase)
+        
+        print(f"🤖 Calling OpenAI Chat API (phase {phase}, streaming)...")
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},  # token usage arrives in the last chunk
+            **COMPLETION_PARAMS
+        )
+        
+        parts = []
+        tokens_used = 0
+        ttft_ms = None
+        async for chunk in stream:
+            if chunk.usage is not None:
+                tokens_used = chunk.usage.total_tokens
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                parts.append(text)
+                yield {"type": "delta", "text": text}
+        
+        assistant_message = "".join(parts)
+        total_ms = (time.perf_counter() - started) * 1000
+        print(f"✅ Streamed response ({tokens_used} tokens, first token {ttft_ms or total_ms:.0f}ms, total {total_ms:.0f}ms)")
+        
+        result = await self._complete_turn(user_id, message, assistant_message, tokens_used, phase, persist)
+        result.update({
+            "type": "done",
+            "ttft_ms": round(ttft_ms if ttft_ms is not None else total_ms, 1),
+            "total_ms": round(total_ms, 1),
+        })
+        yield result
+
     def _build_messages(
         self,
         user_id: str,
@@ -570,28 +736,16 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
         Build messages array for OpenAI Chat API.
         Includes system prompt, context, humanization layer, and conversation history.
         """
-        messages = []
-        
-        # System prompt with astrologer persona
-        system_prompt = self.system_instructions
-        if user_context != "New user - no previous info":
-            system_prompt += f"\n\nUser Context:\n{user_context}"
-        
-        # Add humanization enhancement layer (emotional mirroring, hooks, engagement)
-        humanization = self._add_humanization_layer(user_id, phase)
-        system_prompt += f"\n\n{humanization}"
-        
-        # Add strict response length enforcement
-        system_prompt += "\n\n⚠️ CRITICAL RESPONSE RULES:"
-        system_prompt += "\n- Maximum 2-4 lines only (not sentences, LINES)"
-        system_prompt += "\n- Must end with ONE engaging question or curiosity hook"
-        system_prompt += "\n- Use emojis in every response"
-        system_prompt += "\n- Speak conversationally, NO bullet points or lists"
-        
-        messages.append({
+        # Persona, humanization layer and response rules come precompiled
+        # per astrologer/phase/emotion; only the user context is filled in
+        template = compile_system_template(
+            self.system_instructions, phase,
+            self._detect_user_emotion(user_id), self._remedy_topics(user_id, phase)
+        )
+        messages = [{
             "role": "system",
-            "content": system_prompt
-        })
+            "content": template.render(user_context)
+        }]
         
         # Add recent conversation history (last 10 messages)
         if user_id in self.conversation_history:
@@ -623,38 +777,15 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
         if user_id not in self.user_states:
             self.user_states[user_id] = {}
         
-        # Initialize tracking fields if not present
-        if 'emotional_context' not in self.user_states[user_id]:
-            self.user_states[user_id]['emotional_context'] = ''
-        if 'past_topics' not in self.user_states[user_id]:
-            self.user_states[user_id]['past_topics'] = []
-        
-        # Update emotional context
-        emotion = self._detect_user_emotion(user_id)
-        if emotion != 'neutral':
-            self.user_states[user_id]['emotional_context'] = emotion
-        
-        # Extract and track topics discussed
-        user_lower = user_message.lower()
-        topics_keywords = {
-            'marriage': ['marriage', 'shaadi', 'शादी', 'vivah', 'rishta'],
-            'love': ['love', 'pyaar', 'प्यार', 'relationship', 'partner'],
-            'career': ['career', 'job', 'naukri', 'business', 'work', 'office'],
-            'health': ['health', 'sehat', 'स्वास्थ्य', 'illness', 'disease'],
-            'finance': ['money', 'paisa', 'wealth', 'dhan', 'finance', 'income'],
-            'family': ['family', 'parivar', 'परिवार', 'parents', 'children']
-        }
-        
-        for topic, keywords in topics_keywords.items():
-            if any(keyword in user_lower for keyword in keywords):
-                if topic not in self.user_states[user_id]['past_topics']:
-                    self.user_states[user_id]['past_topics'].append(topic)
-                    # Keep only last 5 topics
-                    if len(self.user_states[user_id]['past_topics']) > 5:
-                        self.user_states[user_id]['past_topics'] = self.user_states[user_id]['past_topics'][-5:]
+        # Update emotional context and track topics discussed (the message was
+        # already scanned when it was added to the history). Only a changed
+        # state is saved, which also refreshes its prompt context.
+        topics = self.text_signals.analysis_of(user_id, user_message).topics
+        changed = update_user_state(self.user_states[user_id], self._detect_user_emotion(user_id), topics)
         
         # Basic extraction (can be enhanced with NLP)
         # Extract name
+        user_lower = user_message.lower()
         if "मेरा नाम" in user_lower or "my name is" in user_lower or "naam" in user_lower:
             # Simple extraction - in production, use proper NLP
             words = user_message.split()
@@ -662,12 +793,14 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
                 if word.lower() in ["नाम", "name", "naam"] and i + 1 < len(words):
                     potential_name = words[i + 1].strip(".,")
                     if potential_name and len(potential_name) > 2:
+                        changed = changed or self.user_states[user_id].get("name") != potential_name
                         self.user_states[user_id]["name"] = potential_name
                         print(f"📝 Extracted name: {potential_name}")
                         break
         
         # Save state after updates
-        self._save_user_states()
+        if changed:
+            self._save_user_states(user_id)
 
     async def get_conversation_history(
         self, 
@@ -711,6 +844,7 @@ Remember: Real Indian astrologers don't just predict — they connect, soothe, a
         try:
             if user_id in self.conversation_history:
                 self.conversation_history[user_id] = []
+                self.text_signals.reset(user_id)
                 print(f"🗑️ Cleared conversation history for {user_id}")
             return True
         except Exception as e:
@@ -24,6 +24,13 @@ except ImportError:
     OPENAI_API_KEY = None
     OPENAI_REALTIME_MODEL = None
 
+try:
+    from backend.database.state_store import user_state_store, UserStateView
+    from backend.services.text_analysis import ConversationSignals, update_user_state
+except ImportError:
+    from database.state_store import user_state_store, UserStateView
+    from services.text_analysis import ConversationSignals, update_user_state
+
 load_dotenv()
 
 class OpenAIRealtimeHandler:
@@ -44,6 +51,10 @@ class OpenAIRealtimeHandler:
         self.conversation_history = {}
         self.user_astrologers = {}
 
+        # Emotion/topic keywords from the user's transcribed speech (same matcher as text chat)
+        self.text_signals = ConversationSignals()
+        self.active_user_id = None
+
         self.current_astrologer_id = astrologer_id
         self.current_astrologer_config = None
         self.system_instructions = self._default_instructions()
@@ -81,20 +92,17 @@ class OpenAIRealtimeHandler:
         self.current_astrologer_id = astrologer_id
         if user_id:
             self.user_astrologers[user_id] = astrologer_id
-            self._save_user_states()
+            self._save_user_states(user_id)
 
     def _load_user_states(self):
-        try:
-            if os.path.exists("user_states.json"):
-                with open("user_states.json", "r") as f:
-                    self.user_states = json.load(f)
-        except Exception as e:
-            print(f"⚠️ Failed to load user states: {e}")
+        # Each user's state loads from the state store on first access
+        self.user_states = UserStateView(user_state_store)
 
-    def _save_user_states(self):
+    def _save_user_states(self, user_id: Optional[str] = None):
         try:
-            with open("user_states.json", "w") as f:
-                json.dump(self.user_states, f, indent=2)
+            for key in ([user_id] if user_id is not None else list(self.user_states)):
+                if key in self.user_states:
+                    user_state_store.put(key, self.user_states[key])
         except Exception as e:
             print(f"⚠️ Failed to save user states: {e}")
 
@@ -242,9 +250,19 @@ class OpenAIRealtimeHandler:
             print(f"🎙️ User said: {transcript}")
             # Track user turn for phase management
             # Note: user_id would need to be passed to this method - will handle in send_audio
+            if self.active_user_id and transcript:
+                self._observe_transcript(self.active_user_id, transcript)
         elif msg_type == "error":
             print(f"❌ OpenAI Error: {data}")
 
+    def _observe_transcript(self, user_id: str, transcript: str):
+        """Record emotion and topics from what the user said (saved only when they change)"""
+        analysis = self.text_signals.observe(user_id, transcript)
+        if user_id not in self.user_states:
+            self.user_states[user_id] = {}
+        if update_user_state(self.user_states[user_id], self.text_signals.emotion(user_id), analysis.topics):
+            self._save_user_states(user_id)
+
     async def send_greeting(self, user_id: str):
         """Send astrologer's greeting message"""
         if not self.is_connected:
@@ -289,6 +307,8 @@ class OpenAIRealtimeHandler:
         if not self.is_connected:
             await self.connect_to_openai()
 
+        # Transcripts of this audio arrive later on the listener without a user id
+        self.active_user_id = user_id
         audio_b64 = base64.b64encode(audio_data).decode()
 
         # Add user context
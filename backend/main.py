@@ -71,10 +71,11 @@ app.add_middleware(
 
 # Register mobile API endpoints
 try:
-    from backend.api.mobile_endpoints import router as mobile_router
+    from backend.api.mobile_endpoints import router as mobile_router, ChatRequest, stream_chat_turn
     app.include_router(mobile_router)
     print("✅ Mobile API endpoints registered")
 except ImportError as e:
+    ChatRequest = stream_chat_turn = None
     print(f"⚠️  Could not import mobile endpoints: {e}")
     print("   Mobile API endpoints not available")
 
@@ -96,8 +97,11 @@ except Exception as e:
 active_connections = {}
 user_handlers = {}  # Each user gets their own handler with their own astrologer
 
-# Text chat handlers (for text mode)
-chat_handlers: Dict[str, OpenAIChatHandler] = {}
+# Text chat handlers (for text mode) - bounded, process-wide registry
+try:
+    from backend.handlers.chat_registry import chat_handlers
+except ImportError:
+    from handlers.chat_registry import chat_handlers
 
 # Pydantic models for request validation
 class ChatMessageRequest(BaseModel):
@@ -113,13 +117,7 @@ def get_or_create_chat_handler(user_id: str, astrologer_id: str) -> OpenAIChatHa
     Get existing chat handler or create new one.
     Mirrors voice handler management pattern.
     """
-    handler_key = f"{user_id}_{astrologer_id}"
-    
-    if handler_key not in chat_handlers:
-        print(f"📝 Creating new chat handler for {user_id} with {astrologer_id}")
-        chat_handlers[handler_key] = OpenAIChatHandler(astrologer_id)
-    
-    return chat_handlers[handler_key]
+    return chat_handlers.get(user_id, astrologer_id)
 
 def pcm16_to_wav(pcm_data: bytes, sample_rate: int = 24000, channels: int = 1) -> bytes:
     """Convert raw PCM16 audio to WAV format"""
@@ -469,6 +467,52 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             await user_handlers[user_id].disconnect()
             del user_handlers[user_id]
 
+@app.websocket("/ws-chat/{user_id}")
+async def text_chat_websocket_endpoint(websocket: WebSocket, user_id: str):
+    """
+    WebSocket endpoint for streaming text chat.
+    Client sends {"type": "chat_message", "conversation_id", "astrologer_id", "message"};
+    server replies with "chat_delta" messages as tokens arrive, then one "chat_done"
+    (same fields as /api/chat/send plus ttft_ms/total_ms) or an "error".
+    """
+    await websocket.accept()
+    print(f"💬 Text chat WebSocket connected: {user_id}")
+
+    try:
+        while True:
+            data = json.loads(await websocket.receive_text())
+
+            if data.get("type") == "chat_message":
+                if stream_chat_turn is None:
+                    await websocket.send_text(json.dumps({"type": "error", "detail": "Chat service not available"}))
+                    continue
+                try:
+                    chat_request = ChatRequest(
+                        user_id=user_id,
+                        conversation_id=data["conversation_id"],
+                        astrologer_id=data["astrologer_id"],
+                        message=data["message"],
+                    )
+                    async for event in stream_chat_turn(chat_request):
+                        if event["type"] == "delta":
+                            await websocket.send_text(json.dumps({"type": "chat_delta", "text": event["text"]}, ensure_ascii=False))
+                        else:
+                            await websocket.send_text(json.dumps({**event, "type": "chat_done"}, ensure_ascii=False, default=str))
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    print(f"❌ Text chat stream error for {user_id}: {e}")
+                    await websocket.send_text(json.dumps({"type": "error", "detail": getattr(e, "detail", str(e))}))
+
+            elif data.get("type") == "ping":
+                # Keep-alive ping
+                await websocket.send_text(json.dumps({"type": "pong"}))
+
+    except WebSocketDisconnect:
+        print(f"🔌 Text chat WebSocket disconnected: {user_id}")
+    except Exception as e:
+        print(f"❌ Text chat WebSocket error for {user_id}: {e}")
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
@@ -554,9 +598,7 @@ async def send_chat_message(request: ChatMessageRequest):
         handler = get_or_create_chat_handler(request.user_id, request.astrologer_id)
         
         # Store conversation_id in user_states for database saving
-        if request.user_id not in handler.user_states:
-            handler.user_states[request.user_id] = {}
-        handler.user_states[request.user_id]['conversation_id'] = request.conversation_id
+        handler.set_conversation_id(request.user_id, request.conversation_id)
         
         # Send message and get response
         response = await handler.send_message(request.user_id, request.message)
@@ -678,6 +720,7 @@ async def chat_health_check():
         "status": "healthy",
         "mode": "text_chat",
         "active_handlers": len(chat_handlers),
+        "chat_handlers": chat_handlers.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -692,6 +735,7 @@ async def shutdown_event():
         await handler.disconnect()
         print(f"🧹 Disconnected handler for user {user_id}")
     user_handlers.clear()
+    await chat_handlers.aclose()
 
 if __name__ == "__main__":
     print("🌟 Starting OpenAI Realtime Voice Astrology Server")
@@ -706,6 +750,7 @@ if __name__ == "__main__":
     print(f"💬 Text Chat interface: http://localhost:{port}/text-chat")
     print(f"📱 Mobile API: http://localhost:{port}/api/process-audio")
     print(f"💬 Text Chat API: http://localhost:{port}/api/chat/send")
+    print(f"💬 Streaming Chat: http://localhost:{port}/api/chat/send/stream (SSE), ws://localhost:{port}/ws-chat/{{user_id}}")
     print(f"❤️  Health check: http://localhost:{port}/health")
     print(f"❤️  Chat health: http://localhost:{port}/health/chat")
     print(f"🔌 WebSocket: ws://localhost:{port}/ws/{{user_id}}")
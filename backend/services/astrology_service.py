@@ -110,7 +110,7 @@ class AstrologyProfile:
         return "Requires ephemeris calculation"
 
     def increment_reading_count(self):
-        """Update reading statistics"""
+        """Update reading statistics (save with AstrologyProfileManager.update_profile)"""
         self.total_readings += 1
         self.last_reading_date = datetime.now().isoformat()
 
@@ -157,6 +157,8 @@ class AstrologyProfileManager:
             # Lambda has read-only filesystem, skip directory creation
             pass
         self.profiles_file = os.path.join(storage_dir, "user_profiles.json")
+        # Bumped on every create/update/delete so callers can cache per-profile text
+        self._versions: Dict[str, int] = {}
         self._load_profiles()
 
     def _load_profiles(self):
@@ -194,6 +196,7 @@ class AstrologyProfileManager:
                 return False  # Profile already exists
 
             self.profiles[profile.user_id] = profile
+            self._bump_version(profile.user_id)
             self._save_profiles()
             print(f"✅ Created astrology profile for user: {profile.user_id}")
             return True
@@ -205,10 +208,18 @@ class AstrologyProfileManager:
         """Get user profile by ID"""
         return self.profiles.get(user_id)
 
+    def profile_version(self, user_id: str) -> int:
+        """Change counter for a user's profile (0 until first created/updated in this process)"""
+        return self._versions.get(user_id, 0)
+
+    def _bump_version(self, user_id: str):
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
     def update_profile(self, profile: AstrologyProfile) -> bool:
         """Update existing profile"""
         try:
             self.profiles[profile.user_id] = profile
+            self._bump_version(profile.user_id)
             self._save_profiles()
             return True
         except Exception as e:
@@ -220,6 +231,7 @@ class AstrologyProfileManager:
         try:
             if user_id in self.profiles:
                 del self.profiles[user_id]
+                self._bump_version(user_id)
                 self._save_profiles()
                 return True
             return False
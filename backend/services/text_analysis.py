@@ -0,0 +1,222 @@
+"""
+Text Analysis for AstroVoice
+Single-pass emotion and topic detection over user messages, shared by the chat and voice handlers
+
+Every emotion and topic keyword (English, Hinglish and Devanagari) is compiled
+into one regular expression shaped like a trie: keywords sharing a prefix share
+a branch, so the regex engine follows one path per character instead of trying
+each keyword in turn. A message is lowercased and scanned once, when it arrives:
+- matches are greedy (longest keyword at a position); a hit also counts the
+  shorter keywords it starts with ('dard' -> 'dar'), and each search restarts
+  one character after the previous hit, so results match the original
+  `keyword in text` checks exactly, overlaps included
+
+ConversationSignals keeps, per user, the keywords seen in their last few
+messages with incremental per-emotion counts; the current emotion is a lookup
+instead of a rescan of the joined recent history.
+"""
+
+import re
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Keyword-based emotion detection (English and Hindi/Hinglish). Order breaks ties.
+EMOTION_KEYWORDS: Dict[str, List[str]] = {
+    'sad': ['sad', 'upset', 'depressed', 'dukhi', 'pareshan', 'tension', 'hurt', 'pain', 'dard'],
+    'worried': ['worried', 'anxiety', 'scared', 'fear', 'chinta', 'dar', 'nervous', 'problem', 'issue'],
+    'excited': ['excited', 'happy', 'great', 'wonderful', 'khush', 'amazing', 'good news'],
+    'curious': ['curious', 'interested', 'want to know', 'tell me', 'batao', 'kya hai'],
+    'hopeful': ['hope', 'wish', 'please', 'help', 'aasha', 'ummeed', 'possible'],
+}
+
+# Topics tracked in user state (order is the order they are recorded in)
+TOPIC_KEYWORDS: Dict[str, List[str]] = {
+    'marriage': ['marriage', 'shaadi', 'शादी', 'vivah', 'rishta'],
+    'love': ['love', 'pyaar', 'प्यार', 'relationship', 'partner'],
+    'career': ['career', 'job', 'naukri', 'business', 'work', 'office'],
+    'health': ['health', 'sehat', 'स्वास्थ्य', 'illness', 'disease'],
+    'finance': ['money', 'paisa', 'wealth', 'dhan', 'finance', 'income'],
+    'family': ['family', 'parivar', 'परिवार', 'parents', 'children'],
+}
+
+MAX_PAST_TOPICS = 5
+
+
+def _trie_regex(node: Dict) -> str:
+    """Regex for a keyword trie ('' marks the end of a keyword); longer matches are tried first"""
+    branches = [re.escape(char) + _trie_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    return f"(?:{body})?" if '' in node else body
+
+
+@dataclass(frozen=True)
+class MessageAnalysis:
+    """Keywords found in one message"""
+    emotion_keywords: FrozenSet[str]
+    topics: Tuple[str, ...]
+
+
+class KeywordMatcher:
+    """All emotion and topic keywords compiled into one pattern"""
+
+    def __init__(self, emotions: Dict[str, List[str]] = EMOTION_KEYWORDS,
+                 topics: Dict[str, List[str]] = TOPIC_KEYWORDS):
+        self.emotions = list(emotions)
+        self.topics = list(topics)
+        self.emotion_of: Dict[str, List[str]] = {}
+        self.topic_of: Dict[str, List[str]] = {}
+        for label, keywords in emotions.items():
+            for keyword in keywords:
+                self.emotion_of.setdefault(keyword.lower(), []).append(label)
+        for label, keywords in topics.items():
+            for keyword in keywords:
+                self.topic_of.setdefault(keyword.lower(), []).append(label)
+
+        keywords = set(self.emotion_of) | set(self.topic_of)
+        trie: Dict = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        self.pattern = re.compile(_trie_regex(trie))
+        # The regex reports the longest keyword at a position; shorter ones starting there also match
+        self._prefixes = {
+            keyword: [other for other in keywords if keyword.startswith(other)]
+            for keyword in keywords
+        }
+
+    def keywords_in(self, text: str) -> FrozenSet[str]:
+        """Distinct keywords occurring anywhere in text (case-insensitive, overlaps included)"""
+        found = set()
+        text = text.lower()
+        search = self.pattern.search
+        match = search(text)
+        while match is not None:
+            found.update(self._prefixes[match.group()])
+            match = search(text, match.start() + 1)
+        return frozenset(found)
+
+    def analyze(self, text: str) -> MessageAnalysis:
+        keywords = self.keywords_in(text)
+        topics = {label for keyword in keywords for label in self.topic_of.get(keyword, ())}
+        return MessageAnalysis(
+            emotion_keywords=frozenset(k for k in keywords if k in self.emotion_of),
+            topics=tuple(label for label in self.topics if label in topics),
+        )
+
+    def dominant_emotion(self, hits: Dict[str, int]) -> str:
+        """Emotion with the most distinct keywords ('neutral' if none)"""
+        best, best_hits = 'neutral', 0
+        for label in self.emotions:
+            if hits.get(label, 0) > best_hits:
+                best, best_hits = label, hits[label]
+        return best
+
+
+class _UserWindow:
+    __slots__ = ('messages', 'keyword_counts', 'emotion_hits', 'last_text', 'last_analysis')
+
+    def __init__(self, window: int):
+        self.messages: Deque[MessageAnalysis] = deque(maxlen=window)
+        self.keyword_counts: Counter = Counter()  # keyword -> messages in the window containing it
+        self.emotion_hits: Counter = Counter()    # emotion -> distinct keywords in the window
+        self.last_text: Optional[str] = None
+        self.last_analysis: Optional[MessageAnalysis] = None
+
+
+class ConversationSignals:
+    """
+    Per-user emotion over the last `window` user messages, updated as messages arrive.
+
+    observe() scans each new message once; emotion() and the latest message's
+    topics are then available without rescanning.
+    """
+
+    def __init__(self, window: int = 3, matcher: Optional[KeywordMatcher] = None):
+        self.window = window
+        self.matcher = matcher or text_matcher
+        self._users: Dict[str, _UserWindow] = {}
+
+    def observe(self, user_id: str, text: str) -> MessageAnalysis:
+        """Record a new user message. Returns its analysis."""
+        analysis = self.matcher.analyze(text)
+        state = self._users.get(user_id)
+        if state is None:
+            state = self._users[user_id] = _UserWindow(self.window)
+
+        if len(state.messages) == state.messages.maxlen:
+            self._count(state, state.messages[0].emotion_keywords, -1)
+        state.messages.append(analysis)
+        self._count(state, analysis.emotion_keywords, 1)
+
+        state.last_text = text
+        state.last_analysis = analysis
+        return analysis
+
+    def emotion(self, user_id: str) -> str:
+        """Dominant emotion in the user's recent messages ('neutral' if none)"""
+        state = self._users.get(user_id)
+        if state is None:
+            return 'neutral'
+        return self.matcher.dominant_emotion(state.emotion_hits)
+
+    def analysis_of(self, user_id: str, text: str) -> MessageAnalysis:
+        """Analysis of a message, reusing observe()'s result for the user's latest one"""
+        state = self._users.get(user_id)
+        if state is not None and state.last_text == text:
+            return state.last_analysis
+        return self.matcher.analyze(text)
+
+    def reset(self, user_id: str) -> None:
+        self._users.pop(user_id, None)
+
+    def _count(self, state: _UserWindow, keywords: Iterable[str], delta: int) -> None:
+        for keyword in keywords:
+            before = state.keyword_counts[keyword]
+            after = before + delta
+            if after:
+                state.keyword_counts[keyword] = after
+            else:
+                del state.keyword_counts[keyword]
+            if (before == 0) != (after == 0):
+                for label in self.matcher.emotion_of[keyword]:
+                    state.emotion_hits[label] += 1 if after else -1
+
+
+def update_user_state(state: Dict, emotion: str, topics: Iterable[str], max_topics: int = MAX_PAST_TOPICS) -> bool:
+    """
+    Record the detected emotion and newly discussed topics in a user's state.
+    Returns True if the state changed.
+    """
+    changed = False
+
+    # Initialize tracking fields if not present
+    if 'emotional_context' not in state:
+        state['emotional_context'] = ''
+        changed = True
+    if 'past_topics' not in state:
+        state['past_topics'] = []
+        changed = True
+
+    # Update emotional context
+    if emotion != 'neutral' and state['emotional_context'] != emotion:
+        state['emotional_context'] = emotion
+        changed = True
+
+    for topic in topics:
+        if topic not in state['past_topics']:
+            state['past_topics'].append(topic)
+            changed = True
+            # Keep only last max_topics topics
+            if len(state['past_topics']) > max_topics:
+                state['past_topics'] = state['past_topics'][-max_topics:]
+
+    return changed
+
+
+# Compiled once per process and shared by every handler
+text_matcher = KeywordMatcher()
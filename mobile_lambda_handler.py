@@ -1,11 +1,24 @@
 """
 Lambda Handler for Mobile API
 Wraps FastAPI mobile_api_service for AWS Lambda deployment
+
+Everything at module level runs once per execution environment (cold start)
+and is reused by every warm invocation: the app, the cached database secret
+and the pooled database connection. The connection is opened here, during
+the init phase, and pinged on checkout after idle periods, so a connection
+dropped while the environment was frozen is replaced transparently.
 """
 
 from mangum import Mangum
 from mobile_api_service import app
 
+try:
+    from backend.database.manager import db
+    db.warm_up()
+except Exception as e:
+    # The first request will connect (and report the error) instead
+    print(f"⚠️ Database warm-up failed: {e}")
+
 # Mangum wraps FastAPI for AWS Lambda compatibility
 handler = Mangum(app, lifespan="off")
 
@@ -15,4 +28,3 @@ def lambda_handler(event, context):
     Routes all API Gateway requests to FastAPI
     """
     return handler(event, context)
-
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: mobile API endpoints against the in-memory database backend
+Hermetic (no PostgreSQL needed): seeds synthetic users and chat history, then
+times the hot read/write endpoints through the FastAPI stack
+
+Numbers measure the API layer (routing, validation, serialization, async
+offload, idempotency) plus the stand-in backend - compare runs against each
+other, not against production database latency.
+
+Usage:
+    python scripts/benchmark_api.py --users 2000 --requests 500
+"""
+
+import os
+import io
+import sys
+import time
+import random
+import argparse
+import statistics
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DB_BACKEND', 'memory')
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api.mobile_endpoints import router
+from backend.database.manager import db
+
+
+def run(label: str, client: TestClient, make_request, requests: int):
+    timings = []
+    errors = 0
+    with redirect_stdout(io.StringIO()):  # endpoints log every request
+        started = time.perf_counter()
+        for i in range(requests):
+            start = time.perf_counter()
+            response = make_request(client, i)
+            timings.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code >= 400
+        elapsed = time.perf_counter() - started
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<18} requests={requests:<5} "
+          f"p50={statistics.median(timings):7.2f}ms  p95={p95:7.2f}ms  "
+          f"ops/s={requests / elapsed:8.1f}  errors={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mobile API endpoints (in-memory backend)")
+    parser.add_argument('--users', type=int, default=1000, help='Synthetic users to seed')
+    parser.add_argument('--conversations', type=int, default=3, help='Conversations per user')
+    parser.add_argument('--turns', type=int, default=20, help='Turns per conversation')
+    parser.add_argument('--requests', type=int, default=300, help='Requests per endpoint')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if db.backend != 'memory':
+        print("❌ benchmark_api.py seeds synthetic data - run it with DB_BACKEND=memory")
+        return 1
+
+    user_ids = db.seed_dataset(users=args.users, conversations_per_user=args.conversations,
+                               turns_per_conversation=args.turns, seed=args.seed)
+    pairs = [(user_id, chat['astrologer_id']) for user_id in user_ids[:100]
+             for chat in db.get_user_conversations(user_id)[:1]]
+    rng = random.Random(args.seed)
+
+    app = FastAPI()
+    app.include_router(router)
+
+    endpoints = (
+        ('astrologers', lambda c, i: c.get("/api/astrologers")),
+        ('chat list', lambda c, i: c.get(f"/api/chat/conversations/{rng.choice(user_ids)}")),
+        ('unified history', lambda c, i: c.get("/api/chat/unified-history/%s/%s?limit=50" % rng.choice(pairs))),
+        ('search', lambda c, i: c.get(f"/api/chat/search/{rng.choice(user_ids)}", params={'q': 'shaadi'})),
+        ('wallet', lambda c, i: c.get(f"/api/wallet/{rng.choice(user_ids)}")),
+        ('deduct-session', lambda c, i: c.post("/api/wallet/deduct-session", json={
+            'user_id': user_ids[i % len(user_ids)], 'conversation_id': f'bench_{i}',
+            'astrologer_id': pairs[0][1], 'astrologer_name': 'Benchmark', 'amount': 1.0,
+            'session_duration_minutes': 1,
+        })),
+    )
+
+    print(f"🏁 Benchmarking {args.requests} requests per endpoint "
+          f"({args.users} users, {args.users * args.conversations * args.turns * 2} messages)")
+    with TestClient(app) as client:
+        for label, make_request in endpoints:
+            run(label, client, make_request, args.requests)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
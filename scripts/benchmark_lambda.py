@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Lambda cold start versus warm invocations
+Each cold sample is a fresh Python process that imports mobile_lambda_handler
+(the init phase) and sends one API Gateway event through it; the same process
+then serves the warm invocations.
+
+Runs against whatever the environment configures (DB_SECRET_ARN / DB_HOST ...),
+so run it from a host close to the database for meaningful numbers. The
+"secret fetches" and "connections" columns should stay flat across warm
+invocations - every one of them is paid once per cold start.
+
+Usage:
+    python scripts/benchmark_lambda.py --cold 5 --warm 200 --path /api/astrologers
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def api_gateway_event(path: str) -> dict:
+    """Minimal API Gateway HTTP API (payload v2) GET event"""
+    return {
+        'version': '2.0',
+        'routeKey': '$default',
+        'rawPath': path,
+        'rawQueryString': '',
+        'headers': {'host': 'benchmark.local', 'accept': 'application/json'},
+        'requestContext': {
+            'http': {'method': 'GET', 'path': path, 'protocol': 'HTTP/1.1', 'sourceIp': '127.0.0.1'},
+            'stage': '$default',
+            'requestId': 'benchmark',
+        },
+        'isBase64Encoded': False,
+    }
+
+
+class _Context:
+    """Stand-in for the Lambda context object"""
+    function_name = 'benchmark'
+    aws_request_id = 'benchmark'
+
+    @staticmethod
+    def get_remaining_time_in_millis():
+        return 30000
+
+
+def child(path: str, warm: int) -> dict:
+    """One execution environment: init, first (cold) invocation, then warm invocations"""
+    sys.path.insert(0, PROJECT_ROOT)
+    event, context = api_gateway_event(path), _Context()
+
+    with redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        import mobile_lambda_handler
+        init_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        status = mobile_lambda_handler.lambda_handler(event, context)['statusCode']
+        first_ms = (time.perf_counter() - started) * 1000
+
+        from backend.config.secrets import get_secret_cache
+        from backend.database.manager import db
+        before = (get_secret_cache().stats()['fetches'], db.get_pool_stats().get('connections_created', 0))
+
+        timings, errors = [], status >= 400
+        for _ in range(warm):
+            started = time.perf_counter()
+            response = mobile_lambda_handler.lambda_handler(event, context)
+            timings.append((time.perf_counter() - started) * 1000)
+            errors += response['statusCode'] >= 400
+        after = (get_secret_cache().stats()['fetches'], db.get_pool_stats().get('connections_created', 0))
+
+    return {
+        'init_ms': init_ms,
+        'first_ms': first_ms,
+        'warm_ms': timings,
+        'errors': errors,
+        'cold_secret_fetches': before[0],
+        'cold_connections': before[1],
+        'warm_secret_fetches': after[0] - before[0],
+        'warm_connections': after[1] - before[1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Lambda cold start vs warm invocations")
+    parser.add_argument('--cold', type=int, default=3, help='Cold starts (fresh processes)')
+    parser.add_argument('--warm', type=int, default=100, help='Warm invocations per process')
+    parser.add_argument('--path', default='/api/astrologers', help='GET path to invoke')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.path, args.warm)))
+        return 0
+
+    runs = []
+    for i in range(args.cold):
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', '--warm', str(args.warm), '--path', args.path],
+            capture_output=True, text=True, cwd=PROJECT_ROOT
+        )
+        if result.returncode != 0:
+            print(f"❌ Cold start {i + 1} failed:\n{result.stderr[-2000:]}")
+            return 1
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    warm = sorted(t for run in runs for t in run['warm_ms'])
+    print(f"🏁 {args.path}: {args.cold} cold starts, {args.warm} warm invocations each")
+    print(f"{'cold init':<22} median={statistics.median(r['init_ms'] for r in runs):8.1f}ms")
+    print(f"{'cold first request':<22} median={statistics.median(r['first_ms'] for r in runs):8.1f}ms")
+    if warm:
+        p95 = warm[max(int(len(warm) * 0.95) - 1, 0)]
+        print(f"{'warm request':<22} p50={statistics.median(warm):8.2f}ms  p95={p95:8.2f}ms")
+    print(f"{'secret fetches':<22} cold={sum(r['cold_secret_fetches'] for r in runs)}  "
+          f"warm={sum(r['warm_secret_fetches'] for r in runs)}")
+    print(f"{'connections opened':<22} cold={sum(r['cold_connections'] for r in runs)}  "
+          f"warm={sum(r['warm_connections'] for r in runs)}")
+    print(f"{'errors':<22} {sum(r['errors'] for r in runs)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ULID message IDs vs legacy concatenated IDs
+Compares primary-key index size and insert throughput using temporary tables
+on the configured database (DB_* env vars). Nothing is left behind.
+
+Usage:
+    python scripts/benchmark_message_ids.py --rows 200000
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2.extras import execute_values
+
+from backend.database.manager import DatabaseManager
+from backend.database.ids import prefixed_id
+
+
+def legacy_ids(count: int, conversations: int = 500):
+    """
+    IDs as generated before: msg_<conversation_id>_<ms>, where the conversation
+    ID embeds user and astrologer. Messages from many live conversations
+    interleave, so inserts land all over the index.
+    """
+    now = int(time.time())
+    conversation_ids = [
+        f"conv_user_{uuid.uuid4().hex[:12]}_astrologer_{random.randint(1, 20):03d}_{now}"
+        for _ in range(conversations)
+    ]
+    base = int(time.time() * 1000)
+    return [f"msg_{random.choice(conversation_ids)}_{base + i}" for i in range(count)]
+
+
+def ulid_ids(count: int):
+    return [prefixed_id('msg') for _ in range(count)]
+
+
+def bench(cursor, table: str, ids, batch: int):
+    cursor.execute(f"CREATE TEMP TABLE {table} (message_id VARCHAR(255) PRIMARY KEY, content TEXT)")
+    start = time.perf_counter()
+    for i in range(0, len(ids), batch):
+        execute_values(cursor, f"INSERT INTO {table} (message_id, content) VALUES %s",
+                       [(message_id, 'x') for message_id in ids[i:i + batch]])
+    elapsed = time.perf_counter() - start
+    cursor.execute(f"SELECT pg_relation_size('{table}_pkey')")
+    index_bytes = cursor.fetchone()[0]
+    return elapsed, index_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message ID schemes")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    # Generation cost alone
+    for label, fn in (('legacy', legacy_ids), ('ulid', ulid_ids)):
+        start = time.perf_counter()
+        sample = fn(args.rows)
+        elapsed = time.perf_counter() - start
+        print(f"🔑 {label:<7} generate {args.rows} ids: {elapsed * 1000:8.1f}ms  "
+              f"avg length={sum(map(len, sample)) / len(sample):.0f} chars")
+
+    db = DatabaseManager()
+    with db.get_connection() as conn:
+        with conn.cursor() as cursor:
+            for label, fn in (('legacy', legacy_ids), ('ulid', ulid_ids)):
+                elapsed, index_bytes = bench(cursor, f"bench_ids_{label}", fn(args.rows), args.batch)
+                print(f"🗄️  {label:<7} insert {args.rows} rows: {args.rows / elapsed:10.0f} rows/s  "
+                      f"pkey index={index_bytes / 1024 / 1024:7.2f} MiB")
+        # Temp tables vanish with the transaction
+        conn.rollback()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
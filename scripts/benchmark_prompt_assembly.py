@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-turn chat prompt assembly, precompiled templates vs legacy rebuild
+Runs in-process (no OpenAI or database calls) for a returning user with a saved
+state, an astrology profile and recent history
+
+Usage:
+    python scripts/benchmark_prompt_assembly.py --turns 5000
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import tempfile
+import tracemalloc
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from backend.handlers import openai_chat
+from backend.services.astrology_service import AstrologyProfile, AstrologyProfileManager
+
+USER_ID = "user_benchmark"
+USER_MSG = "Meri shaadi kab hogi? Please batayein mere kundli ke hisaab se."
+AI_MSG = "Aapki kundli mein 7th house ka lord strong hai, 2026 ke baad yog ban rahe hain 💍 Aapka birth time exact hai na?"
+
+
+def legacy_user_context(handler, user_id: str) -> str:
+    """The pre-template context: state, profile and dialogue rebuilt every turn"""
+    parts = []
+    if user_id in handler.user_states:
+        state = handler.user_states[user_id]
+        parts.append(f"Collected details for user {user_id}:")
+        for k, v in state.items():
+            if v and k not in ['emotional_context', 'past_topics']:
+                parts.append(f"- {k}: {v}")
+        if 'emotional_context' in state and state['emotional_context']:
+            parts.append(f"Emotional state: {state['emotional_context']}")
+        if 'past_topics' in state and state['past_topics']:
+            parts.append(f"Previous discussions: {', '.join(state['past_topics'][-3:])}")
+    profile = openai_chat.astrology_profile_manager.get_profile(user_id)
+    if profile:
+        parts.append("Complete astrology profile:")
+        parts.append(profile.get_context_for_ai())
+    if user_id in handler.conversation_history:
+        parts.append("\nRecent dialogue:")
+        for msg in handler.conversation_history[user_id][-5:]:
+            parts.append(f"{msg.get('role', 'unknown')}: {msg.get('content', '')[:100]}")
+    return "\n".join(parts) if parts else openai_chat.NEW_USER_CONTEXT
+
+
+def legacy_build_messages(handler, user_id: str, message: str, user_context: str, phase: int):
+    """The pre-template system prompt: humanization layer rebuilt and concatenated every turn"""
+    system_prompt = handler.system_instructions
+    if user_context != openai_chat.NEW_USER_CONTEXT:
+        system_prompt += f"\n\nUser Context:\n{user_context}"
+    humanization = openai_chat.build_humanization_layer.__wrapped__(
+        phase, handler._detect_user_emotion(user_id), handler._remedy_topics(user_id, phase)
+    )
+    system_prompt += f"\n\n{humanization}"
+    system_prompt += "\n\n⚠️ CRITICAL RESPONSE RULES:"
+    system_prompt += "\n- Maximum 2-4 lines only (not sentences, LINES)"
+    system_prompt += "\n- Must end with ONE engaging question or curiosity hook"
+    system_prompt += "\n- Use emojis in every response"
+    system_prompt += "\n- Speak conversationally, NO bullet points or lists"
+    messages = [{"role": "system", "content": system_prompt}]
+    for msg in handler.conversation_history.get(user_id, [])[-10:]:
+        messages.append({"role": msg['role'], "content": msg['content']})
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+def legacy_turn(handler):
+    context = legacy_user_context(handler, USER_ID)
+    phase = handler.get_conversation_phase(USER_ID)
+    return legacy_build_messages(handler, USER_ID, USER_MSG, context, phase)
+
+
+def template_turn(handler):
+    context = handler._get_user_context(USER_ID)
+    phase = handler.get_conversation_phase(USER_ID)
+    return handler._build_messages(USER_ID, USER_MSG, context, phase)
+
+
+def make_handler(profiles: AstrologyProfileManager):
+    handler = openai_chat.OpenAIChatHandler(
+        'ast_bench',
+        astrologer_config={
+            'name': 'Benchmark', 'speciality': 'Marriage',
+            'text_system_prompt': openai_chat.OpenAIChatHandler._default_instructions(None),
+        },
+        user_states={USER_ID: {
+            'name': 'Asha', 'conversation_id': 'conv_benchmark',
+            'emotional_context': 'worried', 'past_topics': ['marriage', 'career'],
+        }},
+    )
+    profiles.create_profile(AstrologyProfile(
+        user_id=USER_ID, name='Asha', birth_date='1994-08-17', birth_time='06:45',
+        birth_location='Jaipur, India', birth_timezone='Asia/Kolkata',
+    ))
+    for _ in range(3):
+        handler.increment_conversation_turn(USER_ID, 'user', USER_MSG + ' Mujhe chinta ho rahi hai.')
+        handler.increment_conversation_turn(USER_ID, 'assistant', AI_MSG)
+    return handler
+
+
+def run(label: str, fn, handler, turns: int):
+    fn(handler)  # warm caches and imports
+
+    timings = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        fn(handler)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+
+    # Peak transient memory of one assembly, measured separately (tracemalloc slows everything down)
+    tracemalloc.start()
+    peaks = []
+    for _ in range(min(turns, 200)):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(handler)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<12} turns={turns:<6} "
+          f"p50={statistics.median(timings):8.1f}µs  p95={p95:8.1f}µs  "
+          f"mean={statistics.mean(timings):8.1f}µs  peak alloc/turn={statistics.median(peaks) / 1024:6.1f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat prompt assembly")
+    parser.add_argument('--turns', type=int, default=2000, help='Turns per variant')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        profiles = AstrologyProfileManager(storage_dir=tmp)
+        with mock.patch.object(openai_chat, 'astrology_profile_manager', profiles), \
+                mock.patch.object(openai_chat, 'user_state_store', mock.Mock()):
+            handler = make_handler(profiles)
+            phase = handler.get_conversation_phase(USER_ID)
+            legacy, current = legacy_turn(handler), template_turn(handler)
+            if legacy != current:
+                print("❌ Template output differs from the legacy prompt")
+                return 1
+            print(f"🏁 Prompt assembly, {args.turns} turns per variant "
+                  f"(phase {phase}, system prompt {len(current[0]['content'])} chars)")
+            run('legacy', legacy_turn, handler, args.turns)
+            run('templates', template_turn, handler, args.turns)
+            info = openai_chat.compile_system_template.cache_info()
+            print(f"📊 Template cache: {info.hits} hits, {info.misses} misses")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
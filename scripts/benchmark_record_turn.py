@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: record_turn vs legacy four-call chat turn persistence
+Runs against the configured database (DB_* env vars) and cleans up after itself
+
+Usage:
+    python scripts/benchmark_record_turn.py --turns 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database.manager import DatabaseManager
+
+USER_MSG = "Meri shaadi kab hogi? Please batayein mere kundli ke hisaab se."
+AI_MSG = "Aapki kundli mein 7th house ka lord strong hai, 2026 ke baad yog ban rahe hain. " * 3
+
+
+def legacy_turn(db: DatabaseManager, conversation_id: str):
+    """The pre-record_turn write path: four connections / transactions"""
+    db.add_message(conversation_id, 'user', USER_MSG, 'text')
+    db.update_conversation_last_message(conversation_id, USER_MSG)
+    db.add_message(conversation_id, 'astrologer', AI_MSG, 'text')
+    db.update_conversation_activity(conversation_id)
+
+
+def batched_turn(db: DatabaseManager, conversation_id: str):
+    """Single-statement write path"""
+    db.record_turn(conversation_id, USER_MSG, AI_MSG, tokens=180, model='gpt-4o-mini')
+
+
+def run(label: str, fn, db: DatabaseManager, conversation_id: str, turns: int):
+    before = db.get_pool_stats().get('acquisitions', 0)
+    timings = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        fn(db, conversation_id)
+        timings.append((time.perf_counter() - start) * 1000)
+        # Keep millisecond-based message ids from colliding between turns
+        time.sleep(0.002)
+    checkouts = db.get_pool_stats().get('acquisitions', 0) - before
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<14} turns={turns:<5} "
+          f"p50={statistics.median(timings):7.2f}ms  p95={p95:7.2f}ms  "
+          f"mean={statistics.mean(timings):7.2f}ms  checkouts/turn={checkouts / turns:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat turn persistence")
+    parser.add_argument('--turns', type=int, default=100, help='Turns per variant')
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    astrologers = db.get_all_astrologers(active_only=False)
+    if not astrologers:
+        print("❌ No astrologers in database - seed the schema first")
+        return 1
+
+    user_id = db.generate_user_id()
+    db.create_user({
+        'user_id': user_id, 'email': None, 'phone_number': None,
+        'full_name': 'Benchmark User', 'display_name': 'Benchmark User',
+        'language_preference': 'hi', 'subscription_type': 'free',
+        'metadata': {'benchmark': True}, 'birth_date': None, 'birth_time': None,
+        'birth_location': None, 'birth_timezone': None, 'gender': None,
+    })
+
+    conversations = []
+    try:
+        print(f"🏁 Benchmarking {args.turns} turns per variant against {db.db_config['host']}")
+        for label, fn in (('legacy (4 tx)', legacy_turn), ('record_turn', batched_turn)):
+            conversation_id = db.create_conversation(user_id, astrologers[0]['astrologer_id'], 'benchmark')
+            conversations.append(conversation_id)
+            run(label, fn, db, conversation_id, args.turns)
+    finally:
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM messages WHERE conversation_id = ANY(%s)", (conversations,))
+                cursor.execute("DELETE FROM conversations WHERE conversation_id = ANY(%s)", (conversations,))
+                cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+        print("🧹 Benchmark data removed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
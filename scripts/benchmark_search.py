@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chat history search on a user with a long history
+Seeds one user with many messages in the configured database (DB_* env vars),
+plus background users so the planner sees a shared table, times
+search_messages for typical queries and cleans up after itself
+
+The target is p95 under 50ms per search at tens of thousands of messages.
+The sentences repeat, so common words match a large share of the history -
+a harder case than real chats.
+
+Usage:
+    python scripts/benchmark_search.py --messages 30000 --background-users 10 --searches 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database.manager import DatabaseManager
+
+SENTENCES = [
+    "Meri shaadi kab hogi? Ghar wale rishta dhoond rahe hain.",
+    "Aapki kundli mein shaadi ka yog 2026 ke baad strong hai.",
+    "Career mein promotion milega ya job change karun?",
+    "Shani ki dasha mein job change abhi mat kijiye.",
+    "मेरी शादी में देरी क्यों हो रही है?",
+    "Guru ka gochar aapke saatve ghar par shubh hai.",
+    "Business mein paisa lagana theek rahega is saal?",
+    "Health ka dhyan rakhiye, Mangal thoda kamzor hai.",
+    "Mujhe bahut tension hai exams ko lekar.",
+    "Rahu ketu ka asar agle mahine tak rahega.",
+]
+QUERIES = ["shaadi", "job change", "शादी", "promotion -shani", "\"guru ka gochar\"", "health mangal"]
+
+
+def create_benchmark_user(db: DatabaseManager) -> str:
+    user_id = db.generate_user_id()
+    db.create_user({
+        'user_id': user_id, 'email': None, 'phone_number': None,
+        'full_name': 'Benchmark User', 'display_name': 'Benchmark User',
+        'language_preference': 'hi', 'subscription_type': 'free',
+        'metadata': {'benchmark': True}, 'birth_date': None, 'birth_time': None,
+        'birth_location': None, 'birth_timezone': None, 'gender': None,
+    })
+    return user_id
+
+
+def seed(db: DatabaseManager, user_id: str, astrologer_ids, messages: int, conversations: int):
+    """Spread messages over the last six months across several conversations"""
+    with db.get_connection() as conn:
+        with conn.cursor() as cursor:
+            conversation_ids = []
+            for n in range(conversations):
+                conversation_id = f"bench_conv_{user_id}_{n}"
+                cursor.execute("""
+                    INSERT INTO conversations (conversation_id, user_id, astrologer_id, topic, started_at)
+                    VALUES (%s, %s, %s, 'benchmark', NOW() - INTERVAL '180 days')
+                """, (conversation_id, user_id, astrologer_ids[n % len(astrologer_ids)]))
+                conversation_ids.append(conversation_id)
+
+            cursor.execute("""
+                INSERT INTO messages (message_id, conversation_id, sender_type, message_type, content, sent_at)
+                SELECT 'bench_msg_' || %(user_id)s || '_' || i,
+                       (%(conversations)s)[1 + i %% array_length(%(conversations)s, 1)],
+                       CASE WHEN i %% 2 = 0 THEN 'user' ELSE 'astrologer' END,
+                       'text',
+                       (%(sentences)s)[1 + i %% array_length(%(sentences)s, 1)] || ' ' ||
+                       (%(sentences)s)[1 + (i * 7 / 3) %% array_length(%(sentences)s, 1)],
+                       NOW() - INTERVAL '180 days' * i / %(messages)s
+                FROM generate_series(1, %(messages)s) AS i
+            """, {'user_id': user_id, 'conversations': conversation_ids, 'sentences': SENTENCES,
+                  'messages': messages})
+    return conversation_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat history search")
+    parser.add_argument('--messages', type=int, default=30000, help='Messages in each seeded history')
+    parser.add_argument('--conversations', type=int, default=40, help='Conversations they are spread over')
+    parser.add_argument('--background-users', type=int, default=10,
+                        help='Other users with the same history size')
+    parser.add_argument('--searches', type=int, default=200, help='Timed searches')
+    parser.add_argument('--target-ms', type=float, default=50.0, help='p95 latency target')
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    astrologers = db.get_all_astrologers(active_only=False)
+    if not astrologers:
+        print("❌ No astrologers in database - seed the schema first")
+        return 1
+
+    astrologer_ids = [a['astrologer_id'] for a in astrologers]
+    user_ids = []
+    conversations = []
+    try:
+        print(f"🌱 Seeding {args.background_users + 1} users with {args.messages} messages in "
+              f"{args.conversations} conversations each on {db.db_config['host']}")
+        for _ in range(args.background_users + 1):
+            user_ids.append(create_benchmark_user(db))
+            conversations += seed(db, user_ids[-1], astrologer_ids, args.messages, args.conversations)
+        # Settle the freshly loaded rows like an aged table: visibility map set, statistics current
+        conn = psycopg2.connect(**db.db_config)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute("VACUUM ANALYZE messages")
+        finally:
+            conn.close()
+        user_id = user_ids[-1]
+
+        for query in QUERIES:  # warm the connection pool and caches
+            db.search_messages(user_id, query)
+
+        by_query = {query: [] for query in QUERIES}
+        for n in range(args.searches):
+            query = QUERIES[n % len(QUERIES)]
+            start = time.perf_counter()
+            result = db.search_messages(user_id, query, offset=(n // len(QUERIES)) % 3 * 20)
+            by_query[query].append((time.perf_counter() - start) * 1000)
+            if not result['success']:
+                print(f"❌ Search failed: {result['error']}")
+                return 1
+
+        for query, samples in by_query.items():
+            print(f"  {query:<20} p50={statistics.median(samples):7.2f}ms  max={max(samples):7.2f}ms")
+        timings = sorted(t for samples in by_query.values() for t in samples)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"search         searches={args.searches:<5} "
+              f"p50={statistics.median(timings):7.2f}ms  p95={p95:7.2f}ms  max={timings[-1]:7.2f}ms")
+        if p95 > args.target_ms:
+            print(f"⚠️ p95 above the {args.target_ms:.0f}ms target")
+            return 1
+        print(f"✅ p95 within the {args.target_ms:.0f}ms target")
+        return 0
+    finally:
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM messages WHERE conversation_id = ANY(%s)", (conversations,))
+                cursor.execute("DELETE FROM conversations WHERE conversation_id = ANY(%s)", (conversations,))
+                cursor.execute("DELETE FROM users WHERE user_id = ANY(%s)", (user_ids,))
+        print("🧹 Benchmark data removed")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Database Maintenance for AstroVoice
+Scheduled housekeeping tasks (run daily from cron / EventBridge)
+
+Usage:
+    python scripts/db_maintenance.py partitions status
+    python scripts/db_maintenance.py partitions ensure --months-ahead 3
+    python scripts/db_maintenance.py partitions detach --retain-months 24 [--drop]
+    python scripts/db_maintenance.py partitions migrate
+    python scripts/db_maintenance.py archive --retain-days 365
+    python scripts/db_maintenance.py search backfill
+    python scripts/db_maintenance.py stats reconcile
+    python scripts/db_maintenance.py threads rebuild
+    python scripts/db_maintenance.py idempotency purge
+    python scripts/db_maintenance.py schema status
+    python scripts/db_maintenance.py schema up [--target N] [--no-wait]
+    python scripts/db_maintenance.py shards plan|copy|sync|cleanup --to s1@host1,s2@host2,s3@host3
+
+With DB_SHARDS set, every other command runs once per shard
+(`db_maintenance.py --shard NAME <command>` limits it to one).
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database.manager import db
+from backend.database.partitions import PartitionManager
+from backend.database.archive import MessageArchiver
+from backend.database.statistics import StatisticsReconciler
+from backend.database.threads import ThreadRebuilder
+from backend.database.idempotency import IdempotencyStore
+from backend.database.sharding import ShardedDatabaseManager, Resharder
+from backend.database.manager import DatabaseManager
+from backend.config.settings import MESSAGE_ARCHIVE_RETAIN_DAYS, get_shard_config
+
+
+def partitions_command(args, db) -> int:
+    manager = PartitionManager(db)
+
+    if args.action == 'migrate':
+        manager.migrate_to_partitioned(months_ahead=args.months_ahead)
+        return 0
+
+    if not manager.is_partitioned():
+        print("❌ messages is not partitioned yet - run: partitions migrate")
+        return 1
+
+    if args.action == 'ensure':
+        created = manager.ensure_partitions(months_ahead=args.months_ahead)
+        print(f"✅ {len(created)} partition(s) created")
+    elif args.action == 'detach':
+        detached = manager.detach_old_partitions(retain_months=args.retain_months, drop=args.drop)
+        print(f"✅ {len(detached)} partition(s) {'dropped' if args.drop else 'detached'}")
+    else:
+        print(f"{'partition':<24} {'rows (est)':>12} {'size':>10}")
+        for partition in manager.list_partitions():
+            size_mb = partition['total_bytes'] / 1024 / 1024
+            print(f"{partition['name']:<24} {partition['estimated_rows']:>12} {size_mb:>8.1f}MB")
+    return 0
+
+
+def archive_command(args, db) -> int:
+    archiver = MessageArchiver(db, db.archive)
+    archiver.run(retain_days=args.retain_days, batch_size=args.batch_size)
+    return 0
+
+
+def search_command(args, db) -> int:
+    db.backfill_search_vectors(batch_size=args.batch_size)
+    return 0
+
+
+def stats_command(args, db) -> int:
+    StatisticsReconciler(db).run(batch_size=args.batch_size)
+    return 0
+
+
+def threads_command(args, db) -> int:
+    ThreadRebuilder(db).run(batch_size=args.batch_size)
+    return 0
+
+
+def idempotency_command(args, db) -> int:
+    IdempotencyStore(db).purge_expired()
+    return 0
+
+
+def schema_command(args, db) -> int:
+    if args.action == 'status':
+        for migration in db.get_migration_status():
+            state = 'applied' if migration['applied'] else 'pending'
+            if migration['modified_since_applied']:
+                state += ' (file changed since)'
+            print(f"{migration['version']:04d}_{migration['name']:<32} {state}")
+        return 0
+
+    result = db.migrate(target=args.target, wait=not args.no_wait)
+    return 0 if result['success'] or result['locked'] else 1
+
+
+def shards_command(args, db) -> int:
+    if not isinstance(db, ShardedDatabaseManager):
+        print("❌ DB_SHARDS is not set - configure the current shards first")
+        return 1
+
+    config = get_shard_config(args.to.split(','))
+    target = {entry['name']: DatabaseManager(db_config=entry['config'], name=entry['name'])
+              for entry in config['shards']}
+    resharder = Resharder(db, target, batch_size=args.batch_size)
+
+    if args.action == 'plan':
+        resharder.plan()
+    elif args.action == 'copy':
+        resharder.copy()
+    elif args.action == 'sync':
+        resharder.sync()
+        print("👉 Now set DB_SHARDS to the new list and restart, then run: shards cleanup")
+    else:
+        resharder.cleanup()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AstroVoice database maintenance")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    partitions = subparsers.add_parser('partitions', help='Manage monthly messages partitions')
+    partitions.add_argument('action', choices=['status', 'ensure', 'detach', 'migrate'])
+    partitions.add_argument('--months-ahead', type=int, default=3)
+    partitions.add_argument('--retain-months', type=int, default=24)
+    partitions.add_argument('--drop', action='store_true', help='Drop detached partitions instead of keeping them')
+    partitions.set_defaults(func=partitions_command)
+
+    archive = subparsers.add_parser('archive', help='Move messages past retention into the cold archive')
+    archive.add_argument('--retain-days', type=int, default=MESSAGE_ARCHIVE_RETAIN_DAYS)
+    archive.add_argument('--batch-size', type=int, default=5000)
+    archive.set_defaults(func=archive_command)
+
+    search = subparsers.add_parser('search', help='Maintain the message full-text search index')
+    search.add_argument('action', choices=['backfill'])
+    search.add_argument('--batch-size', type=int, default=5000)
+    search.set_defaults(func=search_command)
+
+    stats = subparsers.add_parser('stats', help='Reconcile the user/astrologer statistics tables')
+    stats.add_argument('action', choices=['reconcile'])
+    stats.add_argument('--batch-size', type=int, default=500)
+    stats.set_defaults(func=stats_command)
+
+    threads = subparsers.add_parser('threads', help='Backfill/repair the chat list read model')
+    threads.add_argument('action', choices=['rebuild'])
+    threads.add_argument('--batch-size', type=int, default=500)
+    threads.set_defaults(func=threads_command)
+
+    idempotency = subparsers.add_parser('idempotency', help='Remove expired idempotency keys')
+    idempotency.add_argument('action', choices=['purge'])
+    idempotency.set_defaults(func=idempotency_command)
+
+    schema = subparsers.add_parser('schema', help='Apply versioned schema migrations')
+    schema.add_argument('action', choices=['status', 'up'])
+    schema.add_argument('--target', type=int, default=None, help='Stop after this migration version')
+    schema.add_argument('--no-wait', action='store_true', help='Skip if another instance is migrating')
+    schema.set_defaults(func=schema_command)
+
+    shards = subparsers.add_parser('shards', help='Move users between shards when the shard list changes')
+    shards.add_argument('action', choices=['plan', 'copy', 'sync', 'cleanup'])
+    shards.add_argument('--to', required=True, help='New shard list (DB_SHARDS format)')
+    shards.add_argument('--batch-size', type=int, default=200)
+    shards.set_defaults(func=shards_command)
+
+    parser.add_argument('--shard', default=None, help='With DB_SHARDS set: run on this shard only')
+
+    args = parser.parse_args()
+    if args.command == 'shards' or not isinstance(db, ShardedDatabaseManager):
+        return args.func(args, db)
+
+    status = 0
+    for name, shard in db.shards.items():
+        if args.shard and name != args.shard:
+            continue
+        print(f"🧩 Shard {name}")
+        status = max(status, args.func(args, shard))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
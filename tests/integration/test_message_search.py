@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Integration Tests - Chat History Search (Requires PostgreSQL)
+Full-text search over a user's messages and the search_vector backfill
+
+Covers ranking, English stems next to exact Hinglish and Devanagari words,
+web-search syntax, the astrologer filter, pagination and isolation between
+users. Latency on large histories is measured by scripts/benchmark_search.py.
+
+Skipped automatically when no database is reachable.
+"""
+
+import sys
+import os
+import unittest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.manager import db
+
+MESSAGES = [
+    ('user', "Meri shaadi kab hogi? Ghar wale rishta dhoond rahe hain."),
+    ('astrologer', "Aapki kundli mein shaadi ka yog 2026 ke baad strong hai."),
+    ('user', "Career mein promotion milega ya job change karun?"),
+    ('astrologer', "Shani ki dasha mein job change abhi mat kijiye, promotions will come later."),
+    ('user', "मेरी शादी में देरी क्यों हो रही है?"),
+    ('astrologer', "Marriage ke liye Guru ka gochar shubh hai, shaadi shaadi shaadi."),
+]
+
+
+def database_available() -> bool:
+    try:
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+def create_test_user() -> str:
+    user_id = db.generate_user_id()
+    db.create_user({
+        'user_id': user_id, 'email': None, 'phone_number': None,
+        'full_name': 'Search Test', 'display_name': 'SearchTest',
+        'language_preference': 'hi', 'subscription_type': 'free', 'metadata': {'test': True},
+        'birth_date': None, 'birth_time': None, 'birth_location': None,
+        'birth_timezone': None, 'gender': None,
+    })
+    return user_id
+
+
+class TestMessageSearch(unittest.TestCase):
+    """search_messages and backfill_search_vectors against a real database"""
+
+    @classmethod
+    def setUpClass(cls):
+        if not database_available():
+            raise unittest.SkipTest("PostgreSQL not reachable - skipping message search tests")
+        astrologers = db.get_all_astrologers(active_only=False)
+        if len(astrologers) < 2:
+            raise unittest.SkipTest("Need two astrologers in the database - seed the schema first")
+        cls.astrologer_ids = [a['astrologer_id'] for a in astrologers[:2]]
+
+        cls.user_id = create_test_user()
+        cls.other_user_id = create_test_user()
+        cls.conversation_id = db.create_conversation(cls.user_id, cls.astrologer_ids[0], 'marriage')
+        cls.other_astrologer_conversation = db.create_conversation(cls.user_id, cls.astrologer_ids[1], 'general')
+        cls.other_user_conversation = db.create_conversation(cls.other_user_id, cls.astrologer_ids[0], 'marriage')
+        for sender, content in MESSAGES:
+            db.add_message(cls.conversation_id, sender, content)
+        db.add_message(cls.other_astrologer_conversation, 'astrologer', "Shaadi ke baare mein phir baat karenge.")
+        db.add_message(cls.other_user_conversation, 'user', "Shaadi ki date nikaliye please")
+
+    @classmethod
+    def tearDownClass(cls):
+        conversations = [cls.conversation_id, cls.other_astrologer_conversation, cls.other_user_conversation]
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM messages WHERE conversation_id = ANY(%s)", (conversations,))
+                cursor.execute("DELETE FROM conversations WHERE conversation_id = ANY(%s)", (conversations,))
+                cursor.execute("DELETE FROM users WHERE user_id = ANY(%s)",
+                               ([cls.user_id, cls.other_user_id],))
+
+    def search(self, query, **kwargs):
+        result = db.search_messages(self.user_id, query, **kwargs)
+        self.assertTrue(result['success'], result.get('error'))
+        return result
+
+    def test_hinglish_words_ranked(self):
+        """Exact Hinglish matches are found, the densest match first"""
+        print("🔍 Testing Hinglish search...")
+        results = self.search("shaadi")['results']
+        self.assertEqual(len(results), 4)
+        self.assertIn("shaadi shaadi shaadi", results[0]['content'])
+        self.assertIn("<b>", results[0]['snippet'])
+        ranks = [r['rank'] for r in results]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        print(f"✅ {len(results)} Hinglish matches in rank order")
+
+    def test_devanagari_words(self):
+        results = self.search("शादी")['results']
+        self.assertEqual([r['content'] for r in results], [MESSAGES[4][1]])
+
+    def test_english_stems(self):
+        """English word forms match through the english configuration"""
+        results = self.search("promotions")['results']
+        self.assertEqual({r['content'] for r in results}, {MESSAGES[2][1], MESSAGES[3][1]})
+
+    def test_websearch_syntax(self):
+        results = self.search('"job change" -shani')['results']
+        self.assertEqual([r['content'] for r in results], [MESSAGES[2][1]])
+
+    def test_astrologer_filter(self):
+        results = self.search("shaadi", astrologer_id=self.astrologer_ids[1])['results']
+        self.assertEqual([r['conversation_id'] for r in results], [self.other_astrologer_conversation])
+        self.assertEqual(results[0]['astrologer_id'], self.astrologer_ids[1])
+
+    def test_other_users_messages_excluded(self):
+        results = self.search("date nikaliye")['results']
+        self.assertEqual(results, [])
+
+    def test_pagination(self):
+        first = self.search("shaadi", limit=2)
+        second = self.search("shaadi", limit=2, offset=2)
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        ids = [r['message_id'] for r in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 4)
+
+    def test_backfill_fills_missing_vectors(self):
+        """Messages without a vector are indexed again, and only once"""
+        print("🔍 Testing search vector backfill...")
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("UPDATE messages SET search_vector = NULL WHERE conversation_id = %s",
+                               (self.conversation_id,))
+
+        self.assertEqual(self.search("shaadi", astrologer_id=self.astrologer_ids[0])['results'], [])
+        updated = db.backfill_search_vectors(batch_size=500)
+        self.assertGreaterEqual(updated, len(MESSAGES))
+        self.assertEqual(len(self.search("shaadi", astrologer_id=self.astrologer_ids[0])['results']), 3)
+        self.assertEqual(db.backfill_search_vectors(batch_size=500), 0)
+        print(f"✅ Backfilled {updated} messages")
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Message Search Integration Tests (Requires PostgreSQL)")
+    print("=" * 60)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestMessageSearch)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
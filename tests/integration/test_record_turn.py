@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Integration Tests - Chat Turn Persistence (Requires PostgreSQL)
+record_turn writing a user message, the astrologer's reply and the
+conversation's counters/preview in one statement
+
+Skipped automatically when no database is reachable.
+"""
+
+import sys
+import os
+import unittest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.manager import db
+
+
+def database_available() -> bool:
+    try:
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+def create_test_user() -> str:
+    user_id = db.generate_user_id()
+    db.create_user({
+        'user_id': user_id, 'email': None, 'phone_number': None,
+        'full_name': 'Turn Test', 'display_name': 'TurnTest',
+        'language_preference': 'hi', 'subscription_type': 'free', 'metadata': {'test': True},
+        'birth_date': None, 'birth_time': None, 'birth_location': None,
+        'birth_timezone': None, 'gender': None,
+    })
+    return user_id
+
+
+class TestRecordTurn(unittest.TestCase):
+    """record_turn against a real database"""
+
+    @classmethod
+    def setUpClass(cls):
+        if not database_available():
+            raise unittest.SkipTest("PostgreSQL not reachable - skipping chat turn tests")
+        astrologers = db.get_all_astrologers()
+        if not astrologers:
+            raise unittest.SkipTest("No astrologers seeded - skipping chat turn tests")
+        cls.astrologer_id = astrologers[0]['astrologer_id']
+
+    def setUp(self):
+        self.user_id = create_test_user()
+        self.conversation_id = db.create_conversation(self.user_id, self.astrologer_id)
+
+    def tearDown(self):
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM messages WHERE conversation_id = %s", (self.conversation_id,))
+                cursor.execute("DELETE FROM conversations WHERE conversation_id = %s", (self.conversation_id,))
+                cursor.execute("DELETE FROM users WHERE user_id = %s", (self.user_id,))
+
+    def messages(self):
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT message_id, sender_type, content, ai_model, tokens_used, sent_at
+                    FROM messages WHERE conversation_id = %s
+                    ORDER BY sent_at, message_id
+                """, (self.conversation_id,))
+                return cursor.fetchall()
+
+    def test_turn_writes_both_messages(self):
+        """Both rows are written in order, with the reply's model and tokens"""
+        print("🔍 Testing record_turn...")
+        ids = db.record_turn(self.conversation_id, "Meri shaadi kab hogi?", "Agle saal yog hai",
+                             tokens=180, model='gpt-4o-mini')
+        self.assertIsNotNone(ids)
+
+        rows = self.messages()
+        self.assertEqual([row[0] for row in rows], [ids['user_message_id'], ids['ai_message_id']])
+        self.assertEqual(rows[0][1:5], ('user', "Meri shaadi kab hogi?", None, None))
+        self.assertEqual(rows[1][1:5], ('astrologer', "Agle saal yog hai", 'gpt-4o-mini', 180))
+        self.assertLess(rows[0][5], rows[1][5])
+        self.assertLess(ids['user_message_id'], ids['ai_message_id'])
+
+        history = db.get_unified_chat_history(self.user_id, self.astrologer_id)
+        senders = [m['sender_type'] for m in history['messages'] if not m['is_separator']]
+        self.assertEqual(senders, ['user', 'astrologer'])
+        print("✅ Turn written in order")
+
+    def test_turn_updates_conversation(self):
+        """Counters grow by exactly two per turn and the preview is the user's message"""
+        print("🔍 Testing conversation counters...")
+        before = db.get_conversation(self.conversation_id)['total_messages']
+        db.record_turn(self.conversation_id, "Career kaisa rahega?", "Accha rahega")
+        long_question = "Kya " + "bahut " * 60 + "der lagegi?"
+        db.record_turn(self.conversation_id, long_question, "Thoda samay lagega")
+
+        conversation = db.get_conversation(self.conversation_id)
+        self.assertEqual(conversation['total_messages'], before + 4)
+        self.assertEqual(conversation['last_message_text'], long_question)
+        self.assertEqual(conversation['last_message_preview'], long_question[:200])
+        self.assertEqual(conversation['last_message_at'], self.messages()[-1][5])
+        print("✅ Conversation counters and preview updated")
+
+    def test_missing_conversation_fails(self):
+        """A turn for an unknown conversation writes nothing"""
+        self.assertIsNone(db.record_turn('conv_missing', "Hello", "Namaste"))
+        self.assertEqual(self.messages(), [])
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Chat Turn Integration Tests (Requires PostgreSQL)")
+    print("=" * 60)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestRecordTurn)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Integration Tests - Schema Upgrade (Requires PostgreSQL)
+Migrates a database created from the pre-migrations schema.sql to the latest version
+
+A scratch database is loaded from fixtures/schema_before_migrations.sql with a
+few rows (messages in a plain, unpartitioned table), then every migration is
+applied, starting with the baseline. The checks:
+- all versions apply and a second run has nothing to do
+- messages ends up partitioned with its rows, search vectors and the
+  (message_id, sent_at) key the write-behind upsert relies on
+- tables added since then exist and read models are backfilled
+
+Needs permission to create databases. Skipped automatically when no database
+is reachable or CREATE DATABASE is not allowed.
+"""
+
+import sys
+import os
+import uuid
+import unittest
+from pathlib import Path
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.config.settings import get_database_config
+from backend.database.manager import DatabaseManager
+from backend.database.migrator import discover_migrations
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'schema_before_migrations.sql'
+
+
+def admin_connection():
+    conn = psycopg2.connect(**get_database_config())
+    conn.autocommit = True
+    return conn
+
+
+def load_old_database(config):
+    """Create the pre-migrations schema with one user, conversation and two messages"""
+    with psycopg2.connect(**config) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(FIXTURE.read_text(encoding='utf-8'))
+            cursor.execute("""
+                INSERT INTO users (user_id, full_name) VALUES ('user_upgrade', 'Upgrade Test');
+                INSERT INTO astrologers (astrologer_id, name, display_name)
+                VALUES ('ast_upgrade', 'Upgrade Astrologer', 'Upgrade Astrologer');
+                INSERT INTO conversations (conversation_id, user_id, astrologer_id)
+                VALUES ('conv_upgrade', 'user_upgrade', 'ast_upgrade');
+                INSERT INTO messages (message_id, conversation_id, sender_type, content, sent_at) VALUES
+                    ('msg_old', 'conv_upgrade', 'user', 'Shaadi kab hogi?', now() - interval '40 days'),
+                    ('msg_new', 'conv_upgrade', 'astrologer', 'Shani is moving', now());
+            """)
+    conn.close()
+
+
+class TestSchemaUpgrade(unittest.TestCase):
+    """Baseline and migrations applied over an existing pre-migrations database"""
+
+    @classmethod
+    def setUpClass(cls):
+        if psycopg2 is None:
+            raise unittest.SkipTest("psycopg2 not installed - skipping schema upgrade tests")
+        try:
+            conn = admin_connection()
+        except Exception as e:
+            raise unittest.SkipTest(f"PostgreSQL not reachable - skipping schema upgrade tests: {e}")
+
+        cls.database = f"astro_upgrade_{uuid.uuid4().hex[:8]}"
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"CREATE DATABASE {cls.database}")
+        except psycopg2.Error as e:
+            raise unittest.SkipTest(f"Cannot create a scratch database: {e}")
+        finally:
+            conn.close()
+
+        config = {**get_database_config(), 'database': cls.database}
+        cls.db = DatabaseManager(db_config=config, name='upgrade_test')
+        try:
+            load_old_database(config)
+            cls.result = cls.db.migrate()
+        except Exception:
+            cls.tearDownClass()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close_pool()
+        conn = admin_connection()
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {cls.database} WITH (FORCE)")
+        conn.close()
+
+    def query(self, sql, params=None):
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+
+    def test_every_migration_applies(self):
+        """The baseline and all later versions apply over the old schema"""
+        print("🔍 Testing upgrade from the pre-migrations schema...")
+        self.assertTrue(self.result['success'], self.result['error'])
+        self.assertEqual(self.result['applied'], [m.version for m in discover_migrations()])
+        print(f"✅ Applied versions {self.result['applied']}")
+
+    def test_second_run_applies_nothing(self):
+        result = self.db.migrate()
+        self.assertTrue(result['success'], result['error'])
+        self.assertEqual(result['applied'], [])
+
+    def test_messages_partitioned_with_rows_kept(self):
+        """The plain messages table is converted and no row is lost"""
+        self.assertEqual(self.query("SELECT relkind FROM pg_class WHERE oid = 'messages'::regclass"), [('p',)])
+        self.assertEqual(self.query("SELECT to_regclass('messages_unpartitioned')"), [(None,)])
+
+        rows = self.query("""
+            SELECT message_id, tableoid::regclass::text, search_vector IS NOT NULL
+            FROM messages ORDER BY sent_at
+        """)
+        self.assertEqual([r[0] for r in rows], ['msg_old', 'msg_new'])
+        self.assertTrue(all(r[1].startswith('messages_y') for r in rows))
+        self.assertTrue(all(r[2] for r in rows))
+
+    def test_write_behind_upsert_key(self):
+        """Inserts conflict on (message_id, sent_at), as write-behind flushes expect"""
+        self.query("""
+            INSERT INTO messages (message_id, conversation_id, sender_type, content, sent_at)
+            SELECT message_id, conversation_id, sender_type, content, sent_at FROM messages
+            ON CONFLICT (message_id, sent_at) DO NOTHING
+            RETURNING message_id
+        """)
+        self.assertEqual(self.query("SELECT count(*) FROM messages"), [(2,)])
+
+    def test_new_tables_backfilled(self):
+        """Tables added after the old schema exist and read models cover old rows"""
+        for table in ('astrologer_statistics', 'user_statistics', 'user_astrologer_threads', 'idempotency_keys'):
+            self.assertIsNotNone(self.query("SELECT to_regclass(%s)", (table,))[0][0], table)
+        threads = self.query("SELECT conversation_id FROM user_astrologer_threads WHERE user_id = 'user_upgrade'")
+        self.assertEqual(threads, [('conv_upgrade',)])
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Schema Upgrade Integration Tests (Requires PostgreSQL)")
+    print("=" * 60)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSchemaUpgrade)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
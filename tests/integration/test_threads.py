@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Integration Tests - Chat List Read Model (Requires PostgreSQL)
+user_astrologer_threads as maintained by the message and conversation
+triggers, mark_thread_read and ThreadRebuilder
+
+Runs against a scratch astrologer. Covers unread counting, the shown
+conversation and its preview (the user's latest message there), a multi-row
+write-behind batch going through the statement trigger's transition table,
+and a rebuild reproducing what the triggers maintain.
+
+Skipped automatically when no database is reachable.
+"""
+
+import sys
+import os
+import uuid
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.manager import db
+from backend.database.threads import ThreadRebuilder
+from backend.database.write_behind import WriteBehindQueue
+
+THREAD_COLUMNS = (
+    'conversation_id', 'status', 'astrologer_name', 'last_message_preview', 'last_message_at',
+    'last_sender_type', 'last_activity_at', 'total_messages', 'unread_count', 'last_read_at',
+)
+
+
+def database_available() -> bool:
+    try:
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+def create_test_user() -> str:
+    user_id = db.generate_user_id()
+    db.create_user({
+        'user_id': user_id, 'email': None, 'phone_number': None,
+        'full_name': 'Threads Test', 'display_name': 'ThreadsTest',
+        'language_preference': 'hi', 'subscription_type': 'free', 'metadata': {'test': True},
+        'birth_date': None, 'birth_time': None, 'birth_location': None,
+        'birth_timezone': None, 'gender': None,
+    })
+    return user_id
+
+
+class TestThreads(unittest.TestCase):
+    """Chat list read model against a real database"""
+
+    @classmethod
+    def setUpClass(cls):
+        if not database_available():
+            raise unittest.SkipTest("PostgreSQL not reachable - skipping chat list tests")
+
+    def setUp(self):
+        self.astrologer_id = f"ast_threads_{uuid.uuid4().hex[:8]}"
+        self.execute("INSERT INTO astrologers (astrologer_id, name, display_name) VALUES (%s, %s, %s)",
+                     (self.astrologer_id, 'Threads Astrologer', 'Threads Astrologer'))
+        self.user_id = create_test_user()
+
+    def tearDown(self):
+        self.execute("DELETE FROM messages WHERE conversation_id IN "
+                     "(SELECT conversation_id FROM conversations WHERE astrologer_id = %s)", (self.astrologer_id,))
+        self.execute("DELETE FROM conversations WHERE astrologer_id = %s", (self.astrologer_id,))
+        self.execute("DELETE FROM users WHERE user_id = %s", (self.user_id,))
+        self.execute("DELETE FROM astrologers WHERE astrologer_id = %s", (self.astrologer_id,))
+
+    def execute(self, sql, params=None):
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+
+    def thread(self):
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT {', '.join(THREAD_COLUMNS)} FROM user_astrologer_threads
+                    WHERE user_id = %s AND astrologer_id = %s
+                """, (self.user_id, self.astrologer_id))
+                row = cursor.fetchone()
+                return dict(zip(THREAD_COLUMNS, row)) if row else None
+
+    def chat(self):
+        chats = [c for c in db.get_user_conversations(self.user_id) if c['astrologer_id'] == self.astrologer_id]
+        self.assertEqual(len(chats), 1)
+        return chats[0]
+
+    def test_unread_counts_replies_after_the_users_message(self):
+        """Replies increment unread, a user message resets it, mark_thread_read clears it"""
+        print("🔍 Testing unread counts...")
+        conversation_id = db.create_conversation(self.user_id, self.astrologer_id)
+        self.assertEqual(self.chat()['last_message'], 'No messages yet')
+
+        db.add_message(conversation_id, 'astrologer', "Namaste, boliye")
+        db.add_message(conversation_id, 'astrologer', "Kya jaanna hai?")
+        self.assertEqual(self.chat()['unread_count'], 2)
+
+        db.add_message(conversation_id, 'user', "Shaadi kab hogi?")
+        self.assertEqual(self.chat()['unread_count'], 0)
+        db.add_message(conversation_id, 'astrologer', "Agle saal")
+        chat = self.chat()
+        self.assertEqual((chat['unread_count'], chat['total_messages']), (1, 4))
+        self.assertEqual(chat['last_message'], "Shaadi kab hogi?")
+        self.assertEqual(self.thread()['last_sender_type'], 'astrologer')
+
+        self.assertTrue(db.mark_thread_read(self.user_id, self.astrologer_id))
+        self.assertEqual(self.chat()['unread_count'], 0)
+        self.assertFalse(db.mark_thread_read(self.user_id, 'ast_missing'))
+        print("✅ Unread counts follow the conversation")
+
+    def test_shown_conversation_switches(self):
+        """The pair shows the conversation with the latest message, with its own preview"""
+        first = db.create_conversation(self.user_id, self.astrologer_id)
+        db.record_turn(first, "Career kaisa rahega?", "Accha rahega")
+        second = db.create_conversation(self.user_id, self.astrologer_id)
+        chat = self.chat()
+        self.assertEqual((chat['conversation_id'], chat['last_message']), (first, "Career kaisa rahega?"))
+
+        db.add_message(second, 'astrologer', "Phir se namaste")
+        chat = self.chat()
+        self.assertEqual((chat['conversation_id'], chat['last_message']), (second, 'No messages yet'))
+        db.record_turn(second, "Ghar kab lunga?", "2027 mein")
+        chat = self.chat()
+        self.assertEqual((chat['last_message'], chat['total_messages']), ("Ghar kab lunga?", 5))
+
+        db.update_conversation_end(second, 60)
+        self.assertEqual(self.chat()['status'], 'completed')
+        db.update_conversation_end(first, 60)
+        self.assertEqual(self.thread()['conversation_id'], second)
+
+    def test_write_behind_batch_through_transition_table(self):
+        """One flush with several turns and conversations updates the thread once, correctly"""
+        print("🔍 Testing a write-behind batch...")
+        first = db.create_conversation(self.user_id, self.astrologer_id)
+        second = db.create_conversation(self.user_id, self.astrologer_id)
+        start = datetime.now()
+        rows = []
+        for n, (conversation_id, sender, content) in enumerate([
+            (first, 'user', "Pehla sawaal"), (first, 'astrologer', "Pehla jawaab"),
+            (second, 'user', "Doosra sawaal"), (second, 'astrologer', "Doosra jawaab"),
+            (second, 'astrologer', "Aur kuch?"),
+        ]):
+            rows.append({'message_id': f"msg_threads_{uuid.uuid4().hex}", 'conversation_id': conversation_id,
+                         'sender_type': sender, 'message_type': 'text', 'content': content,
+                         'sent_at': start + timedelta(seconds=n)})
+
+        journal_dir = tempfile.mkdtemp(prefix="astro-wb-")
+        self.addCleanup(shutil.rmtree, journal_dir, True)
+        queue = WriteBehindQueue(db, journal_dir, batch_size=100, flush_interval=60)
+        queue.start()
+        try:
+            self.assertTrue(queue.submit(rows))
+            self.assertTrue(queue.flush(timeout=10))
+        finally:
+            queue.stop()
+
+        thread = self.thread()
+        self.assertEqual(thread['conversation_id'], second)
+        self.assertEqual(thread['last_message_preview'], "Doosra sawaal")
+        self.assertEqual((thread['total_messages'], thread['unread_count']), (5, 2))
+        self.assertEqual(thread['last_read_at'], rows[2]['sent_at'])
+        self.assertEqual(thread['last_message_at'], rows[-1]['sent_at'])
+        print("✅ Batch applied through the transition table")
+
+    def test_rebuild_matches_triggers(self):
+        """ThreadRebuilder recomputes exactly what the triggers maintained"""
+        print("🔍 Testing thread rebuild...")
+        first = db.create_conversation(self.user_id, self.astrologer_id)
+        db.record_turn(first, "Career kaisa rahega?", "Accha rahega")
+        db.add_message(first, 'astrologer', "Aur kuch?")
+        second = db.create_conversation(self.user_id, self.astrologer_id)
+        db.record_turn(second, "Ghar kab lunga?", "2027 mein")
+        db.add_message(second, 'astrologer', "Shubh muhurat bhi dekh lijiye")
+        maintained = self.thread()
+
+        self.execute("DELETE FROM user_astrologer_threads WHERE user_id = %s", (self.user_id,))
+        ThreadRebuilder(db).run()
+        self.assertEqual(self.thread(), maintained)
+
+        self.execute("""
+            UPDATE user_astrologer_threads SET last_message_preview = 'stale', unread_count = 9
+            WHERE user_id = %s
+        """, (self.user_id,))
+        ThreadRebuilder(db).run()
+        self.assertEqual(self.thread(), maintained)
+        print("✅ Rebuild matches the triggers")
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Chat List Integration Tests (Requires PostgreSQL)")
+    print("=" * 60)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestThreads)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
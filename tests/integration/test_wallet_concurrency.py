@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Integration Tests - Wallet Concurrency (Requires PostgreSQL)
+Stress-tests concurrent wallet debits/credits for lost updates and overdrafts
+
+Hundreds of deductions race on one wallet from a thread pool. The checks:
+- exactly balance / amount deductions succeed and the balance ends at zero
+- the ledger forms an unbroken chain (each row's balance_before is the
+  previous row's balance_after), i.e. no update was lost
+Throughput and latency percentiles are printed for each run.
+
+Skipped automatically when no database is reachable.
+"""
+
+import sys
+import os
+import time
+import unittest
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.manager import db
+
+DEDUCTIONS = int(os.getenv("WALLET_STRESS_DEDUCTIONS", "400"))
+WORKERS = int(os.getenv("WALLET_STRESS_WORKERS", "32"))
+
+
+def database_available() -> bool:
+    try:
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+class TestWalletConcurrency(unittest.TestCase):
+    """Concurrent wallet operations against a real database"""
+
+    @classmethod
+    def setUpClass(cls):
+        if not database_available():
+            raise unittest.SkipTest("PostgreSQL not reachable - skipping wallet stress tests")
+
+    def setUp(self):
+        self.user_id = db.generate_user_id()
+        db.create_user({
+            'user_id': self.user_id, 'email': None, 'phone_number': None,
+            'full_name': 'Wallet Stress Test', 'display_name': 'WalletStress',
+            'language_preference': 'en', 'subscription_type': 'free', 'metadata': {'test': True},
+            'birth_date': None, 'birth_time': None, 'birth_location': None,
+            'birth_timezone': None, 'gender': None,
+        })
+
+    def tearDown(self):
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM transactions WHERE user_id = %s", (self.user_id,))
+                cursor.execute("DELETE FROM wallets WHERE user_id = %s", (self.user_id,))
+                cursor.execute("DELETE FROM users WHERE user_id = %s", (self.user_id,))
+
+    def run_parallel(self, label, calls):
+        """Run callables on the worker pool; print throughput and latency"""
+        latencies = []
+
+        def timed(call):
+            start = time.perf_counter()
+            result = call()
+            latencies.append((time.perf_counter() - start) * 1000)
+            return result
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            results = list(executor.map(timed, calls))
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"📊 {label}: {len(calls)} ops, {WORKERS} workers, {elapsed:.2f}s, "
+              f"{len(calls) / elapsed:.0f} ops/s, p50 {p50:.1f}ms, p95 {p95:.1f}ms")
+        return results
+
+    def ledger(self):
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT transaction_type, amount, balance_before, balance_after
+                    FROM transactions WHERE user_id = %s
+                """, (self.user_id,))
+                return cursor.fetchall()
+
+    def assert_ledger_chain(self, initial, final):
+        """Every applied change starts from the balance the previous one left
+
+        Mixed credits and debits can revisit a balance, so the chain is checked
+        as a multiset: each balance is left once for every time it is reached.
+        A lost update shows up as a balance left twice but reached once.
+        """
+        rows = self.ledger()
+        for _, amount, before, after in rows:
+            self.assertEqual(abs(after - before), amount)
+
+        left = Counter(before for _, _, before, _ in rows) + Counter([Decimal(str(final))])
+        reached = Counter(after for _, _, _, after in rows) + Counter([Decimal(str(initial))])
+        self.assertEqual(left, reached, "a transaction started from a stale balance (lost update)")
+
+    def test_parallel_deductions_do_not_lose_updates(self):
+        """Only as many deductions as the balance covers succeed; none are lost"""
+        print("🔍 Testing parallel wallet deductions...")
+        initial = DEDUCTIONS // 4
+        db.create_wallet(self.user_id, initial_balance=initial)
+
+        results = self.run_parallel("deductions", [
+            (lambda: db.debit_wallet(self.user_id, 1.00, description="stress test"))
+            for _ in range(DEDUCTIONS)
+        ])
+
+        succeeded = [r for r in results if r['success']]
+        refused = [r for r in results if not r['success']]
+        self.assertEqual(len(succeeded), initial)
+        self.assertTrue(all(r['error'] == 'insufficient_balance' for r in refused))
+        self.assertEqual(float(db.get_wallet(self.user_id)['balance']), 0.0)
+        self.assert_ledger_chain(initial, 0)
+        print("✅ No lost updates, no overdraft")
+
+    def test_mixed_credits_and_debits_balance(self):
+        """Interleaved recharges and deductions net out exactly"""
+        print("🔍 Testing interleaved credits and debits...")
+        initial = DEDUCTIONS
+        wallet_id = db.create_wallet(self.user_id, initial_balance=initial)
+
+        def credit():
+            return db.add_transaction({
+                'user_id': self.user_id, 'wallet_id': wallet_id, 'transaction_type': 'recharge',
+                'amount': 2.50, 'payment_method': 'upi', 'description': 'stress test',
+            })
+
+        def debit():
+            return db.add_transaction({
+                'user_id': self.user_id, 'wallet_id': wallet_id, 'transaction_type': 'deduction',
+                'amount': 1.50, 'payment_method': 'wallet', 'description': 'stress test',
+            })
+
+        results = self.run_parallel("credits+debits", [credit, debit] * (DEDUCTIONS // 2))
+
+        self.assertTrue(all(results))
+        expected = initial + (DEDUCTIONS // 2) * (2.50 - 1.50)
+        self.assertAlmostEqual(float(db.get_wallet(self.user_id)['balance']), expected, places=2)
+        self.assert_ledger_chain(initial, expected)
+        print("✅ Ledger and balance agree")
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Wallet Concurrency Integration Tests")
+    print("=" * 60)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestWalletConcurrency)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
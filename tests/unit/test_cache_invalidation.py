@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Read-Through Cache and Invalidation (No Database Required)
+Tests entry tagging, stale-fill protection, the method decorators and notification handling
+"""
+
+import sys
+import os
+import subprocess
+import unittest
+import unittest.mock
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.cache import (
+    InvalidatingCache, CacheRegistry, CacheInvalidationListener,
+    caches, cached, evicts, user_of_wallet, cache_fill_in_progress, mark_cache_fill_failed, _MISS
+)
+
+
+class FakeManager:
+    """Stands in for DatabaseManager (no db_config, so no listener is started)"""
+
+    def __init__(self):
+        self.rows = {'user_1': {'user_id': 'user_1', 'name': 'Asha'}}
+        self.reads = 0
+        self.fill_flags = []
+        self.failing = False
+
+    @cached('test_users', key='user_id')
+    def get_user(self, user_id):
+        self.reads += 1
+        self.fill_flags.append(cache_fill_in_progress())
+        row = self.rows.get(user_id)
+        return dict(row) if row else None
+
+    @cached('test_users')
+    def list_users(self):
+        self.reads += 1
+        return sorted(self.rows)
+
+    @cached('test_users')
+    def list_active_users(self):
+        """Swallows database errors like the manager's list methods"""
+        self.reads += 1
+        if self.failing:
+            mark_cache_fill_failed()  # what get_connection does on an error
+            return []
+        return sorted(self.rows)
+
+    @evicts('test_users', key=('user_data', 'user_id'))
+    def save_user(self, user_data):
+        self.rows[user_data['user_id']] = dict(user_data)
+        return True
+
+
+class TestInvalidatingCache(unittest.TestCase):
+    """Entry bookkeeping"""
+
+    def test_hit_miss_and_ttl(self):
+        """Values are served until their TTL passes"""
+        cache = InvalidatingCache('t')
+        self.assertIs(cache.get(('k',)), _MISS)
+        cache.set(('k',), 1, 'row', cache.version, ttl=60)
+        cache.set(('gone',), 2, 'row', cache.version, ttl=0)
+        self.assertEqual(cache.get(('k',)), 1)
+        self.assertIs(cache.get(('gone',)), _MISS)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_row_eviction_drops_collections(self):
+        """A changed row evicts its entries and every list, not other rows"""
+        cache = InvalidatingCache('t')
+        cache.set(('get', 'a'), 'A', 'a', cache.version, ttl=60)
+        cache.set(('get', 'b'), 'B', 'b', cache.version, ttl=60)
+        cache.set(('list',), ['a', 'b'], None, cache.version, ttl=60)
+        cache.evict('a')
+        self.assertIs(cache.get(('get', 'a')), _MISS)
+        self.assertIs(cache.get(('list',)), _MISS)
+        self.assertEqual(cache.get(('get', 'b')), 'B')
+
+    def test_stale_fill_refused(self):
+        """A value loaded before an invalidation is not stored"""
+        cache = InvalidatingCache('t')
+        version = cache.version
+        cache.evict('a')
+        self.assertFalse(cache.set(('get', 'a'), 'old', 'a', version, ttl=60))
+        self.assertIs(cache.get(('get', 'a')), _MISS)
+        self.assertEqual(cache.stats()['stale_fills'], 1)
+
+    def test_lru_bound(self):
+        """The least recently used entry goes first"""
+        cache = InvalidatingCache('t', max_entries=2)
+        for name in ('a', 'b'):
+            cache.set((name,), name, name, cache.version, ttl=60)
+        cache.get(('a',))
+        cache.set(('c',), 'c', 'c', cache.version, ttl=60)
+        self.assertIs(cache.get(('b',)), _MISS)
+        self.assertEqual(cache.get(('a',)), 'a')
+
+
+class TestCacheDecorators(unittest.TestCase):
+    """@cached / @evicts on manager methods"""
+
+    def setUp(self):
+        caches.clear()
+        self.manager = FakeManager()
+
+    def test_read_through_and_evict_on_write(self):
+        """Repeated reads hit the cache; a write makes the next read reload"""
+        self.assertEqual(self.manager.get_user('user_1')['name'], 'Asha')
+        self.assertEqual(self.manager.get_user(user_id='user_1')['name'], 'Asha')
+        self.manager.list_users()
+        self.manager.list_users()
+        self.assertEqual(self.manager.reads, 2)
+        self.assertEqual(self.manager.fill_flags, [True])
+
+        self.manager.save_user({'user_id': 'user_1', 'name': 'Asha Rao'})
+        self.assertEqual(self.manager.get_user('user_1')['name'], 'Asha Rao')
+        self.manager.list_users()
+        self.assertEqual(self.manager.reads, 4)
+
+    def test_callers_get_copies(self):
+        """Mutating a returned row does not change the cached value"""
+        self.manager.get_user('user_1')['name'] = 'changed'
+        self.assertEqual(self.manager.get_user('user_1')['name'], 'Asha')
+
+    def test_none_not_cached(self):
+        """Missing rows are looked up again"""
+        self.assertIsNone(self.manager.get_user('user_2'))
+        self.manager.rows['user_2'] = {'user_id': 'user_2', 'name': 'Ravi'}
+        self.assertEqual(self.manager.get_user('user_2')['name'], 'Ravi')
+
+    def test_error_fallback_not_cached(self):
+        """An empty list returned after a database error is loaded again next time"""
+        self.manager.failing = True
+        self.assertEqual(self.manager.list_active_users(), [])
+        self.manager.failing = False
+        self.assertEqual(self.manager.list_active_users(), ['user_1'])
+        self.assertEqual(self.manager.list_active_users(), ['user_1'])
+        self.assertEqual(self.manager.reads, 2)
+
+    def test_wallet_key(self):
+        """Wallet writes evict the owning user's wallet entry"""
+        self.assertEqual(user_of_wallet({'wallet_id': 'wallet_user_1'}), 'user_1')
+        self.assertEqual(user_of_wallet({'transaction_data': {'wallet_id': 'wallet_user_9'}}), 'user_9')
+        self.assertIsNone(user_of_wallet({'wallet_id': 'other'}))
+
+
+class TestInvalidationListener(unittest.TestCase):
+    """Notification handling and the fallback TTL"""
+
+    def test_notification_evicts_row(self):
+        """A {"table", "key"} payload evicts that row"""
+        registry = CacheRegistry(ttl_seconds=60, fallback_ttl_seconds=1)
+        cache = registry.namespace('users')
+        cache.set(('get_user', 'user_1'), 'A', 'user_1', cache.version, ttl=60)
+        cache.set(('get_user', 'user_2'), 'B', 'user_2', cache.version, ttl=60)
+
+        listener = CacheInvalidationListener(registry, {'host': 'localhost'})
+        listener.handle('{"table": "users", "key": "user_1"}')
+        self.assertIs(cache.get(('get_user', 'user_1')), _MISS)
+        self.assertEqual(cache.get(('get_user', 'user_2')), 'B')
+
+        listener.handle('not json')
+        self.assertIs(cache.get(('get_user', 'user_2')), _MISS)
+        self.assertEqual(listener.notifications, 2)
+
+    def test_fallback_ttl_without_listener(self):
+        """With no connected listener entries get the short TTL"""
+        registry = CacheRegistry(ttl_seconds=60, fallback_ttl_seconds=1)
+        self.assertFalse(registry.healthy)
+        self.assertEqual(registry.current_ttl(), 1)
+        self.assertFalse(registry.stats()['healthy'])
+
+    def test_disabled_by_default_on_lambda(self):
+        """A frozen Lambda listener still looks connected, so caching starts off there"""
+        def enabled(**env):
+            result = subprocess.run(
+                [sys.executable, '-c', 'from backend.config.settings import get_cache_config; '
+                                       'print(get_cache_config()["enabled"])'],
+                cwd=project_root, env={**os.environ, **env}, capture_output=True, text=True, check=True)
+            return result.stdout.strip().splitlines()[-1]
+
+        environ = {k: v for k, v in os.environ.items() if k not in ('AWS_LAMBDA_FUNCTION_NAME', 'CACHE_ENABLED')}
+        with unittest.mock.patch.dict(os.environ, environ, clear=True):
+            self.assertEqual(enabled(), 'True')
+            self.assertEqual(enabled(AWS_LAMBDA_FUNCTION_NAME='astrovoice-api'), 'False')
+            self.assertEqual(enabled(AWS_LAMBDA_FUNCTION_NAME='astrovoice-api', CACHE_ENABLED='true'), 'True')
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Cache Invalidation Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestSuite()
+    loader = unittest.TestLoader()
+    suite.addTests(loader.loadTestsFromTestCase(TestInvalidatingCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestCacheDecorators))
+    suite.addTests(loader.loadTestsFromTestCase(TestInvalidationListener))
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
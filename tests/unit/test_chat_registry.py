@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Chat Handler Registry (No OpenAI Calls)
+Tests handler reuse, shared client and personas, idle/capacity/memory eviction and metrics
+"""
+
+import sys
+import os
+import unittest
+from unittest import mock
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.handlers.chat_registry import ChatHandlerRegistry
+
+
+class FakeHandler:
+    """Records what the registry built it with"""
+
+    def __init__(self, astrologer_id, client, astrologer_config):
+        self.astrologer_id = astrologer_id
+        self.client = client
+        self.astrologer_config = astrologer_config
+        self.user_states = {}
+        self.conversation_history = {}
+
+
+class TestChatHandlerRegistry(unittest.TestCase):
+    """Registry behaviour"""
+
+    def setUp(self):
+        self.persona_loads = []
+
+    def make_registry(self, **kwargs):
+        def load_persona(astrologer_id):
+            self.persona_loads.append(astrologer_id)
+            return {'name': astrologer_id, 'text_system_prompt': 'prompt'}
+
+        return ChatHandlerRegistry(
+            handler_factory=FakeHandler,
+            persona_loader=load_persona, client_factory=object, **kwargs
+        )
+
+    def test_handlers_reused_and_resources_shared(self):
+        """One handler per user/astrologer; one client and one persona load per astrologer"""
+        registry = self.make_registry()
+        first = registry.get('user_1', 'ast_1')
+        self.assertIs(registry.get('user_1', 'ast_1'), first)
+        other = registry.get('user_2', 'ast_1')
+
+        self.assertIsNot(other, first)
+        self.assertIs(other.client, first.client)
+        self.assertIs(other.astrologer_config, first.astrologer_config)
+        self.assertEqual(self.persona_loads, ['ast_1'])
+
+        stats = registry.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertEqual(stats['clients_created'], 1)
+        self.assertEqual(stats['users'], 2)
+
+    def test_capacity_evicts_least_recently_used(self):
+        """Beyond max_handlers the least recently used handler goes"""
+        registry = self.make_registry(max_handlers=2)
+        registry.get('user_1', 'ast_1')
+        registry.get('user_2', 'ast_1')
+        registry.get('user_1', 'ast_1')
+        registry.get('user_3', 'ast_1')
+        self.assertEqual(len(registry), 2)
+        self.assertEqual(registry.stats()['evicted_capacity'], 1)
+        registry.get('user_1', 'ast_1')
+        self.assertEqual(registry.stats()['hits'], 2)
+
+    def test_idle_handlers_expire(self):
+        """Handlers unused for idle_ttl_seconds are dropped"""
+        registry = self.make_registry(idle_ttl_seconds=60)
+        with mock.patch('backend.handlers.chat_registry.time.monotonic', return_value=1000.0):
+            registry.get('user_1', 'ast_1')
+        with mock.patch('backend.handlers.chat_registry.time.monotonic', return_value=1061.0):
+            self.assertEqual(registry.stats()['handlers'], 0)
+        self.assertEqual(registry.stats()['evicted_idle'], 1)
+
+    def test_memory_cap(self):
+        """Large conversation state pushes out older handlers"""
+        registry = self.make_registry(max_memory_mb=0.01)
+        big = registry.get('user_1', 'ast_1')
+        big.conversation_history['user_1'] = [{'role': 'user', 'content': 'x' * 8000}]
+        registry.get('user_1', 'ast_1')
+        registry.get('user_2', 'ast_1')
+        self.assertEqual(registry.stats()['evicted_memory'], 1)
+        self.assertLessEqual(registry.stats()['resident_bytes'], registry.max_bytes)
+
+    def test_discard(self):
+        """discard() drops all of a user's handlers"""
+        registry = self.make_registry()
+        registry.get('user_1', 'ast_1')
+        registry.get('user_1', 'ast_2')
+        self.assertEqual(registry.discard('user_1'), 2)
+        self.assertEqual(registry.stats()['resident_bytes'], 0)
+
+
+class TestHandlerInjection(unittest.TestCase):
+    """OpenAIChatHandler uses what the registry passes in"""
+
+    def test_shared_client_and_state(self):
+        try:
+            from backend.handlers import openai_chat
+        except ImportError as e:
+            self.skipTest(f"chat handler dependencies missing: {e}")
+
+        client = object()
+        with mock.patch.object(openai_chat, 'OPENAI_API_KEY', 'test-key'), \
+                mock.patch.object(openai_chat, 'get_astrologer_config') as loader:
+            handler = openai_chat.OpenAIChatHandler(
+                'ast_1', client=client,
+                astrologer_config={'name': 'Tina', 'speciality': 'Marriage', 'text_system_prompt': 'persona'},
+                user_states={'user_1': {'name': 'Asha'}},
+            )
+        self.assertIs(handler.client, client)
+        self.assertEqual(handler.system_instructions, 'persona')
+        self.assertEqual(handler.user_states, {'user_1': {'name': 'Asha'}})
+        loader.assert_not_called()
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Chat Handler Registry Unit Tests (No OpenAI Calls)")
+    print("=" * 60)
+
+    suite = unittest.TestSuite()
+    loader = unittest.TestLoader()
+    suite.addTests(loader.loadTestsFromTestCase(TestChatHandlerRegistry))
+    suite.addTests(loader.loadTestsFromTestCase(TestHandlerInjection))
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
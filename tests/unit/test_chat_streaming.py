@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Streaming Text Chat (No OpenAI Calls)
+Tests token delta order, post-stream bookkeeping, first-token timing and registry latency stats
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.handlers.chat_registry import ChatHandlerRegistry
+
+
+def make_chunk(text=None, usage=None):
+    choices = [] if text is None else [SimpleNamespace(delta=SimpleNamespace(content=text))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeStreamingClient:
+    """AsyncOpenAI stand-in whose completions stream a fixed reply"""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+
+        async def chunks():
+            yield make_chunk('')  # role-only first chunk
+            for part in self.parts:
+                await asyncio.sleep(0)
+                yield make_chunk(part)
+            yield make_chunk(usage=SimpleNamespace(total_tokens=42))
+
+        return chunks()
+
+
+class TestStreamMessage(unittest.TestCase):
+    """OpenAIChatHandler.stream_message"""
+
+    def setUp(self):
+        try:
+            from backend.handlers import openai_chat
+        except ImportError as e:
+            self.skipTest(f"chat handler dependencies missing: {e}")
+        self.client = FakeStreamingClient(['Namaste ', 'Asha, ', 'Shani is moving.'])
+        patches = [
+            mock.patch.object(openai_chat, 'OPENAI_API_KEY', 'test-key'),
+            mock.patch.object(openai_chat, 'user_state_store', mock.Mock()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.handler = openai_chat.OpenAIChatHandler(
+            'ast_1', client=self.client,
+            astrologer_config={'name': 'Tina', 'speciality': 'Marriage', 'text_system_prompt': 'persona'},
+            user_states={},
+        )
+
+    def collect(self):
+        async def run():
+            return [event async for event in self.handler.stream_message('user_1', 'Will I marry?', persist=False)]
+        return asyncio.run(run())
+
+    def test_deltas_then_done(self):
+        """Token deltas arrive in order, followed by one done event"""
+        events = self.collect()
+        self.assertEqual([e['text'] for e in events[:-1]], ['Namaste ', 'Asha, ', 'Shani is moving.'])
+        self.assertTrue(all(e['type'] == 'delta' for e in events[:-1]))
+
+        done = events[-1]
+        self.assertEqual(done['type'], 'done')
+        self.assertTrue(done['success'])
+        self.assertEqual(done['message'], 'Namaste Asha, Shani is moving.')
+        self.assertEqual(done['tokens_used'], 42)
+        self.assertLessEqual(done['ttft_ms'], done['total_ms'])
+
+        request = self.client.calls[0]
+        self.assertTrue(request['stream'])
+        self.assertEqual(request['stream_options'], {'include_usage': True})
+
+    def test_history_updated_after_stream(self):
+        """The finished reply is recorded once the stream ends"""
+        self.collect()
+        history = self.handler.conversation_history['user_1']
+        self.assertEqual([m['role'] for m in history[-2:]], ['user', 'assistant'])
+        self.assertEqual(history[-1]['content'], 'Namaste Asha, Shani is moving.')
+
+    def test_abandoned_stream_records_nothing(self):
+        """A client that stops reading leaves no half turn behind"""
+        async def run():
+            stream = self.handler.stream_message('user_1', 'Will I marry?', persist=False)
+            await stream.__anext__()
+            await stream.aclose()
+        asyncio.run(run())
+        self.assertFalse(self.handler.conversation_history.get('user_1'))
+
+
+class TestStreamChatTurn(unittest.TestCase):
+    """Endpoint-level streaming latency, measured like /chat/send"""
+
+    def test_clock_includes_turn_preparation(self):
+        try:
+            from backend.api import mobile_endpoints
+        except ImportError as e:
+            self.skipTest(f"API dependencies missing: {e}")
+
+        class Handler:
+            async def stream_message(self, **kwargs):
+                yield {'type': 'delta', 'text': 'Namaste'}
+                yield {'type': 'done', 'success': True, 'message': 'Namaste', 'ttft_ms': 1.0, 'total_ms': 2.0}
+
+        async def prepare(chat_request):
+            await asyncio.sleep(0.05)  # profile and conversation lookups
+            return Handler(), chat_request.message
+
+        async def record(chat_request, response):
+            return {'success': True, 'ai_response': response['message']}
+
+        registry = ChatHandlerRegistry(handler_factory=object, persona_loader=lambda a: None, client_factory=object)
+        request = mobile_endpoints.ChatRequest(
+            user_id='user_1', conversation_id='conv_1', astrologer_id='ast_1', message='Hi'
+        )
+        with mock.patch.object(mobile_endpoints, '_prepare_chat_turn', prepare), \
+                mock.patch.object(mobile_endpoints, '_record_chat_turn', record), \
+                mock.patch.object(mobile_endpoints, '_chat_handlers', return_value=registry):
+            async def run():
+                return [event async for event in mobile_endpoints.stream_chat_turn(request)]
+            events = asyncio.run(run())
+
+        done = events[-1]
+        self.assertGreaterEqual(done['ttft_ms'], 50)
+        self.assertLessEqual(done['ttft_ms'], done['total_ms'])
+        self.assertEqual(registry.stats()['latency']['streaming']['count'], 1)
+
+
+class TestLatencyStats(unittest.TestCase):
+    """Registry latency percentiles"""
+
+    def test_ttft_and_total_reported_per_mode(self):
+        registry = ChatHandlerRegistry(handler_factory=object, persona_loader=lambda a: None, client_factory=object)
+        for i in range(1, 101):
+            registry.record_latency('streaming', total_ms=1000 + i, ttft_ms=i)
+        registry.record_latency('blocking', total_ms=900)
+
+        latency = registry.stats()['latency']
+        self.assertEqual(latency['streaming']['count'], 100)
+        self.assertEqual(latency['streaming']['ttft_ms'], {'p50': 51, 'p95': 96})
+        self.assertEqual(latency['streaming']['total_ms']['p50'], 1051)
+        self.assertEqual(latency['blocking'], {'count': 1, 'total_ms': {'p50': 900, 'p95': 900}})
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Streaming Chat Unit Tests (No OpenAI Calls)")
+    print("=" * 60)
+
+    suite = unittest.TestSuite()
+    loader = unittest.TestLoader()
+    suite.addTests(loader.loadTestsFromTestCase(TestStreamMessage))
+    suite.addTests(loader.loadTestsFromTestCase(TestStreamChatTurn))
+    suite.addTests(loader.loadTestsFromTestCase(TestLatencyStats))
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Connection Pool (No Database Required)
+Tests checkout/checkin, health checks, lifetime recycling and wait metrics
+using fake DB-API connections
+"""
+
+import sys
+import os
+import time
+import threading
+import unittest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise Exception("server closed the connection unexpectedly")
+        self.conn.executed.append(sql)
+
+
+class FakeConnection:
+    """Minimal stand-in for a psycopg2 connection"""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.rollbacks = 0
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test connection pool behaviour"""
+
+    def setUp(self):
+        self.opened = []
+
+    def connect(self):
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+    def test_connection_reuse(self):
+        """Returned connections are reused instead of reconnecting"""
+        print("🔍 Testing connection reuse...")
+        pool = ConnectionPool(self.connect, min_size=1, max_size=5)
+
+        for _ in range(20):
+            conn = pool.getconn()
+            pool.putconn(conn)
+
+        self.assertEqual(len(self.opened), 1)
+        stats = pool.stats()
+        self.assertEqual(stats['acquisitions'], 20)
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(stats['in_use'], 0)
+        print("✅ Connection reused across 20 checkouts")
+
+    def test_checkin_rolls_back(self):
+        """Open transactions are rolled back when a connection is returned"""
+        pool = ConnectionPool(self.connect, max_size=1)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertEqual(conn.rollbacks, 1)
+
+    def test_max_size_and_timeout(self):
+        """Checkout blocks at max_size and times out with metrics recorded"""
+        print("🔍 Testing pool exhaustion...")
+        pool = ConnectionPool(self.connect, min_size=0, max_size=2, acquire_timeout=0.05)
+        a = pool.getconn()
+        b = pool.getconn()
+
+        with self.assertRaises(PoolTimeoutError):
+            pool.getconn()
+
+        stats = pool.stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['waits'], 1)
+        self.assertEqual(stats['size'], 2)
+
+        pool.putconn(a)
+        pool.putconn(b)
+        print("✅ Pool exhaustion raises PoolTimeoutError")
+
+    def test_waiter_gets_released_connection(self):
+        """A blocked checkout is served as soon as another thread returns a connection"""
+        pool = ConnectionPool(self.connect, min_size=0, max_size=1, acquire_timeout=2)
+        held = pool.getconn()
+        result = {}
+
+        def worker():
+            result['conn'] = pool.getconn()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        time.sleep(0.05)
+        pool.putconn(held)
+        thread.join(timeout=2)
+
+        self.assertIs(result['conn'], held)
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_time_max_ms'], 0)
+
+    def test_discard_frees_slot(self):
+        """Discarded connections are closed and their slot becomes available"""
+        pool = ConnectionPool(self.connect, min_size=0, max_size=1, acquire_timeout=0.05)
+        conn = pool.getconn()
+        pool.putconn(conn, discard=True)
+
+        self.assertTrue(conn.closed)
+        replacement = pool.getconn()
+        self.assertIsNot(replacement, conn)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_closed_connection_replaced_on_checkout(self):
+        """Connections closed by the server while idle are not handed out"""
+        pool = ConnectionPool(self.connect, max_size=2)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.closed = 2  # server went away
+
+        fresh = pool.getconn()
+        self.assertIsNot(fresh, conn)
+        self.assertEqual(pool.stats()['failed_health_checks'], 1)
+
+    def test_health_check_on_idle_connection(self):
+        """Idle connections are pinged and dropped if the ping fails"""
+        print("🔍 Testing idle health check...")
+        pool = ConnectionPool(self.connect, max_size=2, health_check_after=0)
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        # Healthy ping - same connection comes back
+        again = pool.getconn()
+        self.assertIs(again, conn)
+        self.assertIn("SELECT 1", conn.executed)
+        pool.putconn(again)
+
+        # Broken ping - replaced
+        conn.broken = True
+        fresh = pool.getconn()
+        self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+        print("✅ Broken idle connection replaced")
+
+    def test_max_lifetime_recycling(self):
+        """Connections older than max_lifetime are recycled"""
+        pool = ConnectionPool(self.connect, max_size=1, max_lifetime=0.01)
+        conn = pool.getconn()
+        time.sleep(0.02)
+        pool.putconn(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['recycled_max_lifetime'], 1)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_idle_trim_respects_min_size(self):
+        """Idle connections above min_size are closed after max_idle"""
+        pool = ConnectionPool(self.connect, min_size=1, max_size=3, max_idle=0)
+        conns = [pool.getconn() for _ in range(3)]
+        for conn in conns:
+            pool.putconn(conn)
+
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_prefill_and_close(self):
+        """prefill opens min_size connections; close releases them"""
+        pool = ConnectionPool(self.connect, min_size=3, max_size=5)
+        self.assertEqual(pool.prefill(), 3)
+        self.assertEqual(pool.stats()['idle'], 3)
+
+        pool.close()
+        self.assertTrue(all(conn.closed for conn in self.opened))
+        with self.assertRaises(RuntimeError):
+            pool.getconn()
+
+    def test_connect_failure_releases_slot(self):
+        """A failed connect does not leak a pool slot"""
+        def failing_connect():
+            raise Exception("could not connect to server")
+
+        pool = ConnectionPool(failing_connect, min_size=0, max_size=1)
+        with self.assertRaises(Exception):
+            pool.getconn()
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Connection Pool Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestConnectionPool)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Idempotency Keys (No Database Required)
+Tests response replay, in-flight dedup, release on failure and key reuse
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import unittest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.idempotency import (
+    IdempotencyStore, IdempotencyConflictError, IdempotencyInProgressError, request_fingerprint
+)
+
+
+class MemoryStore(IdempotencyStore):
+    """Idempotency store whose idempotency_keys table is a dict"""
+
+    def __init__(self, rows=None, **kwargs):
+        super().__init__(None, **kwargs)
+        self.rows = rows if rows is not None else {}
+        self.rows_lock = threading.Lock()
+        self.claims = 0
+
+    def claim(self, scope, key, fingerprint):
+        with self.rows_lock:
+            self.claims += 1
+            row = self.rows.get((scope, key))
+            if row is None:
+                self.rows[(scope, key)] = {'fingerprint': fingerprint, 'status': 'in_progress', 'response': None}
+                return None
+        if row['fingerprint'] != fingerprint:
+            raise IdempotencyConflictError(key)
+        return {'status': row['status'], 'response': row['response']}
+
+    def complete(self, scope, key, response):
+        with self.rows_lock:
+            self.rows[(scope, key)].update(status='completed', response=response)
+
+    def release(self, scope, key):
+        with self.rows_lock:
+            self.rows.pop((scope, key), None)
+
+
+class CountingHandler:
+    def __init__(self, response=None, fail_times=0, delay=0.0):
+        self.calls = 0
+        self.response = response if response is not None else {'success': True, 'transaction_id': 'txn_1'}
+        self.fail_times = fail_times
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.calls <= self.fail_times:
+            raise RuntimeError("google play unavailable")
+        return dict(self.response)
+
+
+class TestIdempotencyStore(unittest.TestCase):
+    """Test idempotent request execution"""
+
+    def test_retry_replays_stored_response(self):
+        """A retried request returns the first response without running again"""
+        print("🔍 Testing retry replay...")
+        store = MemoryStore()
+        handler = CountingHandler()
+
+        async def scenario():
+            first = await store.execute('deduct', 'key-1', {'amount': 10}, handler)
+            second = await store.execute('deduct', 'key-1', {'amount': 10}, handler)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, second)
+        self.assertEqual(handler.calls, 1)
+        self.assertEqual(store.stats()['cache_hits'], 1)
+        print("✅ Retry served from cache")
+
+    def test_stored_response_survives_restart(self):
+        """A new process (empty hot cache) replays from the table"""
+        rows = {}
+        handler = CountingHandler()
+        asyncio.run(MemoryStore(rows).execute('deduct', 'key-1', {'amount': 10}, handler))
+
+        restarted = MemoryStore(rows)
+        response = asyncio.run(restarted.execute('deduct', 'key-1', {'amount': 10}, handler))
+        self.assertEqual(response['transaction_id'], 'txn_1')
+        self.assertEqual(handler.calls, 1)
+        self.assertEqual(restarted.stats()['stored_hits'], 1)
+
+    def test_concurrent_duplicates_wait_for_first(self):
+        """Duplicates arriving while the first runs share its result"""
+        print("🔍 Testing concurrent duplicates...")
+        store = MemoryStore()
+        handler = CountingHandler(delay=0.05)
+
+        async def scenario():
+            return await asyncio.gather(*[
+                store.execute('verify', 'token-1', {'token': 'token-1'}, handler) for _ in range(20)
+            ])
+
+        responses = asyncio.run(scenario())
+        self.assertEqual(handler.calls, 1)
+        self.assertEqual(store.claims, 1)
+        self.assertTrue(all(r == responses[0] for r in responses))
+        print("✅ Handler ran once for 20 concurrent requests")
+
+    def test_failure_releases_key(self):
+        """A failed request can be retried"""
+        store = MemoryStore()
+        handler = CountingHandler(fail_times=1)
+
+        async def scenario():
+            with self.assertRaises(RuntimeError):
+                await store.execute('verify', 'token-1', {}, handler)
+            return await store.execute('verify', 'token-1', {}, handler)
+
+        self.assertTrue(asyncio.run(scenario())['success'])
+        self.assertEqual(handler.calls, 2)
+
+    def test_store_failure_after_handler_returns_response(self):
+        """A completed handler is not failed (or re-run) because its response could not be stored"""
+        store = MemoryStore()
+        handler = CountingHandler()
+
+        def broken_complete(scope, key, response):
+            raise RuntimeError("connection lost")
+        store.complete = broken_complete
+
+        async def scenario():
+            first = await store.execute('credit', 'key-1', {'amount': 10}, handler)
+            second = await store.execute('credit', 'key-1', {'amount': 10}, handler)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, second)
+        self.assertEqual(handler.calls, 1)
+        self.assertEqual(store.stats()['complete_failures'], 1)
+
+    def test_unstored_responses_are_not_replayed(self):
+        """Responses rejected by should_store run again on retry"""
+        store = MemoryStore()
+        handler = CountingHandler(response={'success': False, 'error': 'insufficient_balance'})
+
+        async def scenario():
+            for _ in range(2):
+                await store.execute('deduct', 'key-1', {}, handler,
+                                    should_store=lambda r: r.get('success') is True)
+
+        asyncio.run(scenario())
+        self.assertEqual(handler.calls, 2)
+        self.assertEqual(store.rows, {})
+
+    def test_key_reuse_with_different_payload_conflicts(self):
+        """The same key for a different request body is rejected"""
+        store = MemoryStore()
+
+        async def scenario():
+            await store.execute('deduct', 'key-1', {'amount': 10}, CountingHandler())
+            await store.execute('deduct', 'key-1', {'amount': 99}, CountingHandler())
+
+        with self.assertRaises(IdempotencyConflictError):
+            asyncio.run(scenario())
+
+    def test_in_progress_elsewhere_times_out(self):
+        """A claim held by another process makes duplicates wait, then give up"""
+        store = MemoryStore(wait_timeout=0.2)
+        store.rows[('verify', 'token-1')] = {
+            'fingerprint': request_fingerprint({'token': 't'}), 'status': 'in_progress', 'response': None
+        }
+
+        handler = CountingHandler()
+        with self.assertRaises(IdempotencyInProgressError):
+            asyncio.run(store.execute('verify', 'token-1', {'token': 't'}, handler))
+        self.assertEqual(handler.calls, 0)
+        self.assertGreater(store.claims, 1)
+
+    def test_no_key_runs_every_time(self):
+        """Requests without a key are not deduplicated"""
+        store = MemoryStore()
+        handler = CountingHandler()
+        asyncio.run(store.execute('deduct', None, {}, handler))
+        asyncio.run(store.execute('deduct', None, {}, handler))
+        self.assertEqual(handler.calls, 2)
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Idempotency Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestIdempotencyStore)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - In-Memory Database Backend (No Database Required)
+Tests method parity with DatabaseManager, wallet rules, the chat list read model and pagination
+"""
+
+import sys
+import os
+import asyncio
+import inspect
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.manager import DatabaseManager, create_database_manager
+from backend.database.memory import MemoryDatabaseManager, MemoryIdempotencyStore
+from backend.database.idempotency import IdempotencyConflictError
+
+
+def make_user(db, user_id=None, balance=100.0):
+    user_id = user_id or db.generate_user_id()
+    db.create_user({'user_id': user_id, 'full_name': 'Test User', 'display_name': 'Test User'})
+    db.create_wallet(user_id, initial_balance=balance)
+    return user_id
+
+
+class TestMemoryBackendParity(unittest.TestCase):
+    """MemoryDatabaseManager must be a drop-in replacement"""
+
+    def test_public_methods_match(self):
+        """Every public DatabaseManager method exists with the same parameters"""
+        for name, method in inspect.getmembers(DatabaseManager, callable):
+            if name.startswith('_'):
+                continue
+            self.assertTrue(hasattr(MemoryDatabaseManager, name), f"missing {name}")
+            expected = list(inspect.signature(method).parameters)
+            actual = list(inspect.signature(getattr(MemoryDatabaseManager, name)).parameters)
+            self.assertEqual(actual, expected, f"signature of {name} differs")
+
+    def test_factory_selects_backend(self):
+        """create_database_manager('memory') returns the in-memory backend"""
+        db = create_database_manager('memory')
+        self.assertIsInstance(db, MemoryDatabaseManager)
+        self.assertEqual(db.backend, 'memory')
+        with self.assertRaises(ValueError):
+            create_database_manager('oracle')
+
+    def test_seeded_catalogue(self):
+        """Astrologers and recharge products are available out of the box"""
+        db = MemoryDatabaseManager()
+        astrologers = db.get_all_astrologers()
+        self.assertTrue(astrologers)
+        self.assertIn('system_prompt', astrologers[0])
+        products = db.get_recharge_products()
+        self.assertEqual(products[0]['product_id'], 'astro_recharge_1')
+        self.assertEqual(db.get_product_by_id('astro_recharge_200')['total_amount'], 225)
+
+
+class TestMemoryBackendBehaviour(unittest.TestCase):
+    """Behaviour that the API relies on"""
+
+    def setUp(self):
+        self.db = MemoryDatabaseManager()
+        self.astrologer_id = self.db.get_all_astrologers()[0]['astrologer_id']
+        self.user_id = make_user(self.db)
+
+    def test_foreign_keys_enforced(self):
+        """Conversations need an existing user and astrologer"""
+        self.assertIsNone(self.db.create_conversation('user_missing', self.astrologer_id))
+        self.assertIsNone(self.db.create_conversation(self.user_id, 'astro_missing'))
+        self.assertIsNone(self.db.create_wallet('user_missing'))
+
+    def test_debit_never_overdraws(self):
+        """Concurrent debits stop at the balance, like the conditional UPDATE"""
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: self.db.debit_wallet(self.user_id, 30), range(8)))
+        self.assertEqual(sum(r['success'] for r in results), 3)
+        self.assertEqual(float(self.db.get_wallet(self.user_id)['balance']), 10.0)
+        failed = next(r for r in results if not r['success'])
+        self.assertEqual(failed['error'], 'insufficient_balance')
+        self.assertEqual(self.db.debit_wallet('user_missing', 1)['error'], 'wallet_not_found')
+
+        history = self.db.get_user_transactions(self.user_id)
+        self.assertEqual(len(history), 3)
+        self.assertEqual(float(history[0]['balance_after']), 10.0)
+
+    def test_purchase_token_processed_once(self):
+        """A Google Play purchase token credits the wallet only once"""
+        wallet_id = self.db.get_wallet(self.user_id)['wallet_id']
+        first = self.db.create_google_play_transaction(self.user_id, wallet_id, 'astro_recharge_100',
+                                                       100, 10, 'token-1', 'GPA.1')
+        second = self.db.create_google_play_transaction(self.user_id, wallet_id, 'astro_recharge_100',
+                                                        100, 10, 'token-1', 'GPA.1')
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        self.assertTrue(self.db.check_purchase_token_exists('token-1'))
+        self.assertTrue(self.db.has_first_recharge_bonus(self.user_id))
+        self.assertEqual(float(self.db.get_wallet(self.user_id)['balance']), 210.0)
+
+    def test_chat_list_and_unread(self):
+        """Turns update the chat list preview, counters and unread count"""
+        conversation_id = self.db.create_conversation(self.user_id, self.astrologer_id)
+        chats = self.db.get_user_conversations(self.user_id)
+        self.assertEqual(chats[0]['last_message'], 'No messages yet')
+
+        self.db.record_turn(conversation_id, 'Meri shaadi kab hogi?', 'Agle saal yog hai')
+        self.assertEqual(self.db.get_conversation(conversation_id)['last_message_preview'], 'Meri shaadi kab hogi?')
+        self.db.add_message(conversation_id, 'astrologer', 'Aur kuch poochna hai?')
+        chat = self.db.get_user_conversations(self.user_id)[0]
+        self.assertEqual(chat['last_message'], 'Meri shaadi kab hogi?')
+        self.assertEqual(chat['total_messages'], 3)
+        self.assertEqual(chat['unread_count'], 2)
+
+        self.assertTrue(self.db.mark_thread_read(self.user_id, self.astrologer_id))
+        self.assertEqual(self.db.get_user_conversations(self.user_id)[0]['unread_count'], 0)
+        self.assertEqual(self.db.get_user_stats(self.user_id)['total_messages'], 3)
+
+    def test_unified_history_pages_with_cursor(self):
+        """Keyset pages cover the whole history without overlap"""
+        for _ in range(2):
+            conversation_id = self.db.create_unified_conversation(self.user_id, self.astrologer_id)
+            for i in range(6):
+                self.db.record_turn(conversation_id, f'question {i}', f'answer {i}')
+
+        seen, cursor = [], None
+        while True:
+            page = self.db.get_unified_chat_history(self.user_id, self.astrologer_id,
+                                                    limit=5, before_cursor=cursor)
+            seen = [m['message_id'] for m in page['messages'] if not m['is_separator']] + seen
+            cursor = page['next_cursor']
+            if not page['has_more']:
+                break
+        self.assertEqual(len(seen), 24)
+        self.assertEqual(len(set(seen)), 24)
+        self.assertEqual(page['total_conversations'], 2)
+
+    def test_search(self):
+        """Search matches words, phrases and exclusions"""
+        conversation_id = self.db.create_conversation(self.user_id, self.astrologer_id)
+        self.db.record_turn(conversation_id, 'When is my marriage?', 'Marriage yog after June')
+        self.db.record_turn(conversation_id, 'Career growth?', 'Promotion in career soon')
+
+        self.assertEqual(len(self.db.search_messages(self.user_id, 'marriages')['results']), 2)
+        self.assertEqual(len(self.db.search_messages(self.user_id, 'career -promotion')['results']), 1)
+        self.assertEqual(len(self.db.search_messages(self.user_id, '"marriage yog"')['results']), 1)
+        self.assertEqual(len(self.db.search_messages(self.user_id, 'june or growth')['results']), 2)
+        result = self.db.search_messages(self.user_id, 'promotion')['results'][0]
+        self.assertIn('<b>Promotion</b>', result['snippet'])
+
+    def test_returns_copies(self):
+        """Callers cannot mutate stored rows"""
+        self.db.get_user(self.user_id)['display_name'] = 'changed'
+        self.assertEqual(self.db.get_user(self.user_id)['display_name'], 'Test User')
+
+    def test_ad_hoc_sql_unavailable(self):
+        """get_connection fails loudly instead of pretending to run SQL"""
+        with self.assertRaises(Exception):
+            self.db.get_connection()
+
+    def test_idempotency_store(self):
+        """The in-memory idempotency table replays and rejects key reuse"""
+        store = MemoryIdempotencyStore(self.db, cache_size=0)
+
+        async def handler():
+            return {'success': True}
+
+        async def scenario():
+            first = await store.execute('deduct', 'key-1', {'amount': 5}, handler)
+            second = await store.execute('deduct', 'key-1', {'amount': 5}, handler)
+            with self.assertRaises(IdempotencyConflictError):
+                await store.execute('deduct', 'key-1', {'amount': 6}, handler)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, second)
+        self.assertEqual(store.stats()['stored_hits'], 1)
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running In-Memory Backend Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestSuite()
+    loader = unittest.TestLoader()
+    suite.addTests(loader.loadTestsFromTestCase(TestMemoryBackendParity))
+    suite.addTests(loader.loadTestsFromTestCase(TestMemoryBackendBehaviour))
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Message Archive (No Database Required)
+Tests segment writing, key-ordered reads and append ordering
+"""
+
+import sys
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.archive import MessageArchive
+
+USER_ID = "user_1a2b3c4d5e6f"
+ASTROLOGER_ID = "astrologer_001"
+
+
+def make_messages(start: datetime, count: int, prefix: str = "msg"):
+    return [{
+        'message_id': f"{prefix}_{i:04d}",
+        'conversation_id': "conv_test",
+        'sender_type': 'user' if i % 2 == 0 else 'astrologer',
+        'message_type': 'text',
+        'content': f"message {i} - शादी कब होगी?",
+        'sent_at': start + timedelta(minutes=i),
+        'ai_model': None,
+        'tokens_used': None,
+    } for i in range(count)]
+
+
+class TestMessageArchive(unittest.TestCase):
+    """Test cold archive storage"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="astro-archive-")
+        self.archive = MessageArchive(self.root)
+        self.start = datetime(2024, 1, 1, 10, 0, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_segments_are_compressed_jsonl(self):
+        """Segments are gzip JSONL files listed in the user index"""
+        print("🔍 Testing segment layout...")
+        file_name = self.archive.append_segment(USER_ID, ASTROLOGER_ID, make_messages(self.start, 10))
+
+        path = os.path.join(self.root, USER_ID, ASTROLOGER_ID, file_name)
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            self.assertEqual(len(f.read().strip().splitlines()), 10)
+
+        index = self.archive.load_index(USER_ID)
+        pair = index['astrologers'][ASTROLOGER_ID]
+        self.assertEqual(pair['total_messages'], 10)
+        self.assertEqual(len(pair['segments']), 1)
+        self.assertTrue(self.archive.has_archive(USER_ID, ASTROLOGER_ID))
+        print("✅ Segment written and indexed")
+
+    def test_read_before_walks_segments_newest_first(self):
+        """Pages continue across segment boundaries in descending key order"""
+        messages = make_messages(self.start, 30)
+        self.archive.append_segment(USER_ID, ASTROLOGER_ID, messages[:10])
+        self.archive.append_segment(USER_ID, ASTROLOGER_ID, messages[10:20])
+        self.archive.append_segment(USER_ID, ASTROLOGER_ID, messages[20:])
+
+        page = self.archive.read_before(USER_ID, ASTROLOGER_ID, None, 5)
+        self.assertEqual([m['message_id'] for m in page], ["msg_0029", "msg_0028", "msg_0027", "msg_0026", "msg_0025"])
+
+        before = (messages[22]['sent_at'], messages[22]['message_id'])
+        page = self.archive.read_before(USER_ID, ASTROLOGER_ID, before, 5)
+        self.assertEqual([m['message_id'] for m in page], ["msg_0021", "msg_0020", "msg_0019", "msg_0018", "msg_0017"])
+        self.assertIsInstance(page[0]['sent_at'], datetime)
+
+    def test_read_past_the_end(self):
+        """Reading older than everything archived returns an empty page"""
+        messages = make_messages(self.start, 5)
+        self.archive.append_segment(USER_ID, ASTROLOGER_ID, messages)
+        before = (messages[0]['sent_at'], messages[0]['message_id'])
+        self.assertEqual(self.archive.read_before(USER_ID, ASTROLOGER_ID, before, 10), [])
+        self.assertEqual(self.archive.read_before("user_unknown", ASTROLOGER_ID, None, 10), [])
+
+    def test_archived_through_and_ordering(self):
+        """archived_through tracks the newest key; older appends are rejected"""
+        messages = make_messages(self.start, 10)
+        self.archive.append_segment(USER_ID, ASTROLOGER_ID, messages[5:])
+
+        through = self.archive.archived_through(USER_ID, ASTROLOGER_ID)
+        self.assertEqual(through, (messages[9]['sent_at'], messages[9]['message_id']))
+
+        with self.assertRaises(ValueError):
+            self.archive.append_segment(USER_ID, ASTROLOGER_ID, messages[:5])
+
+    def test_unsafe_ids_stay_inside_root(self):
+        """IDs are sanitised before being used as path components"""
+        self.archive.append_segment("../../etc", ASTROLOGER_ID, make_messages(self.start, 1))
+        for dirpath, _, _ in os.walk(self.root):
+            self.assertTrue(os.path.abspath(dirpath).startswith(os.path.abspath(self.root)))
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Message Archive Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestMessageArchive)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Schema Migrations (No Database Required)
+Tests statement splitting, migration discovery and the runner against a fake connection
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.migrator import (
+    MigrationRunner, MigrationError, discover_migrations, split_statements,
+    MIGRATIONS_DIR, BASELINE_FILE
+)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((' '.join(sql.split()), params, self.conn.autocommit))
+        self._rows, self.rowcount = self.conn.respond(sql, params)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """Records statements; answers catalog and bookkeeping queries"""
+
+    def __init__(self, applied=None, lock_free=True, fail_on=None, backfill_counts=None):
+        self.applied = dict(applied or {})
+        self.lock_free = lock_free
+        self.fail_on = fail_on
+        self.backfill_counts = list(backfill_counts or [])
+        self.executed = []
+        self.autocommit = False
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+    def statements(self):
+        return [sql for sql, _, _ in self.executed]
+
+    def respond(self, sql, params):
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError(f"boom: {self.fail_on}")
+        if 'pg_try_advisory_lock' in sql:
+            return [(self.lock_free,)], 1
+        if "to_regclass('schema_migrations')" in sql:
+            return [('schema_migrations',)], 1
+        if 'SELECT version, checksum, applied_at FROM schema_migrations' in sql:
+            return [(v, c, None) for v, c in self.applied.items()], len(self.applied)
+        if 'INSERT INTO schema_migrations' in sql:
+            self.applied[params[0]] = params[2]
+            return [], 1
+        if 'SELECT relkind FROM pg_class' in sql:
+            return [('p' if params[0] == 'events' else 'r',)], 1
+        if 'FROM pg_inherits' in sql and 'ORDER BY c.relname' in sql:
+            return [('events_y2026m01',), ('events_default',)], 2
+        if sql.lstrip().startswith('UPDATE') and self.backfill_counts:
+            return [], self.backfill_counts.pop(0)
+        return [], 0
+
+
+class TestSplitStatements(unittest.TestCase):
+    """Test SQL script splitting"""
+
+    def test_splits_on_top_level_semicolons(self):
+        """Plain statements split; trailing comments are dropped"""
+        print("🔍 Testing statement splitting...")
+        statements = split_statements("CREATE TABLE a (id int);\nCREATE INDEX i ON a(id);\n-- done\n")
+        self.assertEqual(statements, ["CREATE TABLE a (id int)", "CREATE INDEX i ON a(id)"])
+        print("✅ Statements split")
+
+    def test_keeps_quoted_and_dollar_quoted_semicolons(self):
+        """Semicolons in strings, identifiers, comments and function bodies do not split"""
+        sql = """
+            INSERT INTO t VALUES ('a;b', 'it''s; fine');
+            -- comment; with semicolon
+            CREATE FUNCTION f() RETURNS TRIGGER AS $body$
+            BEGIN
+                NEW.x = 1; RETURN NEW;
+            END;
+            $body$ LANGUAGE plpgsql;
+            DO $$ BEGIN PERFORM 1; END $$;
+            SELECT "weird;name" FROM t /* block; comment */;
+        """
+        statements = split_statements(sql)
+        self.assertEqual(len(statements), 4)
+        self.assertIn("'it''s; fine'", statements[0])
+        self.assertIn("NEW.x = 1; RETURN NEW;", statements[1])
+        self.assertTrue(statements[2].startswith("DO $$"))
+        self.assertIn('"weird;name"', statements[3])
+
+    def test_baseline_schema_splits_cleanly(self):
+        """schema.sql splits into statements that each start with SQL"""
+        statements = split_statements(BASELINE_FILE.read_text())
+        self.assertGreater(len(statements), 50)
+        self.assertFalse(any(s.startswith('$$') for s in statements))
+
+
+class TestDiscoverMigrations(unittest.TestCase):
+    """Test migration discovery and ordering"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, body):
+        (self.dir / name).write_text(body)
+
+    def test_orders_versions_and_reads_directives(self):
+        """Baseline first, then files by version; directives set the transaction mode"""
+        self.write('0003_online.sql', "-- migrate: no-transaction\nCREATE INDEX CONCURRENTLY IF NOT EXISTS i ON t(x);")
+        self.write('0002_add_column.sql', "ALTER TABLE t ADD COLUMN IF NOT EXISTS x int;")
+        self.write('0004_backfill.py', "TRANSACTIONAL = False\ndef upgrade(ctx):\n    pass\n")
+        self.write('README.md', "not a migration")
+
+        migrations = discover_migrations(self.dir, BASELINE_FILE)
+        self.assertEqual([m.version for m in migrations], [1, 2, 3, 4])
+        self.assertEqual(migrations[0].name, 'baseline')
+        self.assertEqual([m.transactional for m in migrations], [True, True, False, False])
+
+    def test_duplicate_versions_are_rejected(self):
+        """Two files with one version number are an error"""
+        self.write('0002_a.sql', "SELECT 1;")
+        self.write('0002_b.sql', "SELECT 2;")
+        with self.assertRaises(MigrationError):
+            discover_migrations(self.dir, BASELINE_FILE)
+
+    def test_shipped_migrations_are_consistent(self):
+        """The repository's migrations load and start after the baseline"""
+        migrations = discover_migrations(MIGRATIONS_DIR, BASELINE_FILE)
+        self.assertEqual(migrations[0].version, 1)
+        self.assertEqual(len({m.version for m in migrations}), len(migrations))
+
+
+class TestMigrationRunner(unittest.TestCase):
+    """Test applying migrations against a fake connection"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.baseline = self.dir / 'baseline.sql'
+        self.baseline.write_text("CREATE TABLE IF NOT EXISTS t (id int);")
+        self.migrations = self.dir / 'migrations'
+        self.migrations.mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def runner(self, conn):
+        return MigrationRunner(None, self.migrations, self.baseline, lock_timeout='2s', connect=lambda: conn)
+
+    def test_applies_pending_migrations_in_order(self):
+        """Pending versions run once each, under the advisory lock"""
+        print("🔍 Testing migration run...")
+        (self.migrations / '0002_col.sql').write_text("ALTER TABLE t ADD COLUMN IF NOT EXISTS x int;")
+        conn = FakeConnection()
+
+        result = self.runner(conn).migrate()
+        self.assertTrue(result['success'])
+        self.assertEqual(result['applied'], [1, 2])
+        statements = conn.statements()
+        self.assertTrue(statements[0].startswith('SELECT pg_advisory_lock'))
+        self.assertTrue(statements[-1].startswith('SELECT pg_advisory_unlock'))
+        self.assertIn("SELECT set_config('lock_timeout', %s, false)", statements)
+        self.assertEqual(conn.commits, 2)
+        self.assertTrue(conn.closed)
+
+        again = self.runner(conn).migrate()
+        self.assertEqual(again['applied'], [])
+        print("✅ Migrations applied once")
+
+    def test_target_stops_early(self):
+        """Versions above the target are left pending"""
+        (self.migrations / '0002_a.sql').write_text("SELECT 1;")
+        (self.migrations / '0003_b.sql').write_text("SELECT 2;")
+        result = self.runner(FakeConnection()).migrate(target=2)
+        self.assertEqual(result['applied'], [1, 2])
+
+    def test_no_wait_skips_when_locked(self):
+        """Another instance holding the lock means nothing runs"""
+        conn = FakeConnection(lock_free=False)
+        result = self.runner(conn).migrate(wait=False)
+        self.assertTrue(result['locked'])
+        self.assertFalse(result['success'])
+        self.assertFalse(any('schema_migrations' in s for s in conn.statements()))
+
+    def test_failed_migration_rolls_back_and_stops(self):
+        """A failing transactional migration is not recorded; later ones do not run"""
+        (self.migrations / '0002_bad.sql').write_text("ALTER TABLE broken;")
+        (self.migrations / '0003_next.sql').write_text("SELECT 1;")
+        conn = FakeConnection(fail_on='ALTER TABLE broken')
+
+        result = self.runner(conn).migrate()
+        self.assertFalse(result['success'])
+        self.assertIn('0002_bad', result['error'])
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(set(conn.applied), {1})
+        self.assertTrue(conn.statements()[-1].startswith('SELECT pg_advisory_unlock'))
+
+    def test_no_transaction_sql_runs_statements_in_autocommit(self):
+        """Concurrent index builds run one by one outside a transaction"""
+        (self.migrations / '0002_idx.sql').write_text(
+            "-- migrate: no-transaction\n"
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_a ON t(a);\n"
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_b ON t(b);\n"
+        )
+        conn = FakeConnection(applied={1: discover_migrations(self.migrations, self.baseline)[0].checksum})
+
+        self.runner(conn).migrate()
+        creates = [(sql, autocommit) for sql, _, autocommit in conn.executed if 'CREATE INDEX' in sql]
+        self.assertEqual(len(creates), 2)
+        self.assertTrue(all(autocommit for _, autocommit in creates))
+        # Leftover invalid indexes are checked before each build
+        checks = [params for sql, params, _ in conn.executed if 'indisvalid' in sql]
+        self.assertEqual(checks, [('idx_a',), ('idx_b',)])
+
+    def test_partitioned_index_built_per_partition(self):
+        """Partitioned tables get ON ONLY parent + concurrent child index + attach"""
+        (self.migrations / '0002_events.py').write_text(
+            "TRANSACTIONAL = False\n"
+            "def upgrade(ctx):\n"
+            "    ctx.create_index_concurrently('idx_events_kind', 'events', '(kind)')\n"
+        )
+        conn = FakeConnection()
+        self.runner(conn).migrate()
+        statements = conn.statements()
+        self.assertIn('CREATE INDEX IF NOT EXISTS idx_events_kind ON ONLY events (kind)', statements)
+        self.assertIn('CREATE INDEX CONCURRENTLY IF NOT EXISTS events_y2026m01_events_kind ON events_y2026m01 (kind)',
+                      statements)
+        self.assertIn('ALTER INDEX idx_events_kind ATTACH PARTITION events_default_events_kind', statements)
+
+    def test_backfill_commits_in_batches(self):
+        """backfill repeats until a short batch and requires autocommit"""
+        (self.migrations / '0002_fill.py').write_text(
+            "TRANSACTIONAL = False\n"
+            "def upgrade(ctx):\n"
+            "    ctx.total = ctx.backfill('UPDATE t SET x = 1 WHERE id IN "
+            "(SELECT id FROM t WHERE x IS NULL LIMIT %(batch_size)s)', batch_size=10)\n"
+        )
+        conn = FakeConnection(backfill_counts=[10, 10, 3])
+        result = self.runner(conn).migrate()
+        self.assertTrue(result['success'])
+        updates = [(params, autocommit) for sql, params, autocommit in conn.executed if sql.startswith('UPDATE')]
+        self.assertEqual(len(updates), 3)
+        self.assertTrue(all(params == {'batch_size': 10} and autocommit for params, autocommit in updates))
+
+    def test_backfill_in_transactional_migration_fails(self):
+        """Batch commits are impossible inside a transaction"""
+        (self.migrations / '0002_fill.py').write_text(
+            "def upgrade(ctx):\n"
+            "    ctx.backfill('UPDATE t SET x = 1 LIMIT %(batch_size)s')\n"
+        )
+        result = self.runner(FakeConnection()).migrate()
+        self.assertFalse(result['success'])
+        self.assertIn('non-transactional', result['error'])
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Schema Migration Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestSuite()
+    for case in (TestSplitStatements, TestDiscoverMigrations, TestMigrationRunner):
+        suite.addTests(unittest.TestLoader().loadTestsFromTestCase(case))
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
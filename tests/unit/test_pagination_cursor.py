@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Chat History Pagination Cursors (No Database Required)
+"""
+
+import sys
+import os
+import unittest
+from datetime import datetime
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.cursors import encode_cursor, decode_cursor, InvalidCursorError
+
+
+class TestPaginationCursor(unittest.TestCase):
+    """Test keyset cursor encoding"""
+
+    def test_round_trip(self):
+        """A cursor decodes back to the exact keyset position"""
+        print("🔍 Testing cursor round trip...")
+        sent_at = datetime(2025, 3, 14, 9, 26, 53, 589793)
+        message_id = "msg_conv_user_abc_astrologer_001_1710408413_1710408413589"
+
+        cursor = encode_cursor(sent_at, message_id)
+        self.assertEqual(decode_cursor(cursor), (sent_at, message_id))
+        print(f"✅ Cursor: {cursor[:40]}...")
+
+    def test_cursor_is_url_safe(self):
+        """Cursors can be passed as query parameters without escaping"""
+        cursor = encode_cursor(datetime.now(), "msg_ü_テスト_+/=")
+        self.assertRegex(cursor, r'^[A-Za-z0-9_-]+$')
+
+    def test_invalid_cursor(self):
+        """Tampered or garbage cursors raise InvalidCursorError"""
+        for bad in ("not-a-cursor", "", "eyJ0IjoxfQ", "%%%"):
+            with self.assertRaises(InvalidCursorError):
+                decode_cursor(bad)
+
+    def test_invalid_cursor_is_value_error(self):
+        """InvalidCursorError can be handled as a ValueError"""
+        self.assertTrue(issubclass(InvalidCursorError, ValueError))
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Pagination Cursor Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestPaginationCursor)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Query Instrumentation (No Database Required)
+Tests histograms, statement fingerprints, method attribution and N+1 flagging
+"""
+
+import sys
+import os
+import contextvars
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.instrumentation import (
+    LatencyHistogram, _is_read_only, fingerprint, instrument_methods, request_scope, registry
+)
+
+
+@instrument_methods(exclude=('helper',))
+class FakeManager:
+    """Issues 'queries' straight into the registry"""
+
+    def get_thing(self, n=1):
+        for _ in range(n):
+            registry.record_query("SELECT * FROM things WHERE id = %s", 3.0, 1)
+        return n
+
+    def get_nested(self):
+        self.get_thing()
+        registry.record_query("SELECT 1", 1.0, 1)
+
+    def helper(self):
+        registry.record_query("SELECT 2", 1.0, 1)
+
+    @staticmethod
+    def make_id():
+        return "id"
+
+
+class TestQueryInstrumentation(unittest.TestCase):
+    """Test query instrumentation bookkeeping"""
+
+    def setUp(self):
+        registry.reset()
+        self.manager = FakeManager()
+
+    def test_histogram_percentiles(self):
+        """Percentiles report the upper bound of the matching bucket"""
+        histogram = LatencyHistogram()
+        for ms in [0.5] * 90 + [30] * 9 + [4000]:
+            histogram.add(ms)
+        self.assertEqual(histogram.percentile(50), 1.0)
+        self.assertEqual(histogram.percentile(95), 50.0)
+        self.assertEqual(histogram.percentile(100), 4000)
+        self.assertEqual(histogram.to_dict()['count'], 100)
+
+    def test_fingerprint_normalizes_statements(self):
+        """Literals and inlined VALUES batches collapse to one fingerprint"""
+        print("🔍 Testing statement fingerprints...")
+        self.assertEqual(
+            fingerprint("SELECT *\n   FROM users\n  WHERE user_id = %s"),
+            "SELECT * FROM users WHERE user_id = %s"
+        )
+        batch_a = b"INSERT INTO t VALUES ('a', 1, 'x'),('b', 2, 'y')"
+        batch_b = b"INSERT INTO t VALUES ('c', 3, 'z'),('d', 4, 'w'),('e', 5, 'v')"
+        self.assertEqual(fingerprint(batch_a), fingerprint(batch_b))
+        self.assertIn("(...)", fingerprint(batch_a))
+        print("✅ Fingerprints stable")
+
+    def test_queries_are_attributed_to_methods(self):
+        """Statements count against the innermost manager method"""
+        self.manager.get_thing(3)
+        self.manager.get_nested()
+        self.manager.helper()
+
+        methods = registry.snapshot()['methods']
+        self.assertEqual(methods['get_thing']['queries'], 4)
+        self.assertEqual(methods['get_thing']['count'], 2)
+        self.assertEqual(methods['get_nested']['queries'], 1)
+        self.assertNotIn('helper', methods)
+        self.assertIn('<unattributed>', methods)
+        self.assertEqual(FakeManager.make_id(), "id")
+
+    def test_n_plus_one_requests_are_flagged(self):
+        """Requests over the threshold are flagged with their top methods"""
+        print("🔍 Testing N+1 detection...")
+        with request_scope("GET /api/things"):
+            self.manager.get_thing(registry.n_plus_one_threshold + 1)
+        with request_scope("GET /api/things"):
+            self.manager.get_thing(1)
+
+        snapshot = registry.snapshot()
+        route = snapshot['routes']['GET /api/things']
+        self.assertEqual(route['requests'], 2)
+        self.assertEqual(route['n_plus_one_flagged'], 1)
+        self.assertEqual(snapshot['flagged_requests'][0]['methods'],
+                         {'get_thing': registry.n_plus_one_threshold + 1})
+        print("✅ N+1 request flagged")
+
+    def test_request_scope_follows_worker_threads(self):
+        """Queries run on executor threads (as AsyncDatabaseManager does) still count"""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with request_scope("GET /api/threads") as request:
+                futures = [executor.submit(contextvars.copy_context().run, self.manager.get_thing, 2)
+                           for _ in range(3)]
+                for future in futures:
+                    future.result()
+        self.assertEqual(request.queries, 6)
+
+    def test_slow_query_explain_is_rate_limited(self):
+        """A slow statement is sampled once per interval"""
+        slow = registry.slow_query_ms + 1
+        self.assertFalse(registry.should_explain("SELECT fast", registry.slow_query_ms - 1))
+        self.assertTrue(registry.should_explain("SELECT slow", slow))
+        self.assertFalse(registry.should_explain("SELECT slow", slow))
+
+    def test_only_plain_reads_are_explained(self):
+        """Writes and row-locking reads never get an EXPLAIN sample"""
+        self.assertTrue(_is_read_only("  select * from messages where conversation_id = %s"))
+        self.assertTrue(_is_read_only(b"WITH recent AS (SELECT 1) SELECT * FROM recent"))
+        self.assertFalse(_is_read_only("WITH moved AS (DELETE FROM messages RETURNING *) SELECT * FROM moved"))
+        self.assertFalse(_is_read_only("UPDATE wallets SET balance = balance - %s"))
+        self.assertFalse(_is_read_only("SELECT * FROM user_astrologer_threads WHERE user_id = %s FOR UPDATE"))
+        self.assertFalse(_is_read_only("SELECT balance FROM wallets WHERE user_id = %s\nFOR NO KEY UPDATE"))
+        self.assertFalse(_is_read_only("SELECT * FROM conversations FOR SHARE SKIP LOCKED"))
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Query Instrumentation Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestQueryInstrumentation)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Secrets Cache and Credential Refresh (No Database Required)
+Tests TTL reuse, rate-limited forced refresh, rotation and reconnecting with refreshed credentials
+"""
+
+import sys
+import os
+import json
+import unittest
+from unittest import mock
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.config.secrets import SecretCache
+from backend.database import manager as manager_module
+from backend.database.manager import DatabaseManager
+
+
+class FakeSecretsManager:
+    """Secrets Manager client returning a password that can be rotated"""
+
+    def __init__(self):
+        self.password = 'first'
+        self.version = 'v1'
+        self.calls = 0
+        self.fail = False
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("endpoint unreachable")
+        secret = {'host': 'db', 'port': 5432, 'username': 'app', 'password': self.password}
+        return {'SecretString': json.dumps(secret), 'VersionId': self.version}
+
+    def rotate(self, password):
+        self.password = password
+        self.version = f"v{int(self.version[1:]) + 1}"
+
+
+class TestSecretCache(unittest.TestCase):
+    """Process-level secret caching"""
+
+    def setUp(self):
+        self.client = FakeSecretsManager()
+        self.cache = SecretCache(ttl_seconds=60, min_refresh_interval=0, client_factory=lambda: self.client)
+
+    def test_fetched_once_within_ttl(self):
+        """Repeated lookups are served from memory"""
+        for _ in range(5):
+            self.assertEqual(self.cache.get('arn')['password'], 'first')
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual(self.cache.stats()['hits'], 4)
+
+    def test_expired_value_refetched(self):
+        """After the TTL the secret is fetched again"""
+        cache = SecretCache(ttl_seconds=0, client_factory=lambda: self.client)
+        cache.get('arn')
+        cache.get('arn')
+        self.assertEqual(self.client.calls, 2)
+
+    def test_forced_refresh_picks_up_rotation(self):
+        """refresh=True fetches the rotated value"""
+        self.cache.get('arn')
+        self.client.rotate('second')
+        self.assertEqual(self.cache.get('arn')['password'], 'first')
+        self.assertEqual(self.cache.get('arn', refresh=True)['password'], 'second')
+        self.assertEqual(self.cache.stats()['rotations_seen'], 1)
+
+    def test_forced_refresh_rate_limited(self):
+        """Forced refreshes within min_refresh_interval reuse the cached value"""
+        cache = SecretCache(ttl_seconds=60, min_refresh_interval=60, client_factory=lambda: self.client)
+        cache.get('arn')
+        cache.get('arn', refresh=True)
+        self.assertEqual(self.client.calls, 1)
+
+    def test_stale_value_served_when_fetch_fails(self):
+        """An outage after the first fetch keeps the last known value"""
+        self.cache.get('arn')
+        self.client.fail = True
+        self.assertEqual(self.cache.get('arn', refresh=True)['password'], 'first')
+
+        empty = SecretCache(client_factory=lambda: self.client)
+        with self.assertRaises(ConnectionError):
+            empty.get('arn')
+
+
+class FakeOperationalError(Exception):
+    """Stands in for psycopg2.OperationalError"""
+
+
+@unittest.skipUnless(manager_module.PSYCOPG2_AVAILABLE, "psycopg2 not installed")
+class TestCredentialRefresh(unittest.TestCase):
+    """DatabaseManager reconnects with refreshed credentials after a rotation"""
+
+    def test_rejected_password_refreshes_secret(self):
+        configs = {
+            False: {'host': 'db', 'port': 5432, 'database': 'astrovoice', 'user': 'app', 'password': 'old'},
+            True: {'host': 'db', 'port': 5432, 'database': 'astrovoice', 'user': 'app', 'password': 'new'},
+        }
+        refreshes = []
+
+        def get_database_config(refresh=False):
+            refreshes.append(refresh)
+            return configs[refresh]
+
+        def connect(connection_factory=None, **config):
+            if config['password'] != 'new':
+                raise FakeOperationalError('FATAL:  password authentication failed for user "app"')
+            return 'connection'
+
+        with mock.patch.object(manager_module, 'get_database_config', get_database_config), \
+                mock.patch.object(manager_module.psycopg2, 'OperationalError', FakeOperationalError), \
+                mock.patch.object(manager_module.psycopg2, 'connect', connect):
+            db = DatabaseManager()
+            self.assertEqual(db._connect(), 'connection')
+            self.assertEqual(db.db_config['password'], 'new')
+            self.assertEqual(refreshes[-2:], [False, True])
+
+    def test_explicit_config_not_reloaded(self):
+        """Shard managers keep the config they were given"""
+        config = {'host': 'shard', 'port': 5432, 'database': 'astrovoice', 'user': 'app', 'password': 'x'}
+        with mock.patch.object(manager_module.psycopg2, 'connect', lambda **kwargs: kwargs):
+            db = DatabaseManager(db_config=config, name='s1')
+            self.assertEqual(db._connect()['host'], 'shard')
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Secrets Cache Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestSuite()
+    loader = unittest.TestLoader()
+    suite.addTests(loader.loadTestsFromTestCase(TestSecretCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestCredentialRefresh))
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
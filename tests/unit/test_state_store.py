@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - User State Store (No Database Required)
+Tests keyed upserts, debounced batch flushes, legacy JSON import and lazy per-user loading
+"""
+
+import sys
+import os
+import json
+import tempfile
+import unittest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.state_store import UserStateStore, UserStateView
+
+
+class TestUserStateStore(unittest.TestCase):
+    """SQLite-backed per-user state"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'states.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_is_debounced_and_batched(self):
+        """Changes wait for flush(); one flush writes every dirty user"""
+        store = UserStateStore(self.path, flush_interval=60)
+        store.put('user_1', {'name': 'Asha'})
+        store.put('user_2', {'name': 'Ravi'})
+        store.put('user_1', {'name': 'Asha', 'past_topics': ['marriage']})
+
+        self.assertEqual(store.get('user_1')['past_topics'], ['marriage'])
+        self.assertIsNone(UserStateStore(self.path).get('user_1'))
+
+        self.assertEqual(store.flush(), 2)
+        self.assertEqual(store.stats()['flushes'], 1)
+        store.close()
+        reopened = UserStateStore(self.path)
+        self.assertEqual(reopened.get('user_1'), {'name': 'Asha', 'past_topics': ['marriage']})
+        self.assertEqual(reopened.count(), 2)
+
+    def test_write_through_and_max_pending(self):
+        """flush_interval=0 writes immediately; max_pending forces a flush"""
+        store = UserStateStore(self.path, flush_interval=0)
+        store.put('user_1', {'name': 'Asha'})
+        self.assertEqual(store.stats()['pending'], 0)
+
+        batched = UserStateStore(os.path.join(self.tmp.name, 'b.db'), flush_interval=60, max_pending=3)
+        for i in range(3):
+            batched.put(f'user_{i}', {'i': i})
+        self.assertEqual(batched.stats()['rows_written'], 3)
+
+    def test_write_cost_is_per_user(self):
+        """Saving one user writes only that user's row"""
+        store = UserStateStore(self.path, flush_interval=0)
+        for i in range(200):
+            store.put(f'user_{i}', {'name': f'User {i}', 'past_topics': ['career']})
+        before = store.stats()['bytes_written']
+        store.put('user_7', {'name': 'User 7', 'past_topics': ['career', 'love']})
+        written = store.stats()['bytes_written'] - before
+        self.assertLess(written, 100)
+
+    def test_legacy_json_imported_once(self):
+        """An existing user_states.json seeds an empty store"""
+        legacy = os.path.join(self.tmp.name, 'user_states.json')
+        with open(legacy, 'w') as f:
+            json.dump({'user_1': {'name': 'Asha'}}, f)
+        store = UserStateStore(self.path, legacy_files=[legacy])
+        self.assertEqual(store.get('user_1'), {'name': 'Asha'})
+        store.put('user_1', {'name': 'Asha R'})
+        store.close()
+        self.assertEqual(UserStateStore(self.path, legacy_files=[legacy]).get('user_1'), {'name': 'Asha R'})
+
+    def test_unwritable_path_falls_back_to_memory(self):
+        """A read-only location keeps working in memory"""
+        blocker = os.path.join(self.tmp.name, 'file')
+        open(blocker, 'w').close()
+        store = UserStateStore(os.path.join(blocker, 'states.db'), flush_interval=0)
+        store.put('user_1', {'name': 'Asha'})
+        self.assertEqual(store.get('user_1'), {'name': 'Asha'})
+        self.assertEqual(store.path, ':memory:')
+
+
+class TestUserStateView(unittest.TestCase):
+    """The handlers' user_states dict"""
+
+    def test_loads_users_on_access(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = UserStateStore(os.path.join(tmp.name, 'states.db'), flush_interval=0)
+        store.put('user_1', {'name': 'Asha'})
+
+        view = UserStateView(store)
+        self.assertEqual(len(view), 0)
+        self.assertIn('user_1', view)
+        self.assertEqual(view['user_1']['name'], 'Asha')
+        self.assertNotIn('user_2', view)
+        self.assertIsNone(view.get('user_2'))
+        view['user_2'] = {'name': 'Ravi'}
+        self.assertEqual(sorted(view), ['user_1', 'user_2'])
+
+    def test_views_share_one_state_per_user(self):
+        """Handlers for two astrologers save each other's changes, not stale copies"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = UserStateStore(os.path.join(tmp.name, 'states.db'), flush_interval=60)
+        first, second = UserStateView(store), UserStateView(store)
+
+        self.assertNotIn('user_1', first)
+        first['user_1'] = {}
+        first['user_1']['past_topics'] = ['career']
+        store.put('user_1', first['user_1'])
+
+        second['user_1']['name'] = 'Ravi'
+        store.put('user_1', second['user_1'])
+        first['user_1']['past_topics'].append('love')
+        store.put('user_1', first['user_1'])
+
+        store.close()
+        self.assertEqual(UserStateStore(store.path).get('user_1'),
+                         {'past_topics': ['career', 'love'], 'name': 'Ravi'})
+
+    def test_new_user_state_is_shared(self):
+        """A user first seen by two views at once still ends up with one state"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = UserStateStore(os.path.join(tmp.name, 'states.db'), flush_interval=60)
+        first, second = UserStateView(store), UserStateView(store)
+        self.assertNotIn('user_1', first)
+        self.assertNotIn('user_1', second)
+
+        first['user_1'] = {'name': 'Asha'}
+        self.assertEqual(second.get('user_1'), {'name': 'Asha'})
+        second['user_1'] = {}
+        self.assertIs(first['user_1'], second['user_1'])
+        self.assertEqual(first['user_1'], {'name': 'Asha'})
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running User State Store Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestSuite()
+    loader = unittest.TestLoader()
+    suite.addTests(loader.loadTestsFromTestCase(TestUserStateStore))
+    suite.addTests(loader.loadTestsFromTestCase(TestUserStateView))
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
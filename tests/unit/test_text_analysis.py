@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Text Analysis Engine (No OpenAI Calls)
+Tests the compiled keyword matcher, per-user emotion windows and handler integration
+"""
+
+import sys
+import os
+import random
+import unittest
+from unittest import mock
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.services.text_analysis import (
+    EMOTION_KEYWORDS, TOPIC_KEYWORDS, ConversationSignals, text_matcher, update_user_state
+)
+
+ALL_KEYWORDS = {k for words in list(EMOTION_KEYWORDS.values()) + list(TOPIC_KEYWORDS.values()) for k in words}
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """One compiled pattern, same results as `keyword in text`"""
+
+    def test_matches_substring_semantics(self):
+        """Random text built from keyword fragments agrees with plain substring checks"""
+        rng = random.Random(3)
+        pieces = sorted(ALL_KEYWORDS) + ['d', 'ar', ' ', 'xyz', 'नम', 'ी', 'chint', 'ama']
+        for _ in range(2000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 12)))
+            expected = {k for k in ALL_KEYWORDS if k in text.lower()}
+            self.assertEqual(text_matcher.keywords_in(text), expected, text)
+
+    def test_overlapping_keywords(self):
+        """Shared prefixes and overlapping keywords are all counted"""
+        self.assertEqual(text_matcher.keywords_in("Bahut DARD hai"), {'dard', 'dar'})
+        self.assertEqual(text_matcher.keywords_in("chintamazing"), {'chinta', 'amazing'})
+
+    def test_topics_in_recording_order(self):
+        analysis = text_matcher.analyze("परिवार chahta hai ki meri शादी ho, par job ka kya?")
+        self.assertEqual(analysis.topics, ('marriage', 'career', 'family'))
+        self.assertEqual(analysis.emotion_keywords, frozenset())
+
+
+class TestConversationSignals(unittest.TestCase):
+    """Incremental per-user emotion over recent messages"""
+
+    def test_window_slides(self):
+        signals = ConversationSignals(window=2)
+        self.assertEqual(signals.emotion('user_1'), 'neutral')
+        signals.observe('user_1', "Mujhe bahut chinta hai, nervous hoon")
+        self.assertEqual(signals.emotion('user_1'), 'worried')
+        signals.observe('user_1', "Aaj main khush hoon")
+        self.assertEqual(signals.emotion('user_1'), 'worried')
+        signals.observe('user_1', "Great, amazing news")
+        self.assertEqual(signals.emotion('user_1'), 'excited')
+        self.assertEqual(signals.emotion('user_2'), 'neutral')
+
+    def test_ties_follow_emotion_order(self):
+        signals = ConversationSignals()
+        signals.observe('user_1', "I am happy but upset")
+        self.assertEqual(signals.emotion('user_1'), 'sad')
+
+    def test_latest_analysis_reused(self):
+        signals = ConversationSignals()
+        text = "Shaadi kab hogi?"
+        observed = signals.observe('user_1', text)
+        with mock.patch.object(signals.matcher, 'analyze') as analyze:
+            self.assertIs(signals.analysis_of('user_1', text), observed)
+            analyze.assert_not_called()
+
+    def test_update_user_state(self):
+        state = {}
+        self.assertTrue(update_user_state(state, 'neutral', ()))
+        self.assertEqual(state, {'emotional_context': '', 'past_topics': []})
+        self.assertFalse(update_user_state(state, 'neutral', ()))
+        self.assertTrue(update_user_state(state, 'sad', ('marriage',)))
+        self.assertFalse(update_user_state(state, 'sad', ('marriage',)))
+
+        update_user_state(state, 'sad', ('love', 'career', 'health', 'finance', 'family'))
+        self.assertEqual(state['past_topics'], ['love', 'career', 'health', 'finance', 'family'])
+
+
+class TestHandlerIntegration(unittest.TestCase):
+    """Chat and voice handlers feed the shared matcher"""
+
+    def test_chat_handler(self):
+        try:
+            from backend.handlers import openai_chat
+        except ImportError as e:
+            self.skipTest(f"chat handler dependencies missing: {e}")
+        store = mock.Mock()
+        with mock.patch.object(openai_chat, 'OPENAI_API_KEY', 'test-key'), \
+                mock.patch.object(openai_chat, 'user_state_store', store):
+            handler = openai_chat.OpenAIChatHandler(
+                'ast_1', client=object(),
+                astrologer_config={'name': 'Tina', 'speciality': 'Marriage', 'text_system_prompt': 'persona'},
+                user_states={},
+            )
+            message = "Shaadi mein dard aur pareshani hai"
+            handler.increment_conversation_turn('user_1', 'user', message)
+            handler.increment_conversation_turn('user_1', 'assistant', "Tension mat lo, sab theek hoga")
+            self.assertEqual(handler._detect_user_emotion('user_1'), 'sad')
+
+            handler._extract_user_info('user_1', message, "...")
+        self.assertEqual(handler.user_states['user_1']['past_topics'], ['marriage'])
+        self.assertEqual(handler.user_states['user_1']['emotional_context'], 'sad')
+        self.assertEqual(store.put.call_count, 1)
+
+    def test_realtime_transcripts(self):
+        try:
+            from backend.handlers import openai_realtime
+        except ImportError as e:
+            self.skipTest(f"voice handler dependencies missing: {e}")
+        store = mock.Mock()
+        with mock.patch.object(openai_realtime, 'OPENAI_API_KEY', 'test-key'), \
+                mock.patch.object(openai_realtime, 'user_state_store', store):
+            handler = openai_realtime.OpenAIRealtimeHandler()
+            handler.user_states = {}
+            handler._observe_transcript('user_1', "मेरे परिवार में बहुत tension hai")
+        self.assertEqual(handler.user_states['user_1']['past_topics'], ['family'])
+        self.assertEqual(handler.user_states['user_1']['emotional_context'], 'sad')
+        store.put.assert_called_once()
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Text Analysis Unit Tests (No OpenAI Calls)")
+    print("=" * 60)
+
+    suite = unittest.TestSuite()
+    loader = unittest.TestLoader()
+    suite.addTests(loader.loadTestsFromTestCase(TestKeywordMatcher))
+    suite.addTests(loader.loadTestsFromTestCase(TestConversationSignals))
+    suite.addTests(loader.loadTestsFromTestCase(TestHandlerIntegration))
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -7,7 +7,6 @@ Tests UUID-based ID generation for scalability
 import sys
 import os
 import unittest
-import re
 from datetime import datetime
 
 # Add project root to path
@@ -39,6 +38,8 @@ except ImportError as e:
         print(f"❌ Could not import database manager: {e2}")
         sys.exit(1)
 
+from backend.database.ids import ulid_timestamp
+
 class TestUUIDGeneration(unittest.TestCase):
     """Test UUID generation methods"""
     
@@ -79,9 +80,10 @@ class TestUUIDGeneration(unittest.TestCase):
         
         conv_id = db.generate_conversation_id(user_id, astrologer_id)
         
-        # Check format: conv_ + user_id + _ + astrologer_id + _ + timestamp
-        pattern = r'^conv_user_[a-f0-9]{12}_astrologer_001_\d+$'
+        # Check format: conv_ + 26-char ULID (Crockford base32)
+        pattern = r'^conv_[0-9a-hjkmnp-tv-z]{26}$'
         self.assertRegex(conv_id, pattern)
+        self.assertNotIn(user_id, conv_id)
         
         print("✅ Conversation ID format correct")
     
@@ -93,9 +95,10 @@ class TestUUIDGeneration(unittest.TestCase):
         
         msg_id = db.generate_message_id(conversation_id)
         
-        # Check format: msg_ + conversation_id + _ + timestamp
-        pattern = r'^msg_conv_user_[a-f0-9]{12}_astrologer_001_\d+_\d+$'
+        # Check format: msg_ + 26-char ULID - no longer embeds the conversation ID
+        pattern = r'^msg_[0-9a-hjkmnp-tv-z]{26}$'
         self.assertRegex(msg_id, pattern)
+        self.assertEqual(len(msg_id), 30)
         
         print("✅ Message ID format correct")
     
@@ -123,11 +126,8 @@ class TestUUIDGeneration(unittest.TestCase):
         # Generate conversation ID
         conv_id = db.generate_conversation_id(user_id, astrologer_id)
         
-        # Extract timestamp
-        timestamp_match = re.search(r'_(\d+)$', conv_id)
-        self.assertIsNotNone(timestamp_match)
-        
-        timestamp = int(timestamp_match.group(1))
+        # Extract timestamp encoded in the ULID
+        timestamp = int(ulid_timestamp(conv_id).timestamp())
         current_time = int(datetime.now().timestamp())
         
         # Timestamp should be recent (within last minute)
@@ -135,6 +135,21 @@ class TestUUIDGeneration(unittest.TestCase):
         
         print("✅ Timestamp inclusion correct")
     
+    def test_ids_are_time_ordered(self):
+        """Test that IDs sort in creation order, even within one millisecond"""
+        print("🔍 Testing ID ordering...")
+        
+        ids = [db.generate_message_id() for _ in range(1000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), 1000)
+        
+        print("✅ Message IDs are monotonic and unique")
+    
+    def test_transaction_id_format(self):
+        """Test transaction ID format"""
+        txn_id = db.generate_transaction_id()
+        self.assertRegex(txn_id, r'^txn_[0-9a-hjkmnp-tv-z]{26}$')
+    
     def test_scalability_properties(self):
         """Test scalability properties of UUID generation"""
         print("🔍 Testing scalability properties...")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Unit Tests - Write-Behind Message Queue (No Database Required)
+Tests batching, journaling, retry and crash replay against a recording writer
+"""
+
+import sys
+import os
+import glob
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.database.write_behind import WriteBehindQueue, barrier_keys
+
+
+class RecordingQueue(WriteBehindQueue):
+    """Write-behind queue whose flushes are recorded instead of sent to Postgres"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(None, *args, **kwargs)
+        self.batches = []
+        self.fail = threading.Event()
+
+    def _execute(self, rows):
+        if self.fail.is_set():
+            raise RuntimeError("database unavailable")
+        self.batches.append(rows)
+
+    @property
+    def written(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def turn(n: int):
+    now = datetime(2025, 1, 1, 12, 0, n)
+    return [
+        {'message_id': f"msg_{n}_u", 'conversation_id': "conv_1", 'sender_type': 'user',
+         'message_type': 'text', 'content': f"question {n}", 'sent_at': now},
+        {'message_id': f"msg_{n}_a", 'conversation_id': "conv_1", 'sender_type': 'astrologer',
+         'message_type': 'text', 'content': f"answer {n}", 'ai_model': 'gpt-4o-mini',
+         'tokens_used': 42, 'sent_at': now},
+    ]
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    """Test write-behind batching and durability"""
+
+    def setUp(self):
+        self.journal_dir = tempfile.mkdtemp(prefix="astro-wb-")
+
+    def tearDown(self):
+        shutil.rmtree(self.journal_dir, ignore_errors=True)
+
+    def journals(self):
+        return glob.glob(os.path.join(self.journal_dir, 'journal-*.jsonl'))
+
+    def test_turns_are_group_committed(self):
+        """Many submitted turns are written in few batches"""
+        print("🔍 Testing group commit...")
+        queue = RecordingQueue(self.journal_dir, batch_size=1000, flush_interval=60)
+        queue.start()
+        for n in range(50):
+            self.assertTrue(queue.submit(turn(n)))
+
+        self.assertTrue(queue.flush(timeout=5))
+        self.assertEqual(len(queue.written), 100)
+        self.assertEqual(len(queue.batches), 1)
+        self.assertEqual(self.journals(), [])
+        queue.stop()
+        print("✅ 50 turns written in one batch")
+
+    def test_size_trigger_flushes_without_waiting(self):
+        """Reaching batch_size wakes the flusher before the interval elapses"""
+        queue = RecordingQueue(self.journal_dir, batch_size=4, flush_interval=60)
+        queue.start()
+        queue.submit(turn(1))
+        queue.submit(turn(2))
+        for _ in range(100):
+            if queue.written:
+                break
+            threading.Event().wait(0.02)
+        self.assertEqual(len(queue.written), 4)
+        queue.stop()
+
+    def test_rows_are_written_in_column_order(self):
+        """Rows become tuples in MESSAGE_COLUMNS order with missing fields as NULL"""
+        queue = RecordingQueue(self.journal_dir, batch_size=1000, flush_interval=60)
+        queue.start()
+        queue.submit(turn(7))
+        queue.flush(timeout=5)
+        user_row, ai_row = queue.written
+        self.assertEqual(user_row[0], "msg_7_u")
+        self.assertIsNone(user_row[5])
+        self.assertEqual(ai_row[5:7], ('gpt-4o-mini', 42))
+        self.assertIsInstance(ai_row[7], datetime)
+        queue.stop()
+
+    def test_keyed_barrier_waits_only_for_own_rows(self):
+        """Readers with nothing queued pass the barrier without forcing a flush"""
+        queue = RecordingQueue(self.journal_dir, batch_size=1000, flush_interval=60)
+        queue.start()
+        queue.submit(turn(1), barrier_keys('conv_1', 'user_1'))
+
+        self.assertFalse(queue.has_pending(barrier_keys('conv_2', 'user_2')))
+        self.assertTrue(queue.flush(timeout=0.1, keys=barrier_keys(user_id='user_2')))
+        self.assertEqual(queue.written, [])
+
+        self.assertTrue(queue.has_pending(barrier_keys(user_id='user_1')))
+        self.assertTrue(queue.flush(timeout=5, keys=barrier_keys(conversation_id='conv_1')))
+        self.assertEqual(len(queue.written), 2)
+        self.assertFalse(queue.has_pending())
+        queue.stop()
+
+    def test_full_queue_rejects_submissions(self):
+        """Memory is bounded - a full queue asks the caller to write synchronously"""
+        queue = RecordingQueue(self.journal_dir, batch_size=1000, flush_interval=60, max_pending=4)
+        queue.fail.set()
+        queue.start()
+        self.assertTrue(queue.submit(turn(1)))
+        self.assertTrue(queue.submit(turn(2)))
+        self.assertFalse(queue.submit(turn(3)))
+        queue.fail.clear()
+        queue.stop()
+
+    def test_failed_flush_is_retried(self):
+        """Rows stay queued (and journaled) until a flush succeeds"""
+        queue = RecordingQueue(self.journal_dir, batch_size=1000, flush_interval=0.05)
+        queue.fail.set()
+        queue.start()
+        queue.submit(turn(1))
+        self.assertFalse(queue.flush(timeout=0.3))
+        self.assertTrue(self.journals())
+
+        queue.fail.clear()
+        self.assertTrue(queue.flush(timeout=10))
+        self.assertEqual(len(queue.written), 2)
+        self.assertEqual(self.journals(), [])
+        queue.stop()
+
+    def test_journal_is_replayed_after_crash(self):
+        """Entries journaled by a process that never flushed are written on next start"""
+        print("🔍 Testing crash replay...")
+        crashed = RecordingQueue(self.journal_dir, batch_size=1000, flush_interval=60)
+        crashed.fail.set()
+        crashed.start()
+        crashed.submit(turn(1))
+        crashed.submit(turn(2))
+        # Simulate a crash: drop the queue without stopping, release the journal lock
+        crashed._journal.close()
+        crashed._stopping = True
+
+        with open(self.journals()[0], 'a', encoding='utf-8') as f:
+            f.write('{"rows": [{"message_id": "torn')  # partial line from the crash
+
+        restarted = RecordingQueue(self.journal_dir, batch_size=1000, flush_interval=60)
+        restarted.start()
+        self.assertEqual(restarted.stats()['replayed_entries'], 2)
+        self.assertTrue(restarted.flush(timeout=5))
+        self.assertEqual([row[0] for row in restarted.written], ["msg_1_u", "msg_1_a", "msg_2_u", "msg_2_a"])
+        self.assertEqual(self.journals(), [])
+        restarted.stop()
+        print("✅ Journaled turns replayed")
+
+    def test_stop_flushes_pending_rows(self):
+        """Shutdown drains the queue"""
+        queue = RecordingQueue(self.journal_dir, batch_size=1000, flush_interval=60)
+        queue.start()
+        queue.submit(turn(1))
+        queue.stop()
+        self.assertEqual(len(queue.written), 2)
+        self.assertFalse(queue.submit(turn(2)))
+
+
+class TestReadBarrier(unittest.TestCase):
+    """DatabaseManager.flush_pending_writes only involves the caller's own rows"""
+
+    def test_unrelated_readers_are_not_pinned_to_primary(self):
+        try:
+            from backend.database.manager import DatabaseManager
+        except ImportError as e:
+            self.skipTest(f"database dependencies missing: {e}")
+        journal_dir = tempfile.mkdtemp(prefix="astro-wb-")
+        self.addCleanup(shutil.rmtree, journal_dir, True)
+
+        manager = DatabaseManager()
+        queue = manager._write_behind = RecordingQueue(journal_dir, batch_size=1000, flush_interval=60)
+        queue.start()
+        self.addCleanup(queue.stop)
+        writes = []
+        manager._record_session_write = lambda: writes.append(1)
+        queue.submit(turn(1), barrier_keys('conv_1', 'user_1'))
+
+        self.assertTrue(manager.flush_pending_writes(user_id='user_2'))
+        self.assertTrue(manager.flush_pending_writes(conversation_id='conv_2'))
+        self.assertEqual((queue.written, writes), ([], []))
+
+        self.assertTrue(manager.flush_pending_writes(user_id='user_1'))
+        self.assertEqual((len(queue.written), writes), (2, [1]))
+
+    def test_conversation_reads_wait_for_queued_turns(self):
+        """get_conversation sees the counters of turns still in the queue"""
+        try:
+            from backend.database.manager import DatabaseManager
+        except ImportError as e:
+            self.skipTest(f"database dependencies missing: {e}")
+        journal_dir = tempfile.mkdtemp(prefix="astro-wb-")
+        self.addCleanup(shutil.rmtree, journal_dir, True)
+
+        manager = DatabaseManager()
+        queue = manager._write_behind = RecordingQueue(journal_dir, batch_size=1000, flush_interval=60)
+        queue.start()
+        self.addCleanup(queue.stop)
+        manager._record_session_write = lambda: None
+        reads = []
+
+        def get_connection(read_only=False):
+            reads.append(len(queue.written))
+            raise ConnectionError("no database in unit tests")
+
+        manager.get_connection = get_connection
+        queue.submit(turn(1), barrier_keys('conv_1', 'user_1'))
+        self.assertIsNone(manager.get_conversation('conv_1'))
+        self.assertEqual(reads, [2])
+
+
+def run_tests():
+    """Run all tests"""
+    print("🧪 Running Write-Behind Queue Unit Tests (No Database Required)")
+    print("=" * 60)
+
+    suite = unittest.TestSuite()
+    loader = unittest.TestLoader()
+    suite.addTests(loader.loadTestsFromTestCase(TestWriteBehindQueue))
+    suite.addTests(loader.loadTestsFromTestCase(TestReadBarrier))
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    print(f"\n📊 Test Summary:")
+    print(f"Tests run: {result.testsRun}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    return len(result.failures) == 0 and len(result.errors) == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)